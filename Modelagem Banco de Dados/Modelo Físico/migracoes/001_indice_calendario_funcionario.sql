@@ -0,0 +1,4 @@
+-- Índice composto para a agenda por funcionário (GET /agendamentos/calendario).
+-- O índice simples em funcionario_id passa a ser coberto pelo prefixo do composto.
+CREATE INDEX IF NOT EXISTS idx_agendamentos_funcionario_data ON Agendamentos(funcionario_id, data_hora_agendamento);
+DROP INDEX IF EXISTS idx_agendamentos_funcionario_id;
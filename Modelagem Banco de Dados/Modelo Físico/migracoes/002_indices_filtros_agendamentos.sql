@@ -0,0 +1,13 @@
+-- Índices compostos/parciais exigidos pela verificação de planos (scripts/check_query_plans.py).
+CREATE INDEX IF NOT EXISTS idx_clientes_nome ON Clientes(nome);
+CREATE INDEX IF NOT EXISTS idx_animais_nome ON Animais(nome);
+CREATE INDEX IF NOT EXISTS idx_animais_cliente_nome ON Animais(cliente_id, nome);
+CREATE INDEX IF NOT EXISTS idx_agendamentos_animal_data ON Agendamentos(animal_id, data_hora_agendamento);
+CREATE INDEX IF NOT EXISTS idx_agendamentos_status_data ON Agendamentos(status, data_hora_agendamento);
+CREATE INDEX IF NOT EXISTS idx_agendamentos_funcionario_abertos ON Agendamentos(funcionario_id, status, data_hora_agendamento)
+    WHERE status IN ('Agendado', 'Confirmado');
+CREATE INDEX IF NOT EXISTS idx_funcionarios_ativos_nome ON Funcionarios(nome) WHERE ativo;
+
+-- Cobertos pelo prefixo dos compostos acima.
+DROP INDEX IF EXISTS idx_animais_cliente_id;
+DROP INDEX IF EXISTS idx_agendamentos_animal_id;
@@ -0,0 +1,19 @@
+-- Criação da Tabela Tarefas (fila de tarefas em segundo plano, consumida por app/tasks/worker.py)
+CREATE TABLE IF NOT EXISTS Tarefas (
+    tarefa_id BIGSERIAL PRIMARY KEY,
+    tipo VARCHAR(100) NOT NULL,
+    payload JSONB NOT NULL DEFAULT '{}',
+    status VARCHAR(20) NOT NULL DEFAULT 'pendente' CHECK (status IN ('pendente', 'executando', 'concluida', 'falhou')), -- 'falhou' = fila morta (dead letter)
+    tentativas INTEGER NOT NULL DEFAULT 0,
+    max_tentativas INTEGER NOT NULL DEFAULT 5,
+    executar_em TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    bloqueada_ate TIMESTAMP WITH TIME ZONE, -- Prazo do worker que pegou a tarefa; vencido, ela pode ser retomada.
+    chave_unica VARCHAR(255) UNIQUE, -- Evita enfileirar duas vezes a mesma ocorrência (recorrentes, lembretes).
+    ultimo_erro TEXT,
+    data_hora_criacao TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+    data_hora_conclusao TIMESTAMP WITH TIME ZONE
+);
+
+-- Parciais: tarefas prontas para execução e tarefas em execução com prazo vencido.
+CREATE INDEX IF NOT EXISTS idx_tarefas_pendentes ON Tarefas(executar_em) WHERE status = 'pendente';
+CREATE INDEX IF NOT EXISTS idx_tarefas_executando ON Tarefas(bloqueada_ate) WHERE status = 'executando';
@@ -0,0 +1,57 @@
+-- Filiais: cada cliente, animal, funcionário, serviço e agendamento pertence a uma filial.
+-- Os dados existentes ficam na filial 1 (Matriz).
+--
+-- Sem particionamento declarativo: a PK de uma tabela particionada precisa incluir a chave
+-- de partição, o que mudaria todas as FKs por ID. Os índices passam a começar por filial_id
+-- (cada filial percorre só o seu trecho) e filiais grandes vão para um banco próprio
+-- (FILIAIS_BANCOS, ver scripts/move_branch.py).
+CREATE TABLE IF NOT EXISTS Filiais (
+    filial_id SERIAL PRIMARY KEY,
+    nome VARCHAR(150) UNIQUE NOT NULL,
+    data_cadastro TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
+);
+
+INSERT INTO Filiais (filial_id, nome) VALUES (1, 'Matriz') ON CONFLICT DO NOTHING;
+SELECT setval(pg_get_serial_sequence('filiais', 'filial_id'), (SELECT max(filial_id) FROM Filiais));
+
+ALTER TABLE Clientes ADD COLUMN IF NOT EXISTS filial_id INTEGER NOT NULL DEFAULT 1
+    CONSTRAINT fk_clientes_filial REFERENCES Filiais (filial_id);
+ALTER TABLE Funcionarios ADD COLUMN IF NOT EXISTS filial_id INTEGER NOT NULL DEFAULT 1
+    CONSTRAINT fk_funcionarios_filial REFERENCES Filiais (filial_id);
+ALTER TABLE Servicos ADD COLUMN IF NOT EXISTS filial_id INTEGER NOT NULL DEFAULT 1
+    CONSTRAINT fk_servicos_filial REFERENCES Filiais (filial_id);
+-- Animais e agendamentos repetem a filial do cliente/animal para que as listagens da filial
+-- usem um índice próprio sem JOIN.
+ALTER TABLE Animais ADD COLUMN IF NOT EXISTS filial_id INTEGER NOT NULL DEFAULT 1
+    CONSTRAINT fk_animais_filial REFERENCES Filiais (filial_id);
+ALTER TABLE Agendamentos ADD COLUMN IF NOT EXISTS filial_id INTEGER NOT NULL DEFAULT 1
+    CONSTRAINT fk_agendamentos_filial REFERENCES Filiais (filial_id);
+
+-- E-mail de cliente/funcionário e nome de serviço passam a ser únicos por filial.
+ALTER TABLE Clientes DROP CONSTRAINT IF EXISTS clientes_email_key;
+ALTER TABLE Funcionarios DROP CONSTRAINT IF EXISTS funcionarios_email_key;
+ALTER TABLE Servicos DROP CONSTRAINT IF EXISTS servicos_nome_key;
+DO $$
+BEGIN
+    ALTER TABLE Clientes ADD CONSTRAINT uq_clientes_filial_email UNIQUE (filial_id, email);
+    ALTER TABLE Funcionarios ADD CONSTRAINT uq_funcionarios_filial_email UNIQUE (filial_id, email);
+    ALTER TABLE Servicos ADD CONSTRAINT uq_servicos_filial_nome UNIQUE (filial_id, nome);
+EXCEPTION WHEN duplicate_table OR duplicate_object THEN NULL;
+END $$;
+
+-- Índices das listagens começando pela filial.
+CREATE INDEX IF NOT EXISTS idx_clientes_filial_nome ON Clientes(filial_id, nome);
+CREATE INDEX IF NOT EXISTS idx_animais_filial_nome ON Animais(filial_id, nome);
+CREATE INDEX IF NOT EXISTS idx_funcionarios_filial_nome ON Funcionarios(filial_id, nome);
+CREATE INDEX IF NOT EXISTS idx_funcionarios_filial_ativos_nome ON Funcionarios(filial_id, nome) WHERE ativo;
+CREATE INDEX IF NOT EXISTS idx_agendamentos_filial_data ON Agendamentos(filial_id, data_hora_agendamento);
+CREATE INDEX IF NOT EXISTS idx_agendamentos_filial_status_data ON Agendamentos(filial_id, status, data_hora_agendamento);
+
+-- Substituídos pelos índices/constraints por filial acima.
+DROP INDEX IF EXISTS idx_clientes_nome;
+DROP INDEX IF EXISTS idx_clientes_email;
+DROP INDEX IF EXISTS idx_animais_nome;
+DROP INDEX IF EXISTS idx_funcionarios_ativos_nome;
+DROP INDEX IF EXISTS idx_funcionarios_email;
+-- idx_agendamentos_data_hora e idx_agendamentos_status_data ficam: as tarefas de manutenção
+-- (lembretes, não comparecimento) percorrem todas as filiais do banco.
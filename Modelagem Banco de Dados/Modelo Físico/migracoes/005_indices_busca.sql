@@ -0,0 +1,10 @@
+-- Busca textual das listagens (?busca=, ver app/db/busca.py): full text search por prefixo,
+-- sem extensões. As expressões precisam ser idênticas às VETOR_BUSCA_* dos cruds.
+CREATE INDEX IF NOT EXISTS idx_clientes_busca ON Clientes
+    USING GIN (to_tsvector('simple', coalesce(nome, '') || ' ' || coalesce(email, '') || ' ' || coalesce(telefone, '')));
+CREATE INDEX IF NOT EXISTS idx_animais_busca ON Animais
+    USING GIN (to_tsvector('simple', coalesce(nome, '') || ' ' || coalesce(especie, '') || ' ' || coalesce(raca, '')));
+CREATE INDEX IF NOT EXISTS idx_funcionarios_busca ON Funcionarios
+    USING GIN (to_tsvector('simple', coalesce(nome, '') || ' ' || coalesce(cargo, '') || ' ' || coalesce(email, '') || ' ' || coalesce(telefone, '')));
+CREATE INDEX IF NOT EXISTS idx_servicos_busca ON Servicos
+    USING GIN (to_tsvector('simple', coalesce(nome, '') || ' ' || coalesce(descricao, '')));
@@ -0,0 +1,20 @@
+-- Auditoria das alterações de clientes, animais, funcionários, serviços e agendamentos,
+-- gravada em lotes por uma thread da API (ver app/core/audit.py). Só recebe INSERTs: sem
+-- FK para as entidades, para que o histórico sobreviva à exclusão delas.
+CREATE TABLE IF NOT EXISTS Auditoria (
+    auditoria_id BIGSERIAL PRIMARY KEY,
+    filial_id INTEGER NOT NULL,
+    entidade VARCHAR(30) NOT NULL, -- clientes, animais, funcionarios, servicos, agendamentos
+    entidade_id INTEGER NOT NULL,
+    acao VARCHAR(10) NOT NULL CHECK (acao IN ('create', 'update', 'delete')),
+    alteracoes JSONB NOT NULL DEFAULT '{}', -- update: {"campo": {"de": ..., "para": ...}}
+    autor VARCHAR(100), -- Header X-Usuario da requisição
+    endpoint VARCHAR(200),
+    data_hora TIMESTAMP WITH TIME ZONE NOT NULL
+);
+
+-- GET /auditoria/: histórico de um registro e de uma entidade num período, mais recentes primeiro.
+CREATE INDEX IF NOT EXISTS idx_auditoria_registro
+    ON Auditoria (filial_id, entidade, entidade_id, data_hora DESC, auditoria_id DESC);
+CREATE INDEX IF NOT EXISTS idx_auditoria_entidade_data
+    ON Auditoria (filial_id, entidade, data_hora DESC, auditoria_id DESC);
@@ -0,0 +1,54 @@
+-- Estatísticas por cliente e por animal (visitas, gasto total, última visita, não
+-- comparecimentos e serviço favorito), atualizadas pelas funções crud na mesma transação
+-- que cria, altera ou exclui o agendamento (ver app/crud/crud_estatisticas.py).
+--
+-- As tabelas nascem vazias: depois de aplicar esta migração, preencha-as a partir dos
+-- agendamentos existentes com
+--
+--     python -m scripts.rebuild_stats
+--
+-- (a partir de petshop_backend/). Até lá, a listagem de clientes ordenada por estatística
+-- só traz os clientes cadastrados depois da migração.
+CREATE TABLE IF NOT EXISTS Estatisticas_Clientes (
+    cliente_id INTEGER PRIMARY KEY
+        CONSTRAINT fk_estatisticas_cliente REFERENCES Clientes (cliente_id) ON DELETE CASCADE,
+    filial_id INTEGER NOT NULL,
+    visitas INTEGER NOT NULL DEFAULT 0, -- Agendamentos concluídos
+    gasto_total DECIMAL(12, 2) NOT NULL DEFAULT 0, -- Soma dos preços registrados nas visitas
+    ultima_visita TIMESTAMP WITH TIME ZONE,
+    nao_comparecimentos INTEGER NOT NULL DEFAULT 0,
+    servico_favorito_id INTEGER -- Serviço mais feito nas visitas (empate: menor ID)
+        CONSTRAINT fk_estatisticas_cliente_servico REFERENCES Servicos (servico_id) ON DELETE SET NULL
+);
+
+CREATE TABLE IF NOT EXISTS Estatisticas_Animais (
+    animal_id INTEGER PRIMARY KEY
+        CONSTRAINT fk_estatisticas_animal REFERENCES Animais (animal_id) ON DELETE CASCADE,
+    filial_id INTEGER NOT NULL,
+    visitas INTEGER NOT NULL DEFAULT 0,
+    gasto_total DECIMAL(12, 2) NOT NULL DEFAULT 0,
+    ultima_visita TIMESTAMP WITH TIME ZONE,
+    nao_comparecimentos INTEGER NOT NULL DEFAULT 0,
+    servico_favorito_id INTEGER
+        CONSTRAINT fk_estatisticas_animal_servico REFERENCES Servicos (servico_id) ON DELETE SET NULL
+);
+
+-- Quantas visitas de cada animal incluíram cada serviço (base do serviço favorito).
+CREATE TABLE IF NOT EXISTS Estatisticas_Animais_Servicos (
+    animal_id INTEGER NOT NULL
+        CONSTRAINT fk_estatisticas_servicos_animal REFERENCES Animais (animal_id) ON DELETE CASCADE,
+    servico_id INTEGER NOT NULL
+        CONSTRAINT fk_estatisticas_servicos_servico REFERENCES Servicos (servico_id) ON DELETE CASCADE,
+    quantidade INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (animal_id, servico_id)
+);
+
+-- GET /clientes/?ordenar=: cada ordenação percorre o índice da filial já na ordem (maiores primeiro).
+CREATE INDEX IF NOT EXISTS idx_estatisticas_clientes_gasto
+    ON Estatisticas_Clientes (filial_id, gasto_total DESC, cliente_id);
+CREATE INDEX IF NOT EXISTS idx_estatisticas_clientes_visitas
+    ON Estatisticas_Clientes (filial_id, visitas DESC, cliente_id);
+CREATE INDEX IF NOT EXISTS idx_estatisticas_clientes_ultima
+    ON Estatisticas_Clientes (filial_id, ultima_visita DESC NULLS LAST, cliente_id);
+CREATE INDEX IF NOT EXISTS idx_estatisticas_clientes_faltas
+    ON Estatisticas_Clientes (filial_id, nao_comparecimentos DESC, cliente_id);
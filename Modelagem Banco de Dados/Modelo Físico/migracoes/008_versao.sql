@@ -0,0 +1,12 @@
+-- Controle de concorrência otimista: cada cliente, animal, funcionário, serviço e
+-- agendamento tem uma versão, somada a cada alteração pelas funções crud. O PUT pode
+-- informar a versão editada (header If-Match ou campo "versao"); se o registro mudou
+-- desde então, a alteração é recusada com 409 em vez de sobrescrever a outra.
+--
+-- ADD COLUMN com DEFAULT constante não reescreve a tabela (PostgreSQL 11+): os registros
+-- existentes ficam na versão 1.
+ALTER TABLE Clientes ADD COLUMN IF NOT EXISTS versao INTEGER NOT NULL DEFAULT 1;
+ALTER TABLE Funcionarios ADD COLUMN IF NOT EXISTS versao INTEGER NOT NULL DEFAULT 1;
+ALTER TABLE Servicos ADD COLUMN IF NOT EXISTS versao INTEGER NOT NULL DEFAULT 1;
+ALTER TABLE Animais ADD COLUMN IF NOT EXISTS versao INTEGER NOT NULL DEFAULT 1;
+ALTER TABLE Agendamentos ADD COLUMN IF NOT EXISTS versao INTEGER NOT NULL DEFAULT 1;
@@ -1,66 +1,99 @@
 
+-- Criação da Tabela Filiais
+CREATE TABLE Filiais (
+    filial_id SERIAL PRIMARY KEY,
+    nome VARCHAR(150) UNIQUE NOT NULL,
+    data_cadastro TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
+);
+
+INSERT INTO Filiais (nome) VALUES ('Matriz');
+
+
 -- Criação da Tabela Clientes
 CREATE TABLE Clientes (
     cliente_id SERIAL PRIMARY KEY,
+    filial_id INTEGER NOT NULL DEFAULT 1,
     nome VARCHAR(255) NOT NULL,
     telefone VARCHAR(20) NOT NULL,
-    email VARCHAR(255) UNIQUE NOT NULL,
+    email VARCHAR(255) NOT NULL,
     endereco VARCHAR(500),
-    data_cadastro TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
+    data_cadastro TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+    versao INTEGER NOT NULL DEFAULT 1, -- Somada a cada alteração (controle de concorrência otimista).
+    CONSTRAINT uq_clientes_filial_email UNIQUE (filial_id, email), -- E-mail único por filial.
+    CONSTRAINT fk_clientes_filial FOREIGN KEY (filial_id)
+        REFERENCES Filiais (filial_id)
 );
 
 
 -- Criação da Tabela Funcionarios
 CREATE TABLE Funcionarios (
     funcionario_id SERIAL PRIMARY KEY,
+    filial_id INTEGER NOT NULL DEFAULT 1,
     nome VARCHAR(255) NOT NULL,
     cargo VARCHAR(100) NOT NULL,
     telefone VARCHAR(20),
-    email VARCHAR(255) UNIQUE,
+    email VARCHAR(255),
     data_contratacao DATE NOT NULL,
-    ativo BOOLEAN DEFAULT TRUE -- Adicionado para indicar se o funcionário está ativo
+    ativo BOOLEAN DEFAULT TRUE, -- Adicionado para indicar se o funcionário está ativo
+    versao INTEGER NOT NULL DEFAULT 1, -- Somada a cada alteração (controle de concorrência otimista).
+    CONSTRAINT uq_funcionarios_filial_email UNIQUE (filial_id, email),
+    CONSTRAINT fk_funcionarios_filial FOREIGN KEY (filial_id)
+        REFERENCES Filiais (filial_id)
 );
 
 
 -- Criação da Tabela Servicos
 CREATE TABLE Servicos (
     servico_id SERIAL PRIMARY KEY,
-    nome VARCHAR(150) UNIQUE NOT NULL,
+    filial_id INTEGER NOT NULL DEFAULT 1,
+    nome VARCHAR(150) NOT NULL,
     descricao TEXT,
     preco DECIMAL(10, 2) NOT NULL CHECK (preco >= 0),
-    duracao_estimada_minutos INTEGER NOT NULL CHECK (duracao_estimada_minutos > 0)
+    duracao_estimada_minutos INTEGER NOT NULL CHECK (duracao_estimada_minutos > 0),
+    versao INTEGER NOT NULL DEFAULT 1, -- Somada a cada alteração (controle de concorrência otimista).
+    CONSTRAINT uq_servicos_filial_nome UNIQUE (filial_id, nome), -- Também atende a listagem da filial por nome.
+    CONSTRAINT fk_servicos_filial FOREIGN KEY (filial_id)
+        REFERENCES Filiais (filial_id)
 );
 
 
 -- Criação da Tabela Animais
 CREATE TABLE Animais (
     animal_id SERIAL PRIMARY KEY,
+    filial_id INTEGER NOT NULL DEFAULT 1, -- Mesma filial do cliente (gravada pelo crud).
     cliente_id INTEGER NOT NULL,
     nome VARCHAR(100) NOT NULL,
     especie VARCHAR(50) NOT NULL,
     raca VARCHAR(50),
     data_nascimento DATE,
     observacoes TEXT,
+    versao INTEGER NOT NULL DEFAULT 1, -- Somada a cada alteração (controle de concorrência otimista).
     CONSTRAINT fk_cliente FOREIGN KEY (cliente_id)
         REFERENCES Clientes (cliente_id)
-        ON DELETE CASCADE -- Se o cliente for removido, seus animais também são.
+        ON DELETE CASCADE, -- Se o cliente for removido, seus animais também são.
+    CONSTRAINT fk_animais_filial FOREIGN KEY (filial_id)
+        REFERENCES Filiais (filial_id)
 );
 
 -- Criação da Tabela Agendamentos
 CREATE TABLE Agendamentos (
     agendamento_id SERIAL PRIMARY KEY,
+    filial_id INTEGER NOT NULL DEFAULT 1, -- Mesma filial do animal (gravada pelo crud).
     animal_id INTEGER NOT NULL,
     funcionario_id INTEGER, 
     data_hora_agendamento TIMESTAMP WITH TIME ZONE NOT NULL,
     data_hora_criacao TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
     status VARCHAR(50) NOT NULL CHECK (status IN ('Agendado', 'Confirmado', 'Cancelado', 'Concluído', 'Não Compareceu')),
     observacoes TEXT,
+    versao INTEGER NOT NULL DEFAULT 1, -- Somada a cada alteração (controle de concorrência otimista).
     CONSTRAINT fk_animal FOREIGN KEY (animal_id)
         REFERENCES Animais (animal_id)
         ON DELETE CASCADE, -- Se o animal for removido, seus agendamentos também são.
     CONSTRAINT fk_funcionario FOREIGN KEY (funcionario_id)
         REFERENCES Funcionarios (funcionario_id)
-        ON DELETE SET NULL -- 
+        ON DELETE SET NULL, -- 
+    CONSTRAINT fk_agendamentos_filial FOREIGN KEY (filial_id)
+        REFERENCES Filiais (filial_id)
 );
 
 
@@ -80,10 +113,127 @@ CREATE TABLE Agendamento_Servicos (
 );
 
 -- Criação de Índices para otimização de consultas
-CREATE INDEX idx_animais_cliente_id ON Animais(cliente_id);
-CREATE INDEX idx_agendamentos_animal_id ON Agendamentos(animal_id);
-CREATE INDEX idx_agendamentos_funcionario_id ON Agendamentos(funcionario_id);
+-- Listagens da filial ordenadas por nome (LIMIT/OFFSET sem ordenar a tabela inteira).
+-- Sem particionamento: filiais grandes vão para um banco próprio (FILIAIS_BANCOS).
+CREATE INDEX idx_clientes_filial_nome ON Clientes(filial_id, nome);
+CREATE INDEX idx_animais_filial_nome ON Animais(filial_id, nome);
+CREATE INDEX idx_funcionarios_filial_nome ON Funcionarios(filial_id, nome);
+-- Composto: atende a FK e a listagem de animais do cliente já ordenada por nome.
+CREATE INDEX idx_animais_cliente_nome ON Animais(cliente_id, nome);
+-- Compostos com data: cada filtro de get_agendamentos percorre o índice já na ordem do ORDER BY.
+CREATE INDEX idx_agendamentos_animal_data ON Agendamentos(animal_id, data_hora_agendamento);
+-- Composto: atende o filtro por funcionário e a agenda (calendário) por período.
+CREATE INDEX idx_agendamentos_funcionario_data ON Agendamentos(funcionario_id, data_hora_agendamento);
+-- Compostos com a filial: listagens e análises de uma filial por período/status.
+CREATE INDEX idx_agendamentos_filial_data ON Agendamentos(filial_id, data_hora_agendamento);
+CREATE INDEX idx_agendamentos_filial_status_data ON Agendamentos(filial_id, status, data_hora_agendamento);
+-- Sem a filial: tarefas de manutenção que percorrem o banco inteiro (lembretes, não comparecimento).
+CREATE INDEX idx_agendamentos_status_data ON Agendamentos(status, data_hora_agendamento);
 CREATE INDEX idx_agendamentos_data_hora ON Agendamentos(data_hora_agendamento);
+-- Parcial: agenda em aberto por funcionário (status Agendado/Confirmado são poucos frente ao histórico).
+CREATE INDEX idx_agendamentos_funcionario_abertos ON Agendamentos(funcionario_id, status, data_hora_agendamento)
+    WHERE status IN ('Agendado', 'Confirmado');
+-- Parcial: listagem de funcionários ativos da filial.
+CREATE INDEX idx_funcionarios_filial_ativos_nome ON Funcionarios(filial_id, nome) WHERE ativo;
 CREATE INDEX idx_agendamento_servicos_servico_id ON Agendamento_Servicos(servico_id);
-CREATE INDEX idx_clientes_email ON Clientes(email);
-CREATE INDEX idx_funcionarios_email ON Funcionarios(email);
+-- Busca por e-mail: atendida pelas constraints únicas (filial_id, email).
+-- Busca textual das listagens (?busca=): GIN sobre as mesmas expressões VETOR_BUSCA_* dos cruds.
+CREATE INDEX idx_clientes_busca ON Clientes
+    USING GIN (to_tsvector('simple', coalesce(nome, '') || ' ' || coalesce(email, '') || ' ' || coalesce(telefone, '')));
+CREATE INDEX idx_animais_busca ON Animais
+    USING GIN (to_tsvector('simple', coalesce(nome, '') || ' ' || coalesce(especie, '') || ' ' || coalesce(raca, '')));
+CREATE INDEX idx_funcionarios_busca ON Funcionarios
+    USING GIN (to_tsvector('simple', coalesce(nome, '') || ' ' || coalesce(cargo, '') || ' ' || coalesce(email, '') || ' ' || coalesce(telefone, '')));
+CREATE INDEX idx_servicos_busca ON Servicos
+    USING GIN (to_tsvector('simple', coalesce(nome, '') || ' ' || coalesce(descricao, '')));
+
+-- Criação da Tabela Tarefas (fila de tarefas em segundo plano, consumida por app/tasks/worker.py)
+CREATE TABLE Tarefas (
+    tarefa_id BIGSERIAL PRIMARY KEY,
+    tipo VARCHAR(100) NOT NULL,
+    payload JSONB NOT NULL DEFAULT '{}',
+    status VARCHAR(20) NOT NULL DEFAULT 'pendente' CHECK (status IN ('pendente', 'executando', 'concluida', 'falhou')), -- 'falhou' = fila morta (dead letter)
+    tentativas INTEGER NOT NULL DEFAULT 0,
+    max_tentativas INTEGER NOT NULL DEFAULT 5,
+    executar_em TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    bloqueada_ate TIMESTAMP WITH TIME ZONE, -- Prazo do worker que pegou a tarefa; vencido, ela pode ser retomada.
+    chave_unica VARCHAR(255) UNIQUE, -- Evita enfileirar duas vezes a mesma ocorrência (recorrentes, lembretes).
+    ultimo_erro TEXT,
+    data_hora_criacao TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+    data_hora_conclusao TIMESTAMP WITH TIME ZONE
+);
+
+-- Parciais: tarefas prontas para execução e tarefas em execução com prazo vencido.
+CREATE INDEX idx_tarefas_pendentes ON Tarefas(executar_em) WHERE status = 'pendente';
+CREATE INDEX idx_tarefas_executando ON Tarefas(bloqueada_ate) WHERE status = 'executando';
+
+-- Criação da Tabela Auditoria (alterações gravadas em lotes por app/core/audit.py; só recebe INSERTs)
+CREATE TABLE Auditoria (
+    auditoria_id BIGSERIAL PRIMARY KEY,
+    filial_id INTEGER NOT NULL,
+    entidade VARCHAR(30) NOT NULL, -- clientes, animais, funcionarios, servicos, agendamentos
+    entidade_id INTEGER NOT NULL, -- Sem FK: o histórico sobrevive à exclusão do registro.
+    acao VARCHAR(10) NOT NULL CHECK (acao IN ('create', 'update', 'delete')),
+    alteracoes JSONB NOT NULL DEFAULT '{}', -- update: {"campo": {"de": ..., "para": ...}}
+    autor VARCHAR(100), -- Header X-Usuario da requisição
+    endpoint VARCHAR(200),
+    data_hora TIMESTAMP WITH TIME ZONE NOT NULL
+);
+
+-- GET /auditoria/: histórico de um registro e de uma entidade num período, mais recentes primeiro.
+CREATE INDEX idx_auditoria_registro ON Auditoria(filial_id, entidade, entidade_id, data_hora DESC, auditoria_id DESC);
+CREATE INDEX idx_auditoria_entidade_data ON Auditoria(filial_id, entidade, data_hora DESC, auditoria_id DESC);
+
+-- Criação das Tabelas de Estatísticas (mantidas pelas funções crud na mesma transação dos
+-- agendamentos, ver app/crud/crud_estatisticas.py; recalculáveis com scripts/rebuild_stats.py)
+CREATE TABLE Estatisticas_Clientes (
+    cliente_id INTEGER PRIMARY KEY,
+    filial_id INTEGER NOT NULL,
+    visitas INTEGER NOT NULL DEFAULT 0, -- Agendamentos concluídos
+    gasto_total DECIMAL(12, 2) NOT NULL DEFAULT 0, -- Soma dos preços registrados nas visitas
+    ultima_visita TIMESTAMP WITH TIME ZONE,
+    nao_comparecimentos INTEGER NOT NULL DEFAULT 0,
+    servico_favorito_id INTEGER, -- Serviço mais feito nas visitas (empate: menor ID)
+    CONSTRAINT fk_estatisticas_cliente FOREIGN KEY (cliente_id)
+        REFERENCES Clientes (cliente_id)
+        ON DELETE CASCADE,
+    CONSTRAINT fk_estatisticas_cliente_servico FOREIGN KEY (servico_favorito_id)
+        REFERENCES Servicos (servico_id)
+        ON DELETE SET NULL
+);
+
+CREATE TABLE Estatisticas_Animais (
+    animal_id INTEGER PRIMARY KEY,
+    filial_id INTEGER NOT NULL,
+    visitas INTEGER NOT NULL DEFAULT 0,
+    gasto_total DECIMAL(12, 2) NOT NULL DEFAULT 0,
+    ultima_visita TIMESTAMP WITH TIME ZONE,
+    nao_comparecimentos INTEGER NOT NULL DEFAULT 0,
+    servico_favorito_id INTEGER,
+    CONSTRAINT fk_estatisticas_animal FOREIGN KEY (animal_id)
+        REFERENCES Animais (animal_id)
+        ON DELETE CASCADE,
+    CONSTRAINT fk_estatisticas_animal_servico FOREIGN KEY (servico_favorito_id)
+        REFERENCES Servicos (servico_id)
+        ON DELETE SET NULL
+);
+
+-- Quantas visitas de cada animal incluíram cada serviço (base do serviço favorito).
+CREATE TABLE Estatisticas_Animais_Servicos (
+    animal_id INTEGER NOT NULL,
+    servico_id INTEGER NOT NULL,
+    quantidade INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (animal_id, servico_id),
+    CONSTRAINT fk_estatisticas_servicos_animal FOREIGN KEY (animal_id)
+        REFERENCES Animais (animal_id)
+        ON DELETE CASCADE,
+    CONSTRAINT fk_estatisticas_servicos_servico FOREIGN KEY (servico_id)
+        REFERENCES Servicos (servico_id)
+        ON DELETE CASCADE
+);
+
+-- GET /clientes/?ordenar=: cada ordenação percorre o índice da filial já na ordem (maiores primeiro).
+CREATE INDEX idx_estatisticas_clientes_gasto ON Estatisticas_Clientes(filial_id, gasto_total DESC, cliente_id);
+CREATE INDEX idx_estatisticas_clientes_visitas ON Estatisticas_Clientes(filial_id, visitas DESC, cliente_id);
+CREATE INDEX idx_estatisticas_clientes_ultima ON Estatisticas_Clientes(filial_id, ultima_visita DESC NULLS LAST, cliente_id);
+CREATE INDEX idx_estatisticas_clientes_faltas ON Estatisticas_Clientes(filial_id, nao_comparecimentos DESC, cliente_id);
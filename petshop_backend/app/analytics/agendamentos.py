@@ -0,0 +1,411 @@
+import io
+from datetime import datetime, timedelta
+from typing import Dict, Iterator, List, Optional, Sequence
+from zoneinfo import ZoneInfo
+
+import numpy as np
+import pandas as pd
+
+from app.db.database import filial_atual, get_db_cursor
+
+# --- Análises de agendamentos em formato colunar ---
+#
+# Os dados saem do Postgres via COPY ... TO STDOUT (CSV) direto para um buffer lido pelo
+# pandas, em janelas de tempo, sem passar por modelos Pydantic linha a linha. As métricas
+# são calculadas com operações vetorizadas do pandas/NumPy.
+# Os conjuntos são sempre da filial atual; a visão de várias filiais carrega cada uma no seu
+# banco (em paralelo) e concatena os DataFrames antes de calcular as métricas.
+
+JANELA_PADRAO_DIAS = 31
+
+STATUS_CONCLUIDO = "Concluído"
+STATUS_NAO_COMPARECEU = "Não Compareceu"
+
+SQL_AGENDAMENTOS = """
+    SELECT
+        a.filial_id,
+        a.agendamento_id,
+        a.animal_id,
+        ani.cliente_id,
+        a.funcionario_id,
+        a.data_hora_agendamento,
+        a.status,
+        COALESCE(s.valor_total, 0) AS valor_total,
+        COALESCE(s.qtd_servicos, 0) AS qtd_servicos,
+        COALESCE(s.duracao_minutos, 0) AS duracao_minutos
+    FROM Agendamentos a
+    JOIN Animais ani ON a.animal_id = ani.animal_id
+    LEFT JOIN LATERAL (
+        SELECT SUM(ags.preco_registrado) AS valor_total,
+               COUNT(*) AS qtd_servicos,
+               SUM(sv.duracao_estimada_minutos) AS duracao_minutos
+        FROM Agendamento_Servicos ags
+        JOIN Servicos sv ON ags.servico_id = sv.servico_id
+        WHERE ags.agendamento_id = a.agendamento_id
+    ) s ON TRUE
+    WHERE a.filial_id = %s
+      AND a.data_hora_agendamento >= %s AND a.data_hora_agendamento < %s
+"""
+
+SQL_SERVICOS = """
+    SELECT
+        a.filial_id,
+        ags.agendamento_id,
+        ags.servico_id,
+        sv.nome AS servico_nome,
+        ags.preco_registrado,
+        a.status,
+        a.data_hora_agendamento
+    FROM Agendamento_Servicos ags
+    JOIN Agendamentos a ON ags.agendamento_id = a.agendamento_id
+    JOIN Servicos sv ON ags.servico_id = sv.servico_id
+    WHERE a.filial_id = %s
+      AND a.data_hora_agendamento >= %s AND a.data_hora_agendamento < %s
+"""
+
+DTYPES_AGENDAMENTOS = {
+    "filial_id": "int32",
+    "agendamento_id": "int64",
+    "animal_id": "int64",
+    "cliente_id": "int64",
+    "funcionario_id": "Int64",
+    "status": "category",
+    "valor_total": "float64",
+    "qtd_servicos": "int16",
+    "duracao_minutos": "int32",
+}
+
+DTYPES_SERVICOS = {
+    "filial_id": "int32",
+    "agendamento_id": "int64",
+    "servico_id": "int32",
+    "servico_nome": "category",
+    "preco_registrado": "float64",
+    "status": "category",
+}
+
+CONJUNTOS = {
+    "agendamentos": (SQL_AGENDAMENTOS, DTYPES_AGENDAMENTOS),
+    "servicos": (SQL_SERVICOS, DTYPES_SERVICOS),
+}
+
+
+def _copy_frame(cursor, sql: str, params, dtypes: Dict[str, str]) -> pd.DataFrame:
+    """Executa COPY (consulta) TO STDOUT em CSV e lê o buffer como DataFrame."""
+    buffer = io.StringIO()
+    consulta = cursor.mogrify(sql, params).decode()
+    cursor.copy_expert(f"COPY ({consulta}) TO STDOUT WITH (FORMAT csv, HEADER true)", buffer)
+    buffer.seek(0)
+    frame = pd.read_csv(buffer, dtype=dtypes, parse_dates=["data_hora_agendamento"])
+    frame["data_hora_agendamento"] = pd.to_datetime(frame["data_hora_agendamento"], utc=True)
+    return frame
+
+
+def iter_chunks(conjunto: str, data_inicio: datetime, data_fim: datetime,
+                janela_dias: int = JANELA_PADRAO_DIAS) -> Iterator[pd.DataFrame]:
+    """Gera DataFrames do conjunto ("agendamentos" ou "servicos"), uma janela de tempo por vez."""
+    sql, dtypes = CONJUNTOS[conjunto]
+    filial_id = filial_atual()
+    with get_db_cursor() as cursor:
+        # Timestamps no CSV sempre em UTC, independente do fuso da sessão.
+        cursor.execute("SET LOCAL TimeZone = 'UTC';")
+        inicio = data_inicio
+        while inicio < data_fim:
+            fim = min(inicio + timedelta(days=janela_dias), data_fim)
+            frame = _copy_frame(cursor, sql, (filial_id, inicio, fim), dtypes)
+            if not frame.empty:
+                yield frame
+            inicio = fim
+
+
+def load_frame(conjunto: str, data_inicio: datetime, data_fim: datetime) -> pd.DataFrame:
+    """Carrega o conjunto inteiro do período num único DataFrame."""
+    chunks = list(iter_chunks(conjunto, data_inicio, data_fim))
+    if not chunks:
+        sql, dtypes = CONJUNTOS[conjunto]
+        vazio = pd.DataFrame({coluna: pd.Series(dtype=tipo) for coluna, tipo in dtypes.items()})
+        vazio["data_hora_agendamento"] = pd.Series(dtype="datetime64[ns, UTC]")
+        return vazio
+    return pd.concat(chunks, ignore_index=True)
+
+
+# --- Métricas ---
+
+def _lista(valores) -> List[Optional[float]]:
+    """Converte um array NumPy para lista JSON, trocando NaN por None."""
+    return [None if np.isnan(v) else round(float(v), 4) for v in np.asarray(valores, dtype="float64")]
+
+
+def ticket_distribution(agendamentos: pd.DataFrame, faixas: int = 10) -> dict:
+    """Distribuição do valor total dos agendamentos concluídos."""
+    valores = agendamentos.loc[agendamentos["status"] == STATUS_CONCLUIDO, "valor_total"].to_numpy()
+    if valores.size == 0:
+        return {"quantidade": 0}
+    percentis = [10, 25, 50, 75, 90, 99]
+    contagens, limites = np.histogram(valores, bins=faixas)
+    return {
+        "quantidade": int(valores.size),
+        "media": round(float(valores.mean()), 2),
+        "desvio_padrao": round(float(valores.std()), 2),
+        "percentis": dict(zip((f"p{p}" for p in percentis), _lista(np.percentile(valores, percentis)))),
+        "histograma": {"limites": _lista(limites), "contagens": contagens.tolist()},
+    }
+
+
+def service_mix(servicos: pd.DataFrame) -> List[dict]:
+    """Quantidade, receita e participação de cada serviço nos agendamentos concluídos."""
+    concluidos = servicos[servicos["status"] == STATUS_CONCLUIDO]
+    if concluidos.empty:
+        return []
+    # Os IDs só são únicos dentro do banco da filial: o agrupamento inclui a filial.
+    mix = concluidos.groupby(["filial_id", "servico_id", "servico_nome"], observed=True)["preco_registrado"].agg(
+        quantidade="size", receita="sum")
+    mix["participacao_quantidade"] = mix["quantidade"] / mix["quantidade"].sum()
+    mix["participacao_receita"] = mix["receita"] / mix["receita"].sum()
+    mix = mix.sort_values("receita", ascending=False).reset_index()
+    mix[["receita", "participacao_quantidade", "participacao_receita"]] = mix[
+        ["receita", "participacao_quantidade", "participacao_receita"]].round(4)
+    return mix.to_dict(orient="records")
+
+
+def no_show_rates(agendamentos: pd.DataFrame, fuso_horario: str) -> dict:
+    """Taxa de não comparecimento por dia da semana (0 = segunda) e hora local.
+
+    A base são os agendamentos já resolvidos (concluídos + não compareceu).
+    """
+    resolvidos = agendamentos[agendamentos["status"].isin([STATUS_CONCLUIDO, STATUS_NAO_COMPARECEU])]
+    local = resolvidos["data_hora_agendamento"].dt.tz_convert(fuso_horario)
+    indice = (local.dt.dayofweek * 24 + local.dt.hour).to_numpy()
+    faltas = (resolvidos["status"] == STATUS_NAO_COMPARECEU).to_numpy()
+
+    total = np.bincount(indice, minlength=7 * 24)
+    nao_compareceu = np.bincount(indice[faltas], minlength=7 * 24)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        taxa = np.where(total > 0, nao_compareceu / total, np.nan).reshape(7, 24)
+        por_dia = nao_compareceu.reshape(7, 24).sum(axis=1) / total.reshape(7, 24).sum(axis=1)
+
+    return {
+        "taxa_geral": round(float(faltas.mean()), 4) if faltas.size else None,
+        "por_dia_semana": _lista(por_dia),
+        "por_dia_semana_hora": [_lista(linha) for linha in taxa],
+        "amostras_por_dia_semana_hora": total.reshape(7, 24).tolist(),
+    }
+
+
+def employee_throughput(agendamentos: pd.DataFrame, fuso_horario: str) -> List[dict]:
+    """Atendimentos concluídos, receita e atendimentos por dia trabalhado de cada funcionário."""
+    concluidos = agendamentos[(agendamentos["status"] == STATUS_CONCLUIDO) & agendamentos["funcionario_id"].notna()]
+    if concluidos.empty:
+        return []
+    concluidos = concluidos.assign(dia=concluidos["data_hora_agendamento"].dt.tz_convert(fuso_horario).dt.date)
+    resumo = concluidos.groupby(["filial_id", "funcionario_id"]).agg(
+        atendimentos=("agendamento_id", "size"),
+        receita=("valor_total", "sum"),
+        minutos=("duracao_minutos", "sum"),
+        dias_trabalhados=("dia", "nunique"),
+    )
+    resumo["atendimentos_por_dia"] = (resumo["atendimentos"] / resumo["dias_trabalhados"]).round(2)
+    resumo["receita"] = resumo["receita"].round(2)
+    resumo = resumo.sort_values("atendimentos", ascending=False).reset_index()
+    resumo["funcionario_id"] = resumo["funcionario_id"].astype("int64")
+    resumo["filial_id"] = resumo["filial_id"].astype("int64")
+    return resumo.to_dict(orient="records")
+
+
+def branch_summary(agendamentos: pd.DataFrame) -> List[dict]:
+    """Agendamentos, concluídos e receita concluída de cada filial."""
+    concluido = agendamentos["status"] == STATUS_CONCLUIDO
+    resumo = agendamentos.assign(
+        concluido=concluido,
+        receita=agendamentos["valor_total"].where(concluido, 0.0),
+    ).groupby("filial_id").agg(
+        agendamentos=("agendamento_id", "size"),
+        concluidos=("concluido", "sum"),
+        receita=("receita", "sum"),
+    )
+    resumo["receita"] = resumo["receita"].round(2)
+    resumo = resumo.reset_index().astype({"filial_id": "int64", "concluidos": "int64"})
+    return resumo.to_dict(orient="records")
+
+
+def _load_frames(data_inicio: datetime, data_fim: datetime):
+    return load_frame("agendamentos", data_inicio, data_fim), load_frame("servicos", data_inicio, data_fim)
+
+
+def compute_metricas(data_inicio: datetime, data_fim: datetime, fuso_horario: str,
+                     filiais: Optional[Sequence[int]] = None) -> dict:
+    """Carrega o período e calcula todas as métricas de agendamentos.
+
+    Sem filiais, usa só a filial atual; com uma lista, carrega cada filial no seu banco e
+    calcula as métricas sobre os dados de todas elas juntas.
+    """
+    if filiais is None:
+        agendamentos, servicos = _load_frames(data_inicio, data_fim)
+    else:
+        from app.core.branches import em_todas_as_filiais
+
+        por_filial = em_todas_as_filiais(lambda: _load_frames(data_inicio, data_fim), filiais)
+        agendamentos = _concat([frames[0] for frames in por_filial.values()])
+        servicos = _concat([frames[1] for frames in por_filial.values()])
+    contagem_status = agendamentos["status"].value_counts()
+    return {
+        "periodo": {"inicio": data_inicio, "fim": data_fim, "fuso_horario": fuso_horario},
+        "filiais": branch_summary(agendamentos),
+        "agendamentos": int(len(agendamentos)),
+        "por_status": {str(status): int(qtd) for status, qtd in contagem_status.items() if qtd},
+        "ticket": ticket_distribution(agendamentos),
+        "mix_servicos": service_mix(servicos),
+        "nao_comparecimento": no_show_rates(agendamentos, fuso_horario),
+        "produtividade_funcionarios": employee_throughput(agendamentos, fuso_horario),
+    }
+
+
+def _concat(frames: List[pd.DataFrame]) -> pd.DataFrame:
+    """Concatena os frames das filiais; as categorias são refeitas sobre a união dos valores."""
+    if len(frames) == 1:
+        return frames[0]
+    categorias = frames[0].select_dtypes("category").columns
+    unidos = pd.concat([f.astype({c: "object" for c in categorias}) for f in frames], ignore_index=True)
+    return unidos.astype({c: "category" for c in categorias})
+
+
+# --- Ocupação dos funcionários (mapa de calor dia da semana x horário) ---
+#
+# Cada agendamento é um intervalo [início, início + soma das durações dos serviços) no
+# horário local. Os intervalos são rasterizados numa grade de minutos da semana por
+# funcionário com um vetor de diferenças (+1 no início, -1 no fim, via np.bincount) e uma
+# soma acumulada; somar os minutos de cada faixa dá os minutos reservados. Nenhum laço
+# Python passa pelos agendamentos.
+
+MINUTOS_SEMANA = 7 * 24 * 60
+# 1970-01-01 (época) foi uma quinta-feira: desloca para a semana começar na segunda.
+DESLOCAMENTO_SEGUNDA = 3 * 24 * 60
+
+SQL_INTERVALOS = """
+    SELECT a.funcionario_id,
+           floor(extract(epoch FROM a.data_hora_agendamento AT TIME ZONE %s) / 60)::bigint AS inicio_minuto,
+           SUM(sv.duracao_estimada_minutos) AS duracao_minutos
+    FROM Agendamentos a
+    JOIN Agendamento_Servicos ags ON ags.agendamento_id = a.agendamento_id
+    JOIN Servicos sv ON sv.servico_id = ags.servico_id
+    WHERE a.filial_id = %s
+      AND a.funcionario_id IS NOT NULL
+      AND a.status <> 'Cancelado'
+      AND a.data_hora_agendamento >= %s AND a.data_hora_agendamento < %s
+      {filtro_funcionarios}
+    GROUP BY a.agendamento_id
+"""
+
+
+def load_intervalos(data_inicio: datetime, data_fim: datetime, fuso_horario: str,
+                    funcionario_ids: Optional[Sequence[int]] = None):
+    """Carrega (funcionario_id, início em minutos locais desde a época, duração) em arrays NumPy."""
+    params = [fuso_horario, filial_atual(), data_inicio, data_fim]
+    filtro = ""
+    if funcionario_ids:
+        filtro = "AND a.funcionario_id = ANY(%s)"
+        params.append(list(funcionario_ids))
+    with get_db_cursor() as cursor:
+        consulta = cursor.mogrify(SQL_INTERVALOS.format(filtro_funcionarios=filtro), params).decode()
+        buffer = io.StringIO()
+        cursor.copy_expert(f"COPY ({consulta}) TO STDOUT WITH (FORMAT csv)", buffer)
+    buffer.seek(0)
+    if not buffer.getvalue():
+        vazio = np.empty(0, dtype=np.int64)
+        return vazio, vazio, vazio
+    frame = pd.read_csv(buffer, header=None, dtype="int64")
+    return frame[0].to_numpy(), frame[1].to_numpy(), frame[2].to_numpy()
+
+
+def rasterize_intervals(indice: np.ndarray, inicio_minuto: np.ndarray, duracao: np.ndarray,
+                        quantidade: int, granularidade_minutos: int) -> np.ndarray:
+    """Minutos reservados por (linha, dia da semana, faixa), shape (quantidade, 7, 1440 // granularidade).
+
+    indice é a linha de cada intervalo (0..quantidade-1). Intervalos que passam do fim de
+    domingo continuam na segunda; sobreposições do mesmo funcionário somam.
+    """
+    largura = MINUTOS_SEMANA + 1
+    inicio = (inicio_minuto + DESLOCAMENTO_SEGUNDA) % MINUTOS_SEMANA
+    fim = inicio + np.minimum(duracao, MINUTOS_SEMANA)
+    virada = fim > MINUTOS_SEMANA
+    base = indice * largura
+
+    posicoes_mais = np.concatenate([base + inicio, base[virada]])
+    posicoes_menos = np.concatenate([base + np.minimum(fim, MINUTOS_SEMANA), base[virada] + fim[virada] - MINUTOS_SEMANA])
+    diferencas = (np.bincount(posicoes_mais, minlength=quantidade * largura)
+                  - np.bincount(posicoes_menos, minlength=quantidade * largura))
+    ocupados = np.cumsum(diferencas.reshape(quantidade, largura), axis=1)[:, :MINUTOS_SEMANA]
+    return ocupados.reshape(quantidade, 7, 1440 // granularidade_minutos, granularidade_minutos).sum(axis=3)
+
+
+def _minutos_disponiveis(data_inicio: datetime, data_fim: datetime, fuso_horario: str,
+                         granularidade_minutos: int) -> np.ndarray:
+    """Minutos do período em cada (dia da semana, faixa), no horário local, shape (7, faixas)."""
+    fuso = ZoneInfo(fuso_horario)
+    epoca = datetime(1970, 1, 1)
+    inicio = int((data_inicio.astimezone(fuso).replace(tzinfo=None) - epoca).total_seconds() // 60)
+    fim = int((data_fim.astimezone(fuso).replace(tzinfo=None) - epoca).total_seconds() // 60)
+    faixas_semana = MINUTOS_SEMANA // granularidade_minutos
+    faixas = np.arange(-(-inicio // granularidade_minutos), fim // granularidade_minutos)
+    faixa_semana = (faixas + DESLOCAMENTO_SEGUNDA // granularidade_minutos) % faixas_semana
+    ocorrencias = np.bincount(faixa_semana, minlength=faixas_semana)
+    return (ocorrencias * granularidade_minutos).reshape(7, -1)
+
+
+def capacity_heatmap(data_inicio: datetime, data_fim: datetime, fuso_horario: str,
+                     granularidade_minutos: int = 60, funcionario_ids: Optional[Sequence[int]] = None) -> dict:
+    """Minutos reservados por funcionário em cada dia da semana (0 = segunda) e faixa de horário local.
+
+    A taxa de ocupação de uma célula é minutos_reservados / minutos_disponiveis (o mesmo
+    denominador para todos os funcionários: minutos do período que caem naquela célula).
+    """
+    funcionarios, inicio_minuto, duracao = load_intervalos(data_inicio, data_fim, fuso_horario, funcionario_ids)
+    ids, indice = np.unique(funcionarios, return_inverse=True)
+    reservados = rasterize_intervals(indice, inicio_minuto, duracao, len(ids), granularidade_minutos)
+    return {
+        "periodo": {"inicio": data_inicio, "fim": data_fim, "fuso_horario": fuso_horario},
+        "granularidade_minutos": granularidade_minutos,
+        "agendamentos": int(len(duracao)),
+        "funcionarios": ids.tolist(),
+        "minutos_disponiveis": _minutos_disponiveis(data_inicio, data_fim, fuso_horario, granularidade_minutos).tolist(),
+        "minutos_reservados": reservados.tolist(),
+        "total_reservado": reservados.sum(axis=(1, 2)).tolist(),
+    }
+
+
+# --- Exportação Arrow/Parquet ---
+
+def _to_arrow(frame: pd.DataFrame):
+    import pyarrow as pa
+
+    # Categorias viram texto para que todas as janelas tenham exatamente o mesmo schema.
+    categorias = frame.select_dtypes("category").columns
+    return pa.Table.from_pandas(frame.astype({c: "string" for c in categorias}), preserve_index=False)
+
+
+def export_bytes(conjunto: str, formato: str, data_inicio: datetime, data_fim: datetime) -> bytes:
+    """Exporta o conjunto em Parquet ou Arrow IPC, escrevendo um row group/lote por janela."""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    def novo_escritor(schema):
+        if formato == "parquet":
+            return pq.ParquetWriter(destino, schema, compression="zstd")
+        return pa.ipc.new_stream(destino, schema)
+
+    destino = pa.BufferOutputStream()
+    escritor = None
+    try:
+        for chunk in iter_chunks(conjunto, data_inicio, data_fim):
+            tabela = _to_arrow(chunk)
+            if escritor is None:
+                escritor = novo_escritor(tabela.schema)
+            escritor.write_table(tabela)
+        if escritor is None:
+            tabela = _to_arrow(load_frame(conjunto, data_inicio, data_fim))
+            escritor = novo_escritor(tabela.schema)
+            escritor.write_table(tabela)
+    finally:
+        if escritor is not None:
+            escritor.close()
+    return destino.getvalue().to_pybytes()
@@ -0,0 +1,189 @@
+import asyncio
+import math
+import os
+import time
+from typing import Dict, Optional
+
+from starlette.responses import JSONResponse
+
+from app.db.database import DB_POOL_MAX
+
+# --- Controle de admissão por classe de rota ---
+#
+# Cada classe recebe uma fatia do orçamento de conexões (DB_POOL_MAX). Requisições
+# acima do limite esperam numa fila limitada; se a fila estiver cheia ou o prazo
+# de espera acabar, a resposta é um 503 imediato com Retry-After, em vez de
+# acumular threads esperando por uma conexão.
+#
+# O pool do banco é dimensionado pela soma dos limites (CONEXOES_ADMITIDAS) mais a
+# reserva DB_POOL_RESERVA, de quem não passa por aqui, então uma requisição admitida
+# sempre encontra uma conexão livre.
+
+CLASSE_LEITURA = "leitura"
+CLASSE_ESCRITA = "escrita"
+CLASSE_RELATORIO = "relatorio"
+
+# Fração do pool reservada para cada classe.
+FRACOES_POOL = {
+    CLASSE_LEITURA: 0.5,
+    CLASSE_ESCRITA: 0.3,
+    CLASSE_RELATORIO: 0.2,
+}
+
+# Prefixos de rotas pesadas (relatórios, exportações, análises).
+PREFIXOS_RELATORIO = ("/relatorios", "/analytics")
+
+# Rotas que nunca passam pelo controle de admissão. Só /health/ready usa o banco (um
+# SELECT 1), com uma conexão da reserva do pool.
+ROTAS_LIVRES = ("/", "/docs", "/redoc", "/openapi.json", "/metrics", "/health/live", "/health/ready", "/debug/queries")
+
+FILA_POR_VAGA = int(os.getenv("ADMISSAO_FILA_POR_VAGA", "4"))
+ESPERA_MAXIMA_S = {
+    CLASSE_LEITURA: float(os.getenv("ADMISSAO_ESPERA_LEITURA_S", "2")),
+    CLASSE_ESCRITA: float(os.getenv("ADMISSAO_ESPERA_ESCRITA_S", "5")),
+    CLASSE_RELATORIO: float(os.getenv("ADMISSAO_ESPERA_RELATORIO_S", "10")),
+}
+
+
+def limites_por_classe(conexoes: int) -> Dict[str, int]:
+    """Vagas de cada classe: a fração das conexões, no mínimo uma."""
+    return {classe: max(1, int(conexoes * fracao)) for classe, fracao in FRACOES_POOL.items()}
+
+
+# Com orçamentos pequenos o mínimo de uma vaga por classe passa de DB_POOL_MAX (2 -> 1+1+1).
+CONEXOES_ADMITIDAS = sum(limites_por_classe(DB_POOL_MAX).values())
+
+
+class SaturadoError(Exception):
+    """Levantada quando uma classe de rota não pode admitir mais requisições."""
+
+    def __init__(self, classe: str, retry_after: int):
+        super().__init__(f"Classe '{classe}' saturada")
+        self.classe = classe
+        self.retry_after = retry_after
+
+
+class Limitador:
+    """Semáforo com fila de espera limitada e prazo, mais contadores para métricas."""
+
+    def __init__(self, nome: str, limite: int, fila_maxima: int, espera_maxima: float):
+        self.nome = nome
+        self.limite = limite
+        self.fila_maxima = fila_maxima
+        self.espera_maxima = espera_maxima
+        self._semaforo = asyncio.Semaphore(limite)
+        self.em_execucao = 0
+        self.em_fila = 0
+        self.pico_fila = 0
+        self.admitidas = 0
+        self.rejeitadas_fila_cheia = 0
+        self.rejeitadas_prazo = 0
+        self.tempo_espera_total = 0.0
+
+    def _retry_after(self) -> int:
+        return max(1, math.ceil(self.espera_maxima))
+
+    async def adquirir(self):
+        if not self._semaforo.locked():
+            await self._semaforo.acquire()
+        else:
+            if self.em_fila >= self.fila_maxima:
+                self.rejeitadas_fila_cheia += 1
+                raise SaturadoError(self.nome, self._retry_after())
+            self.em_fila += 1
+            self.pico_fila = max(self.pico_fila, self.em_fila)
+            inicio = time.monotonic()
+            try:
+                await asyncio.wait_for(self._semaforo.acquire(), timeout=self.espera_maxima)
+            except asyncio.TimeoutError:
+                self.rejeitadas_prazo += 1
+                raise SaturadoError(self.nome, self._retry_after())
+            finally:
+                self.em_fila -= 1
+                self.tempo_espera_total += time.monotonic() - inicio
+        self.em_execucao += 1
+        self.admitidas += 1
+
+    def liberar(self):
+        self.em_execucao -= 1
+        self._semaforo.release()
+
+    def metricas(self) -> Dict[str, object]:
+        return {
+            "limite": self.limite,
+            "fila_maxima": self.fila_maxima,
+            "espera_maxima_s": self.espera_maxima,
+            "em_execucao": self.em_execucao,
+            "em_fila": self.em_fila,
+            "pico_fila": self.pico_fila,
+            "admitidas": self.admitidas,
+            "rejeitadas_fila_cheia": self.rejeitadas_fila_cheia,
+            "rejeitadas_prazo": self.rejeitadas_prazo,
+            "espera_media_ms": round(1000 * self.tempo_espera_total / self.admitidas, 2) if self.admitidas else 0.0,
+        }
+
+
+class ControleAdmissao:
+    """Conjunto de limitadores, um por classe de rota, dimensionados pelo pool."""
+
+    def __init__(self, conexoes: int = DB_POOL_MAX):
+        self.limitadores: Dict[str, Limitador] = {}
+        for classe, limite in limites_por_classe(conexoes).items():
+            self.limitadores[classe] = Limitador(
+                nome=classe,
+                limite=limite,
+                fila_maxima=limite * FILA_POR_VAGA,
+                espera_maxima=ESPERA_MAXIMA_S[classe],
+            )
+
+    @staticmethod
+    def classificar(metodo: str, caminho: str) -> Optional[str]:
+        """Retorna a classe da rota, ou None se ela não passa pelo controle."""
+        if metodo == "OPTIONS" or caminho in ROTAS_LIVRES:
+            return None
+        if caminho.startswith(PREFIXOS_RELATORIO):
+            return CLASSE_RELATORIO
+        if metodo in ("GET", "HEAD"):
+            return CLASSE_LEITURA
+        return CLASSE_ESCRITA
+
+    def metricas(self) -> Dict[str, Dict[str, object]]:
+        return {classe: limitador.metricas() for classe, limitador in self.limitadores.items()}
+
+
+class AdmissionControlMiddleware:
+    """Middleware ASGI que aplica o ControleAdmissao antes de chegar no threadpool."""
+
+    def __init__(self, app, controle: ControleAdmissao):
+        self.app = app
+        self.controle = controle
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        classe = self.controle.classificar(scope["method"], scope["path"])
+        if classe is None:
+            await self.app(scope, receive, send)
+            return
+
+        limitador = self.controle.limitadores[classe]
+        try:
+            await limitador.adquirir()
+        except SaturadoError as e:
+            response = JSONResponse(
+                status_code=503,
+                content={"detail": "Servidor sobrecarregado, tente novamente em instantes"},
+                headers={"Retry-After": str(e.retry_after)},
+            )
+            await response(scope, receive, send)
+            return
+
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            limitador.liberar()
+
+
+controle_admissao = ControleAdmissao()
@@ -0,0 +1,251 @@
+import atexit
+import json
+import os
+import queue
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+import psycopg2
+
+from app.db.database import BancoDadosError, apos_commit, filial_atual, get_db_cursor, requisicao_atual, usar_filial
+from app.db.profiler import executar_valores
+
+# --- Auditoria das alterações (quem mudou o quê e quando) ---
+#
+# Os crud_* chamam registrar_auditoria() com o que o próprio comando de escrita já devolve:
+# o RETURNING do INSERT traz a linha criada, o do DELETE a linha apagada e o do UPDATE, com
+# sql_update_versionado() (app/db/versao.py), também os valores anteriores dos campos
+# alterados. A requisição não faz nenhuma escrita a mais: o registro só entra numa fila em
+# memória depois do commit (apos_commit), e uma thread grava a fila na tabela Auditoria em
+# lotes, com um INSERT de várias linhas por filial.
+#
+# A fila é limitada (AUDITORIA_FILA_MAX). Cheia, quem grava espera até AUDITORIA_ESPERA_FILA_MS
+# que a thread abra espaço (backpressure); se ela não der conta, o registro é descartado e
+# contado em /metrics. Os registros ainda na fila são gravados no encerramento normal do
+# processo, mas se perdem se ele morrer.
+#
+# O autor é o header X-Usuario da requisição (não há autenticação na API).
+
+FILA_MAX = int(os.getenv("AUDITORIA_FILA_MAX", "10000"))
+TAMANHO_LOTE = int(os.getenv("AUDITORIA_LOTE", "500"))
+# Quanto a thread espera por mais registros antes de gravar um lote incompleto.
+ESPERA_LOTE_S = float(os.getenv("AUDITORIA_ESPERA_LOTE_MS", "200")) / 1000
+ESPERA_FILA_S = float(os.getenv("AUDITORIA_ESPERA_FILA_MS", "500")) / 1000
+MAX_TENTATIVAS = 5
+ESPERA_ENCERRAMENTO_S = 10.0
+
+ACAO_CREATE = "create"
+ACAO_UPDATE = "update"
+ACAO_DELETE = "delete"
+
+HEADER_USUARIO = b"x-usuario"
+TAMANHO_MAXIMO_AUTOR = 100
+
+SQL_INSERT = """
+    INSERT INTO Auditoria (filial_id, entidade, entidade_id, acao, alteracoes, autor, endpoint, data_hora)
+    VALUES %s
+"""
+
+
+def _json_padrao(valor):
+    """Datas no mesmo formato ISO do model_dump(mode="json"); o resto (Decimal) como texto."""
+    return valor.isoformat() if hasattr(valor, "isoformat") else str(valor)
+
+
+class EventoAuditoria(NamedTuple):
+    filial_id: int
+    entidade: str
+    entidade_id: int
+    acao: str
+    alteracoes: dict
+    autor: Optional[str]
+    endpoint: Optional[str]
+    data_hora: datetime
+
+
+def valores_auditados(modelo, id_attr: str) -> dict:
+    """Campos do registro para a auditoria, sem o ID e a filial (que têm colunas próprias) e a versão."""
+    return modelo.model_dump(mode="json", exclude={id_attr, "filial_id", "versao"})
+
+
+def _origem() -> Tuple[Optional[str], Optional[str]]:
+    """(autor, endpoint) da requisição em curso, se houver uma."""
+    requisicao = requisicao_atual()
+    if requisicao is None or requisicao.scope is None:
+        return None, None
+    autor = dict(requisicao.scope.get("headers", ())).get(HEADER_USUARIO)
+    if autor is not None:
+        autor = autor.decode("utf-8", errors="replace").strip()[:TAMANHO_MAXIMO_AUTOR] or None
+    return autor, requisicao.endpoint
+
+
+def registrar_auditoria(entidade: str, entidade_id: int, acao: str, antes: Optional[dict] = None,
+                        depois: Optional[dict] = None, filial_id: Optional[int] = None) -> None:
+    """Registra uma alteração, a ser gravada só se a transação em curso for confirmada.
+
+    create guarda os valores de depois, delete os de antes e update apenas os campos que
+    mudaram, como {"campo": {"de": antes, "para": depois}} (sem mudanças, nada é registrado).
+    Um update sem antes (upserts, em que o RETURNING não tem os valores anteriores) guarda
+    os campos como ficaram, {"campo": {"para": depois}}. A filial padrão é a atual.
+    """
+    if acao == ACAO_UPDATE and antes is None:
+        alteracoes = {campo: {"para": valor} for campo, valor in (depois or {}).items()}
+    elif acao == ACAO_UPDATE:
+        alteracoes = {
+            campo: {"de": antes.get(campo), "para": valor}
+            for campo, valor in (depois or {}).items()
+            if antes.get(campo) != valor
+        }
+        if not alteracoes:
+            return
+    else:
+        alteracoes = dict((depois if acao == ACAO_CREATE else antes) or {})
+    evento = EventoAuditoria(filial_atual() if filial_id is None else filial_id, entidade, entidade_id, acao, alteracoes, *_origem(),
+                             datetime.now(timezone.utc))
+    apos_commit(lambda: gravador.enfileirar(evento))
+
+
+def registrar_upsert_lote(entidade: str, registros, chave_attr: str, resultado) -> None:
+    """Registra os inseridos/atualizados de um upsert em lote (ResultadoUpsert) com os dados enviados."""
+    inseridos = set(resultado.inseridos)
+    alterados = inseridos.union(resultado.atualizados)
+    # Chaves repetidas no lote valem pela última ocorrência, como no próprio upsert.
+    por_chave = {getattr(registro, chave_attr): registro for registro in registros}
+    for valor_chave, entidade_id in resultado.ids.items():
+        if entidade_id in alterados:
+            registrar_auditoria(entidade, entidade_id, ACAO_CREATE if entidade_id in inseridos else ACAO_UPDATE,
+                                depois=por_chave[valor_chave].model_dump(mode="json"))
+
+
+class GravadorAuditoria:
+    """Fila limitada de eventos e a thread que os grava em lotes."""
+
+    def __init__(self, capacidade: int = FILA_MAX):
+        self.capacidade = capacidade
+        self._fila: "queue.Queue[EventoAuditoria]" = queue.Queue(maxsize=capacidade)
+        self._parar = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._registrado_atexit = False
+        self._lock = threading.Lock()
+        self.enfileirados = 0
+        self.gravados = 0
+        self.descartados = 0
+        self.lotes = 0
+        self.maior_lote = 0
+        self.falhas = 0
+        self.ultimo_erro: Optional[str] = None
+
+    def start(self) -> None:
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._parar.clear()
+            self._thread = threading.Thread(target=self._run, name="auditoria", daemon=True)
+            self._thread.start()
+            registrar_atexit, self._registrado_atexit = not self._registrado_atexit, True
+        if registrar_atexit:
+            # Processos sem lifespan (scripts, workers) também gravam o que ficou na fila ao sair.
+            atexit.register(self.stop)
+
+    def stop(self, timeout: float = ESPERA_ENCERRAMENTO_S) -> None:
+        """Grava o que está na fila e encerra a thread."""
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is None:
+            return
+        self._parar.set()
+        thread.join(timeout)
+
+    def enfileirar(self, evento: EventoAuditoria) -> bool:
+        """Põe o evento na fila, esperando até ESPERA_FILA_S se ela estiver cheia."""
+        if self._thread is None:
+            self.start()
+        try:
+            self._fila.put(evento, timeout=ESPERA_FILA_S)
+        except queue.Full:
+            with self._lock:
+                self.descartados += 1
+            return False
+        with self._lock:
+            self.enfileirados += 1
+        return True
+
+    def _proximo_lote(self) -> List[EventoAuditoria]:
+        """Espera o primeiro evento e junta os que chegarem até ESPERA_LOTE_S depois dele."""
+        try:
+            lote = [self._fila.get(timeout=ESPERA_LOTE_S)]
+        except queue.Empty:
+            return []
+        prazo = time.monotonic() + ESPERA_LOTE_S
+        while len(lote) < TAMANHO_LOTE:
+            restante = prazo - time.monotonic()
+            try:
+                # No encerramento não espera: só esvazia a fila.
+                if self._parar.is_set() or restante <= 0:
+                    lote.append(self._fila.get_nowait())
+                else:
+                    lote.append(self._fila.get(timeout=restante))
+            except queue.Empty:
+                if self._parar.is_set() or restante <= 0:
+                    break
+        return lote
+
+    def _run(self) -> None:
+        while True:
+            lote = self._proximo_lote()
+            if lote:
+                self._gravar(lote)
+            elif self._parar.is_set():
+                return
+
+    def _gravar(self, lote: List[EventoAuditoria]) -> None:
+        por_filial: Dict[int, List[EventoAuditoria]] = {}
+        for evento in lote:
+            por_filial.setdefault(evento.filial_id, []).append(evento)
+        for filial_id, eventos in por_filial.items():
+            linhas = [
+                (e.filial_id, e.entidade, e.entidade_id, e.acao, json.dumps(e.alteracoes, default=_json_padrao),
+                 e.autor, e.endpoint, e.data_hora)
+                for e in eventos
+            ]
+            for tentativa in range(1, MAX_TENTATIVAS + 1):
+                try:
+                    with usar_filial(filial_id), get_db_cursor(commit=True) as cursor:
+                        executar_valores(cursor, SQL_INSERT, linhas, page_size=TAMANHO_LOTE)
+                    break
+                except (psycopg2.Error, BancoDadosError) as e:
+                    with self._lock:
+                        self.falhas += 1
+                        self.ultimo_erro = str(e).strip()
+                    print(f"Erro ao gravar auditoria (tentativa {tentativa}): {e}")
+                    # No encerramento não insiste: o processo está saindo.
+                    if tentativa == MAX_TENTATIVAS or self._parar.wait(min(2 ** tentativa, 30)):
+                        with self._lock:
+                            self.descartados += len(linhas)
+                        linhas = []
+                        break
+            if linhas:
+                with self._lock:
+                    self.gravados += len(linhas)
+                    self.lotes += 1
+                    self.maior_lote = max(self.maior_lote, len(linhas))
+
+    def metricas(self) -> dict:
+        with self._lock:
+            return {
+                "ativo": self._thread is not None,
+                "fila": self._fila.qsize(),
+                "capacidade": self.capacidade,
+                "enfileirados": self.enfileirados,
+                "gravados": self.gravados,
+                "descartados": self.descartados,
+                "lotes": self.lotes,
+                "maior_lote": self.maior_lote,
+                "falhas": self.falhas,
+                "ultimo_erro": self.ultimo_erro,
+            }
+
+
+gravador = GravadorAuditoria()
@@ -0,0 +1,106 @@
+import asyncio
+import contextvars
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Sequence, TypeVar
+
+from starlette.responses import JSONResponse
+
+from app.db.database import BancoDadosError, banco_da_filial, usar_filial
+
+# --- Filial da requisição e consultas em várias filiais ---
+#
+# O header X-Filial-Id escolhe a filial de toda a requisição (sem ele, FILIAL_PADRAO); os
+# módulos crud_* leem a filial de filial_atual() e o pool de conexões escolhe o banco dela.
+# IDs de filial já vistos ficam em memória: filiais não são apagadas, então só um ID
+# desconhecido custa uma consulta ao cadastro.
+
+HEADER_FILIAL = b"x-filial-id"
+
+# Quantos bancos uma consulta em todas as filiais carrega ao mesmo tempo. As filiais de um
+# mesmo banco vão uma depois da outra: a requisição nunca segura mais de uma conexão de cada
+# pool, a que o controle de admissão contou para ela.
+PARALELISMO_FILIAIS = int(os.getenv("FILIAIS_PARALELISMO", "4"))
+
+T = TypeVar("T")
+
+
+class FilialMiddleware:
+    """Middleware ASGI que lê X-Filial-Id e executa a requisição dentro de usar_filial()."""
+
+    def __init__(self, app):
+        self.app = app
+        self._conhecidas = set()
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        valor = dict(scope["headers"]).get(HEADER_FILIAL)
+        if valor is None:
+            await self.app(scope, receive, send)
+            return
+
+        try:
+            filial_id = int(valor)
+            if filial_id < 1:
+                raise ValueError
+        except ValueError:
+            response = JSONResponse(status_code=400, content={"detail": "Header X-Filial-Id inválido"})
+            await response(scope, receive, send)
+            return
+
+        try:
+            existe = await self._existe(filial_id)
+        except BancoDadosError as e:
+            response = JSONResponse(status_code=503, content={"detail": str(e)},
+                                    headers={"Retry-After": getattr(e, "retry_after", "1")})
+            await response(scope, receive, send)
+            return
+        if not existe:
+            response = JSONResponse(status_code=404, content={"detail": "Filial não encontrada"})
+            await response(scope, receive, send)
+            return
+
+        with usar_filial(filial_id):
+            await self.app(scope, receive, send)
+
+    async def _existe(self, filial_id: int) -> bool:
+        if filial_id in self._conhecidas:
+            return True
+        from app.crud.armazenamento import crud_filial
+
+        if await asyncio.to_thread(crud_filial.get_filial_by_id, filial_id) is None:
+            return False
+        self._conhecidas.add(filial_id)
+        return True
+
+
+def em_todas_as_filiais(funcao: Callable[[], T], filiais: Sequence[int]) -> Dict[int, T]:
+    """Executa funcao() uma vez por filial (cada uma no seu banco) e devolve {filial_id: resultado}.
+
+    Bancos diferentes rodam em paralelo, cada um numa cópia do contexto atual: o orçamento
+    de tempo e o cancelamento da requisição continuam valendo para todas. As filiais de um
+    mesmo banco rodam em sequência.
+    """
+    def executar(grupo: List[int]) -> Dict[int, T]:
+        resultados = {}
+        for filial_id in grupo:
+            with usar_filial(filial_id):
+                resultados[filial_id] = funcao()
+        return resultados
+
+    por_banco: Dict[str, List[int]] = {}
+    for filial_id in filiais:
+        por_banco.setdefault(banco_da_filial(filial_id), []).append(filial_id)
+    if len(por_banco) <= 1:
+        resultados = executar(list(filiais))
+    else:
+        resultados = {}
+        with ThreadPoolExecutor(max_workers=min(PARALELISMO_FILIAIS, len(por_banco)),
+                                thread_name_prefix="filiais") as executor:
+            futuros = [executor.submit(contextvars.copy_context().run, executar, grupo)
+                       for grupo in por_banco.values()]
+            for futuro in futuros:
+                resultados.update(futuro.result())
+    return {filial_id: resultados[filial_id] for filial_id in filiais}
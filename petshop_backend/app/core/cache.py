@@ -0,0 +1,250 @@
+import os
+import select
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+from typing import Callable, Dict, Hashable, Optional, Set
+
+import psycopg2
+
+from app.db.database import DATABASE_URL, banco_principal, em_cursor_compartilhado, filial_atual
+
+# --- Cache de entidades (consultas por ID/e-mail) coerente entre workers ---
+#
+# Cada processo da API mantém um LRU limitado com TTL na frente de get_*_by_id/_by_email.
+# As funções de update/delete chamam invalidar_entidade() no mesmo cursor da escrita: a
+# entrada local sai na hora e um NOTIFY no canal CANAL_INVALIDACAO, entregue só quando a
+# transação é confirmada, avisa os demais workers (cada um escuta o canal numa thread com
+# conexão própria). Enquanto essa thread não estiver conectada o cache é ignorado, para
+# que um worker que perdeu avisos nunca sirva dados antigos.
+#
+# As chaves incluem a filial. Filiais com banco próprio (FILIAIS_BANCOS) não usam o cache:
+# o ouvinte só escuta o banco principal e não receberia os avisos delas.
+# Dentro de use_cursor (ex.: POST /lote) o cache também é ignorado: a transação pode ter
+# gravado dados ainda não confirmados, que não podem ser lidos do cache nem guardados nele.
+
+CACHE_CAPACIDADE = int(os.getenv("CACHE_ENTIDADES_CAPACIDADE", "1000"))
+CACHE_TTL_S = float(os.getenv("CACHE_ENTIDADES_TTL_S", "60"))
+CANAL_INVALIDACAO = "petshop_cache"
+
+TODOS = "*"
+
+
+class CacheEntidades:
+    """LRU + TTL de uma entidade. As chaves são (filial_id, "id", valor) ou (filial_id, "email", valor)."""
+
+    def __init__(self, nome: str, id_attr: str, capacidade: int = CACHE_CAPACIDADE, ttl_s: float = CACHE_TTL_S):
+        self.nome = nome
+        self.id_attr = id_attr
+        self.capacidade = capacidade
+        self.ttl_s = ttl_s
+        self._entradas: "OrderedDict[Hashable, tuple]" = OrderedDict()  # chave -> (expira_em, entidade_id, valor)
+        self._chaves_por_id: Dict[int, Set[Hashable]] = {}
+        # Incrementada a cada invalidação: um valor lido do banco antes dela não é guardado depois.
+        self._geracao = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expiradas = 0
+        self.invalidacoes = 0
+
+    def get(self, chave: Hashable):
+        with self._lock:
+            entrada = self._entradas.get(chave)
+            if entrada is None:
+                self.misses += 1
+                return None
+            if entrada[0] < time.monotonic():
+                self._remover(chave)
+                self.expiradas += 1
+                self.misses += 1
+                return None
+            self._entradas.move_to_end(chave)
+            self.hits += 1
+            # Cópia: quem chama pode alterar o modelo sem afetar o cache.
+            return entrada[2].model_copy()
+
+    def set(self, chave: Hashable, valor, geracao: int) -> None:
+        entidade_id = getattr(valor, self.id_attr)
+        with self._lock:
+            if geracao != self._geracao:
+                return
+            if chave in self._entradas:
+                self._remover(chave)
+            self._entradas[chave] = (time.monotonic() + self.ttl_s, entidade_id, valor)
+            self._chaves_por_id.setdefault(entidade_id, set()).add(chave)
+            while len(self._entradas) > self.capacidade:
+                self._remover(next(iter(self._entradas)))
+                self.evictions += 1
+
+    def prime(self, valores, atributos: Dict[str, str]) -> int:
+        """Carrega entidades já lidas do banco, uma chave por (tipo_chave -> atributo)."""
+        geracao = self.geracao()
+        for valor in valores:
+            for tipo_chave, atributo in atributos.items():
+                if getattr(valor, atributo) is not None:
+                    self.set((valor.filial_id, tipo_chave, getattr(valor, atributo)), valor, geracao)
+        return len(self._entradas)
+
+    def geracao(self) -> int:
+        with self._lock:
+            return self._geracao
+
+    def invalidate(self, entidade_id) -> None:
+        """Remove todas as chaves (por ID e por e-mail) da entidade; TODOS limpa o cache inteiro."""
+        with self._lock:
+            self._geracao += 1
+            self.invalidacoes += 1
+            if entidade_id == TODOS:
+                self._entradas.clear()
+                self._chaves_por_id.clear()
+                return
+            for chave in list(self._chaves_por_id.get(entidade_id, ())):
+                self._remover(chave)
+
+    def _remover(self, chave: Hashable) -> None:
+        _, entidade_id, _ = self._entradas.pop(chave)
+        chaves = self._chaves_por_id.get(entidade_id)
+        if chaves is not None:
+            chaves.discard(chave)
+            if not chaves:
+                del self._chaves_por_id[entidade_id]
+
+    def cached(self, tipo_chave: str):
+        """Decorator para funções get_*_by_<tipo_chave>(valor) -> Optional[Modelo].
+
+        Resultados None (não encontrado) não são guardados.
+        """
+        def decorator(funcao: Callable) -> Callable:
+            @wraps(funcao)
+            def wrapper(*args, **kwargs):
+                filial_id = filial_atual()
+                if not ouvinte.ativo or not banco_principal(filial_id) or em_cursor_compartilhado():
+                    return funcao(*args, **kwargs)
+                valor_chave = args[0] if args else next(iter(kwargs.values()))
+                chave = (filial_id, tipo_chave, valor_chave)
+                valor = self.get(chave)
+                if valor is not None:
+                    return valor
+                geracao = self.geracao()
+                valor = funcao(*args, **kwargs)
+                if valor is not None:
+                    self.set(chave, valor, geracao)
+                return valor
+            return wrapper
+        return decorator
+
+    def metricas(self) -> dict:
+        with self._lock:
+            return {
+                "tamanho": len(self._entradas),
+                "capacidade": self.capacidade,
+                "ttl_s": self.ttl_s,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expiradas": self.expiradas,
+                "invalidacoes": self.invalidacoes,
+            }
+
+
+CACHES: Dict[str, CacheEntidades] = {
+    "clientes": CacheEntidades("clientes", "cliente_id"),
+    "animais": CacheEntidades("animais", "animal_id"),
+    "funcionarios": CacheEntidades("funcionarios", "funcionario_id"),
+}
+
+cache_clientes = CACHES["clientes"]
+cache_animais = CACHES["animais"]
+cache_funcionarios = CACHES["funcionarios"]
+
+
+def invalidar_entidade(cursor, nome: str, entidade_id=TODOS) -> None:
+    """Invalida localmente e agenda o aviso aos demais workers no cursor da escrita.
+
+    O NOTIFY só é entregue no commit; se a transação for desfeita, ninguém é avisado
+    (e a invalidação local apenas custa um miss).
+    """
+    CACHES[nome].invalidate(entidade_id)
+    cursor.execute("SELECT pg_notify(%s, %s);", (CANAL_INVALIDACAO, f"{nome}:{entidade_id}"))
+
+
+def _aplicar_aviso(payload: str) -> None:
+    nome, _, entidade_id = payload.partition(":")
+    cache = CACHES.get(nome)
+    if cache is None:
+        return
+    cache.invalidate(entidade_id if entidade_id == TODOS else int(entidade_id))
+
+
+class OuvinteInvalidacao:
+    """Thread que escuta CANAL_INVALIDACAO e aplica os avisos nos caches deste processo."""
+
+    def __init__(self):
+        self.ativo = False
+        self.reconexoes = 0
+        self._conectado = threading.Event()
+        self._parar = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+        self._parar.clear()
+        self._thread = threading.Thread(target=self._run, name="cache-invalidacao", daemon=True)
+        self._thread.start()
+
+    def aguardar_conexao(self, timeout: float) -> bool:
+        return self._conectado.wait(timeout)
+
+    def stop(self) -> None:
+        self._parar.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+        self.ativo = False
+
+    def _run(self) -> None:
+        espera = 1.0
+        while not self._parar.is_set():
+            conn = None
+            try:
+                conn = psycopg2.connect(DATABASE_URL)
+                conn.autocommit = True
+                conn.cursor().execute(f"LISTEN {CANAL_INVALIDACAO};")
+                # Avisos perdidos enquanto estávamos desconectados são desconhecidos: começa do zero.
+                for cache in CACHES.values():
+                    cache.invalidate(TODOS)
+                self.ativo = True
+                self._conectado.set()
+                espera = 1.0
+                while not self._parar.is_set():
+                    if select.select([conn], [], [], 1.0) == ([], [], []):
+                        continue
+                    conn.poll()
+                    while conn.notifies:
+                        _aplicar_aviso(conn.notifies.pop(0).payload)
+            except psycopg2.Error as e:
+                print(f"Erro na escuta de invalidação do cache: {e}")
+            finally:
+                self.ativo = False
+                self._conectado.clear()
+                if conn is not None:
+                    conn.close()
+            if not self._parar.is_set():
+                self.reconexoes += 1
+                self._parar.wait(espera)
+                espera = min(espera * 2, 30.0)
+
+
+ouvinte = OuvinteInvalidacao()
+
+
+def metricas() -> dict:
+    return {
+        "ativo": ouvinte.ativo,
+        "reconexoes": ouvinte.reconexoes,
+        **{nome: cache.metricas() for nome, cache in CACHES.items()},
+    }
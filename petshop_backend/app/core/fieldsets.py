@@ -0,0 +1,45 @@
+from functools import lru_cache
+from typing import Dict, Iterable, List, Optional, Tuple, Type
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel, create_model
+
+# --- Sparse fieldsets (?fields=a,b,c) ---
+#
+# Os módulos crud_* montam o SELECT apenas com as colunas pedidas; aqui ficam a validação
+# do parâmetro e o modelo parcial usado para validar/serializar a resposta.
+
+
+def parse_fields(fields: Optional[str], disponiveis: Iterable[str]) -> Optional[List[str]]:
+    """Converte "a,b,c" numa lista sem repetições, validando contra os campos disponíveis.
+
+    Retorna None quando o parâmetro não foi informado (resposta completa).
+    """
+    if fields is None:
+        return None
+    campos = list(dict.fromkeys(c.strip() for c in fields.split(",") if c.strip()))
+    disponiveis = list(disponiveis)
+    invalidos = [c for c in campos if c not in disponiveis]
+    if invalidos or not campos:
+        raise ValueError(
+            f"Campos inválidos: {', '.join(invalidos) or '(nenhum)'}. Disponíveis: {', '.join(disponiveis)}"
+        )
+    return campos
+
+
+@lru_cache(maxsize=256)
+def partial_model(model: Type[BaseModel], campos: Tuple[str, ...]) -> Type[BaseModel]:
+    """Cria (e memoriza) um modelo com apenas os campos pedidos, mantendo tipos e validações."""
+    definicoes = {nome: (model.model_fields[nome].annotation, model.model_fields[nome]) for nome in campos}
+    return create_model(f"{model.__name__}Parcial", **definicoes)
+
+
+def partial_response(model: Type[BaseModel], campos: List[str], dados, headers: Optional[Dict[str, str]] = None) -> JSONResponse:
+    """Valida as linhas parciais (dict ou lista de dicts) e devolve a resposta JSON."""
+    parcial = partial_model(model, tuple(campos))
+    if isinstance(dados, list):
+        conteudo = [parcial(**linha) for linha in dados]
+    else:
+        conteudo = parcial(**dados)
+    return JSONResponse(content=jsonable_encoder(conteudo), headers=headers)
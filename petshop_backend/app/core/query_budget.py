@@ -0,0 +1,63 @@
+import asyncio
+import os
+
+from app.core.admission import CLASSE_ESCRITA, CLASSE_LEITURA, CLASSE_RELATORIO, ControleAdmissao
+from app.db.database import OrcamentoConsulta, RequisicaoBanco, requisicao_banco
+
+# --- Orçamento de tempo das consultas por classe de rota ---
+#
+# Cada conexão retirada do pool durante a requisição recebe statement_timeout/lock_timeout
+# da classe da rota (mesma classificação do controle de admissão). Se o cliente desconectar
+# antes da resposta, as consultas em andamento são canceladas no servidor (pg_cancel via
+# conn.cancel()), liberando conexão e thread em vez de terminar um trabalho que ninguém vai ler.
+
+ORCAMENTOS = {
+    CLASSE_LEITURA: OrcamentoConsulta(
+        statement_timeout_ms=int(os.getenv("TIMEOUT_LEITURA_MS", "5000")),
+        lock_timeout_ms=int(os.getenv("LOCK_TIMEOUT_LEITURA_MS", "1000")),
+    ),
+    CLASSE_ESCRITA: OrcamentoConsulta(
+        statement_timeout_ms=int(os.getenv("TIMEOUT_ESCRITA_MS", "10000")),
+        lock_timeout_ms=int(os.getenv("LOCK_TIMEOUT_ESCRITA_MS", "3000")),
+    ),
+    CLASSE_RELATORIO: OrcamentoConsulta(
+        statement_timeout_ms=int(os.getenv("TIMEOUT_RELATORIO_MS", "120000")),
+        lock_timeout_ms=int(os.getenv("LOCK_TIMEOUT_RELATORIO_MS", "5000")),
+    ),
+}
+
+
+class QueryBudgetMiddleware:
+    """Middleware ASGI que aplica o orçamento da classe da rota e cancela consultas órfãs."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        classe = ControleAdmissao.classificar(scope["method"], scope["path"])
+        if classe is None:
+            await self.app(scope, receive, send)
+            return
+
+        requisicao = RequisicaoBanco(ORCAMENTOS[classe], scope)
+        # Só uma tarefa pode ler do receive original: ela repassa as mensagens para a
+        # aplicação por uma fila e percebe o http.disconnect mesmo com o handler ocupado.
+        mensagens: asyncio.Queue = asyncio.Queue()
+
+        async def vigiar_desconexao():
+            while True:
+                mensagem = await receive()
+                await mensagens.put(mensagem)
+                if mensagem["type"] == "http.disconnect":
+                    await asyncio.to_thread(requisicao.cancelar)
+                    return
+
+        vigia = asyncio.create_task(vigiar_desconexao())
+        try:
+            with requisicao_banco(requisicao):
+                await self.app(scope, mensagens.get, send)
+        finally:
+            vigia.cancel()
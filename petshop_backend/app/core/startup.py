@@ -0,0 +1,151 @@
+import asyncio
+import threading
+import time
+from contextlib import asynccontextmanager
+from typing import Optional
+
+import psycopg2
+
+from app.core import cache as cache_entidades
+from app.core.audit import gravador as gravador_auditoria
+from app.crud.armazenamento import (ARMAZENAMENTO, crud_agendamento, crud_animal, crud_cliente, crud_funcionario,
+                                    crud_servico, em_memoria)
+from app.db.database import BancoDadosError, aquecer_pool, medir_latencia, pool_status
+from app.reports.jobs import gerenciador_jobs
+
+# --- Inicialização (lifespan) e health checks ---
+#
+# Antes de aceitar requisições o processo abre as DB_POOL_MIN conexões do pool e roda em
+# cada uma as consultas por ID mais usadas: o backend do Postgres carrega catálogo e planos
+# nessa primeira execução, e a primeira requisição real não paga esse custo. Em seguida o
+# cache de entidades recebe os funcionários ativos. Falhas aqui não impedem a subida:
+# /health/ready responde 503 e uma thread tenta o aquecimento de novo a cada
+# INTERVALO_REAQUECIMENTO_S até o banco responder. O probe só mede a latência (um SELECT 1
+# com uma conexão da reserva do pool): aquecer retira DB_POOL_MIN conexões de uma vez.
+#
+# A thread que grava a auditoria sobe junto e, no encerramento, grava o que ficou na fila.
+#
+# Módulos pesados (pandas, pyarrow, openpyxl, reportlab) só são importados pelos endpoints
+# que os usam.
+#
+# Com ARMAZENAMENTO=memoria não há banco: nada é aquecido, o cache de entidades e a
+# auditoria ficam desligados e a aplicação já sobe pronta.
+
+ESPERA_OUVINTE_CACHE_S = 2.0
+INTERVALO_REAQUECIMENTO_S = 5.0
+
+
+def _consultas_quentes(_cursor) -> None:
+    """Executa as consultas de validação/detalhe com IDs inexistentes (só aquece, não retorna nada)."""
+    crud_cliente.get_cliente_by_id(-1)
+    crud_cliente.get_cliente_by_email("")
+    crud_animal.get_animal_by_id(-1)
+    crud_funcionario.get_funcionario_by_id(-1)
+    crud_funcionario.get_funcionario_by_email("")
+    crud_servico.get_servico_by_id(-1)
+    crud_agendamento.get_agendamento_by_id(-1)
+
+
+class EstadoAplicacao:
+    def __init__(self):
+        self.iniciado_em = time.monotonic()
+        self.pronto = False
+        self.aquecimento: dict = {}
+        self.ultima_latencia_ms: Optional[float] = None
+        self._parar = threading.Event()
+        self._reaquecimento: Optional[threading.Thread] = None
+
+    def _aquecer_pool(self) -> int:
+        """Aquece as conexões do pool; pronto = aquecimento sem erro. Retorna quantas foram aquecidas."""
+        try:
+            conexoes = aquecer_pool(_consultas_quentes)
+            self.ultima_latencia_ms = round(medir_latencia(), 2)
+        except (psycopg2.Error, BancoDadosError) as e:
+            print(f"Aquecimento do pool falhou: {e}")
+            return 0
+        self.pronto = True
+        return conexoes
+
+    def _carregar_cache(self) -> int:
+        if not cache_entidades.ouvinte.aguardar_conexao(ESPERA_OUVINTE_CACHE_S):
+            return 0
+        ativos = crud_funcionario.get_funcionarios(limit=cache_entidades.CACHE_CAPACIDADE, apenas_ativos=True)
+        return cache_entidades.cache_funcionarios.prime(ativos, {"id": "funcionario_id", "email": "email"})
+
+    def aquecer(self) -> None:
+        if em_memoria():
+            self.pronto = True
+            self.aquecimento = {"armazenamento": ARMAZENAMENTO}
+            return
+        inicio = time.perf_counter()
+        conexoes = self._aquecer_pool()
+        cache_entidades.ouvinte.start()
+        funcionarios_em_cache = self._carregar_cache() if self.pronto else 0
+        self.aquecimento = {
+            "conexoes": conexoes,
+            "cache_funcionarios": funcionarios_em_cache,
+            "duracao_ms": round((time.perf_counter() - inicio) * 1000, 2),
+        }
+        print(f"Aquecimento concluído: {self.aquecimento}")
+        if not self.pronto:
+            self._reaquecimento = threading.Thread(target=self._reaquecer, name="reaquecimento-pool", daemon=True)
+            self._reaquecimento.start()
+
+    def _reaquecer(self) -> None:
+        """O banco não respondeu na subida: tenta aquecer de novo até conseguir."""
+        while not self._parar.wait(INTERVALO_REAQUECIMENTO_S):
+            inicio = time.perf_counter()
+            conexoes = self._aquecer_pool()
+            if self.pronto:
+                self.aquecimento = {
+                    "conexoes": conexoes,
+                    "cache_funcionarios": self._carregar_cache(),
+                    "duracao_ms": round((time.perf_counter() - inicio) * 1000, 2),
+                }
+                print(f"Aquecimento concluído: {self.aquecimento}")
+                return
+
+    def parar(self) -> None:
+        self._parar.set()
+
+    def live(self) -> dict:
+        return {
+            "status": "ok",
+            "uptime_s": round(time.monotonic() - self.iniciado_em, 1),
+            "ultima_latencia_db_ms": self.ultima_latencia_ms,
+        }
+
+    def ready(self) -> dict:
+        """Mede a latência do banco agora; pronto = aquecimento feito e banco respondendo."""
+        if em_memoria():
+            return {"pronto": True, "armazenamento": ARMAZENAMENTO, "aquecimento": self.aquecimento}
+        erro = None
+        try:
+            self.ultima_latencia_ms = round(medir_latencia(), 2)
+        except (psycopg2.Error, BancoDadosError) as e:
+            erro = str(e).strip()
+        return {
+            "pronto": self.pronto and erro is None,
+            "latencia_db_ms": None if erro else self.ultima_latencia_ms,
+            "erro": erro,
+            "pool": pool_status(),
+            "cache_ouvinte_ativo": cache_entidades.ouvinte.ativo,
+            "aquecimento": self.aquecimento,
+        }
+
+
+estado = EstadoAplicacao()
+
+
+@asynccontextmanager
+async def lifespan(app):
+    await asyncio.to_thread(estado.aquecer)
+    if not em_memoria():
+        gravador_auditoria.start()
+    try:
+        yield
+    finally:
+        estado.parar()
+        cache_entidades.ouvinte.stop()
+        await asyncio.to_thread(gravador_auditoria.stop)
+        gerenciador_jobs.shutdown()
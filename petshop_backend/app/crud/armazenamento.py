@@ -0,0 +1,32 @@
+import os
+
+# --- Escolha do armazenamento (ARMAZENAMENTO=postgres|memoria) ---
+#
+# "postgres" (padrão) usa os módulos crud_*; "memoria" usa os crud de app/crud/memoria.py,
+# com as mesmas funções, sobre tabelas em memória: a API sobe sem banco, para testes e como
+# referência nos benchmarks. Os dados somem quando o processo termina.
+# Quem precisa das funções crud importa daqui: from app.crud.armazenamento import crud_cliente
+
+POSTGRES = "postgres"
+MEMORIA = "memoria"
+
+ARMAZENAMENTO = os.getenv("ARMAZENAMENTO", POSTGRES).strip().lower()
+if ARMAZENAMENTO not in (POSTGRES, MEMORIA):
+    raise RuntimeError(f"ARMAZENAMENTO inválido: {ARMAZENAMENTO!r} (use '{POSTGRES}' ou '{MEMORIA}')")
+
+
+def em_memoria() -> bool:
+    return ARMAZENAMENTO == MEMORIA
+
+
+if em_memoria():
+    from app.crud.memoria import (crud_agendamento_memoria as crud_agendamento, crud_animal_memoria as crud_animal,
+                                  crud_cliente_memoria as crud_cliente, crud_filial_memoria as crud_filial,
+                                  crud_funcionario_memoria as crud_funcionario, crud_lote_memoria as crud_lote,
+                                  crud_servico_memoria as crud_servico)
+else:
+    from app.crud import (crud_agendamento, crud_animal, crud_cliente, crud_filial, crud_funcionario, crud_lote,
+                          crud_servico)
+
+__all__ = ["ARMAZENAMENTO", "em_memoria", "crud_agendamento", "crud_animal", "crud_cliente", "crud_filial",
+           "crud_funcionario", "crud_lote", "crud_servico"]
@@ -1,22 +1,30 @@
 import psycopg2
 from typing import List, Optional, Tuple
 from decimal import Decimal
-from datetime import datetime
+from datetime import datetime, date, time, timedelta
+from zoneinfo import ZoneInfo
 
-from app.db.database import get_db_cursor
-from app.models.agendamento import Agendamento, AgendamentoCreate, AgendamentoUpdate, AgendamentoServicoDetalhe, AgendamentoSimple
+from app.core.audit import ACAO_CREATE, ACAO_DELETE, ACAO_UPDATE, registrar_auditoria
+from app.db.busca import condicao_busca, consulta_busca
+from app.db.database import BancoDadosError, ConflitoVersaoError, filial_atual, get_db_cursor, repetir_em_conflito
+from app.db.versao import conferir_versao, executar_update_versionado, sql_update_versionado
+from app.db.counts import Contagem, count_capped, count_filial
+from app.models.agendamento import Agendamento, AgendamentoCreate, AgendamentoUpdate, AgendamentoServicoDetalhe, AgendamentoSimple, CalendarioFuncionario, CalendarioAgendamentos
 from app.models.servico import Servico
 from app.crud.crud_servico import get_servico_by_id
+from app.crud import crud_estatisticas
+from app.crud.crud_animal import condicao_busca_animal
+from app.crud.crud_funcionario import VETOR_BUSCA_FUNCIONARIO
 
 # --- Funções Auxiliares ---
 
 def _fetch_servicos_details(cursor, servico_ids: List[int]) -> List[Tuple[int, Decimal]]:
-    """Busca ID e preço atual dos serviços fornecidos."""
+    """Busca ID e preço atual dos serviços fornecidos (apenas os da filial atual)."""
     if not servico_ids:
         return []
     placeholders = ",".join(["%s"] * len(servico_ids))
-    sql = f"SELECT servico_id, preco FROM Servicos WHERE servico_id IN ({placeholders});"
-    cursor.execute(sql, tuple(servico_ids))
+    sql = f"SELECT servico_id, preco FROM Servicos WHERE servico_id IN ({placeholders}) AND filial_id = %s;"
+    cursor.execute(sql, (*servico_ids, filial_atual()))
     results = cursor.fetchall()
     if len(results) != len(servico_ids):
         found_ids = {row[0] for row in results}
@@ -57,42 +65,63 @@ def _get_servicos_for_agendamento(cursor, agendamento_id: int) -> List[Agendamen
 
 # --- Funções CRUD Principais ---
 
+@repetir_em_conflito
 def create_agendamento(agendamento: AgendamentoCreate) -> Optional[Agendamento]:
     """Cria um novo agendamento e associa os serviços usando SQL puro e transação."""
     new_agendamento_id = None
     try:
         with get_db_cursor(commit=True) as cursor:
             servicos_com_preco = _fetch_servicos_details(cursor, agendamento.servicos_ids)
+            # INSERT ... SELECT: a filial vem do animal, e nada é inserido se o animal ou o
+            # funcionário não forem da filial atual.
             sql_insert_agendamento = """
-                INSERT INTO Agendamentos (animal_id, funcionario_id, data_hora_agendamento, status, observacoes)
-                VALUES (%s, %s, %s, %s, %s)
-                RETURNING agendamento_id, data_hora_criacao;
+                INSERT INTO Agendamentos (animal_id, funcionario_id, data_hora_agendamento, status, observacoes, filial_id)
+                SELECT ani.animal_id, %s, %s, %s, %s, ani.filial_id
+                FROM Animais ani
+                WHERE ani.animal_id = %s AND ani.filial_id = %s
+                  AND (%s::integer IS NULL OR EXISTS (
+                      SELECT 1 FROM Funcionarios f WHERE f.funcionario_id = %s AND f.filial_id = ani.filial_id))
+                RETURNING agendamento_id, data_hora_agendamento, data_hora_criacao, filial_id, versao;
             """
             cursor.execute(sql_insert_agendamento, (
-                agendamento.animal_id,
                 agendamento.funcionario_id,
                 agendamento.data_hora_agendamento,
                 agendamento.status,
-                agendamento.observacoes
+                agendamento.observacoes,
+                agendamento.animal_id,
+                filial_atual(),
+                agendamento.funcionario_id,
+                agendamento.funcionario_id
             ))
             result = cursor.fetchone()
             if not result:
-                raise Exception("Falha ao criar agendamento, não retornou ID.")
-            new_agendamento_id, data_hora_criacao = result
+                raise ValueError(
+                    f"Animal {agendamento.animal_id} ou funcionário {agendamento.funcionario_id} não encontrado nesta filial.")
+            new_agendamento_id, data_hora_agendamento, data_hora_criacao, filial_id, versao = result
             _insert_agendamento_servicos(cursor, new_agendamento_id, servicos_com_preco)
+            crud_estatisticas.aplicar(cursor, None, crud_estatisticas.Contribuicao(
+                agendamento.animal_id, agendamento.status, agendamento.data_hora_agendamento,
+                sum((preco for _, preco in servicos_com_preco), Decimal(0)),
+                tuple(sorted(servico_id for servico_id, _ in servicos_com_preco))))
             servicos_detalhes = _get_servicos_for_agendamento(cursor, new_agendamento_id)
+            registrar_auditoria("agendamentos", new_agendamento_id, ACAO_CREATE,
+                                depois=agendamento.model_dump(mode="json"))
 
         return Agendamento(
             agendamento_id=new_agendamento_id,
             animal_id=agendamento.animal_id,
             funcionario_id=agendamento.funcionario_id,
-            data_hora_agendamento=agendamento.data_hora_agendamento,
+            data_hora_agendamento=data_hora_agendamento,
             data_hora_criacao=data_hora_criacao,
             status=agendamento.status,
             observacoes=agendamento.observacoes,
+            filial_id=filial_id,
+            versao=versao,
             servicos=servicos_detalhes
         )
 
+    except BancoDadosError:
+        raise
     except (psycopg2.Error, ValueError, Exception) as e:
         print(f"Erro ao criar agendamento: {e}")
         if isinstance(e, psycopg2.Error) and e.pgcode == '23503':
@@ -104,13 +133,14 @@ def create_agendamento(agendamento: AgendamentoCreate) -> Optional[Agendamento]:
 def get_agendamento_by_id(agendamento_id: int) -> Optional[Agendamento]:
     """Busca um agendamento completo pelo ID usando SQL puro."""
     sql_agendamento = """
-        SELECT agendamento_id, animal_id, funcionario_id, data_hora_agendamento, data_hora_criacao, status, observacoes
+        SELECT agendamento_id, animal_id, funcionario_id, data_hora_agendamento, data_hora_criacao, status, observacoes, filial_id,
+               versao
         FROM Agendamentos
-        WHERE agendamento_id = %s;
+        WHERE agendamento_id = %s AND filial_id = %s;
     """
     try:
         with get_db_cursor() as cursor:
-            cursor.execute(sql_agendamento, (agendamento_id,))
+            cursor.execute(sql_agendamento, (agendamento_id, filial_atual()))
             row_agendamento = cursor.fetchone()
             if not row_agendamento:
                 return None
@@ -125,22 +155,106 @@ def get_agendamento_by_id(agendamento_id: int) -> Optional[Agendamento]:
                 data_hora_criacao=row_agendamento[4],
                 status=row_agendamento[5],
                 observacoes=row_agendamento[6],
+                filial_id=row_agendamento[7],
+                versao=row_agendamento[8],
                 servicos=servicos_detalhes
             )
 
+    except BancoDadosError:
+        raise
     except psycopg2.Error as e:
         print(f"Erro ao buscar agendamento por ID: {e}")
     except Exception as e:
         print(f"Erro inesperado ao buscar agendamento por ID: {e}")
     return None
 
+# Até esse número de animais (ou funcionários) encontrados pela busca, os agendamentos são
+# filtrados pela lista de IDs, com estimativas exatas para o planejador (índices por animal e
+# por funcionário). Acima dele a busca é ampla e fica como subconsulta: os agendamentos da
+# filial são percorridos pela data e os primeiros que batem já preenchem a página.
+LIMITE_IDS_BUSCA = 1000
+
+def _ids_busca(consulta: str, filial_id: int) -> Optional[Tuple[List[int], List[int]]]:
+    """IDs de animais e funcionários da filial que batem com a busca, ou None se passarem do limite."""
+    condicao_animal, params_animal = condicao_busca_animal(consulta, filial_id)
+    sql_animais = f"SELECT animal_id FROM Animais WHERE filial_id = %s AND {condicao_animal} LIMIT %s;"
+    sql_funcionarios = f"""
+        SELECT funcionario_id FROM Funcionarios
+        WHERE filial_id = %s AND {condicao_busca(VETOR_BUSCA_FUNCIONARIO)} LIMIT %s;
+    """
+    try:
+        with get_db_cursor() as cursor:
+            cursor.execute(sql_animais, (filial_id, *params_animal, LIMITE_IDS_BUSCA + 1))
+            animal_ids = [row[0] for row in cursor.fetchall()]
+            if len(animal_ids) > LIMITE_IDS_BUSCA:
+                return None
+            cursor.execute(sql_funcionarios, (filial_id, consulta, LIMITE_IDS_BUSCA + 1))
+            funcionario_ids = [row[0] for row in cursor.fetchall()]
+    except BancoDadosError:
+        raise
+    except psycopg2.Error as e:
+        print(f"Erro ao resolver a busca de agendamentos: {e}")
+        return None
+    if len(funcionario_ids) > LIMITE_IDS_BUSCA:
+        return None
+    return animal_ids, funcionario_ids
+
+def _build_agendamentos_filtros(
+    animal_id: Optional[int] = None,
+    funcionario_id: Optional[int] = None,
+    data_inicio: Optional[datetime] = None,
+    data_fim: Optional[datetime] = None,
+    status: Optional[str] = None,
+    busca: Optional[str] = None
+) -> Tuple[List[str], list]:
+    """Monta as condições do WHERE (sobre o alias "a" de Agendamentos) e seus parâmetros.
+
+    A primeira condição é sempre a filial atual. A busca encontra agendamentos cujo animal
+    (ou dono) ou funcionário bate com o texto (ver LIMITE_IDS_BUSCA).
+    """
+    filial_id = filial_atual()
+    conditions = ["a.filial_id = %s"]
+    params: list = [filial_id]
+
+    if animal_id is not None:
+        conditions.append("a.animal_id = %s")
+        params.append(animal_id)
+    if funcionario_id is not None:
+        conditions.append("a.funcionario_id = %s")
+        params.append(funcionario_id)
+    if data_inicio is not None:
+        conditions.append("a.data_hora_agendamento >= %s")
+        params.append(data_inicio)
+    if data_fim is not None:
+        conditions.append("a.data_hora_agendamento <= %s")
+        params.append(data_fim)
+    if status is not None:
+        conditions.append("a.status = %s")
+        params.append(status)
+    consulta = consulta_busca(busca)
+    ids = _ids_busca(consulta, filial_id) if consulta is not None else None
+    if ids is not None:
+        conditions.append("(a.animal_id = ANY(%s) OR a.funcionario_id = ANY(%s))")
+        params.extend(ids)
+    elif consulta is not None:
+        condicao_animal, params_animal = condicao_busca_animal(consulta, filial_id)
+        conditions.append(
+            f"(a.animal_id IN (SELECT animal_id FROM Animais WHERE filial_id = %s AND {condicao_animal})"
+            f" OR a.funcionario_id IN (SELECT funcionario_id FROM Funcionarios"
+            f" WHERE filial_id = %s AND {condicao_busca(VETOR_BUSCA_FUNCIONARIO)}))"
+        )
+        params.extend([filial_id, *params_animal, filial_id, consulta])
+
+    return conditions, params
+
 def get_agendamentos(
     skip: int = 0, limit: int = 100,
     animal_id: Optional[int] = None,
     funcionario_id: Optional[int] = None,
     data_inicio: Optional[datetime] = None,
     data_fim: Optional[datetime] = None,
-    status: Optional[str] = None
+    status: Optional[str] = None,
+    busca: Optional[str] = None
 ) -> List[Agendamento]:
     """Busca agendamentos com filtros e paginação, incluindo nomes, valor total e serviços."""
     sql_base = """
@@ -159,33 +273,24 @@ def get_agendamentos(
                 SELECT SUM(ags.preco_registrado)
                 FROM Agendamento_Servicos ags
                 WHERE ags.agendamento_id = a.agendamento_id
-            ), 0) AS valor_total
+            ), 0) AS valor_total,
+            a.filial_id,
+            a.versao
         FROM Agendamentos a
         JOIN Animais ani ON a.animal_id = ani.animal_id
         JOIN Clientes c ON ani.cliente_id = c.cliente_id
         LEFT JOIN Funcionarios f ON a.funcionario_id = f.funcionario_id
     """
-    conditions = []
-    params = []
-
-    if animal_id is not None:
-        conditions.append("a.animal_id = %s")
-        params.append(animal_id)
-    if funcionario_id is not None:
-        conditions.append("a.funcionario_id = %s")
-        params.append(funcionario_id)
-    if data_inicio is not None:
-        conditions.append("a.data_hora_agendamento >= %s")
-        params.append(data_inicio)
-    if data_fim is not None:
-        conditions.append("a.data_hora_agendamento <= %s")
-        params.append(data_fim)
-    if status is not None:
-        conditions.append("a.status = %s")
-        params.append(status)
+    conditions, params = _build_agendamentos_filtros(
+        animal_id=animal_id,
+        funcionario_id=funcionario_id,
+        data_inicio=data_inicio,
+        data_fim=data_fim,
+        status=status,
+        busca=busca
+    )
 
-    if conditions:
-        sql_base += " WHERE " + " AND ".join(conditions)
+    sql_base += " WHERE " + " AND ".join(conditions)
 
     sql_final = sql_base + " ORDER BY a.data_hora_agendamento DESC LIMIT %s OFFSET %s;"
     params.extend([limit, skip])
@@ -195,8 +300,8 @@ def get_agendamentos(
         with get_db_cursor() as cursor:
             cursor.execute(sql_final, tuple(params))
             rows = cursor.fetchall()
+            servicos = _get_servicos_for_agendamentos(cursor, [row[0] for row in rows])
             for row in rows:
-                servicos_detalhes = _get_servicos_for_agendamento(cursor, row[0])
                 agendamentos.append(Agendamento(
                     agendamento_id=row[0],
                     animal_id=row[1],
@@ -209,73 +314,315 @@ def get_agendamentos(
                     cliente_nome=row[8] or None,
                     funcionario_nome=row[9] or None,
                     valor_total=Decimal(row[10]) if row[10] is not None else None,
-                    servicos=servicos_detalhes
+                    filial_id=row[11],
+                    versao=row[12],
+                    servicos=servicos[row[0]]
                 ))
+    except BancoDadosError:
+        raise
     except psycopg2.Error as e:
         print(f"Erro ao buscar agendamentos: {e}")
     except Exception as e:
         print(f"Erro inesperado ao buscar agendamentos: {e}")
     return agendamentos
 
+# Campos que podem ser pedidos em ?fields=: expressão SQL e JOIN necessário (None = só Agendamentos).
+# "servicos" não é coluna: é carregado numa segunda consulta, apenas quando pedido.
+CAMPOS_AGENDAMENTO = {
+    "agendamento_id": ("a.agendamento_id", None),
+    "animal_id": ("a.animal_id", None),
+    "funcionario_id": ("a.funcionario_id", None),
+    "data_hora_agendamento": ("a.data_hora_agendamento", None),
+    "data_hora_criacao": ("a.data_hora_criacao", None),
+    "status": ("a.status", None),
+    "observacoes": ("a.observacoes", None),
+    "filial_id": ("a.filial_id", None),
+    "versao": ("a.versao", None),
+    "animal_nome": ("ani.nome", "animal"),
+    "cliente_nome": ("c.nome", "cliente"),
+    "funcionario_nome": ("f.nome", "funcionario"),
+    "valor_total": ("""COALESCE((
+                SELECT SUM(ags.preco_registrado)
+                FROM Agendamento_Servicos ags
+                WHERE ags.agendamento_id = a.agendamento_id
+            ), 0)""", None),
+    "servicos": (None, None),
+}
+
+_JOINS_AGENDAMENTO = {
+    "animal": "JOIN Animais ani ON a.animal_id = ani.animal_id",
+    "cliente": "JOIN Clientes c ON ani.cliente_id = c.cliente_id",
+    "funcionario": "LEFT JOIN Funcionarios f ON a.funcionario_id = f.funcionario_id",
+}
+
+def _get_servicos_for_agendamentos(cursor, agendamento_ids: List[int]) -> dict:
+    """Busca de uma vez os serviços de vários agendamentos, agrupados por agendamento_id."""
+    servicos = {agendamento_id: [] for agendamento_id in agendamento_ids}
+    if not agendamento_ids:
+        return servicos
+    sql = """
+        SELECT ags.agendamento_id, ags.servico_id, s.nome, ags.preco_registrado, ags.observacoes
+        FROM Agendamento_Servicos ags
+        JOIN Servicos s ON ags.servico_id = s.servico_id
+        WHERE ags.agendamento_id = ANY(%s);
+    """
+    cursor.execute(sql, (list(agendamento_ids),))
+    for row in cursor.fetchall():
+        servicos[row[0]].append(AgendamentoServicoDetalhe(
+            servico_id=row[1],
+            nome_servico=row[2],
+            preco_registrado=Decimal(row[3]),
+            observacoes=row[4]
+        ))
+    return servicos
+
+def get_agendamentos_campos(
+    campos: List[str],
+    skip: int = 0, limit: int = 100,
+    agendamento_id: Optional[int] = None,
+    animal_id: Optional[int] = None,
+    funcionario_id: Optional[int] = None,
+    data_inicio: Optional[datetime] = None,
+    data_fim: Optional[datetime] = None,
+    status: Optional[str] = None,
+    busca: Optional[str] = None
+) -> List[dict]:
+    """Busca agendamentos com SELECT e JOINs montados apenas a partir dos campos pedidos."""
+    colunas = [c for c in campos if c != "servicos"]
+    joins = {CAMPOS_AGENDAMENTO[c][1] for c in colunas} - {None}
+    if "cliente" in joins:
+        joins.add("animal")
+    # O ID é sempre lido (para ligar os serviços), mas só é devolvido se tiver sido pedido.
+    expressoes = ["a.agendamento_id"] + [CAMPOS_AGENDAMENTO[c][0] for c in colunas]
+
+    sql = f"SELECT {', '.join(expressoes)} FROM Agendamentos a"
+    for join in ("animal", "cliente", "funcionario"):
+        if join in joins:
+            sql += " " + _JOINS_AGENDAMENTO[join]
+
+    conditions, params = _build_agendamentos_filtros(
+        animal_id=animal_id,
+        funcionario_id=funcionario_id,
+        data_inicio=data_inicio,
+        data_fim=data_fim,
+        status=status,
+        busca=busca
+    )
+    if agendamento_id is not None:
+        conditions.append("a.agendamento_id = %s")
+        params.append(agendamento_id)
+    sql += " WHERE " + " AND ".join(conditions)
+    sql += " ORDER BY a.data_hora_agendamento DESC LIMIT %s OFFSET %s;"
+    params.extend([limit, skip])
+
+    agendamentos = []
+    try:
+        with get_db_cursor() as cursor:
+            cursor.execute(sql, tuple(params))
+            rows = cursor.fetchall()
+            servicos = {}
+            if "servicos" in campos:
+                servicos = _get_servicos_for_agendamentos(cursor, [row[0] for row in rows])
+            for row in rows:
+                valores = dict(zip(colunas, row[1:]))
+                if "servicos" in campos:
+                    valores["servicos"] = servicos[row[0]]
+                agendamentos.append({campo: valores[campo] for campo in campos})
+    except BancoDadosError:
+        raise
+    except psycopg2.Error as e:
+        print(f"Erro ao buscar campos de agendamentos: {e}")
+    except Exception as e:
+        print(f"Erro inesperado ao buscar campos de agendamentos: {e}")
+    return agendamentos
+
+def count_agendamentos(
+    animal_id: Optional[int] = None,
+    funcionario_id: Optional[int] = None,
+    data_inicio: Optional[datetime] = None,
+    data_fim: Optional[datetime] = None,
+    status: Optional[str] = None,
+    busca: Optional[str] = None
+) -> Optional[Contagem]:
+    """Conta os agendamentos da filial: estimativa sem filtros, contagem limitada com filtros.
+
+    Os JOINs da listagem não alteram o total (animal e cliente são obrigatórios, funcionário
+    é LEFT JOIN), então a contagem lê apenas Agendamentos.
+    """
+    conditions, params = _build_agendamentos_filtros(
+        animal_id=animal_id,
+        funcionario_id=funcionario_id,
+        data_inicio=data_inicio,
+        data_fim=data_fim,
+        status=status,
+        busca=busca
+    )
+    if len(conditions) == 1:
+        return count_filial("Agendamentos")
+    return count_capped("FROM Agendamentos a WHERE " + " AND ".join(conditions), params)
+
+def get_calendario_funcionarios(
+    funcionario_ids: List[int],
+    data_inicio: date,
+    dias: int = 7,
+    fuso_horario: str = "America/Sao_Paulo"
+) -> CalendarioAgendamentos:
+    """Busca a agenda de vários funcionários num intervalo de dias em uma única consulta.
+
+    O fim de cada agendamento é o início mais a soma das durações estimadas dos serviços,
+    e o dia é calculado no fuso horário pedido (usa o índice (funcionario_id, data_hora_agendamento)).
+    """
+    fuso = ZoneInfo(fuso_horario)
+    inicio_periodo = datetime.combine(data_inicio, time.min, tzinfo=fuso)
+    fim_periodo = datetime.combine(data_inicio + timedelta(days=dias), time.min, tzinfo=fuso)
+
+    sql = """
+        SELECT
+            a.funcionario_id,
+            a.agendamento_id,
+            (a.data_hora_agendamento AT TIME ZONE %s)::date AS dia,
+            a.data_hora_agendamento AS inicio,
+            a.data_hora_agendamento + make_interval(mins => COALESCE(s.duracao, 0)::int) AS fim,
+            a.status,
+            ani.nome AS animal_nome,
+            COALESCE(s.valor_total, 0) AS valor_total
+        FROM Agendamentos a
+        JOIN Animais ani ON a.animal_id = ani.animal_id
+        LEFT JOIN LATERAL (
+            SELECT SUM(sv.duracao_estimada_minutos) AS duracao, SUM(ags.preco_registrado) AS valor_total
+            FROM Agendamento_Servicos ags
+            JOIN Servicos sv ON ags.servico_id = sv.servico_id
+            WHERE ags.agendamento_id = a.agendamento_id
+        ) s ON TRUE
+        WHERE a.filial_id = %s
+          AND a.funcionario_id = ANY(%s)
+          AND a.data_hora_agendamento >= %s
+          AND a.data_hora_agendamento < %s
+        ORDER BY a.funcionario_id, a.data_hora_agendamento;
+    """
+    calendarios = {fid: CalendarioFuncionario(funcionario_id=fid) for fid in dict.fromkeys(funcionario_ids)}
+    try:
+        with get_db_cursor() as cursor:
+            cursor.execute(sql, (fuso_horario, filial_atual(), list(calendarios), inicio_periodo, fim_periodo))
+            for row in cursor.fetchall():
+                calendario = calendarios[row[0]]
+                calendario.agendamento_id.append(row[1])
+                calendario.dia.append(row[2])
+                calendario.inicio.append(row[3].astimezone(fuso))
+                calendario.fim.append(row[4].astimezone(fuso))
+                calendario.status.append(row[5])
+                calendario.animal.append(row[6])
+                calendario.valor_total.append(Decimal(row[7]))
+    except BancoDadosError:
+        raise
+    except psycopg2.Error as e:
+        print(f"Erro ao buscar calendário dos funcionários: {e}")
+    except Exception as e:
+        print(f"Erro inesperado ao buscar calendário dos funcionários: {e}")
+
+    return CalendarioAgendamentos(
+        fuso_horario=fuso_horario,
+        data_inicio=data_inicio,
+        data_fim=data_inicio + timedelta(days=dias - 1),
+        funcionarios=list(calendarios.values())
+    )
+
+@repetir_em_conflito
 def update_agendamento(agendamento_id: int, agendamento_update: AgendamentoUpdate) -> Optional[Agendamento]:
-    """Atualiza um agendamento existente, incluindo a lista de serviços (se fornecida)."""
-    update_data = agendamento_update.model_dump(exclude_unset=True, exclude={'servicos_ids'})
+    """Atualiza um agendamento existente, incluindo a lista de serviços (se fornecida).
+
+    Retorna None se o agendamento não existir na filial; animal/funcionário de outra filial e
+    serviços inválidos levantam ValueError. Com agendamento_update.versao, levanta
+    ConflitoVersaoError se o agendamento já estiver em outra versão.
+    """
+    update_data = agendamento_update.model_dump(exclude_unset=True, exclude={'servicos_ids', 'versao'})
     servicos_ids_to_update = agendamento_update.servicos_ids
 
     if not update_data and servicos_ids_to_update is None:
-        return get_agendamento_by_id(agendamento_id)
+        return conferir_versao(get_agendamento_by_id(agendamento_id), agendamento_update.versao)
 
+    antes, depois = {}, {}
+    # Só status, animal, data e serviços mudam as estatísticas do animal e do cliente.
+    muda_estatisticas = bool(crud_estatisticas.CAMPOS_CONTRIBUICAO & update_data.keys()) or servicos_ids_to_update is not None
     try:
         with get_db_cursor(commit=True) as cursor:
-            if update_data:
-                set_parts = []
-                values = []
-                for key, value in update_data.items():
-                    set_parts.append(f"{key} = %s")
-                    values.append(value)
-                values.append(agendamento_id)
-                sql_update = f"""
-                    UPDATE Agendamentos
-                    SET {", ".join(set_parts)}
-                    WHERE agendamento_id = %s;
-                """
-                cursor.execute(sql_update, tuple(values))
-                if cursor.rowcount == 0:
-                    raise ValueError(f"Agendamento com ID {agendamento_id} não encontrado para atualização.")
+            contribuicao_anterior = None
+            if muda_estatisticas:
+                contribuicao_anterior = crud_estatisticas.contribuicao_atual(cursor, agendamento_id, filial_atual())
+            # Sempre um UPDATE (só da versão, se apenas os serviços mudarem): confere a versão
+            # e traz os campos alterados antes e depois (auditoria).
+            set_parts = [f"{key} = %s" for key in update_data]
+            values = [agendamento_id, filial_atual(), *update_data.values(), agendamento_update.versao]
+            # Novo animal/funcionário precisa ser da mesma filial do agendamento.
+            conditions = []
+            if update_data.get("animal_id") is not None:
+                conditions.append("EXISTS (SELECT 1 FROM Animais ani WHERE ani.animal_id = %s AND ani.filial_id = Agendamentos.filial_id)")
+                values.append(update_data["animal_id"])
+            if update_data.get("funcionario_id") is not None:
+                conditions.append("EXISTS (SELECT 1 FROM Funcionarios f WHERE f.funcionario_id = %s AND f.filial_id = Agendamentos.filial_id)")
+                values.append(update_data["funcionario_id"])
+            sql_update = sql_update_versionado("Agendamentos", "agendamento_id", set_parts,
+                                               ("agendamento_id", *update_data), update_data, conditions)
+            row = executar_update_versionado(cursor, sql_update, values, agendamento_update.versao)
+            if row is None:
+                return None
+            if row[0] is None:
+                raise ValueError(f"Animal {update_data.get('animal_id')} ou funcionário {update_data.get('funcionario_id')} "
+                                 "não encontrado nesta filial.")
+            depois = dict(zip(update_data, row[1:len(update_data) + 1]))
+            antes = dict(zip(update_data, row[len(update_data) + 1:]))
 
             if servicos_ids_to_update is not None:
                 if not servicos_ids_to_update:
                     raise ValueError("Um agendamento deve ter pelo menos um serviço.")
 
                 servicos_com_preco = _fetch_servicos_details(cursor, servicos_ids_to_update)
-                sql_delete_old_servicos = "DELETE FROM Agendamento_Servicos WHERE agendamento_id = %s;"
+                sql_delete_old_servicos = "DELETE FROM Agendamento_Servicos WHERE agendamento_id = %s RETURNING servico_id;"
                 cursor.execute(sql_delete_old_servicos, (agendamento_id,))
+                antes["servicos_ids"] = sorted(row[0] for row in cursor.fetchall())
                 _insert_agendamento_servicos(cursor, agendamento_id, servicos_com_preco)
+                depois["servicos_ids"] = sorted(servico_id for servico_id, _ in servicos_com_preco)
+
+            if contribuicao_anterior is not None:
+                crud_estatisticas.aplicar(cursor, contribuicao_anterior,
+                                          crud_estatisticas.contribuicao_atual(cursor, agendamento_id, filial_atual()))
+            registrar_auditoria("agendamentos", agendamento_id, ACAO_UPDATE, antes=antes, depois=depois)
 
         return get_agendamento_by_id(agendamento_id)
 
-    except (psycopg2.Error, ValueError, Exception) as e:
+    except (BancoDadosError, ConflitoVersaoError, ValueError):
+        raise
+    except (psycopg2.Error, Exception) as e:
         print(f"Erro ao atualizar agendamento ID {agendamento_id}: {e}")
         if isinstance(e, psycopg2.Error) and e.pgcode == '23503':
             print(f"Verifique se o animal_id ou funcionario_id existem.")
-        elif isinstance(e, ValueError):
-            print(f"Erro de dados: {e}")
     return None
 
+@repetir_em_conflito
 def delete_agendamento(agendamento_id: int) -> bool:
     """Deleta um agendamento pelo ID usando SQL puro."""
-    sql = "DELETE FROM Agendamentos WHERE agendamento_id = %s RETURNING agendamento_id;"
+    sql = """
+        DELETE FROM Agendamentos WHERE agendamento_id = %s AND filial_id = %s
+        RETURNING agendamento_id, animal_id, funcionario_id, data_hora_agendamento, status, observacoes;
+    """
     deleted_id = None
     try:
         with get_db_cursor(commit=True) as cursor:
-            cursor.execute(sql, (agendamento_id,))
+            # Lida (e travada) antes: os serviços vão junto com o agendamento, em cascata.
+            contribuicao = crud_estatisticas.contribuicao_atual(cursor, agendamento_id, filial_atual())
+            cursor.execute(sql, (agendamento_id, filial_atual()))
             result = cursor.fetchone()
             if result:
                 deleted_id = result[0]
+                crud_estatisticas.aplicar(cursor, contribuicao, None)
+                registrar_auditoria("agendamentos", agendamento_id, ACAO_DELETE, antes=dict(zip(
+                    ("animal_id", "funcionario_id", "data_hora_agendamento", "status", "observacoes"), result[1:])))
                 print(f"Agendamento ID {deleted_id} deletado com sucesso.")
             else:
                 print(f"Agendamento ID {agendamento_id} não encontrado para deleção.")
 
+    except BancoDadosError:
+        raise
     except psycopg2.Error as e:
         print(f"Erro ao deletar agendamento: {e}")
     except Exception as e:
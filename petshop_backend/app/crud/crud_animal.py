@@ -1,38 +1,94 @@
 import psycopg2
-from typing import List, Optional
+from typing import List, Optional, Tuple
 
-from app.db.database import get_db_cursor
+from app.db.busca import condicao_busca, consulta_busca, vetor_busca
+from app.db.database import BancoDadosError, ConflitoVersaoError, filial_atual, get_db_cursor, repetir_em_conflito
+from app.db.versao import conferir_versao, executar_update_versionado, sql_update_versionado
+from app.core.audit import ACAO_CREATE, ACAO_DELETE, ACAO_UPDATE, registrar_auditoria, valores_auditados
+from app.core.cache import cache_animais, invalidar_entidade
+from app.db.counts import Contagem, count_capped, count_filial
+from app.crud import crud_estatisticas
+from app.crud.crud_cliente import VETOR_BUSCA_CLIENTE
 from app.models.animal import Animal, AnimalCreate, AnimalUpdate
+from app.models.estatisticas import EstatisticasAnimal
 
+# ?busca= procura por prefixo em nome, espécie e raça (idx_animais_busca) ou no dono.
+VETOR_BUSCA_ANIMAL = vetor_busca("nome", "especie", "raca")
 
+
+def condicao_busca_animal(consulta: str, filial_id: int) -> Tuple[str, list]:
+    """Condição sobre Animais (sem alias) para uma tsquery de consulta_busca() e seus parâmetros.
+
+    Os donos que batem com a busca são resolvidos antes, num ARRAY(...) avaliado uma vez, para
+    que o plano combine os índices idx_animais_busca e idx_animais_cliente_nome (BitmapOr).
+    """
+    sql = (
+        f"({condicao_busca(VETOR_BUSCA_ANIMAL)} OR cliente_id = ANY(ARRAY("
+        f"SELECT cliente_id FROM Clientes WHERE filial_id = %s AND {condicao_busca(VETOR_BUSCA_CLIENTE)})))"
+    )
+    return sql, [consulta, filial_id, consulta]
+
+
+def _build_animais_filtros(cliente_id: Optional[int] = None, busca: Optional[str] = None) -> Tuple[List[str], list]:
+    """Condições do WHERE das listagens de animais; a primeira é sempre a filial atual."""
+    filial_id = filial_atual()
+    conditions = ["filial_id = %s"]
+    params: list = [filial_id]
+    if cliente_id is not None:
+        conditions.append("cliente_id = %s")
+        params.append(cliente_id)
+    consulta = consulta_busca(busca)
+    if consulta is not None:
+        condicao, condicao_params = condicao_busca_animal(consulta, filial_id)
+        conditions.append(condicao)
+        params.extend(condicao_params)
+    return conditions, params
+
+
+@repetir_em_conflito
 def create_animal(animal: AnimalCreate) -> Optional[Animal]:
-    """Cria um novo animal no banco de dados usando SQL puro."""
+    """Cria um novo animal no banco de dados usando SQL puro.
+
+    O INSERT ... SELECT copia a filial do cliente e não insere nada se o cliente não for da filial atual.
+    """
     sql = """
-        INSERT INTO Animais (cliente_id, nome, especie, raca, data_nascimento, observacoes)
-        VALUES (%s, %s, %s, %s, %s, %s)
-        RETURNING animal_id, cliente_id, nome, especie, raca, data_nascimento, observacoes;
+        INSERT INTO Animais (cliente_id, nome, especie, raca, data_nascimento, observacoes, filial_id)
+        SELECT c.cliente_id, %s, %s, %s, %s, %s, c.filial_id
+        FROM Clientes c
+        WHERE c.cliente_id = %s AND c.filial_id = %s
+        RETURNING animal_id, cliente_id, nome, especie, raca, data_nascimento, observacoes, filial_id, versao;
     """
     try:
         with get_db_cursor(commit=True) as cursor:
             cursor.execute(sql, (
-                animal.cliente_id,
                 animal.nome,
                 animal.especie,
                 animal.raca,
                 animal.data_nascimento,
-                animal.observacoes
+                animal.observacoes,
+                animal.cliente_id,
+                filial_atual()
             ))
             row = cursor.fetchone()
-            if row:
-                return Animal(
-                    animal_id=row[0],
-                    cliente_id=row[1],
-                    nome=row[2],
-                    especie=row[3],
-                    raca=row[4],
-                    data_nascimento=row[5],
-                    observacoes=row[6]
-                )
+            if not row:
+                print(f"Erro ao criar animal: Cliente com ID {animal.cliente_id} não existe nesta filial.")
+                return None
+            criado = Animal(
+                animal_id=row[0],
+                cliente_id=row[1],
+                nome=row[2],
+                especie=row[3],
+                raca=row[4],
+                data_nascimento=row[5],
+                observacoes=row[6],
+                filial_id=row[7],
+                versao=row[8]
+            )
+            registrar_auditoria("animais", criado.animal_id, ACAO_CREATE,
+                                depois=valores_auditados(criado, "animal_id"))
+            return criado
+    except BancoDadosError:
+        raise
     except psycopg2.Error as e:
         if e.pgcode == '23503': 
              print(f"Erro ao criar animal: Cliente com ID {animal.cliente_id} não existe.")
@@ -42,16 +98,17 @@ def create_animal(animal: AnimalCreate) -> Optional[Animal]:
         print(f"Erro inesperado ao criar animal: {e}")
     return None
 
+@cache_animais.cached("id")
 def get_animal_by_id(animal_id: int) -> Optional[Animal]:
     """Busca um animal pelo ID usando SQL puro."""
     sql = """
-        SELECT animal_id, cliente_id, nome, especie, raca, data_nascimento, observacoes
+        SELECT animal_id, cliente_id, nome, especie, raca, data_nascimento, observacoes, filial_id, versao
         FROM Animais
-        WHERE animal_id = %s;
+        WHERE animal_id = %s AND filial_id = %s;
     """
     try:
         with get_db_cursor() as cursor:
-            cursor.execute(sql, (animal_id,))
+            cursor.execute(sql, (animal_id, filial_atual()))
             row = cursor.fetchone()
             if row:
                 return Animal(
@@ -61,27 +118,55 @@ def get_animal_by_id(animal_id: int) -> Optional[Animal]:
                     especie=row[3],
                     raca=row[4],
                     data_nascimento=row[5],
-                    observacoes=row[6]
+                    observacoes=row[6],
+                    filial_id=row[7],
+                    versao=row[8]
                 )
+    except BancoDadosError:
+        raise
     except psycopg2.Error as e:
         print(f"Erro ao buscar animal por ID: {e}")
     except Exception as e:
         print(f"Erro inesperado ao buscar animal por ID: {e}")
     return None
 
-def get_animais_by_cliente(cliente_id: int, skip: int = 0, limit: int = 100) -> List[Animal]:
+def get_estatisticas_animal(animal_id: int) -> Optional[EstatisticasAnimal]:
+    """Visitas, gasto, última visita, não comparecimentos e serviço favorito do animal."""
+    sql = f"""
+        SELECT a.animal_id, {crud_estatisticas.COLUNAS_LEITURA}
+        FROM Animais a
+        LEFT JOIN Estatisticas_Animais e ON e.animal_id = a.animal_id
+        LEFT JOIN Servicos sf ON sf.servico_id = e.servico_favorito_id
+        WHERE a.animal_id = %s AND a.filial_id = %s;
+    """
+    try:
+        with get_db_cursor() as cursor:
+            cursor.execute(sql, (animal_id, filial_atual()))
+            row = cursor.fetchone()
+            if row:
+                return EstatisticasAnimal(animal_id=row[0], **crud_estatisticas.valores_estatisticas(row[1:]))
+    except BancoDadosError:
+        raise
+    except psycopg2.Error as e:
+        print(f"Erro ao buscar estatísticas do animal: {e}")
+    except Exception as e:
+        print(f"Erro inesperado ao buscar estatísticas do animal: {e}")
+    return None
+
+def get_animais_by_cliente(cliente_id: int, skip: int = 0, limit: int = 100, busca: Optional[str] = None) -> List[Animal]:
     """Busca animais pertencentes a um cliente específico com paginação."""
-    sql = """
-        SELECT animal_id, cliente_id, nome, especie, raca, data_nascimento, observacoes
+    conditions, params = _build_animais_filtros(cliente_id=cliente_id, busca=busca)
+    sql = f"""
+        SELECT animal_id, cliente_id, nome, especie, raca, data_nascimento, observacoes, filial_id, versao
         FROM Animais
-        WHERE cliente_id = %s
+        WHERE {" AND ".join(conditions)}
         ORDER BY nome
         LIMIT %s OFFSET %s;
     """
     animais = []
     try:
         with get_db_cursor() as cursor:
-            cursor.execute(sql, (cliente_id, limit, skip))
+            cursor.execute(sql, (*params, limit, skip))
             rows = cursor.fetchall()
             for row in rows:
                 animais.append(Animal(
@@ -91,26 +176,32 @@ def get_animais_by_cliente(cliente_id: int, skip: int = 0, limit: int = 100) ->
                     especie=row[3],
                     raca=row[4],
                     data_nascimento=row[5],
-                    observacoes=row[6]
+                    observacoes=row[6],
+                    filial_id=row[7],
+                    versao=row[8]
                 ))
+    except BancoDadosError:
+        raise
     except psycopg2.Error as e:
         print(f"Erro ao buscar animais por cliente: {e}")
     except Exception as e:
         print(f"Erro inesperado ao buscar animais por cliente: {e}")
     return animais
 
-def get_animais(skip: int = 0, limit: int = 100) -> List[Animal]:
-    """Busca uma lista de todos os animais com paginação."""
-    sql = """
-        SELECT animal_id, cliente_id, nome, especie, raca, data_nascimento, observacoes
+def get_animais(skip: int = 0, limit: int = 100, busca: Optional[str] = None) -> List[Animal]:
+    """Busca uma lista de todos os animais com paginação e busca textual opcional."""
+    conditions, params = _build_animais_filtros(busca=busca)
+    sql = f"""
+        SELECT animal_id, cliente_id, nome, especie, raca, data_nascimento, observacoes, filial_id, versao
         FROM Animais
+        WHERE {" AND ".join(conditions)}
         ORDER BY nome
         LIMIT %s OFFSET %s;
     """
     animais = []
     try:
         with get_db_cursor() as cursor:
-            cursor.execute(sql, (limit, skip))
+            cursor.execute(sql, (*params, limit, skip))
             rows = cursor.fetchall()
             for row in rows:
                 animais.append(Animal(
@@ -120,66 +211,142 @@ def get_animais(skip: int = 0, limit: int = 100) -> List[Animal]:
                     especie=row[3],
                     raca=row[4],
                     data_nascimento=row[5],
-                    observacoes=row[6]
+                    observacoes=row[6],
+                    filial_id=row[7],
+                    versao=row[8]
                 ))
+    except BancoDadosError:
+        raise
     except psycopg2.Error as e:
         print(f"Erro ao buscar todos os animais: {e}")
     except Exception as e:
         print(f"Erro inesperado ao buscar todos os animais: {e}")
     return animais
 
+# Colunas que podem ser pedidas em ?fields= (campo do modelo -> expressão SQL).
+CAMPOS_ANIMAL = {
+    "animal_id": "animal_id",
+    "cliente_id": "cliente_id",
+    "nome": "nome",
+    "especie": "especie",
+    "raca": "raca",
+    "data_nascimento": "data_nascimento",
+    "observacoes": "observacoes",
+    "filial_id": "filial_id",
+    "versao": "versao",
+    "cliente_nome": "(SELECT c.nome FROM Clientes c WHERE c.cliente_id = Animais.cliente_id) AS cliente_nome",
+}
+
+def get_animais_campos(
+    campos: List[str], skip: int = 0, limit: int = 100,
+    cliente_id: Optional[int] = None, animal_id: Optional[int] = None, busca: Optional[str] = None
+) -> List[dict]:
+    """Busca animais selecionando apenas as colunas pedidas, com filtro opcional por cliente, ID ou busca."""
+    sql = f"SELECT {', '.join(CAMPOS_ANIMAL[c] for c in campos)} FROM Animais"
+    conditions, params = _build_animais_filtros(cliente_id=cliente_id, busca=busca)
+    if animal_id is not None:
+        conditions.append("animal_id = %s")
+        params.append(animal_id)
+    sql += " WHERE " + " AND ".join(conditions)
+    sql += " ORDER BY nome LIMIT %s OFFSET %s;"
+    params.extend([limit, skip])
+
+    animais = []
+    try:
+        with get_db_cursor() as cursor:
+            cursor.execute(sql, tuple(params))
+            for row in cursor.fetchall():
+                animais.append(dict(zip(campos, row)))
+    except BancoDadosError:
+        raise
+    except psycopg2.Error as e:
+        print(f"Erro ao buscar campos de animais: {e}")
+    except Exception as e:
+        print(f"Erro inesperado ao buscar campos de animais: {e}")
+    return animais
+
+def count_animais(cliente_id: Optional[int] = None, busca: Optional[str] = None) -> Optional[Contagem]:
+    """Total de animais da filial, opcionalmente de um cliente ou da busca (contagem limitada quando filtrada)."""
+    conditions, params = _build_animais_filtros(cliente_id=cliente_id, busca=busca)
+    if len(conditions) == 1:
+        return count_filial("Animais")
+    return count_capped("FROM Animais WHERE " + " AND ".join(conditions), params)
+
+@repetir_em_conflito
 def update_animal(animal_id: int, animal_update: AnimalUpdate) -> Optional[Animal]:
-    """Atualiza um animal existente usando SQL puro."""
-    update_data = animal_update.model_dump(exclude_unset=True)
+    """Atualiza um animal existente usando SQL puro.
+
+    Retorna None se o animal não existir na filial; com animal_update.versao, levanta
+    ConflitoVersaoError se ele já estiver em outra versão.
+    """
+    update_data = animal_update.model_dump(exclude_unset=True, exclude={"versao"})
     if not update_data:
-        return get_animal_by_id(animal_id)
+        return conferir_versao(get_animal_by_id(animal_id), animal_update.versao)
 
     set_parts = []
-    values = []
+    values = [animal_id, filial_atual()]
     for key, value in update_data.items():
         set_parts.append(f"{key} = %s")
         values.append(value)
+    values.append(animal_update.versao)
 
-    values.append(animal_id)
-
-    sql = f"""
-        UPDATE Animais
-        SET {", ".join(set_parts)}
-        WHERE animal_id = %s
-        RETURNING animal_id, cliente_id, nome, especie, raca, data_nascimento, observacoes;
-    """
+    # Um comando só: confere a versão e devolve também os valores anteriores (auditoria).
+    sql = sql_update_versionado(
+        "Animais", "animal_id", set_parts,
+        ("animal_id", "cliente_id", "nome", "especie", "raca", "data_nascimento", "observacoes", "filial_id", "versao"),
+        update_data)
 
     try:
         with get_db_cursor(commit=True) as cursor:
-            cursor.execute(sql, tuple(values))
-            row = cursor.fetchone()
+            row = executar_update_versionado(cursor, sql, values, animal_update.versao)
             if row:
-                return Animal(
+                invalidar_entidade(cursor, "animais", animal_id)
+                atualizado = Animal(
                     animal_id=row[0],
                     cliente_id=row[1],
                     nome=row[2],
                     especie=row[3],
                     raca=row[4],
                     data_nascimento=row[5],
-                    observacoes=row[6]
+                    observacoes=row[6],
+                    filial_id=row[7],
+                    versao=row[8]
                 )
+                registrar_auditoria("animais", animal_id, ACAO_UPDATE,
+                                    antes=dict(zip(update_data, row[9:])),
+                                    depois={campo: getattr(atualizado, campo) for campo in update_data})
+                return atualizado
+    except (BancoDadosError, ConflitoVersaoError):
+        raise
     except psycopg2.Error as e:
         print(f"Erro ao atualizar animal: {e}")
     except Exception as e:
         print(f"Erro inesperado ao atualizar animal: {e}")
     return None
 
+@repetir_em_conflito
 def delete_animal(animal_id: int) -> bool:
     """Deleta um animal pelo ID usando SQL puro."""
     # AGENDAMENTOS ASSOCIADOS SERÃO REMOVIDOS
-    sql = "DELETE FROM Animais WHERE animal_id = %s RETURNING animal_id;"
+    sql = """
+        DELETE FROM Animais WHERE animal_id = %s AND filial_id = %s
+        RETURNING animal_id, cliente_id, nome, especie, raca, data_nascimento, observacoes;
+    """
     deleted_id = None
     try:
         with get_db_cursor(commit=True) as cursor:
-            cursor.execute(sql, (animal_id,))
+            # As estatísticas do animal saem em cascata; as do dono são descontadas antes.
+            cliente_id = crud_estatisticas.retirar_animal(cursor, animal_id, filial_atual())
+            cursor.execute(sql, (animal_id, filial_atual()))
             result = cursor.fetchone()
             if result:
+                invalidar_entidade(cursor, "animais", animal_id)
+                crud_estatisticas.recalcular_clientes(cursor, [cliente_id] if cliente_id else [])
                 deleted_id = result[0]
+                registrar_auditoria("animais", animal_id, ACAO_DELETE, antes=dict(zip(
+                    ("cliente_id", "nome", "especie", "raca", "data_nascimento", "observacoes"), result[1:])))
+    except BancoDadosError:
+        raise
     except psycopg2.Error as e:
         print(f"Erro ao deletar animal: {e}")
     except Exception as e:
@@ -0,0 +1,197 @@
+import psycopg2
+from bisect import bisect_right, insort
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from app.core.audit import ACAO_UPDATE, registrar_auditoria
+from app.db.database import BancoDadosError, filial_atual, get_db_cursor, repetir_em_conflito
+from app.models.agendamento import AtribuicaoAgendamento, CargaFuncionario, ResultadoAtribuicao
+
+# --- Atribuição automática de funcionários ---
+#
+# Os agendamentos sem funcionário do período são processados em ordem de início (os mais
+# longos primeiro em caso de empate). Cada um vai para o funcionário com menos minutos
+# ocupados no período que esteja livre de [início, fim), onde fim = início + soma das
+# durações estimadas dos serviços. As agendas ficam em listas ordenadas de intervalos
+# disjuntos por funcionário, então testar se um funcionário está livre é uma busca binária,
+# e os funcionários são percorridos do menos para o mais ocupado até achar um livre.
+#
+# Tudo roda numa transação: um lock consultivo por filial serializa atribuições
+# simultâneas, os agendamentos pendentes ficam bloqueados (FOR UPDATE) até o commit e as
+# atribuições são gravadas num único UPDATE. Em dry_run a transação é desfeita.
+
+# Primeira chave do pg_advisory_xact_lock(chave, filial_id) das atribuições.
+LOCK_ATRIBUICAO = 43_001
+
+# Agendamentos que começam até esse tempo antes do período ainda podem ocupá-lo.
+MARGEM_OCUPACAO = timedelta(days=1)
+
+STATUS_ATRIBUIVEIS = ("Agendado", "Confirmado")
+
+_SQL_DURACAO = """
+    LEFT JOIN LATERAL (
+        SELECT SUM(sv.duracao_estimada_minutos) AS duracao
+        FROM Agendamento_Servicos ags
+        JOIN Servicos sv ON ags.servico_id = sv.servico_id
+        WHERE ags.agendamento_id = a.agendamento_id
+    ) s ON TRUE
+"""
+
+SQL_PENDENTES = f"""
+    SELECT a.agendamento_id, a.data_hora_agendamento,
+           a.data_hora_agendamento + make_interval(mins => COALESCE(s.duracao, 0)::int)
+    FROM Agendamentos a
+    {_SQL_DURACAO}
+    WHERE a.filial_id = %s
+      AND a.funcionario_id IS NULL
+      AND a.status = ANY(%s)
+      AND a.data_hora_agendamento >= %s
+      AND a.data_hora_agendamento < %s
+    ORDER BY a.data_hora_agendamento, a.agendamento_id
+    FOR UPDATE OF a;
+"""
+
+SQL_OCUPADOS = f"""
+    SELECT a.funcionario_id, a.data_hora_agendamento,
+           a.data_hora_agendamento + make_interval(mins => COALESCE(s.duracao, 0)::int)
+    FROM Agendamentos a
+    {_SQL_DURACAO}
+    WHERE a.funcionario_id = ANY(%s)
+      AND a.status <> 'Cancelado'
+      AND a.data_hora_agendamento >= %s
+      AND a.data_hora_agendamento < %s;
+"""
+
+
+class AgendaFuncionario:
+    """Intervalos ocupados de um funcionário, disjuntos e ordenados pelo início."""
+
+    __slots__ = ("inicios", "fins")
+
+    def __init__(self, intervalos: Iterable[Tuple[datetime, datetime]] = ()):
+        self.inicios: List[datetime] = []
+        self.fins: List[datetime] = []
+        # Agendamentos já sobrepostos no banco são unidos num só intervalo.
+        for inicio, fim in sorted(intervalos):
+            if self.fins and inicio < self.fins[-1]:
+                self.fins[-1] = max(self.fins[-1], fim)
+            else:
+                self.inicios.append(inicio)
+                self.fins.append(fim)
+
+    def livre(self, inicio: datetime, fim: datetime) -> bool:
+        i = bisect_right(self.inicios, inicio)
+        if i > 0 and self.fins[i - 1] > inicio:
+            return False
+        return i == len(self.inicios) or self.inicios[i] >= fim
+
+    def reservar(self, inicio: datetime, fim: datetime) -> None:
+        i = bisect_right(self.inicios, inicio)
+        self.inicios.insert(i, inicio)
+        self.fins.insert(i, fim)
+
+
+def _minutos(inicio: datetime, fim: datetime) -> int:
+    return int((fim - inicio).total_seconds() // 60)
+
+
+def planejar_atribuicoes(
+    pendentes: Sequence[Tuple[int, datetime, datetime]],
+    ocupados: Dict[int, List[Tuple[datetime, datetime]]],
+    funcionario_ids: Sequence[int],
+    data_inicio: datetime,
+    data_fim: datetime,
+) -> Tuple[Dict[int, int], Dict[int, int]]:
+    """Escolhe um funcionário para cada pendente (agendamento_id, início, fim).
+
+    ocupados traz os intervalos já agendados de cada funcionário. Retorna
+    ({agendamento_id: funcionario_id}, {funcionario_id: minutos ocupados no período});
+    pendentes que conflitam com todos os funcionários ficam fora do primeiro dicionário.
+    """
+    agendas = {fid: AgendaFuncionario(ocupados.get(fid, ())) for fid in funcionario_ids}
+    carga = {
+        fid: sum(_minutos(inicio, fim) for inicio, fim in ocupados.get(fid, ()) if data_inicio <= inicio < data_fim)
+        for fid in funcionario_ids
+    }
+    # (minutos ocupados, funcionario_id), do menos para o mais ocupado.
+    ordem = sorted((minutos, fid) for fid, minutos in carga.items())
+
+    atribuicoes: Dict[int, int] = {}
+    for agendamento_id, inicio, fim in sorted(pendentes, key=lambda p: (p[1], p[1] - p[2], p[0])):
+        for posicao, (minutos, fid) in enumerate(ordem):
+            if agendas[fid].livre(inicio, fim):
+                break
+        else:
+            continue
+        agendas[fid].reservar(inicio, fim)
+        atribuicoes[agendamento_id] = fid
+        carga[fid] = minutos + _minutos(inicio, fim)
+        del ordem[posicao]
+        insort(ordem, (carga[fid], fid))
+    return atribuicoes, carga
+
+
+@repetir_em_conflito
+def atribuir_agendamentos(
+    data_inicio: datetime,
+    data_fim: datetime,
+    cargo: Optional[str] = None,
+    dry_run: bool = False,
+) -> Optional[ResultadoAtribuicao]:
+    """Atribui funcionários ativos (opcionalmente de um cargo) aos agendamentos sem funcionário do período."""
+    filial_id = filial_atual()
+    try:
+        with get_db_cursor(commit=not dry_run) as cursor:
+            cursor.execute("SELECT pg_advisory_xact_lock(%s, %s);", (LOCK_ATRIBUICAO, filial_id))
+            cursor.execute(SQL_PENDENTES, (filial_id, list(STATUS_ATRIBUIVEIS), data_inicio, data_fim))
+            pendentes = cursor.fetchall()
+
+            filtros = ["filial_id = %s", "ativo"]
+            params = [filial_id]
+            if cargo is not None:
+                filtros.append("cargo = %s")
+                params.append(cargo)
+            cursor.execute(f"SELECT funcionario_id FROM Funcionarios WHERE {' AND '.join(filtros)} ORDER BY funcionario_id;", params)
+            funcionario_ids = [row[0] for row in cursor.fetchall()]
+
+            ocupados: Dict[int, List[Tuple[datetime, datetime]]] = {}
+            if pendentes and funcionario_ids:
+                ultimo_fim = max(fim for _, _, fim in pendentes)
+                cursor.execute(SQL_OCUPADOS, (funcionario_ids, data_inicio - MARGEM_OCUPACAO, max(ultimo_fim, data_fim)))
+                for fid, inicio, fim in cursor.fetchall():
+                    ocupados.setdefault(fid, []).append((inicio, fim))
+
+            atribuicoes, carga = planejar_atribuicoes(pendentes, ocupados, funcionario_ids, data_inicio, data_fim)
+
+            if atribuicoes and not dry_run:
+                cursor.execute("""
+                    UPDATE Agendamentos a SET funcionario_id = v.funcionario_id, versao = a.versao + 1
+                    FROM unnest(%s::int[], %s::int[]) AS v (agendamento_id, funcionario_id)
+                    WHERE a.agendamento_id = v.agendamento_id AND a.funcionario_id IS NULL
+                    RETURNING a.agendamento_id, a.funcionario_id;
+                """, (list(atribuicoes), list(atribuicoes.values())))
+                for agendamento_id, fid in cursor.fetchall():
+                    registrar_auditoria("agendamentos", agendamento_id, ACAO_UPDATE,
+                                        antes={"funcionario_id": None}, depois={"funcionario_id": fid})
+    except BancoDadosError:
+        raise
+    except psycopg2.Error as e:
+        print(f"Erro ao atribuir funcionários aos agendamentos: {e}")
+        return None
+
+    quantidade = dict.fromkeys(funcionario_ids, 0)
+    for fid in atribuicoes.values():
+        quantidade[fid] += 1
+    return ResultadoAtribuicao(
+        dry_run=dry_run,
+        pendentes=len(pendentes),
+        atribuicoes=[
+            AtribuicaoAgendamento(agendamento_id=agendamento_id, funcionario_id=atribuicoes[agendamento_id], inicio=inicio, fim=fim)
+            for agendamento_id, inicio, fim in pendentes if agendamento_id in atribuicoes
+        ],
+        sem_funcionario=[agendamento_id for agendamento_id, _, _ in pendentes if agendamento_id not in atribuicoes],
+        funcionarios=[
+            CargaFuncionario(funcionario_id=fid, agendamentos_atribuidos=quantidade[fid], minutos_ocupados=carga[fid])
+            for fid in funcionario_ids
+        ],
+    )
@@ -0,0 +1,63 @@
+import psycopg2
+from datetime import datetime
+from typing import List, Optional
+
+from app.db.database import BancoDadosError, filial_atual, get_db_cursor
+from app.models.auditoria import RegistroAuditoria
+
+# Os registros são gravados por app/core/audit.py; aqui só a consulta. Com entidade_id a
+# consulta usa idx_auditoria_registro, sem ele idx_auditoria_entidade_data, ambos já na
+# ordem da resposta (mais recentes primeiro).
+
+
+def get_registros_auditoria(
+    entidade: str,
+    entidade_id: Optional[int] = None,
+    data_inicio: Optional[datetime] = None,
+    data_fim: Optional[datetime] = None,
+    skip: int = 0,
+    limit: int = 100,
+) -> List[RegistroAuditoria]:
+    """Histórico de alterações de uma entidade (ou de um registro dela) no período [data_inicio, data_fim)."""
+    conditions = ["filial_id = %s", "entidade = %s"]
+    params: list = [filial_atual(), entidade]
+    if entidade_id is not None:
+        conditions.append("entidade_id = %s")
+        params.append(entidade_id)
+    if data_inicio is not None:
+        conditions.append("data_hora >= %s")
+        params.append(data_inicio)
+    if data_fim is not None:
+        conditions.append("data_hora < %s")
+        params.append(data_fim)
+    sql = f"""
+        SELECT auditoria_id, entidade, entidade_id, acao, alteracoes, autor, endpoint, data_hora
+        FROM Auditoria
+        WHERE {" AND ".join(conditions)}
+        ORDER BY data_hora DESC, auditoria_id DESC
+        LIMIT %s OFFSET %s;
+    """
+    registros = []
+    try:
+        with get_db_cursor() as cursor:
+            cursor.execute(sql, (*params, limit, skip))
+            registros = [
+                RegistroAuditoria(
+                    auditoria_id=row[0],
+                    entidade=row[1],
+                    entidade_id=row[2],
+                    acao=row[3],
+                    alteracoes=row[4],
+                    autor=row[5],
+                    endpoint=row[6],
+                    data_hora=row[7]
+                )
+                for row in cursor.fetchall()
+            ]
+    except BancoDadosError:
+        raise
+    except psycopg2.Error as e:
+        print(f"Erro ao buscar registros de auditoria: {e}")
+    except Exception as e:
+        print(f"Erro inesperado ao buscar registros de auditoria: {e}")
+    return registros
@@ -1,47 +1,79 @@
 import psycopg2
-from typing import List, Optional
+from typing import List, Optional, Tuple
 
-from app.db.database import get_db_cursor
+from app.db.busca import condicao_busca, consulta_busca, vetor_busca
+from app.db.database import (BancoDadosError, ConflitoVersaoError, RegistroDuplicadoError, filial_atual, get_db_cursor,
+                             repetir_em_conflito)
+from app.core.audit import (ACAO_CREATE, ACAO_DELETE, ACAO_UPDATE, registrar_auditoria, registrar_upsert_lote,
+                            valores_auditados)
+from app.core.cache import TODOS, cache_clientes, invalidar_entidade
+from app.db.counts import Contagem, count_capped, count_filial
+from app.db.upsert import ResultadoUpsert, upsert_em_lote
+from app.db.versao import conferir_versao, executar_update_versionado, sql_update_versionado
+from app.crud import crud_estatisticas
 from app.models.cliente import Cliente, ClienteCreate, ClienteUpdate
+from app.models.estatisticas import Estatisticas, EstatisticasCliente
 
+# Acima disso, um lote invalida o cache de clientes inteiro em vez de um aviso por ID.
+LIMITE_INVALIDACAO_POR_ID = 50
 
+# ?busca= procura por prefixo em nome, e-mail e telefone (índice idx_clientes_busca).
+VETOR_BUSCA_CLIENTE = vetor_busca("nome", "email", "telefone")
+
+
+@repetir_em_conflito
 def create_cliente(cliente: ClienteCreate) -> Optional[Cliente]:
-    """Cria um novo cliente no banco de dados usando SQL puro."""
+    """Cria um novo cliente no banco de dados usando SQL puro.
+
+    O e-mail duplicado é detectado no próprio INSERT (ON CONFLICT DO NOTHING), sem consulta
+    prévia: levanta RegistroDuplicadoError.
+    """
     sql = """
-        INSERT INTO Clientes (nome, telefone, email, endereco)
-        VALUES (%s, %s, %s, %s)
-        RETURNING cliente_id, nome, telefone, email, endereco, data_cadastro;
+        INSERT INTO Clientes (nome, telefone, email, endereco, filial_id)
+        VALUES (%s, %s, %s, %s, %s)
+        ON CONFLICT (filial_id, email) DO NOTHING
+        RETURNING cliente_id, nome, telefone, email, endereco, data_cadastro, filial_id, versao;
     """
     try:
         with get_db_cursor(commit=True) as cursor:
-            cursor.execute(sql, (cliente.nome, cliente.telefone, cliente.email, cliente.endereco))
+            cursor.execute(sql, (cliente.nome, cliente.telefone, cliente.email, cliente.endereco, filial_atual()))
             row = cursor.fetchone()
             if row:
                 # Mapeia a tupla do banco para o modelo Pydantic
-                return Cliente(
+                criado = Cliente(
                     cliente_id=row[0],
                     nome=row[1],
                     telefone=row[2],
                     email=row[3],
                     endereco=row[4],
-                    data_cadastro=row[5]
+                    data_cadastro=row[5],
+                    filial_id=row[6],
+                    versao=row[7]
                 )
+                crud_estatisticas.iniciar_clientes(cursor, [criado.cliente_id], criado.filial_id)
+                registrar_auditoria("clientes", criado.cliente_id, ACAO_CREATE,
+                                    depois=valores_auditados(criado, "cliente_id"))
+                return criado
+            raise RegistroDuplicadoError("Email já cadastrado")
+    except (BancoDadosError, RegistroDuplicadoError):
+        raise
     except psycopg2.Error as e:
         print(f"Erro ao criar cliente: {e}")
     except Exception as e:
         print(f"Erro inesperado ao criar cliente: {e}")
     return None
 
+@cache_clientes.cached("id")
 def get_cliente_by_id(cliente_id: int) -> Optional[Cliente]:
     """Busca um cliente pelo ID usando SQL puro."""
     sql = """
-        SELECT cliente_id, nome, telefone, email, endereco, data_cadastro
+        SELECT cliente_id, nome, telefone, email, endereco, data_cadastro, filial_id, versao
         FROM Clientes
-        WHERE cliente_id = %s;
+        WHERE cliente_id = %s AND filial_id = %s;
     """
     try:
         with get_db_cursor() as cursor:
-            cursor.execute(sql, (cliente_id,))
+            cursor.execute(sql, (cliente_id, filial_atual()))
             row = cursor.fetchone()
             if row:
                 return Cliente(
@@ -50,24 +82,29 @@ def get_cliente_by_id(cliente_id: int) -> Optional[Cliente]:
                     telefone=row[2],
                     email=row[3],
                     endereco=row[4],
-                    data_cadastro=row[5]
+                    data_cadastro=row[5],
+                    filial_id=row[6],
+                    versao=row[7]
                 )
+    except BancoDadosError:
+        raise
     except psycopg2.Error as e:
         print(f"Erro ao buscar cliente por ID: {e}")
     except Exception as e:
         print(f"Erro inesperado ao buscar cliente por ID: {e}")
     return None
 
+@cache_clientes.cached("email")
 def get_cliente_by_email(email: str) -> Optional[Cliente]:
     """Busca um cliente pelo email usando SQL puro."""
     sql = """
-        SELECT cliente_id, nome, telefone, email, endereco, data_cadastro
+        SELECT cliente_id, nome, telefone, email, endereco, data_cadastro, filial_id, versao
         FROM Clientes
-        WHERE email = %s;
+        WHERE filial_id = %s AND email = %s;
     """
     try:
         with get_db_cursor() as cursor:
-            cursor.execute(sql, (email,))
+            cursor.execute(sql, (filial_atual(), email))
             row = cursor.fetchone()
             if row:
                 return Cliente(
@@ -76,26 +113,204 @@ def get_cliente_by_email(email: str) -> Optional[Cliente]:
                     telefone=row[2],
                     email=row[3],
                     endereco=row[4],
-                    data_cadastro=row[5]
+                    data_cadastro=row[5],
+                    filial_id=row[6],
+                    versao=row[7]
                 )
+    except BancoDadosError:
+        raise
     except psycopg2.Error as e:
         print(f"Erro ao buscar cliente por email: {e}")
     except Exception as e:
         print(f"Erro inesperado ao buscar cliente por email: {e}")
     return None
 
-def get_clientes(skip: int = 0, limit: int = 100) -> List[Cliente]:
-    """Busca uma lista de clientes com paginação usando SQL puro."""
-    sql = """
-        SELECT cliente_id, nome, telefone, email, endereco, data_cadastro
-        FROM Clientes
-        ORDER BY nome
+def get_estatisticas_cliente(cliente_id: int) -> Optional[EstatisticasCliente]:
+    """Visitas, gasto, última visita, não comparecimentos e serviço favorito do cliente (todos os animais)."""
+    sql = f"""
+        SELECT c.cliente_id, {crud_estatisticas.COLUNAS_LEITURA}
+        FROM Clientes c
+        LEFT JOIN Estatisticas_Clientes e ON e.cliente_id = c.cliente_id
+        LEFT JOIN Servicos sf ON sf.servico_id = e.servico_favorito_id
+        WHERE c.cliente_id = %s AND c.filial_id = %s;
+    """
+    try:
+        with get_db_cursor() as cursor:
+            cursor.execute(sql, (cliente_id, filial_atual()))
+            row = cursor.fetchone()
+            if row:
+                return EstatisticasCliente(cliente_id=row[0], **crud_estatisticas.valores_estatisticas(row[1:]))
+    except BancoDadosError:
+        raise
+    except psycopg2.Error as e:
+        print(f"Erro ao buscar estatísticas do cliente: {e}")
+    except Exception as e:
+        print(f"Erro inesperado ao buscar estatísticas do cliente: {e}")
+    return None
+
+# --- Ficha completa do cliente (JSON montado pelo Postgres) ---
+#
+# Uma única consulta monta o documento inteiro com json_build_object/json_agg; o texto
+# resultante vai direto para a resposta HTTP, sem criar modelos Pydantic linha a linha.
+# Valores monetários saem como texto ("30.00"), como nos demais endpoints.
+
+PARTES_COMPLETO = ("animais", "agendamentos", "servicos", "estatisticas")
+
+SQL_COMPLETO_ANIMAIS = """
+    'animais', (
+        SELECT COALESCE(json_agg(json_build_object(
+            'animal_id', a.animal_id, 'cliente_id', a.cliente_id, 'nome', a.nome, 'especie', a.especie,
+            'raca', a.raca, 'data_nascimento', a.data_nascimento, 'observacoes', a.observacoes,
+            'filial_id', a.filial_id, 'versao', a.versao
+        ) ORDER BY a.nome), '[]'::json)
+        FROM Animais a
+        WHERE a.cliente_id = c.cliente_id AND a.filial_id = c.filial_id
+    )"""
+
+SQL_COMPLETO_ESTATISTICAS = """
+    'estatisticas', (
+        SELECT json_build_object(
+            'visitas', COALESCE(e.visitas, 0), 'gasto_total', COALESCE(e.gasto_total, 0.00)::text,
+            'ultima_visita', e.ultima_visita, 'nao_comparecimentos', COALESCE(e.nao_comparecimentos, 0),
+            'servico_favorito_id', e.servico_favorito_id, 'servico_favorito_nome', sf.nome
+        )
+        FROM (SELECT c.cliente_id) x
+        LEFT JOIN Estatisticas_Clientes e ON e.cliente_id = x.cliente_id
+        LEFT JOIN Servicos sf ON sf.servico_id = e.servico_favorito_id
+    )"""
+
+SQL_COMPLETO_SERVICOS = """,
+                'valor_total', s.valor_total::text,
+                'servicos', s.servicos"""
+
+SQL_COMPLETO_SERVICOS_JOIN = """
+            LEFT JOIN LATERAL (
+                SELECT COALESCE(SUM(ags.preco_registrado), 0) AS valor_total,
+                       COALESCE(json_agg(json_build_object(
+                           'servico_id', ags.servico_id, 'nome_servico', sv.nome,
+                           'preco_registrado', ags.preco_registrado::text, 'observacoes', ags.observacoes
+                       ) ORDER BY sv.nome), '[]'::json) AS servicos
+                FROM Agendamento_Servicos ags
+                JOIN Servicos sv ON sv.servico_id = ags.servico_id
+                WHERE ags.agendamento_id = ag.agendamento_id
+            ) s ON TRUE"""
+
+# {chave}, {filtro} e {ordem} definem próximos x recentes; {servicos}/{servicos_join} são opcionais.
+SQL_COMPLETO_AGENDAMENTOS = """
+    '{chave}', (
+        SELECT COALESCE(json_agg(x.agendamento ORDER BY x.data_hora_agendamento {ordem}), '[]'::json)
+        FROM (
+            SELECT ag.data_hora_agendamento, json_build_object(
+                'agendamento_id', ag.agendamento_id, 'animal_id', ag.animal_id, 'animal_nome', an.nome,
+                'funcionario_id', ag.funcionario_id, 'funcionario_nome', f.nome,
+                'data_hora_agendamento', ag.data_hora_agendamento, 'data_hora_criacao', ag.data_hora_criacao,
+                'status', ag.status, 'observacoes', ag.observacoes, 'versao', ag.versao{servicos}
+            ) AS agendamento
+            FROM Animais an
+            JOIN Agendamentos ag ON ag.animal_id = an.animal_id
+            LEFT JOIN Funcionarios f ON f.funcionario_id = ag.funcionario_id{servicos_join}
+            WHERE an.cliente_id = c.cliente_id AND an.filial_id = c.filial_id
+              AND ag.data_hora_agendamento {filtro} now()
+            ORDER BY ag.data_hora_agendamento {ordem}
+            LIMIT %(limite)s
+        ) x
+    )"""
+
+
+def get_cliente_completo_json(cliente_id: int, partes=PARTES_COMPLETO, limite_agendamentos: int = 10) -> Optional[str]:
+    """Cliente com animais, agendamentos próximos e recentes (com serviços) e estatísticas, como texto JSON.
+
+    partes escolhe o que incluir entre PARTES_COMPLETO; "servicos" detalha os agendamentos.
+    Retorna None se o cliente não existir na filial.
+    """
+    blocos = []
+    if "animais" in partes:
+        blocos.append(SQL_COMPLETO_ANIMAIS)
+    if "agendamentos" in partes:
+        com_servicos = "servicos" in partes
+        for chave, filtro, ordem in (("proximos_agendamentos", ">=", "ASC"), ("agendamentos_recentes", "<", "DESC")):
+            blocos.append(SQL_COMPLETO_AGENDAMENTOS.format(
+                chave=chave, filtro=filtro, ordem=ordem,
+                servicos=SQL_COMPLETO_SERVICOS if com_servicos else "",
+                servicos_join=SQL_COMPLETO_SERVICOS_JOIN if com_servicos else "",
+            ))
+    if "estatisticas" in partes:
+        blocos.append(SQL_COMPLETO_ESTATISTICAS)
+    sql = f"""
+        SELECT json_build_object(
+            'cliente_id', c.cliente_id, 'nome', c.nome, 'telefone', c.telefone, 'email', c.email,
+            'endereco', c.endereco, 'data_cadastro', c.data_cadastro, 'filial_id', c.filial_id,
+            'versao', c.versao
+            {''.join(',' + bloco for bloco in blocos)}
+        )::text
+        FROM Clientes c
+        WHERE c.cliente_id = %(cliente_id)s AND c.filial_id = %(filial_id)s;
+    """
+    try:
+        with get_db_cursor() as cursor:
+            cursor.execute(sql, {"cliente_id": cliente_id, "filial_id": filial_atual(), "limite": limite_agendamentos})
+            row = cursor.fetchone()
+            if row:
+                return row[0]
+    except BancoDadosError:
+        raise
+    except psycopg2.Error as e:
+        print(f"Erro ao buscar ficha completa do cliente: {e}")
+    except Exception as e:
+        print(f"Erro inesperado ao buscar ficha completa do cliente: {e}")
+    return None
+
+def _build_clientes_filtros(busca: Optional[str] = None) -> Tuple[List[str], list]:
+    """Condições do WHERE das listagens de clientes; a primeira é sempre a filial atual."""
+    conditions = ["filial_id = %s"]
+    params = [filial_atual()]
+    consulta = consulta_busca(busca)
+    if consulta is not None:
+        conditions.append(condicao_busca(VETOR_BUSCA_CLIENTE))
+        params.append(consulta)
+    return conditions, params
+
+# ?ordenar=: coluna de Estatisticas_Clientes (maiores primeiro, desempate pelo ID) ou o nome.
+ORDENACOES_CLIENTE = {
+    "gasto_total": "e.gasto_total DESC",
+    "visitas": "e.visitas DESC",
+    "ultima_visita": "e.ultima_visita DESC NULLS LAST",
+    "nao_comparecimentos": "e.nao_comparecimentos DESC",
+}
+
+def _from_clientes(conditions: List[str], ordenar: str) -> Tuple[str, str]:
+    """FROM/WHERE (alias c) e ORDER BY das listagens de clientes.
+
+    Ordenada por estatística, a consulta percorre o índice da ordenação em
+    Estatisticas_Clientes; os filtros ficam numa subconsulta sobre Clientes.
+    """
+    where = " AND ".join(conditions)
+    if ordenar not in ORDENACOES_CLIENTE:
+        return f"FROM Clientes c WHERE {where}", "ORDER BY c.nome"
+    return (f"""FROM (SELECT * FROM Clientes WHERE {where}) c
+        JOIN Estatisticas_Clientes e ON e.cliente_id = c.cliente_id AND e.filial_id = c.filial_id
+        LEFT JOIN Servicos sf ON sf.servico_id = e.servico_favorito_id""",
+            f"ORDER BY {ORDENACOES_CLIENTE[ordenar]}, e.cliente_id")
+
+def get_clientes(skip: int = 0, limit: int = 100, busca: Optional[str] = None, ordenar: str = "nome") -> List[Cliente]:
+    """Busca uma lista de clientes com paginação e busca textual opcional usando SQL puro.
+
+    Ordenada por estatística (ORDENACOES_CLIENTE), cada cliente vem com as suas estatísticas.
+    """
+    conditions, params = _build_clientes_filtros(busca)
+    from_sql, order_sql = _from_clientes(conditions, ordenar)
+    com_estatisticas = ordenar in ORDENACOES_CLIENTE
+    sql = f"""
+        SELECT c.cliente_id, c.nome, c.telefone, c.email, c.endereco, c.data_cadastro, c.filial_id, c.versao
+               {", " + crud_estatisticas.COLUNAS_LEITURA if com_estatisticas else ""}
+        {from_sql}
+        {order_sql}
         LIMIT %s OFFSET %s;
     """
     clientes = []
     try:
         with get_db_cursor() as cursor:
-            cursor.execute(sql, (limit, skip))
+            cursor.execute(sql, (*params, limit, skip))
             rows = cursor.fetchall()
             for row in rows:
                 clientes.append(Cliente(
@@ -104,66 +319,234 @@ def get_clientes(skip: int = 0, limit: int = 100) -> List[Cliente]:
                     telefone=row[2],
                     email=row[3],
                     endereco=row[4],
-                    data_cadastro=row[5]
+                    data_cadastro=row[5],
+                    filial_id=row[6],
+                    versao=row[7],
+                    estatisticas=Estatisticas(**crud_estatisticas.valores_estatisticas(row[8:])) if com_estatisticas else None
                 ))
+    except BancoDadosError:
+        raise
     except psycopg2.Error as e:
         print(f"Erro ao buscar clientes: {e}")
     except Exception as e:
         print(f"Erro inesperado ao buscar clientes: {e}")
     return clientes
 
+# Colunas que podem ser pedidas em ?fields= (campo do modelo -> expressão SQL).
+CAMPOS_CLIENTE = {
+    "cliente_id": "cliente_id",
+    "nome": "nome",
+    "telefone": "telefone",
+    "email": "email",
+    "endereco": "endereco",
+    "data_cadastro": "data_cadastro",
+    "filial_id": "filial_id",
+    "versao": "versao",
+}
+
+def get_clientes_campos(
+    campos: List[str], skip: int = 0, limit: int = 100,
+    cliente_id: Optional[int] = None, busca: Optional[str] = None, ordenar: str = "nome"
+) -> List[dict]:
+    """Busca clientes selecionando apenas as colunas pedidas (listagem ou, com cliente_id, detalhe)."""
+    conditions, params = _build_clientes_filtros(busca)
+    if cliente_id is not None:
+        conditions.append("cliente_id = %s")
+        params.append(cliente_id)
+    from_sql, order_sql = _from_clientes(conditions, ordenar)
+    sql = f"SELECT {', '.join('c.' + CAMPOS_CLIENTE[c] for c in campos)} {from_sql} {order_sql} LIMIT %s OFFSET %s;"
+    params.extend([limit, skip])
+
+    clientes = []
+    try:
+        with get_db_cursor() as cursor:
+            cursor.execute(sql, tuple(params))
+            for row in cursor.fetchall():
+                clientes.append(dict(zip(campos, row)))
+    except BancoDadosError:
+        raise
+    except psycopg2.Error as e:
+        print(f"Erro ao buscar campos de clientes: {e}")
+    except Exception as e:
+        print(f"Erro inesperado ao buscar campos de clientes: {e}")
+    return clientes
+
+def count_clientes(busca: Optional[str] = None) -> Optional[Contagem]:
+    """Total de clientes da filial (estimado pelo catálogo quando ela tem banco próprio).
+
+    Com busca, a contagem é limitada.
+    """
+    conditions, params = _build_clientes_filtros(busca)
+    if len(conditions) == 1:
+        return count_filial("Clientes")
+    return count_capped("FROM Clientes WHERE " + " AND ".join(conditions), params)
+
+@repetir_em_conflito
 def update_cliente(cliente_id: int, cliente_update: ClienteUpdate) -> Optional[Cliente]:
-    """Atualiza um cliente existente usando SQL puro."""
+    """Atualiza um cliente existente usando SQL puro.
+
+    Retorna None se o cliente não existir na filial; e-mail de outro cliente levanta
+    RegistroDuplicadoError (violação da restrição única, sem consulta prévia). Com
+    cliente_update.versao, levanta ConflitoVersaoError se o cliente já estiver em outra versão.
+    """
     # Monta a query de update dinamicamente para atualizar apenas os campos fornecidos
-    update_data = cliente_update.model_dump(exclude_unset=True) # Pega só os campos definidos
+    update_data = cliente_update.model_dump(exclude_unset=True, exclude={"versao"}) # Pega só os campos definidos
     if not update_data:
         # Se nada foi passado para atualizar, retorna o cliente atual sem fazer query
-        return get_cliente_by_id(cliente_id)
+        return conferir_versao(get_cliente_by_id(cliente_id), cliente_update.versao)
 
     set_parts = []
-    values = []
+    values = [cliente_id, filial_atual()]
     for key, value in update_data.items():
         set_parts.append(f"{key} = %s")
         values.append(value)
+    values.append(cliente_update.versao)
 
-    values.append(cliente_id) # Adiciona o ID para o WHERE
-
-    sql = f"""
-        UPDATE Clientes
-        SET {', '.join(set_parts)}
-        WHERE cliente_id = %s
-        RETURNING cliente_id, nome, telefone, email, endereco, data_cadastro;
-    """
+    # Um comando só: confere a versão e devolve também os valores anteriores (auditoria).
+    sql = sql_update_versionado(
+        "Clientes", "cliente_id", set_parts,
+        ("cliente_id", "nome", "telefone", "email", "endereco", "data_cadastro", "filial_id", "versao"), update_data)
 
     try:
         with get_db_cursor(commit=True) as cursor:
-            cursor.execute(sql, tuple(values))
-            row = cursor.fetchone()
+            row = executar_update_versionado(cursor, sql, values, cliente_update.versao)
             if row:
-                return Cliente(
+                invalidar_entidade(cursor, "clientes", cliente_id)
+                atualizado = Cliente(
                     cliente_id=row[0],
                     nome=row[1],
                     telefone=row[2],
                     email=row[3],
                     endereco=row[4],
-                    data_cadastro=row[5]
+                    data_cadastro=row[5],
+                    filial_id=row[6],
+                    versao=row[7]
                 )
+                registrar_auditoria("clientes", cliente_id, ACAO_UPDATE,
+                                    antes=dict(zip(update_data, row[8:])),
+                                    depois={campo: getattr(atualizado, campo) for campo in update_data})
+                return atualizado
+    except (BancoDadosError, ConflitoVersaoError):
+        raise
     except psycopg2.Error as e:
+        if e.pgcode == '23505':
+            raise RegistroDuplicadoError("Novo email já cadastrado para outro cliente")
         print(f"Erro ao atualizar cliente: {e}")
     except Exception as e:
         print(f"Erro inesperado ao atualizar cliente: {e}")
     return None
 
+@repetir_em_conflito
+def upsert_cliente(cliente: ClienteCreate) -> Optional[Tuple[Cliente, str]]:
+    """Cria ou atualiza o cliente da filial com este e-mail num único comando.
+
+    Retorna o cliente e a ação aplicada: "inserido", "atualizado" ou "inalterado".
+    """
+    sql = """
+        INSERT INTO Clientes AS c (nome, telefone, email, endereco, filial_id)
+        VALUES (%s, %s, %s, %s, %s)
+        ON CONFLICT (filial_id, email) DO UPDATE
+        SET nome = EXCLUDED.nome, telefone = EXCLUDED.telefone, endereco = EXCLUDED.endereco, versao = c.versao + 1
+        WHERE (c.nome, c.telefone, c.endereco) IS DISTINCT FROM (EXCLUDED.nome, EXCLUDED.telefone, EXCLUDED.endereco)
+        RETURNING c.cliente_id, c.nome, c.telefone, c.email, c.endereco, c.data_cadastro, c.filial_id, c.versao, (c.xmax = 0);
+    """
+    sql_inalterado = """
+        SELECT cliente_id, nome, telefone, email, endereco, data_cadastro, filial_id, versao, NULL
+        FROM Clientes
+        WHERE filial_id = %s AND email = %s;
+    """
+    filial_id = filial_atual()
+    try:
+        with get_db_cursor(commit=True) as cursor:
+            cursor.execute(sql, (cliente.nome, cliente.telefone, cliente.email, cliente.endereco, filial_id))
+            row = cursor.fetchone()
+            if row is None:
+                # Já existia com os mesmos dados: o UPDATE foi descartado pelo WHERE.
+                cursor.execute(sql_inalterado, (filial_id, cliente.email))
+                row = cursor.fetchone()
+            elif not row[8]:
+                invalidar_entidade(cursor, "clientes", row[0])
+            else:
+                crud_estatisticas.iniciar_clientes(cursor, [row[0]], filial_id)
+            if row:
+                acao = "inalterado" if row[8] is None else "inserido" if row[8] else "atualizado"
+                gravado = Cliente(
+                    cliente_id=row[0],
+                    nome=row[1],
+                    telefone=row[2],
+                    email=row[3],
+                    endereco=row[4],
+                    data_cadastro=row[5],
+                    filial_id=row[6],
+                    versao=row[7]
+                )
+                if acao != "inalterado":
+                    registrar_auditoria("clientes", gravado.cliente_id,
+                                        ACAO_CREATE if acao == "inserido" else ACAO_UPDATE,
+                                        depois=valores_auditados(gravado, "cliente_id"))
+                return gravado, acao
+    except BancoDadosError:
+        raise
+    except psycopg2.Error as e:
+        print(f"Erro ao gravar cliente por email: {e}")
+    except Exception as e:
+        print(f"Erro inesperado ao gravar cliente por email: {e}")
+    return None
+
+@repetir_em_conflito
+def upsert_clientes(clientes: List[ClienteCreate]) -> Optional[ResultadoUpsert]:
+    """Cria ou atualiza vários clientes da filial pelo e-mail, em comandos de várias linhas.
+
+    Tudo numa transação: ou o lote inteiro é gravado, ou nada.
+    """
+    filial_id = filial_atual()
+    linhas = [(c.nome, c.telefone, c.email, c.endereco, filial_id) for c in clientes]
+    try:
+        with get_db_cursor(commit=True) as cursor:
+            resultado = upsert_em_lote(
+                cursor, "Clientes", "cliente_id",
+                colunas=("nome", "telefone", "email", "endereco", "filial_id"),
+                chave=("filial_id", "email"),
+                atualizaveis=("nome", "telefone", "endereco"),
+                linhas=linhas,
+            )
+            crud_estatisticas.iniciar_clientes(cursor, resultado.inseridos, filial_id)
+            if len(resultado.atualizados) > LIMITE_INVALIDACAO_POR_ID:
+                invalidar_entidade(cursor, "clientes", TODOS)
+            else:
+                for cliente_id in resultado.atualizados:
+                    invalidar_entidade(cursor, "clientes", cliente_id)
+            registrar_upsert_lote("clientes", clientes, "email", resultado)
+            return resultado
+    except BancoDadosError:
+        raise
+    except psycopg2.Error as e:
+        print(f"Erro ao gravar lote de clientes: {e}")
+    except Exception as e:
+        print(f"Erro inesperado ao gravar lote de clientes: {e}")
+    return None
+
+@repetir_em_conflito
 def delete_cliente(cliente_id: int) -> bool:
     """Deleta um cliente pelo ID usando SQL puro."""
-    sql = "DELETE FROM Clientes WHERE cliente_id = %s RETURNING cliente_id;"
+    sql = """
+        DELETE FROM Clientes WHERE cliente_id = %s AND filial_id = %s
+        RETURNING cliente_id, nome, telefone, email, endereco, data_cadastro;
+    """
     deleted_id = None
     try:
         with get_db_cursor(commit=True) as cursor:
-            cursor.execute(sql, (cliente_id,))
+            cursor.execute(sql, (cliente_id, filial_atual()))
             result = cursor.fetchone()
             if result:
+                invalidar_entidade(cursor, "clientes", cliente_id)
+                # ON DELETE CASCADE também remove os animais do cliente.
+                invalidar_entidade(cursor, "animais")
                 deleted_id = result[0]
+                registrar_auditoria("clientes", cliente_id, ACAO_DELETE,
+                                    antes=dict(zip(("nome", "telefone", "email", "endereco", "data_cadastro"), result[1:])))
+    except BancoDadosError:
+        raise
     except psycopg2.Error as e:
         print(f"Erro ao deletar cliente: {e}")
     except Exception as e:
@@ -0,0 +1,306 @@
+from datetime import datetime
+from decimal import Decimal
+from typing import Iterable, List, NamedTuple, Optional, Tuple
+
+# --- Estatísticas por cliente e por animal ---
+#
+# Estatisticas_Animais e Estatisticas_Clientes guardam visitas (agendamentos concluídos),
+# gasto total (preços registrados nas visitas), última visita, não comparecimentos e serviço
+# favorito. As funções crud de agendamentos chamam aplicar() no mesmo cursor da alteração:
+# a contribuição anterior do agendamento é subtraída e a nova somada, na mesma transação.
+# Só agendamentos concluídos ou não comparecidos contam; os demais não escrevem nada aqui.
+#
+# Última visita e serviço favorito não se desfazem por subtração: quando uma visita muda,
+# os do animal são recalculados pelo índice idx_agendamentos_animal_data e pelas contagens
+# de Estatisticas_Animais_Servicos, e os do cliente a partir dos de seus animais.
+#
+# Todas as funções recebem o cursor da transação em curso.
+
+STATUS_VISITA = "Concluído"
+STATUS_NAO_COMPARECEU = "Não Compareceu"
+STATUS_CONTADOS = (STATUS_VISITA, STATUS_NAO_COMPARECEU)
+
+# Campos de um agendamento que mudam a sua contribuição (além dos serviços).
+CAMPOS_CONTRIBUICAO = frozenset({"animal_id", "status", "data_hora_agendamento"})
+
+
+class Contribuicao(NamedTuple):
+    """O que um agendamento soma às estatísticas do seu animal e do dono."""
+    animal_id: int
+    status: str
+    data_hora_agendamento: datetime
+    valor: Decimal = Decimal(0)
+    servicos_ids: Tuple[int, ...] = ()
+
+    @property
+    def conta(self) -> bool:
+        return self.status in STATUS_CONTADOS
+
+
+# Colunas lidas pelas consultas de leitura (alias e da tabela de estatísticas, sf do serviço
+# favorito), na ordem de valores_estatisticas(); sem linha de estatísticas, valem zero.
+COLUNAS_LEITURA = ("COALESCE(e.visitas, 0), COALESCE(e.gasto_total, 0.00), e.ultima_visita, "
+                   "COALESCE(e.nao_comparecimentos, 0), e.servico_favorito_id, sf.nome")
+CAMPOS_LEITURA = ("visitas", "gasto_total", "ultima_visita", "nao_comparecimentos",
+                  "servico_favorito_id", "servico_favorito_nome")
+
+
+def valores_estatisticas(row) -> dict:
+    """Campos dos modelos Estatisticas* a partir das colunas de COLUNAS_LEITURA."""
+    return dict(zip(CAMPOS_LEITURA, row))
+
+
+def contribuicao_atual(cursor, agendamento_id: int, filial_id: int) -> Optional[Contribuicao]:
+    """Contribuição do agendamento como está no banco, travando a linha (FOR UPDATE).
+
+    Os serviços são lidos num segundo comando, depois da trava, para não vir de um snapshot
+    anterior a uma alteração concorrente; só são lidos se o status conta.
+    """
+    cursor.execute("""
+        SELECT animal_id, status, data_hora_agendamento
+        FROM Agendamentos
+        WHERE agendamento_id = %s AND filial_id = %s
+        FOR UPDATE;
+    """, (agendamento_id, filial_id))
+    row = cursor.fetchone()
+    if row is None:
+        return None
+    contribuicao = Contribuicao(*row)
+    if not contribuicao.conta:
+        return contribuicao
+    cursor.execute("""
+        SELECT COALESCE(SUM(preco_registrado), 0), COALESCE(array_agg(servico_id ORDER BY servico_id), '{}')
+        FROM Agendamento_Servicos
+        WHERE agendamento_id = %s;
+    """, (agendamento_id,))
+    valor, servicos_ids = cursor.fetchone()
+    return contribuicao._replace(valor=Decimal(valor), servicos_ids=tuple(servicos_ids))
+
+
+SQL_SOMAR = """
+    WITH alvo AS (
+        SELECT animal_id, cliente_id, filial_id FROM Animais WHERE animal_id = %(animal_id)s
+    ), por_animal AS (
+        INSERT INTO Estatisticas_Animais AS e (animal_id, filial_id, visitas, gasto_total, ultima_visita, nao_comparecimentos)
+        SELECT animal_id, filial_id, %(visitas)s, %(gasto)s, %(ultima_visita)s, %(faltas)s FROM alvo
+        ON CONFLICT (animal_id) DO UPDATE SET
+            visitas = e.visitas + EXCLUDED.visitas,
+            gasto_total = e.gasto_total + EXCLUDED.gasto_total,
+            ultima_visita = GREATEST(e.ultima_visita, EXCLUDED.ultima_visita),
+            nao_comparecimentos = e.nao_comparecimentos + EXCLUDED.nao_comparecimentos
+    ), por_servico AS (
+        INSERT INTO Estatisticas_Animais_Servicos AS e (animal_id, servico_id, quantidade)
+        SELECT alvo.animal_id, s.servico_id, %(visitas)s
+        FROM alvo, unnest(%(servicos_ids)s::integer[]) AS s (servico_id)
+        ON CONFLICT (animal_id, servico_id) DO UPDATE SET quantidade = e.quantidade + EXCLUDED.quantidade
+    )
+    INSERT INTO Estatisticas_Clientes AS e (cliente_id, filial_id, visitas, gasto_total, ultima_visita, nao_comparecimentos)
+    SELECT cliente_id, filial_id, %(visitas)s, %(gasto)s, %(ultima_visita)s, %(faltas)s FROM alvo
+    ON CONFLICT (cliente_id) DO UPDATE SET
+        visitas = e.visitas + EXCLUDED.visitas,
+        gasto_total = e.gasto_total + EXCLUDED.gasto_total,
+        ultima_visita = GREATEST(e.ultima_visita, EXCLUDED.ultima_visita),
+        nao_comparecimentos = e.nao_comparecimentos + EXCLUDED.nao_comparecimentos
+    RETURNING cliente_id;
+"""
+
+# Também descarta as contagens de serviço que chegaram a zero (a subconsulta já as ignora).
+SQL_RECALCULAR_ANIMAIS = """
+    WITH zeradas AS (
+        DELETE FROM Estatisticas_Animais_Servicos WHERE animal_id = ANY(%(animais)s) AND quantidade <= 0
+    )
+    UPDATE Estatisticas_Animais e SET
+        ultima_visita = CASE WHEN %(ultima_visita)s THEN (
+            SELECT max(a.data_hora_agendamento) FROM Agendamentos a
+            WHERE a.animal_id = e.animal_id AND a.status = 'Concluído'
+        ) ELSE e.ultima_visita END,
+        servico_favorito_id = (
+            SELECT s.servico_id FROM Estatisticas_Animais_Servicos s
+            WHERE s.animal_id = e.animal_id AND s.quantidade > 0
+            ORDER BY s.quantidade DESC, s.servico_id
+            LIMIT 1
+        )
+    WHERE e.animal_id = ANY(%(animais)s);
+"""
+
+SQL_RECALCULAR_CLIENTES = """
+    UPDATE Estatisticas_Clientes e SET
+        ultima_visita = (
+            SELECT max(ea.ultima_visita) FROM Animais an
+            JOIN Estatisticas_Animais ea ON ea.animal_id = an.animal_id
+            WHERE an.cliente_id = e.cliente_id
+        ),
+        servico_favorito_id = (
+            SELECT s.servico_id FROM Animais an
+            JOIN Estatisticas_Animais_Servicos s ON s.animal_id = an.animal_id
+            WHERE an.cliente_id = e.cliente_id
+            GROUP BY s.servico_id
+            HAVING sum(s.quantidade) > 0
+            ORDER BY sum(s.quantidade) DESC, s.servico_id
+            LIMIT 1
+        )
+    WHERE e.cliente_id = ANY(%(clientes)s);
+"""
+
+
+def _somar(cursor, contribuicao: Contribuicao, sinal: int) -> List[int]:
+    """Soma (sinal 1) ou subtrai (-1) a contribuição; retorna o cliente afetado."""
+    visita = contribuicao.status == STATUS_VISITA
+    cursor.execute(SQL_SOMAR, {
+        "animal_id": contribuicao.animal_id,
+        "visitas": sinal if visita else 0,
+        "gasto": sinal * contribuicao.valor if visita else 0,
+        # Na subtração a última visita é recalculada depois; GREATEST ignora o NULL.
+        "ultima_visita": contribuicao.data_hora_agendamento if visita and sinal > 0 else None,
+        "faltas": 0 if visita else sinal,
+        "servicos_ids": list(contribuicao.servicos_ids) if visita else [],
+    })
+    return [row[0] for row in cursor.fetchall()]
+
+
+def recalcular_clientes(cursor, cliente_ids: Iterable[int]) -> None:
+    """Última visita e serviço favorito dos clientes, a partir das estatísticas dos animais."""
+    cliente_ids = sorted(set(cliente_ids))
+    if cliente_ids:
+        cursor.execute(SQL_RECALCULAR_CLIENTES, {"clientes": cliente_ids})
+
+
+def aplicar(cursor, antes: Optional[Contribuicao], depois: Optional[Contribuicao]) -> None:
+    """Troca a contribuição antes (None: agendamento novo) pela depois (None: excluído)."""
+    if antes == depois:
+        return
+    partes = [(contribuicao, sinal) for contribuicao, sinal in ((antes, -1), (depois, 1))
+              if contribuicao is not None and contribuicao.conta]
+    clientes = []
+    for contribuicao, sinal in partes:
+        clientes.extend(_somar(cursor, contribuicao, sinal))
+    visitas = [(contribuicao, sinal) for contribuicao, sinal in partes if contribuicao.status == STATUS_VISITA]
+    if not visitas:
+        return
+    cursor.execute(SQL_RECALCULAR_ANIMAIS, {
+        "animais": sorted({contribuicao.animal_id for contribuicao, _ in visitas}),
+        "ultima_visita": any(sinal < 0 for _, sinal in visitas),
+    })
+    recalcular_clientes(cursor, clientes)
+
+
+def somar_nao_comparecimentos(cursor, animal_ids: List[int]) -> None:
+    """Um não comparecimento por item de animal_ids (marcação em massa de agendamentos em aberto)."""
+    if not animal_ids:
+        return
+    cursor.execute("""
+        WITH alvo AS (
+            SELECT an.animal_id, an.cliente_id, an.filial_id, f.quantidade
+            FROM (SELECT animal_id, count(*) AS quantidade FROM unnest(%s::integer[]) AS u (animal_id)
+                  GROUP BY animal_id) f
+            JOIN Animais an ON an.animal_id = f.animal_id
+        ), por_animal AS (
+            INSERT INTO Estatisticas_Animais AS e (animal_id, filial_id, nao_comparecimentos)
+            SELECT animal_id, filial_id, quantidade FROM alvo ORDER BY animal_id
+            ON CONFLICT (animal_id) DO UPDATE SET nao_comparecimentos = e.nao_comparecimentos + EXCLUDED.nao_comparecimentos
+        )
+        INSERT INTO Estatisticas_Clientes AS e (cliente_id, filial_id, nao_comparecimentos)
+        SELECT cliente_id, filial_id, sum(quantidade) FROM alvo GROUP BY cliente_id, filial_id ORDER BY cliente_id
+        ON CONFLICT (cliente_id) DO UPDATE SET nao_comparecimentos = e.nao_comparecimentos + EXCLUDED.nao_comparecimentos;
+    """, (animal_ids,))
+
+
+def iniciar_clientes(cursor, cliente_ids: Iterable[int], filial_id: int) -> None:
+    """Linha zerada para clientes novos, para que a listagem ordenada por estatística os inclua."""
+    cliente_ids = list(cliente_ids)
+    if cliente_ids:
+        cursor.execute("""
+            INSERT INTO Estatisticas_Clientes (cliente_id, filial_id)
+            SELECT unnest(%s::integer[]), %s
+            ON CONFLICT (cliente_id) DO NOTHING;
+        """, (cliente_ids, filial_id))
+
+
+def retirar_animal(cursor, animal_id: int, filial_id: int) -> Optional[int]:
+    """Subtrai do dono as estatísticas do animal, antes de excluí-lo; retorna o dono.
+
+    Depois da exclusão (que leva as linhas do animal em cascata), chame recalcular_clientes().
+    """
+    cursor.execute("""
+        UPDATE Estatisticas_Clientes e SET
+            visitas = e.visitas - ea.visitas,
+            gasto_total = e.gasto_total - ea.gasto_total,
+            nao_comparecimentos = e.nao_comparecimentos - ea.nao_comparecimentos
+        FROM Animais an
+        JOIN Estatisticas_Animais ea ON ea.animal_id = an.animal_id
+        WHERE an.animal_id = %s AND an.filial_id = %s AND e.cliente_id = an.cliente_id
+        RETURNING e.cliente_id;
+    """, (animal_id, filial_id))
+    row = cursor.fetchone()
+    return row[0] if row else None
+
+
+# --- Reconstrução a partir dos agendamentos ---
+
+SQL_RECONSTRUIR = """
+    LOCK TABLE Estatisticas_Clientes, Estatisticas_Animais, Estatisticas_Animais_Servicos IN SHARE ROW EXCLUSIVE MODE;
+
+    DELETE FROM Estatisticas_Animais_Servicos s USING Animais an
+    WHERE an.animal_id = s.animal_id AND (%(filial)s::integer IS NULL OR an.filial_id = %(filial)s);
+    DELETE FROM Estatisticas_Animais WHERE %(filial)s::integer IS NULL OR filial_id = %(filial)s;
+    DELETE FROM Estatisticas_Clientes WHERE %(filial)s::integer IS NULL OR filial_id = %(filial)s;
+
+    INSERT INTO Estatisticas_Animais_Servicos (animal_id, servico_id, quantidade)
+    SELECT a.animal_id, ags.servico_id, count(*)
+    FROM Agendamentos a
+    JOIN Agendamento_Servicos ags ON ags.agendamento_id = a.agendamento_id
+    WHERE a.status = 'Concluído' AND (%(filial)s::integer IS NULL OR a.filial_id = %(filial)s)
+    GROUP BY a.animal_id, ags.servico_id;
+
+    INSERT INTO Estatisticas_Animais (animal_id, filial_id, visitas, gasto_total, ultima_visita,
+                                      nao_comparecimentos, servico_favorito_id)
+    SELECT an.animal_id, an.filial_id, COALESCE(v.visitas, 0), COALESCE(v.gasto_total, 0), v.ultima_visita,
+           COALESCE(v.nao_comparecimentos, 0), f.servico_id
+    FROM Animais an
+    LEFT JOIN (
+        SELECT a.animal_id,
+               count(*) FILTER (WHERE a.status = 'Concluído') AS visitas,
+               sum(s.valor) FILTER (WHERE a.status = 'Concluído') AS gasto_total,
+               max(a.data_hora_agendamento) FILTER (WHERE a.status = 'Concluído') AS ultima_visita,
+               count(*) FILTER (WHERE a.status = 'Não Compareceu') AS nao_comparecimentos
+        FROM Agendamentos a
+        LEFT JOIN (
+            SELECT agendamento_id, sum(preco_registrado) AS valor FROM Agendamento_Servicos GROUP BY agendamento_id
+        ) s ON s.agendamento_id = a.agendamento_id
+        WHERE a.status IN ('Concluído', 'Não Compareceu') AND (%(filial)s::integer IS NULL OR a.filial_id = %(filial)s)
+        GROUP BY a.animal_id
+    ) v ON v.animal_id = an.animal_id
+    LEFT JOIN (
+        SELECT DISTINCT ON (animal_id) animal_id, servico_id
+        FROM Estatisticas_Animais_Servicos
+        ORDER BY animal_id, quantidade DESC, servico_id
+    ) f ON f.animal_id = an.animal_id
+    WHERE %(filial)s::integer IS NULL OR an.filial_id = %(filial)s;
+
+    INSERT INTO Estatisticas_Clientes (cliente_id, filial_id, visitas, gasto_total, ultima_visita,
+                                       nao_comparecimentos, servico_favorito_id)
+    SELECT c.cliente_id, c.filial_id, COALESCE(sum(ea.visitas), 0), COALESCE(sum(ea.gasto_total), 0),
+           max(ea.ultima_visita), COALESCE(sum(ea.nao_comparecimentos), 0), f.servico_id
+    FROM Clientes c
+    LEFT JOIN Animais an ON an.cliente_id = c.cliente_id
+    LEFT JOIN Estatisticas_Animais ea ON ea.animal_id = an.animal_id
+    LEFT JOIN (
+        SELECT DISTINCT ON (an.cliente_id) an.cliente_id, s.servico_id
+        FROM Estatisticas_Animais_Servicos s
+        JOIN Animais an ON an.animal_id = s.animal_id
+        WHERE %(filial)s::integer IS NULL OR an.filial_id = %(filial)s
+        GROUP BY an.cliente_id, s.servico_id
+        ORDER BY an.cliente_id, sum(s.quantidade) DESC, s.servico_id
+    ) f ON f.cliente_id = c.cliente_id
+    WHERE %(filial)s::integer IS NULL OR c.filial_id = %(filial)s
+    GROUP BY c.cliente_id, c.filial_id, f.servico_id;
+"""
+
+
+def reconstruir(cursor, filial_id: Optional[int] = None) -> None:
+    """Recalcula as estatísticas da filial (ou de todas) a partir dos agendamentos.
+
+    A trava impede que alterações concorrentes somem sobre linhas apagadas: as que já
+    escreveram terminam antes, e as seguintes esperam e somam sobre o resultado novo.
+    """
+    cursor.execute(SQL_RECONSTRUIR, {"filial": filial_id})
@@ -0,0 +1,69 @@
+import psycopg2
+from typing import List, Optional
+
+from app.db.database import FILIAL_PADRAO, BancoDadosError, banco_principal, get_db_cursor, usar_filial
+from app.models.filial import Filial, FilialCreate
+
+# O cadastro de filiais fica no banco principal (o da FILIAL_PADRAO), mesmo para as
+# filiais cujos dados foram movidos para outro banco.
+
+
+def _filial(row) -> Filial:
+    return Filial(filial_id=row[0], nome=row[1], data_cadastro=row[2], banco_proprio=not banco_principal(row[0]))
+
+def create_filial(filial: FilialCreate) -> Optional[Filial]:
+    """Cria uma nova filial no banco principal."""
+    sql = """
+        INSERT INTO Filiais (nome)
+        VALUES (%s)
+        RETURNING filial_id, nome, data_cadastro;
+    """
+    try:
+        with usar_filial(FILIAL_PADRAO), get_db_cursor(commit=True) as cursor:
+            cursor.execute(sql, (filial.nome,))
+            row = cursor.fetchone()
+            if row:
+                return _filial(row)
+    except BancoDadosError:
+        raise
+    except psycopg2.Error as e:
+        if e.pgcode == '23505':
+            print(f"Erro ao criar filial: Nome '{filial.nome}' já existe.")
+        else:
+            print(f"Erro de banco de dados ao criar filial: {e}")
+    except Exception as e:
+        print(f"Erro inesperado ao criar filial: {e}")
+    return None
+
+def get_filial_by_id(filial_id: int) -> Optional[Filial]:
+    """Busca uma filial pelo ID."""
+    sql = "SELECT filial_id, nome, data_cadastro FROM Filiais WHERE filial_id = %s;"
+    try:
+        with usar_filial(FILIAL_PADRAO), get_db_cursor() as cursor:
+            cursor.execute(sql, (filial_id,))
+            row = cursor.fetchone()
+            if row:
+                return _filial(row)
+    except BancoDadosError:
+        raise
+    except psycopg2.Error as e:
+        print(f"Erro ao buscar filial por ID: {e}")
+    except Exception as e:
+        print(f"Erro inesperado ao buscar filial por ID: {e}")
+    return None
+
+def get_filiais() -> List[Filial]:
+    """Lista todas as filiais (são poucas: sem paginação)."""
+    sql = "SELECT filial_id, nome, data_cadastro FROM Filiais ORDER BY filial_id;"
+    filiais = []
+    try:
+        with usar_filial(FILIAL_PADRAO), get_db_cursor() as cursor:
+            cursor.execute(sql)
+            filiais = [_filial(row) for row in cursor.fetchall()]
+    except BancoDadosError:
+        raise
+    except psycopg2.Error as e:
+        print(f"Erro ao buscar filiais: {e}")
+    except Exception as e:
+        print(f"Erro inesperado ao buscar filiais: {e}")
+    return filiais
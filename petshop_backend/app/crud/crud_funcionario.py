@@ -1,15 +1,34 @@
 import psycopg2
-from typing import List, Optional
+from typing import List, Optional, Tuple
 
-from app.db.database import get_db_cursor
-from app.models.funcionario import Funcionario, FuncionarioCreate, FuncionarioUpdate
+from app.db.busca import condicao_busca, consulta_busca, vetor_busca
+from app.db.database import (BancoDadosError, ConflitoVersaoError, RegistroDuplicadoError, filial_atual, get_db_cursor,
+                             repetir_em_conflito)
+from app.core.audit import (ACAO_CREATE, ACAO_DELETE, ACAO_UPDATE, registrar_auditoria, registrar_upsert_lote,
+                            valores_auditados)
+from app.core.cache import TODOS, cache_funcionarios, invalidar_entidade
+from app.db.counts import Contagem, count_capped, count_filial
+from app.db.upsert import ResultadoUpsert, upsert_em_lote
+from app.db.versao import conferir_versao, executar_update_versionado, sql_update_versionado
+from app.models.funcionario import Funcionario, FuncionarioCreate, FuncionarioUpdate, FuncionarioUpsert
 
+# Acima disso, um lote invalida o cache de funcionários inteiro em vez de um aviso por ID.
+LIMITE_INVALIDACAO_POR_ID = 50
+
+# ?busca= procura por prefixo em nome, cargo, e-mail e telefone (idx_funcionarios_busca).
+VETOR_BUSCA_FUNCIONARIO = vetor_busca("nome", "cargo", "email", "telefone")
+
+@repetir_em_conflito
 def create_funcionario(funcionario: FuncionarioCreate) -> Optional[Funcionario]:
-    """Cria um novo funcionário no banco de dados usando SQL puro."""
+    """Cria um novo funcionário no banco de dados usando SQL puro.
+
+    E-mail já usado na filial levanta RegistroDuplicadoError (detectado no próprio INSERT).
+    """
     sql = """
-        INSERT INTO Funcionarios (nome, cargo, telefone, email, data_contratacao, ativo)
-        VALUES (%s, %s, %s, %s, %s, %s)
-        RETURNING funcionario_id, nome, cargo, telefone, email, data_contratacao, ativo;
+        INSERT INTO Funcionarios (nome, cargo, telefone, email, data_contratacao, ativo, filial_id)
+        VALUES (%s, %s, %s, %s, %s, %s, %s)
+        ON CONFLICT (filial_id, email) DO NOTHING
+        RETURNING funcionario_id, nome, cargo, telefone, email, data_contratacao, ativo, filial_id, versao;
     """
     try:
         with get_db_cursor(commit=True) as cursor:
@@ -19,38 +38,45 @@ def create_funcionario(funcionario: FuncionarioCreate) -> Optional[Funcionario]:
                 funcionario.telefone,
                 funcionario.email,
                 funcionario.data_contratacao,
-                funcionario.ativo
+                funcionario.ativo,
+                filial_atual()
             ))
             row = cursor.fetchone()
             if row:
-                return Funcionario(
+                criado = Funcionario(
                     funcionario_id=row[0],
                     nome=row[1],
                     cargo=row[2],
                     telefone=row[3],
                     email=row[4],
                     data_contratacao=row[5],
-                    ativo=row[6]
+                    ativo=row[6],
+                    filial_id=row[7],
+                    versao=row[8]
                 )
+                registrar_auditoria("funcionarios", criado.funcionario_id, ACAO_CREATE,
+                                    depois=valores_auditados(criado, "funcionario_id"))
+                return criado
+            raise RegistroDuplicadoError("Email já cadastrado para outro funcionário")
+    except (BancoDadosError, RegistroDuplicadoError):
+        raise
     except psycopg2.Error as e:
-        if e.pgcode == '23505':
-            print(f"Erro ao criar funcionário: Email '{funcionario.email}' já existe.")
-        else:
-            print(f"Erro de banco de dados ao criar funcionário: {e}")
+        print(f"Erro de banco de dados ao criar funcionário: {e}")
     except Exception as e:
         print(f"Erro inesperado ao criar funcionário: {e}")
     return None
 
+@cache_funcionarios.cached("id")
 def get_funcionario_by_id(funcionario_id: int) -> Optional[Funcionario]:
     """Busca um funcionário pelo ID usando SQL puro."""
     sql = """
-        SELECT funcionario_id, nome, cargo, telefone, email, data_contratacao, ativo
+        SELECT funcionario_id, nome, cargo, telefone, email, data_contratacao, ativo, filial_id, versao
         FROM Funcionarios
-        WHERE funcionario_id = %s;
+        WHERE funcionario_id = %s AND filial_id = %s;
     """
     try:
         with get_db_cursor() as cursor:
-            cursor.execute(sql, (funcionario_id,))
+            cursor.execute(sql, (funcionario_id, filial_atual()))
             row = cursor.fetchone()
             if row:
                 return Funcionario(
@@ -60,24 +86,29 @@ def get_funcionario_by_id(funcionario_id: int) -> Optional[Funcionario]:
                     telefone=row[3],
                     email=row[4],
                     data_contratacao=row[5],
-                    ativo=row[6]
+                    ativo=row[6],
+                    filial_id=row[7],
+                    versao=row[8]
                 )
+    except BancoDadosError:
+        raise
     except psycopg2.Error as e:
         print(f"Erro ao buscar funcionário por ID: {e}")
     except Exception as e:
         print(f"Erro inesperado ao buscar funcionário por ID: {e}")
     return None
 
+@cache_funcionarios.cached("email")
 def get_funcionario_by_email(email: str) -> Optional[Funcionario]:
     """Busca um funcionário pelo e-mail usando SQL puro."""
     sql = """
-        SELECT funcionario_id, nome, cargo, telefone, email, data_contratacao, ativo
+        SELECT funcionario_id, nome, cargo, telefone, email, data_contratacao, ativo, filial_id, versao
         FROM Funcionarios
-        WHERE email = %s;
+        WHERE filial_id = %s AND email = %s;
     """
     try:
         with get_db_cursor() as cursor:
-            cursor.execute(sql, (email,))
+            cursor.execute(sql, (filial_atual(), email))
             row = cursor.fetchone()
             if row:
                 return Funcionario(
@@ -87,29 +118,42 @@ def get_funcionario_by_email(email: str) -> Optional[Funcionario]:
                     telefone=row[3],
                     email=row[4],
                     data_contratacao=row[5],
-                    ativo=row[6]
+                    ativo=row[6],
+                    filial_id=row[7],
+                    versao=row[8]
                 )
+    except BancoDadosError:
+        raise
     except psycopg2.Error as e:
         print(f"Erro ao buscar funcionário por e-mail: {e}")
     except Exception as e:
         print(f"Erro inesperado ao buscar funcionário por e-mail: {e}")
     return None
 
-def get_funcionarios(skip: int = 0, limit: int = 100, apenas_ativos: bool = False) -> List[Funcionario]:
-    """Busca uma lista de funcionários com paginação e filtro opcional de ativos."""
-    sql_base = """
-        SELECT funcionario_id, nome, cargo, telefone, email, data_contratacao, ativo
-        FROM Funcionarios
-    """
-    conditions = []
-    params = []
-
+def _build_funcionarios_filtros(apenas_ativos: bool = False, busca: Optional[str] = None) -> Tuple[List[str], list]:
+    """Condições do WHERE das listagens de funcionários; a primeira é sempre a filial atual."""
+    conditions = ["filial_id = %s"]
+    params = [filial_atual()]
     if apenas_ativos:
         conditions.append("ativo = %s")
         params.append(True)
+    consulta = consulta_busca(busca)
+    if consulta is not None:
+        conditions.append(condicao_busca(VETOR_BUSCA_FUNCIONARIO))
+        params.append(consulta)
+    return conditions, params
 
-    if conditions:
-        sql_base += " WHERE " + " AND ".join(conditions)
+def get_funcionarios(
+    skip: int = 0, limit: int = 100, apenas_ativos: bool = False, busca: Optional[str] = None
+) -> List[Funcionario]:
+    """Busca uma lista de funcionários com paginação, filtro opcional de ativos e busca textual."""
+    sql_base = """
+        SELECT funcionario_id, nome, cargo, telefone, email, data_contratacao, ativo, filial_id, versao
+        FROM Funcionarios
+    """
+    conditions, params = _build_funcionarios_filtros(apenas_ativos=apenas_ativos, busca=busca)
+
+    sql_base += " WHERE " + " AND ".join(conditions)
 
     sql_final = sql_base + " ORDER BY nome LIMIT %s OFFSET %s;"
     params.extend([limit, skip])
@@ -127,72 +171,243 @@ def get_funcionarios(skip: int = 0, limit: int = 100, apenas_ativos: bool = Fals
                     telefone=row[3],
                     email=row[4],
                     data_contratacao=row[5],
-                    ativo=row[6]
+                    ativo=row[6],
+                    filial_id=row[7],
+                    versao=row[8]
                 ))
+    except BancoDadosError:
+        raise
     except psycopg2.Error as e:
         print(f"Erro ao buscar funcionários: {e}")
     except Exception as e:
         print(f"Erro inesperado ao buscar funcionários: {e}")
     return funcionarios
 
+# Colunas que podem ser pedidas em ?fields= (campo do modelo -> expressão SQL).
+CAMPOS_FUNCIONARIO = {
+    "funcionario_id": "funcionario_id",
+    "nome": "nome",
+    "cargo": "cargo",
+    "telefone": "telefone",
+    "email": "email",
+    "data_contratacao": "data_contratacao",
+    "ativo": "ativo",
+    "filial_id": "filial_id",
+    "versao": "versao",
+}
+
+def get_funcionarios_campos(
+    campos: List[str], skip: int = 0, limit: int = 100,
+    apenas_ativos: bool = False, funcionario_id: Optional[int] = None, busca: Optional[str] = None
+) -> List[dict]:
+    """Busca funcionários selecionando apenas as colunas pedidas, com filtro opcional de ativos, ID ou busca."""
+    sql = f"SELECT {', '.join(CAMPOS_FUNCIONARIO[c] for c in campos)} FROM Funcionarios"
+    conditions, params = _build_funcionarios_filtros(apenas_ativos=apenas_ativos, busca=busca)
+    if funcionario_id is not None:
+        conditions.append("funcionario_id = %s")
+        params.append(funcionario_id)
+    sql += " WHERE " + " AND ".join(conditions)
+    sql += " ORDER BY nome LIMIT %s OFFSET %s;"
+    params.extend([limit, skip])
+
+    funcionarios = []
+    try:
+        with get_db_cursor() as cursor:
+            cursor.execute(sql, tuple(params))
+            for row in cursor.fetchall():
+                funcionarios.append(dict(zip(campos, row)))
+    except BancoDadosError:
+        raise
+    except psycopg2.Error as e:
+        print(f"Erro ao buscar campos de funcionários: {e}")
+    except Exception as e:
+        print(f"Erro inesperado ao buscar campos de funcionários: {e}")
+    return funcionarios
+
+def count_funcionarios(apenas_ativos: bool = False, busca: Optional[str] = None) -> Optional[Contagem]:
+    """Total de funcionários da filial, opcionalmente apenas os ativos ou os da busca."""
+    conditions, params = _build_funcionarios_filtros(apenas_ativos=apenas_ativos, busca=busca)
+    if len(conditions) == 1:
+        return count_filial("Funcionarios")
+    return count_capped("FROM Funcionarios WHERE " + " AND ".join(conditions), params)
+
+@repetir_em_conflito
 def update_funcionario(funcionario_id: int, funcionario_update: FuncionarioUpdate) -> Optional[Funcionario]:
-    """Atualiza um funcionário existente usando SQL puro."""
-    update_data = funcionario_update.model_dump(exclude_unset=True)
+    """Atualiza um funcionário existente usando SQL puro.
+
+    Retorna None se o funcionário não existir na filial; e-mail de outro funcionário levanta
+    RegistroDuplicadoError. Com funcionario_update.versao, levanta ConflitoVersaoError se o
+    funcionário já estiver em outra versão.
+    """
+    update_data = funcionario_update.model_dump(exclude_unset=True, exclude={"versao"})
     if not update_data:
-        return get_funcionario_by_id(funcionario_id)
+        return conferir_versao(get_funcionario_by_id(funcionario_id), funcionario_update.versao)
 
     set_parts = []
-    values = []
+    values = [funcionario_id, filial_atual()]
     for key, value in update_data.items():
         set_parts.append(f"{key} = %s")
         values.append(value)
+    values.append(funcionario_update.versao)
 
-    values.append(funcionario_id)
+    # Um comando só: confere a versão e devolve também os valores anteriores (auditoria).
+    sql = sql_update_versionado(
+        "Funcionarios", "funcionario_id", set_parts,
+        ("funcionario_id", "nome", "cargo", "telefone", "email", "data_contratacao", "ativo", "filial_id", "versao"),
+        update_data)
 
-    sql = f"""
-        UPDATE Funcionarios
-        SET {", ".join(set_parts)}
-        WHERE funcionario_id = %s
-        RETURNING funcionario_id, nome, cargo, telefone, email, data_contratacao, ativo;
-    """
+    try:
+        with get_db_cursor(commit=True) as cursor:
+            row = executar_update_versionado(cursor, sql, values, funcionario_update.versao)
+            if row:
+                invalidar_entidade(cursor, "funcionarios", funcionario_id)
+                atualizado = Funcionario(
+                    funcionario_id=row[0],
+                    nome=row[1],
+                    cargo=row[2],
+                    telefone=row[3],
+                    email=row[4],
+                    data_contratacao=row[5],
+                    ativo=row[6],
+                    filial_id=row[7],
+                    versao=row[8]
+                )
+                registrar_auditoria("funcionarios", funcionario_id, ACAO_UPDATE,
+                                    antes=dict(zip(update_data, row[9:])),
+                                    depois={campo: getattr(atualizado, campo) for campo in update_data})
+                return atualizado
+    except (BancoDadosError, ConflitoVersaoError):
+        raise
+    except psycopg2.Error as e:
+        if e.pgcode == '23505':
+            raise RegistroDuplicadoError("Novo email já cadastrado para outro funcionário")
+        print(f"Erro ao atualizar funcionário: {e}")
+    except Exception as e:
+        print(f"Erro inesperado ao atualizar funcionário: {e}")
+    return None
 
+@repetir_em_conflito
+def upsert_funcionario(funcionario: FuncionarioUpsert) -> Optional[Tuple[Funcionario, str]]:
+    """Cria ou atualiza o funcionário da filial com este e-mail num único comando.
+
+    Retorna o funcionário e a ação aplicada: "inserido", "atualizado" ou "inalterado".
+    """
+    sql = """
+        INSERT INTO Funcionarios AS f (nome, cargo, telefone, email, data_contratacao, ativo, filial_id)
+        VALUES (%s, %s, %s, %s, %s, %s, %s)
+        ON CONFLICT (filial_id, email) DO UPDATE
+        SET nome = EXCLUDED.nome, cargo = EXCLUDED.cargo, telefone = EXCLUDED.telefone,
+            data_contratacao = EXCLUDED.data_contratacao, ativo = EXCLUDED.ativo, versao = f.versao + 1
+        WHERE (f.nome, f.cargo, f.telefone, f.data_contratacao, f.ativo)
+              IS DISTINCT FROM (EXCLUDED.nome, EXCLUDED.cargo, EXCLUDED.telefone, EXCLUDED.data_contratacao, EXCLUDED.ativo)
+        RETURNING f.funcionario_id, f.nome, f.cargo, f.telefone, f.email, f.data_contratacao, f.ativo, f.filial_id, f.versao,
+                  (f.xmax = 0);
+    """
+    sql_inalterado = """
+        SELECT funcionario_id, nome, cargo, telefone, email, data_contratacao, ativo, filial_id, versao, NULL
+        FROM Funcionarios
+        WHERE filial_id = %s AND email = %s;
+    """
+    filial_id = filial_atual()
     try:
         with get_db_cursor(commit=True) as cursor:
-            cursor.execute(sql, tuple(values))
+            cursor.execute(sql, (
+                funcionario.nome,
+                funcionario.cargo,
+                funcionario.telefone,
+                funcionario.email,
+                funcionario.data_contratacao,
+                funcionario.ativo,
+                filial_id
+            ))
             row = cursor.fetchone()
+            if row is None:
+                # Já existia com os mesmos dados: o UPDATE foi descartado pelo WHERE.
+                cursor.execute(sql_inalterado, (filial_id, funcionario.email))
+                row = cursor.fetchone()
+            elif not row[9]:
+                invalidar_entidade(cursor, "funcionarios", row[0])
             if row:
-                return Funcionario(
+                acao = "inalterado" if row[9] is None else "inserido" if row[9] else "atualizado"
+                gravado = Funcionario(
                     funcionario_id=row[0],
                     nome=row[1],
                     cargo=row[2],
                     telefone=row[3],
                     email=row[4],
                     data_contratacao=row[5],
-                    ativo=row[6]
+                    ativo=row[6],
+                    filial_id=row[7],
+                    versao=row[8]
                 )
+                if acao != "inalterado":
+                    registrar_auditoria("funcionarios", gravado.funcionario_id,
+                                        ACAO_CREATE if acao == "inserido" else ACAO_UPDATE,
+                                        depois=valores_auditados(gravado, "funcionario_id"))
+                return gravado, acao
+    except BancoDadosError:
+        raise
     except psycopg2.Error as e:
-        if e.pgcode == '23505': 
-            print(f"Erro ao atualizar funcionário: Email '{funcionario_update.email}' já pertence a outro funcionário.")
-        else:
-            print(f"Erro ao atualizar funcionário: {e}")
+        print(f"Erro ao gravar funcionário por email: {e}")
     except Exception as e:
-        print(f"Erro inesperado ao atualizar funcionário: {e}")
+        print(f"Erro inesperado ao gravar funcionário por email: {e}")
+    return None
+
+@repetir_em_conflito
+def upsert_funcionarios(funcionarios: List[FuncionarioUpsert]) -> Optional[ResultadoUpsert]:
+    """Cria ou atualiza vários funcionários da filial pelo e-mail, em comandos de várias linhas.
+
+    Tudo numa transação: ou o lote inteiro é gravado, ou nada.
+    """
+    filial_id = filial_atual()
+    linhas = [(f.nome, f.cargo, f.telefone, f.email, f.data_contratacao, f.ativo, filial_id) for f in funcionarios]
+    try:
+        with get_db_cursor(commit=True) as cursor:
+            resultado = upsert_em_lote(
+                cursor, "Funcionarios", "funcionario_id",
+                colunas=("nome", "cargo", "telefone", "email", "data_contratacao", "ativo", "filial_id"),
+                chave=("filial_id", "email"),
+                atualizaveis=("nome", "cargo", "telefone", "data_contratacao", "ativo"),
+                linhas=linhas,
+            )
+            if len(resultado.atualizados) > LIMITE_INVALIDACAO_POR_ID:
+                invalidar_entidade(cursor, "funcionarios", TODOS)
+            else:
+                for funcionario_id in resultado.atualizados:
+                    invalidar_entidade(cursor, "funcionarios", funcionario_id)
+            registrar_upsert_lote("funcionarios", funcionarios, "email", resultado)
+            return resultado
+    except BancoDadosError:
+        raise
+    except psycopg2.Error as e:
+        print(f"Erro ao gravar lote de funcionários: {e}")
+    except Exception as e:
+        print(f"Erro inesperado ao gravar lote de funcionários: {e}")
     return None
 
+@repetir_em_conflito
 def delete_funcionario(funcionario_id: int) -> bool:
     """Deleta (ou marca como inativo) um funcionário pelo ID usando SQL puro."""
-    sql = "DELETE FROM Funcionarios WHERE funcionario_id = %s RETURNING funcionario_id;"
+    sql = """
+        DELETE FROM Funcionarios WHERE funcionario_id = %s AND filial_id = %s
+        RETURNING funcionario_id, nome, cargo, telefone, email, data_contratacao, ativo;
+    """
 
     deleted_id = None
     try:
         with get_db_cursor(commit=True) as cursor:
-            cursor.execute(sql, (funcionario_id,))
+            cursor.execute(sql, (funcionario_id, filial_atual()))
             result = cursor.fetchone()
             if result:
+                invalidar_entidade(cursor, "funcionarios", funcionario_id)
                 deleted_id = result[0]
+                registrar_auditoria("funcionarios", funcionario_id, ACAO_DELETE, antes=dict(zip(
+                    ("nome", "cargo", "telefone", "email", "data_contratacao", "ativo"), result[1:])))
                 print(f"Funcionário ID {deleted_id} deletado com sucesso.")
             else:
                 print(f"Funcionário ID {funcionario_id} não encontrado para deleção.")
+    except BancoDadosError:
+        raise
     except psycopg2.Error as e:
         print(f"Erro ao deletar funcionário: {e}")
     except Exception as e:
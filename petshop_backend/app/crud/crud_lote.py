@@ -0,0 +1,160 @@
+from contextlib import contextmanager
+from typing import Any, Callable, ContextManager, Dict, List, NamedTuple, Optional, Tuple, Type
+
+from pydantic import BaseModel, ValidationError
+
+from app.db.database import ConflitoVersaoError, get_db_cursor, repetir_em_conflito, use_cursor
+from app.crud import crud_agendamento, crud_animal, crud_cliente, crud_funcionario, crud_servico
+from app.models.agendamento import AgendamentoCreate, AgendamentoUpdate
+from app.models.animal import AnimalCreate, AnimalUpdate
+from app.models.cliente import ClienteCreate, ClienteUpdate
+from app.models.funcionario import FuncionarioCreate, FuncionarioUpdate
+from app.models.lote import OperacaoLote, ResultadoOperacao
+from app.models.servico import ServicoCreate, ServicoUpdate
+
+# --- Lote de operações em uma transação ---
+#
+# As operações rodam em ordem, pelas mesmas funções crud_* dos endpoints, com use_cursor
+# apontando todas para um único cursor: uma conexão e uma transação para o lote inteiro.
+# Na primeira operação que falha o lote é desfeito (rollback) e nenhuma é aplicada.
+# Um create com "ref" registra o ID criado; operações seguintes o usam como "$ref" em id
+# ou em campos *_id/*_ids de dados.
+# O banco em memória (app/crud/memoria.py) executa o lote com as suas próprias funções crud
+# (montar_entidades) e a sua transação.
+
+
+class Entidade(NamedTuple):
+    nome: str
+    modelo_create: Type[BaseModel]
+    modelo_update: Type[BaseModel]
+    create: Callable
+    update: Callable
+    delete: Callable
+    id_attr: str
+
+
+def montar_entidades(cliente, animal, funcionario, servico, agendamento) -> Dict[str, Entidade]:
+    """Entidades do lote a partir dos módulos (ou objetos) com as funções crud de cada uma."""
+    return {
+        "clientes": Entidade("Cliente", ClienteCreate, ClienteUpdate, cliente.create_cliente,
+                             cliente.update_cliente, cliente.delete_cliente, "cliente_id"),
+        "animais": Entidade("Animal", AnimalCreate, AnimalUpdate, animal.create_animal,
+                            animal.update_animal, animal.delete_animal, "animal_id"),
+        "funcionarios": Entidade("Funcionário", FuncionarioCreate, FuncionarioUpdate, funcionario.create_funcionario,
+                                 funcionario.update_funcionario, funcionario.delete_funcionario, "funcionario_id"),
+        "servicos": Entidade("Serviço", ServicoCreate, ServicoUpdate, servico.create_servico,
+                             servico.update_servico, servico.delete_servico, "servico_id"),
+        "agendamentos": Entidade("Agendamento", AgendamentoCreate, AgendamentoUpdate, agendamento.create_agendamento,
+                                 agendamento.update_agendamento, agendamento.delete_agendamento, "agendamento_id"),
+    }
+
+
+ENTIDADES = montar_entidades(crud_cliente, crud_animal, crud_funcionario, crud_servico, crud_agendamento)
+
+
+@contextmanager
+def _transacao_postgres():
+    with get_db_cursor(commit=True) as cursor, use_cursor(cursor):
+        yield
+
+
+class FalhaOperacao(Exception):
+    """Interrompe o lote: status HTTP e mensagem da operação que falhou."""
+
+    def __init__(self, status: int, mensagem: str):
+        super().__init__(mensagem)
+        self.status = status
+        self.mensagem = mensagem
+
+
+def _resolver_ref(valor: Any, ids: Dict[str, int]) -> Any:
+    if isinstance(valor, str) and valor.startswith("$"):
+        if valor[1:] not in ids:
+            raise FalhaOperacao(400, f"Referência '{valor}' não foi criada por uma operação anterior do lote")
+        return ids[valor[1:]]
+    return valor
+
+
+def _resolver_dados(dados: Dict[str, Any], ids: Dict[str, int]) -> Dict[str, Any]:
+    resolvidos = {}
+    for campo, valor in dados.items():
+        if campo.endswith("_ids") and isinstance(valor, list):
+            valor = [_resolver_ref(item, ids) for item in valor]
+        elif campo.endswith("_id"):
+            valor = _resolver_ref(valor, ids)
+        resolvidos[campo] = valor
+    return resolvidos
+
+
+def _validar(modelo: Type[BaseModel], dados: Dict[str, Any]) -> BaseModel:
+    try:
+        return modelo.model_validate(dados)
+    except ValidationError as e:
+        erros = "; ".join(f"{'.'.join(map(str, erro['loc']))}: {erro['msg']}" for erro in e.errors())
+        raise FalhaOperacao(422, erros)
+
+
+def _executar(operacao: OperacaoLote, ids: Dict[str, int], entidades: Dict[str, Entidade]) -> Tuple[int, int, Any]:
+    """Executa uma operação; retorna (status, id, registro)."""
+    entidade = entidades[operacao.entidade]
+    dados = _resolver_dados(operacao.dados, ids)
+
+    if operacao.acao == "create":
+        criado = entidade.create(_validar(entidade.modelo_create, dados))
+        if criado is None:
+            raise FalhaOperacao(400, f"Erro ao criar {entidade.nome.lower()}. Verifique os dados e os IDs informados.")
+        novo_id = getattr(criado, entidade.id_attr)
+        if operacao.ref:
+            ids[operacao.ref] = novo_id
+        return 201, novo_id, criado
+
+    registro_id = _resolver_ref(operacao.id, ids)
+    if not isinstance(registro_id, int):
+        raise FalhaOperacao(400, f"ID inválido: {operacao.id!r}")
+    if operacao.acao == "update":
+        atualizado = entidade.update(registro_id, _validar(entidade.modelo_update, dados))
+        if atualizado is None:
+            raise FalhaOperacao(404, f"{entidade.nome} com ID {registro_id} não encontrado (ou dados inválidos)")
+        return 200, registro_id, atualizado
+
+    if not entidade.delete(registro_id):
+        raise FalhaOperacao(404, f"{entidade.nome} com ID {registro_id} não encontrado")
+    return 204, registro_id, None
+
+
+@repetir_em_conflito
+def executar_operacoes(operacoes: List[OperacaoLote], entidades: Dict[str, Entidade] = ENTIDADES,
+                       transacao: Optional[Callable[[], ContextManager]] = None) -> Tuple[bool, List[ResultadoOperacao]]:
+    """Executa as operações em uma única transação. Retorna (sucesso, resultado por operação).
+
+    transacao é o bloco que confirma tudo ou desfaz tudo; o padrão é um cursor do Postgres.
+    """
+    resultados: List[ResultadoOperacao] = []
+    ids: Dict[str, int] = {}
+    try:
+        with (transacao or _transacao_postgres)():
+            for indice, operacao in enumerate(operacoes):
+                try:
+                    status, registro_id, registro = _executar(operacao, ids, entidades)
+                except ConflitoVersaoError as e:
+                    raise FalhaOperacao(409, str(e))
+                except ValueError as e:
+                    # Inclui RegistroDuplicadoError, RegistroEmUsoError e referências inválidas
+                    # detectadas no próprio comando.
+                    raise FalhaOperacao(400, str(e))
+                resultados.append(ResultadoOperacao(
+                    indice=indice, acao=operacao.acao, entidade=operacao.entidade, status=status, id=registro_id,
+                    resultado=registro.model_dump(mode="json") if registro is not None else None,
+                ))
+    except FalhaOperacao as falha:
+        # Sair do bloco com exceção desfaz a transação (rollback): nada foi aplicado.
+        falhou = len(resultados)
+        return False, [
+            ResultadoOperacao(
+                indice=indice, acao=operacao.acao, entidade=operacao.entidade,
+                status=falha.status if indice == falhou else 424,
+                erro=falha.mensagem if indice == falhou else f"Não aplicada: a operação {falhou} do lote falhou",
+            )
+            for indice, operacao in enumerate(operacoes)
+        ]
+    return True, resultados
@@ -1,16 +1,27 @@
 import psycopg2
-from typing import List, Optional
+from typing import List, Optional, Tuple
 from decimal import Decimal
 
-from app.db.database import get_db_cursor
+from app.core.audit import ACAO_CREATE, ACAO_DELETE, ACAO_UPDATE, registrar_auditoria, valores_auditados
+from app.db.busca import condicao_busca, consulta_busca, vetor_busca
+from app.db.database import (BancoDadosError, ConflitoVersaoError, RegistroDuplicadoError, RegistroEmUsoError,
+                             filial_atual, get_db_cursor, repetir_em_conflito)
+from app.db.versao import conferir_versao, executar_update_versionado, sql_update_versionado
+from app.db.counts import Contagem, count_capped, count_filial
 from app.models.servico import Servico, ServicoCreate, ServicoUpdate
 
+# ?busca= procura por prefixo em nome e descrição (idx_servicos_busca).
+VETOR_BUSCA_SERVICO = vetor_busca("nome", "descricao")
+
+SERVICO_EM_USO = "Serviço não pode ser deletado pois está associado a agendamentos"
+
+@repetir_em_conflito
 def create_servico(servico: ServicoCreate) -> Optional[Servico]:
     """Cria um novo serviço no banco de dados usando SQL puro."""
     sql = """
-        INSERT INTO Servicos (nome, descricao, preco, duracao_estimada_minutos)
-        VALUES (%s, %s, %s, %s)
-        RETURNING servico_id, nome, descricao, preco, duracao_estimada_minutos;
+        INSERT INTO Servicos (nome, descricao, preco, duracao_estimada_minutos, filial_id)
+        VALUES (%s, %s, %s, %s, %s)
+        RETURNING servico_id, nome, descricao, preco, duracao_estimada_minutos, filial_id, versao;
     """
     try:
         with get_db_cursor(commit=True) as cursor:
@@ -18,17 +29,25 @@ def create_servico(servico: ServicoCreate) -> Optional[Servico]:
                 servico.nome,
                 servico.descricao,
                 servico.preco,
-                servico.duracao_estimada_minutos
+                servico.duracao_estimada_minutos,
+                filial_atual()
             ))
             row = cursor.fetchone()
             if row:
-                return Servico(
+                criado = Servico(
                     servico_id=row[0],
                     nome=row[1],
                     descricao=row[2],
                     preco=Decimal(row[3]),
-                    duracao_estimada_minutos=row[4]
+                    duracao_estimada_minutos=row[4],
+                    filial_id=row[5],
+                    versao=row[6]
                 )
+                registrar_auditoria("servicos", criado.servico_id, ACAO_CREATE,
+                                    depois=valores_auditados(criado, "servico_id"))
+                return criado
+    except BancoDadosError:
+        raise
     except psycopg2.Error as e:
         if e.pgcode == '23505':  
             print(f"Erro ao criar serviço: Nome '{servico.nome}' já existe.")
@@ -43,13 +62,13 @@ def create_servico(servico: ServicoCreate) -> Optional[Servico]:
 def get_servico_by_id(servico_id: int) -> Optional[Servico]:
     """Busca um serviço pelo ID usando SQL puro."""
     sql = """
-        SELECT servico_id, nome, descricao, preco, duracao_estimada_minutos
+        SELECT servico_id, nome, descricao, preco, duracao_estimada_minutos, filial_id, versao
         FROM Servicos
-        WHERE servico_id = %s;
+        WHERE servico_id = %s AND filial_id = %s;
     """
     try:
         with get_db_cursor() as cursor:
-            cursor.execute(sql, (servico_id,))
+            cursor.execute(sql, (servico_id, filial_atual()))
             row = cursor.fetchone()
             if row:
                 return Servico(
@@ -57,8 +76,12 @@ def get_servico_by_id(servico_id: int) -> Optional[Servico]:
                     nome=row[1],
                     descricao=row[2],
                     preco=Decimal(row[3]),
-                    duracao_estimada_minutos=row[4]
+                    duracao_estimada_minutos=row[4],
+                    filial_id=row[5],
+                    versao=row[6]
                 )
+    except BancoDadosError:
+        raise
     except psycopg2.Error as e:
         print(f"Erro ao buscar serviço por ID: {e}")
     except Exception as e:
@@ -68,13 +91,13 @@ def get_servico_by_id(servico_id: int) -> Optional[Servico]:
 def get_servico_by_nome(nome: str) -> Optional[Servico]:
     """Busca um serviço pelo nome usando SQL puro."""
     sql = """
-        SELECT servico_id, nome, descricao, preco, duracao_estimada_minutos
+        SELECT servico_id, nome, descricao, preco, duracao_estimada_minutos, filial_id, versao
         FROM Servicos
-        WHERE nome = %s;
+        WHERE filial_id = %s AND nome = %s;
     """
     try:
         with get_db_cursor() as cursor:
-            cursor.execute(sql, (nome,))
+            cursor.execute(sql, (filial_atual(), nome))
             row = cursor.fetchone()
             if row:
                 return Servico(
@@ -82,26 +105,42 @@ def get_servico_by_nome(nome: str) -> Optional[Servico]:
                     nome=row[1],
                     descricao=row[2],
                     preco=Decimal(row[3]),
-                    duracao_estimada_minutos=row[4]
+                    duracao_estimada_minutos=row[4],
+                    filial_id=row[5],
+                    versao=row[6]
                 )
+    except BancoDadosError:
+        raise
     except psycopg2.Error as e:
         print(f"Erro ao buscar serviço por nome: {e}")
     except Exception as e:
         print(f"Erro inesperado ao buscar serviço por nome: {e}")
     return None
 
-def get_servicos(skip: int = 0, limit: int = 100) -> List[Servico]:
-    """Busca uma lista de serviços com paginação usando SQL puro."""
-    sql = """
-        SELECT servico_id, nome, descricao, preco, duracao_estimada_minutos
+def _build_servicos_filtros(busca: Optional[str] = None) -> Tuple[List[str], list]:
+    """Condições do WHERE das listagens de serviços; a primeira é sempre a filial atual."""
+    conditions = ["filial_id = %s"]
+    params = [filial_atual()]
+    consulta = consulta_busca(busca)
+    if consulta is not None:
+        conditions.append(condicao_busca(VETOR_BUSCA_SERVICO))
+        params.append(consulta)
+    return conditions, params
+
+def get_servicos(skip: int = 0, limit: int = 100, busca: Optional[str] = None) -> List[Servico]:
+    """Busca uma lista de serviços com paginação e busca textual opcional usando SQL puro."""
+    conditions, params = _build_servicos_filtros(busca)
+    sql = f"""
+        SELECT servico_id, nome, descricao, preco, duracao_estimada_minutos, filial_id, versao
         FROM Servicos
+        WHERE {" AND ".join(conditions)}
         ORDER BY nome
         LIMIT %s OFFSET %s;
     """
     servicos = []
     try:
         with get_db_cursor() as cursor:
-            cursor.execute(sql, (limit, skip))
+            cursor.execute(sql, (*params, limit, skip))
             rows = cursor.fetchall()
             for row in rows:
                 servicos.append(Servico(
@@ -109,50 +148,112 @@ def get_servicos(skip: int = 0, limit: int = 100) -> List[Servico]:
                     nome=row[1],
                     descricao=row[2],
                     preco=Decimal(row[3]),
-                    duracao_estimada_minutos=row[4]
+                    duracao_estimada_minutos=row[4],
+                    filial_id=row[5],
+                    versao=row[6]
                 ))
+    except BancoDadosError:
+        raise
     except psycopg2.Error as e:
         print(f"Erro ao buscar serviços: {e}")
     except Exception as e:
         print(f"Erro inesperado ao buscar serviços: {e}")
     return servicos
 
+# Colunas que podem ser pedidas em ?fields= (campo do modelo -> expressão SQL).
+CAMPOS_SERVICO = {
+    "servico_id": "servico_id",
+    "nome": "nome",
+    "descricao": "descricao",
+    "preco": "preco",
+    "duracao_estimada_minutos": "duracao_estimada_minutos",
+    "filial_id": "filial_id",
+    "versao": "versao",
+}
+
+def get_servicos_campos(
+    campos: List[str], skip: int = 0, limit: int = 100,
+    servico_id: Optional[int] = None, busca: Optional[str] = None
+) -> List[dict]:
+    """Busca serviços selecionando apenas as colunas pedidas (listagem ou, com servico_id, detalhe)."""
+    conditions, params = _build_servicos_filtros(busca)
+    if servico_id is not None:
+        conditions.append("servico_id = %s")
+        params.append(servico_id)
+    sql = f"SELECT {', '.join(CAMPOS_SERVICO[c] for c in campos)} FROM Servicos WHERE {' AND '.join(conditions)}"
+    sql += " ORDER BY nome LIMIT %s OFFSET %s;"
+    params.extend([limit, skip])
+
+    servicos = []
+    try:
+        with get_db_cursor() as cursor:
+            cursor.execute(sql, tuple(params))
+            for row in cursor.fetchall():
+                servicos.append(dict(zip(campos, row)))
+    except BancoDadosError:
+        raise
+    except psycopg2.Error as e:
+        print(f"Erro ao buscar campos de serviços: {e}")
+    except Exception as e:
+        print(f"Erro inesperado ao buscar campos de serviços: {e}")
+    return servicos
+
+def count_servicos(busca: Optional[str] = None) -> Optional[Contagem]:
+    """Total de serviços da filial (estimado pelo catálogo quando ela tem banco próprio).
+
+    Com busca, a contagem é limitada.
+    """
+    conditions, params = _build_servicos_filtros(busca)
+    if len(conditions) == 1:
+        return count_filial("Servicos")
+    return count_capped("FROM Servicos WHERE " + " AND ".join(conditions), params)
+
+@repetir_em_conflito
 def update_servico(servico_id: int, servico_update: ServicoUpdate) -> Optional[Servico]:
-    """Atualiza um serviço existente usando SQL puro."""
-    update_data = servico_update.model_dump(exclude_unset=True)
+    """Atualiza um serviço existente usando SQL puro.
+
+    Retorna None se o serviço não existir na filial; nome de outro serviço levanta
+    RegistroDuplicadoError (violação da restrição única, sem consulta prévia). Com
+    servico_update.versao, levanta ConflitoVersaoError se o serviço já estiver em outra versão.
+    """
+    update_data = servico_update.model_dump(exclude_unset=True, exclude={"versao"})
     if not update_data:
-        return get_servico_by_id(servico_id)
+        return conferir_versao(get_servico_by_id(servico_id), servico_update.versao)
 
     set_parts = []
-    values = []
+    values = [servico_id, filial_atual()]
     for key, value in update_data.items():
         set_parts.append(f"{key} = %s")
         values.append(value)
+    values.append(servico_update.versao)
 
-    values.append(servico_id)
-
-    sql = f"""
-        UPDATE Servicos
-        SET {", ".join(set_parts)}
-        WHERE servico_id = %s
-        RETURNING servico_id, nome, descricao, preco, duracao_estimada_minutos;
-    """
+    # Um comando só: confere a versão e devolve também os valores anteriores (auditoria).
+    sql = sql_update_versionado(
+        "Servicos", "servico_id", set_parts,
+        ("servico_id", "nome", "descricao", "preco", "duracao_estimada_minutos", "filial_id", "versao"), update_data)
 
     try:
         with get_db_cursor(commit=True) as cursor:
-            cursor.execute(sql, tuple(values))
-            row = cursor.fetchone()
+            row = executar_update_versionado(cursor, sql, values, servico_update.versao)
             if row:
-                return Servico(
+                atualizado = Servico(
                     servico_id=row[0],
                     nome=row[1],
                     descricao=row[2],
                     preco=Decimal(row[3]),
-                    duracao_estimada_minutos=row[4]
+                    duracao_estimada_minutos=row[4],
+                    filial_id=row[5],
+                    versao=row[6]
                 )
+                registrar_auditoria("servicos", servico_id, ACAO_UPDATE,
+                                    antes=dict(zip(update_data, row[7:])),
+                                    depois={campo: getattr(atualizado, campo) for campo in update_data})
+                return atualizado
+    except (BancoDadosError, ConflitoVersaoError):
+        raise
     except psycopg2.Error as e:
-        if e.pgcode == '23505':  
-            print(f"Erro ao atualizar serviço: Nome '{servico_update.nome}' já existe.")
+        if e.pgcode == '23505':
+            raise RegistroDuplicadoError("Outro serviço já existe com este nome")
         elif e.pgcode == '23514':  
             print(f"Erro ao atualizar serviço: Verifique se o preço é >= 0 e a duração > 0.")
         else:
@@ -161,24 +262,31 @@ def update_servico(servico_id: int, servico_update: ServicoUpdate) -> Optional[S
         print(f"Erro inesperado ao atualizar serviço: {e}")
     return None
 
+@repetir_em_conflito
 def delete_servico(servico_id: int) -> bool:
     """Deleta um serviço pelo ID usando SQL puro."""
-    sql = "DELETE FROM Servicos WHERE servico_id = %s RETURNING servico_id;"
+    sql = """
+        DELETE FROM Servicos WHERE servico_id = %s AND filial_id = %s
+        RETURNING servico_id, nome, descricao, preco, duracao_estimada_minutos;
+    """
     deleted_id = None
     try:
         with get_db_cursor(commit=True) as cursor:
-            cursor.execute(sql, (servico_id,))
+            cursor.execute(sql, (servico_id, filial_atual()))
             result = cursor.fetchone()
             if result:
                 deleted_id = result[0]
+                registrar_auditoria("servicos", servico_id, ACAO_DELETE, antes=dict(zip(
+                    ("nome", "descricao", "preco", "duracao_estimada_minutos"), result[1:])))
                 print(f"Serviço ID {deleted_id} deletado com sucesso.")
             else:
                 print(f"Serviço ID {servico_id} não encontrado para deleção.")
+    except BancoDadosError:
+        raise
     except psycopg2.Error as e:
         if e.pgcode == '23503':
-            print(f"Erro ao deletar serviço ID {servico_id}: Serviço está associado a um ou mais agendamentos. Remova as associações primeiro.")
-        else:
-            print(f"Erro ao deletar serviço: {e}")
+            raise RegistroEmUsoError(SERVICO_EM_USO)
+        print(f"Erro ao deletar serviço: {e}")
     except Exception as e:
         print(f"Erro inesperado ao deletar serviço: {e}")
     return deleted_id is not None
\ No newline at end of file
@@ -0,0 +1,882 @@
+import json
+from datetime import date, datetime, time, timedelta, timezone
+from decimal import Decimal
+from itertools import islice
+from typing import Dict, Iterable, List, Optional, Tuple
+from zoneinfo import ZoneInfo
+
+from app.crud import crud_agendamento, crud_animal, crud_cliente, crud_estatisticas, crud_funcionario, crud_lote, crud_servico
+from app.db.busca import _TERMO, termos_busca
+from app.db.counts import LIMITE_CONTAGEM, MODO_EXATO, MODO_LIMITADO, Contagem
+from app.db.database import ConflitoVersaoError, RegistroDuplicadoError, RegistroEmUsoError, filial_atual
+from app.db.memoria import (PG_FOREIGN_KEY, PG_UNIQUE, BancoMemoria, ViolacaoRestricao, criar_banco_petshop, numeric,
+                            popular_inicial, timestamptz)
+from app.db.upsert import ResultadoUpsert
+from app.db.versao import conferir_versao
+from app.models.agendamento import (Agendamento, AgendamentoCreate, AgendamentoServicoDetalhe, AgendamentoUpdate,
+                                    CalendarioAgendamentos, CalendarioFuncionario)
+from app.models.animal import Animal, AnimalCreate, AnimalUpdate
+from app.models.cliente import Cliente, ClienteCreate, ClienteUpdate
+from app.models.estatisticas import Estatisticas, EstatisticasAnimal, EstatisticasCliente
+from app.models.filial import Filial, FilialCreate
+from app.models.funcionario import Funcionario, FuncionarioCreate, FuncionarioUpdate, FuncionarioUpsert
+from app.models.servico import Servico, ServicoCreate, ServicoUpdate
+
+# --- Funções crud sobre o banco em memória (ARMAZENAMENTO=memoria) ---
+#
+# Cada classe tem as mesmas funções, parâmetros e retornos do módulo crud_* equivalente,
+# inclusive nos erros (RegistroDuplicadoError, ValueError, None ou lista vazia), para que
+# app/main.py funcione igual sobre qualquer um dos dois. As consultas usam os índices de
+# app/db/memoria.py: chave, restrições únicas, chaves estrangeiras e a ordem por filial.
+#
+# Diferenças conhecidas: a ordem por nome compara os códigos dos caracteres (não usa a
+# collation do banco); a busca aproxima o to_tsvector('simple') separando as palavras pelo
+# mesmo padrão de app/db/busca.py; auditoria, cache e NOTIFY não se aplicam; as estatísticas
+# de clientes e animais são calculadas na leitura, a partir dos agendamentos.
+
+
+def _pagina(linhas: Iterable[dict], skip: int, limit: int) -> List[dict]:
+    return list(islice(linhas, skip, skip + limit))
+
+
+def _contagem(linhas: Iterable[dict], limite: int = LIMITE_CONTAGEM) -> Contagem:
+    """Conta até o limite, como count_capped()."""
+    total = sum(1 for _ in islice(linhas, limite + 1))
+    if total > limite:
+        return Contagem(limite, MODO_LIMITADO)
+    return Contagem(total, MODO_EXATO)
+
+
+def _palavras(*valores: Optional[str]) -> List[str]:
+    """Palavras das colunas como o parser 'simple': cada token e as partes separadas por @ . + -."""
+    palavras = []
+    for valor in valores:
+        for token in _TERMO.findall((valor or "").lower()):
+            palavras.append(token)
+            palavras.extend(parte for parte in token.replace("@", " ").replace(".", " ").replace("+", " ")
+                            .replace("-", " ").split() if parte != token)
+    return palavras
+
+
+def _bate_busca(termos: List[str], *valores: Optional[str]) -> bool:
+    """Cada termo precisa ser o começo de alguma palavra das colunas (como 'termo':*)."""
+    palavras = _palavras(*valores)
+    return all(any(palavra.startswith(termo) for palavra in palavras) for termo in termos)
+
+
+def _json_padrao(valor):
+    """Datas em ISO, como o json_build_object do Postgres."""
+    return valor.isoformat() if hasattr(valor, "isoformat") else str(valor)
+
+
+def _da_filial(linha: Optional[dict]) -> Optional[dict]:
+    return linha if linha is not None and linha["filial_id"] == filial_atual() else None
+
+
+def _alterados(atual: dict, novos: dict) -> bool:
+    return any(atual[coluna] != valor for coluna, valor in novos.items())
+
+
+def _atualizar_versionado(banco: BancoMemoria, tabela: str, chave: int, valores: dict,
+                          versao: Optional[int]) -> Optional[dict]:
+    """Como sql_update_versionado(): None fora da filial, ConflitoVersaoError em outra versão, e soma a versão."""
+    atual = _da_filial(banco[tabela].obter(chave))
+    if atual is None:
+        return None
+    if versao is not None and atual["versao"] != versao:
+        raise ConflitoVersaoError(atual["versao"])
+    return banco.atualizar(tabela, chave, {**valores, "versao": atual["versao"] + 1})
+
+
+def _estatisticas(banco: BancoMemoria, animais: Iterable[dict]) -> dict:
+    """Campos de Estatisticas dos animais somados, como os mantidos em Estatisticas_* no Postgres."""
+    visitas, gasto_total, ultima_visita, nao_comparecimentos = 0, Decimal(0), None, 0
+    quantidades: Dict[int, int] = {}
+    for animal in animais:
+        for ag in banco["Agendamentos"].onde("animal_id", animal["animal_id"]):
+            if ag["status"] == crud_estatisticas.STATUS_NAO_COMPARECEU:
+                nao_comparecimentos += 1
+            elif ag["status"] == crud_estatisticas.STATUS_VISITA:
+                visitas += 1
+                if ultima_visita is None or ag["data_hora_agendamento"] > ultima_visita:
+                    ultima_visita = ag["data_hora_agendamento"]
+                for ags in banco["Agendamento_Servicos"].onde("agendamento_id", ag["agendamento_id"]):
+                    gasto_total += ags["preco_registrado"]
+                    quantidades[ags["servico_id"]] = quantidades.get(ags["servico_id"], 0) + 1
+    favorito = min(quantidades, key=lambda servico_id: (-quantidades[servico_id], servico_id)) if quantidades else None
+    return {
+        "visitas": visitas,
+        "gasto_total": numeric(gasto_total),
+        "ultima_visita": ultima_visita,
+        "nao_comparecimentos": nao_comparecimentos,
+        "servico_favorito_id": favorito,
+        "servico_favorito_nome": banco["Servicos"].obter(favorito)["nome"] if favorito is not None else None,
+    }
+
+
+class ClientesMemoria:
+    CAMPOS_CLIENTE = crud_cliente.CAMPOS_CLIENTE
+    PARTES_COMPLETO = crud_cliente.PARTES_COMPLETO
+
+    def __init__(self, banco: BancoMemoria):
+        self.banco = banco
+
+    @property
+    def tabela(self):
+        return self.banco["Clientes"]
+
+    def create_cliente(self, cliente: ClienteCreate) -> Optional[Cliente]:
+        """Cria um novo cliente; e-mail já usado na filial levanta RegistroDuplicadoError."""
+        try:
+            linha = self.banco.inserir("Clientes", {**cliente.model_dump(), "filial_id": filial_atual()})
+        except ViolacaoRestricao as e:
+            if e.pgcode == PG_UNIQUE:
+                raise RegistroDuplicadoError("Email já cadastrado")
+            print(f"Erro ao criar cliente: {e}")
+            return None
+        return Cliente(**linha)
+
+    def get_cliente_by_id(self, cliente_id: int) -> Optional[Cliente]:
+        with self.banco.leitura():
+            linha = _da_filial(self.tabela.obter(cliente_id))
+            return Cliente(**linha) if linha else None
+
+    def get_cliente_by_email(self, email: str) -> Optional[Cliente]:
+        with self.banco.leitura():
+            linha = self.tabela.obter_unica("uq_clientes_filial_email", filial_atual(), email)
+            return Cliente(**linha) if linha else None
+
+    def _filtradas(self, busca: Optional[str]) -> Iterable[dict]:
+        linhas = self.tabela.ordenadas(filial_atual())
+        termos = termos_busca(busca)
+        if termos:
+            linhas = (c for c in linhas if _bate_busca(termos, c["nome"], c["email"], c["telefone"]))
+        return linhas
+
+    def _estatisticas(self, cliente: dict) -> dict:
+        return _estatisticas(self.banco, self.banco["Animais"].onde("cliente_id", cliente["cliente_id"]))
+
+    def _ordenadas(self, linhas: Iterable[dict], ordenar: str) -> List[Tuple[dict, Optional[dict]]]:
+        """(cliente, estatísticas) na ordem de ?ordenar=: a estatística decrescente (vazias por
+        último) e, no empate, o ID; por nome, sem estatísticas."""
+        if ordenar not in crud_cliente.ORDENACOES_CLIENTE:
+            return [(linha, None) for linha in linhas]
+        pares = sorted(((linha, self._estatisticas(linha)) for linha in linhas), key=lambda par: par[0]["cliente_id"])
+        return sorted(pares, key=lambda par: (par[1][ordenar] is not None, par[1][ordenar]), reverse=True)
+
+    def get_clientes(self, skip: int = 0, limit: int = 100, busca: Optional[str] = None,
+                     ordenar: str = "nome") -> List[Cliente]:
+        with self.banco.leitura():
+            return [Cliente(**linha, estatisticas=Estatisticas(**estatisticas) if estatisticas else None)
+                    for linha, estatisticas in _pagina(self._ordenadas(self._filtradas(busca), ordenar), skip, limit)]
+
+    def get_clientes_campos(self, campos: List[str], skip: int = 0, limit: int = 100,
+                            cliente_id: Optional[int] = None, busca: Optional[str] = None,
+                            ordenar: str = "nome") -> List[dict]:
+        with self.banco.leitura():
+            linhas = self._filtradas(busca)
+            if cliente_id is not None:
+                linhas = (c for c in linhas if c["cliente_id"] == cliente_id)
+            return [{campo: linha[campo] for campo in campos}
+                    for linha, _ in _pagina(self._ordenadas(linhas, ordenar), skip, limit)]
+
+    def get_estatisticas_cliente(self, cliente_id: int) -> Optional[EstatisticasCliente]:
+        with self.banco.leitura():
+            cliente = _da_filial(self.tabela.obter(cliente_id))
+            return EstatisticasCliente(cliente_id=cliente_id, **self._estatisticas(cliente)) if cliente else None
+
+    def count_clientes(self, busca: Optional[str] = None) -> Optional[Contagem]:
+        with self.banco.leitura():
+            if not termos_busca(busca):
+                return Contagem(self.tabela.contar("filial_id", filial_atual()), MODO_EXATO)
+            return _contagem(self._filtradas(busca))
+
+    def get_cliente_completo_json(self, cliente_id: int, partes=crud_cliente.PARTES_COMPLETO,
+                                  limite_agendamentos: int = 10) -> Optional[str]:
+        """Mesmo documento de crud_cliente.get_cliente_completo_json, montado em Python."""
+        with self.banco.leitura():
+            cliente = _da_filial(self.tabela.obter(cliente_id))
+            if cliente is None:
+                return None
+            documento = {campo: cliente[campo] for campo in
+                         ("cliente_id", "nome", "telefone", "email", "endereco", "data_cadastro", "filial_id", "versao")}
+            animais = sorted(self.banco["Animais"].onde("cliente_id", cliente_id), key=lambda a: a["nome"])
+            if "animais" in partes:
+                documento["animais"] = [
+                    {campo: animal[campo] for campo in ("animal_id", "cliente_id", "nome", "especie", "raca",
+                                                        "data_nascimento", "observacoes", "filial_id", "versao")}
+                    for animal in animais
+                ]
+            if "agendamentos" in partes:
+                agendamentos = [(animal, ag) for animal in animais
+                                for ag in self.banco["Agendamentos"].onde("animal_id", animal["animal_id"])]
+                agora = datetime.now(timezone.utc)
+                proximos = sorted((x for x in agendamentos if x[1]["data_hora_agendamento"] >= agora),
+                                  key=lambda x: x[1]["data_hora_agendamento"])
+                recentes = sorted((x for x in agendamentos if x[1]["data_hora_agendamento"] < agora),
+                                  key=lambda x: x[1]["data_hora_agendamento"], reverse=True)
+                com_servicos = "servicos" in partes
+                documento["proximos_agendamentos"] = [self._agendamento_completo(animal, ag, com_servicos)
+                                                      for animal, ag in proximos[:limite_agendamentos]]
+                documento["agendamentos_recentes"] = [self._agendamento_completo(animal, ag, com_servicos)
+                                                      for animal, ag in recentes[:limite_agendamentos]]
+            if "estatisticas" in partes:
+                estatisticas = _estatisticas(self.banco, animais)
+                documento["estatisticas"] = {**estatisticas, "gasto_total": str(estatisticas["gasto_total"])}
+        return json.dumps(documento, default=_json_padrao, ensure_ascii=False)
+
+    def _agendamento_completo(self, animal: dict, ag: dict, com_servicos: bool) -> dict:
+        funcionario = self.banco["Funcionarios"].obter(ag["funcionario_id"])
+        item = {
+            "agendamento_id": ag["agendamento_id"], "animal_id": ag["animal_id"], "animal_nome": animal["nome"],
+            "funcionario_id": ag["funcionario_id"], "funcionario_nome": funcionario["nome"] if funcionario else None,
+            "data_hora_agendamento": ag["data_hora_agendamento"], "data_hora_criacao": ag["data_hora_criacao"],
+            "status": ag["status"], "observacoes": ag["observacoes"], "versao": ag["versao"],
+        }
+        if com_servicos:
+            servicos = _servicos_do_agendamento(self.banco, ag["agendamento_id"])
+            item["valor_total"] = str(sum((s.preco_registrado for s in servicos), Decimal(0)))
+            item["servicos"] = [
+                {"servico_id": s.servico_id, "nome_servico": s.nome_servico,
+                 "preco_registrado": str(s.preco_registrado), "observacoes": s.observacoes}
+                for s in sorted(servicos, key=lambda s: s.nome_servico)
+            ]
+        return item
+
+    def update_cliente(self, cliente_id: int, cliente_update: ClienteUpdate) -> Optional[Cliente]:
+        update_data = cliente_update.model_dump(exclude_unset=True, exclude={"versao"})
+        if not update_data:
+            return conferir_versao(self.get_cliente_by_id(cliente_id), cliente_update.versao)
+        try:
+            with self.banco.transacao():
+                linha = _atualizar_versionado(self.banco, "Clientes", cliente_id, update_data, cliente_update.versao)
+                if linha is None:
+                    return None
+        except ViolacaoRestricao as e:
+            if e.pgcode == PG_UNIQUE:
+                raise RegistroDuplicadoError("Novo email já cadastrado para outro cliente")
+            print(f"Erro ao atualizar cliente: {e}")
+            return None
+        return Cliente(**linha)
+
+    def upsert_cliente(self, cliente: ClienteCreate) -> Optional[Tuple[Cliente, str]]:
+        try:
+            linha, acao = _upsert(self.banco, "Clientes", "uq_clientes_filial_email", "email",
+                                  {**cliente.model_dump(), "filial_id": filial_atual()},
+                                  ("nome", "telefone", "endereco"))
+        except ViolacaoRestricao as e:
+            print(f"Erro ao gravar cliente por email: {e}")
+            return None
+        return Cliente(**linha), acao
+
+    def upsert_clientes(self, clientes: List[ClienteCreate]) -> Optional[ResultadoUpsert]:
+        try:
+            return _upsert_lote(self.banco, "Clientes", "cliente_id", "uq_clientes_filial_email", "email",
+                                [{**c.model_dump(), "filial_id": filial_atual()} for c in clientes],
+                                ("nome", "telefone", "endereco"))
+        except ViolacaoRestricao as e:
+            print(f"Erro ao gravar lote de clientes: {e}")
+            return None
+
+    def delete_cliente(self, cliente_id: int) -> bool:
+        """Deleta o cliente; os animais (e seus agendamentos) vão junto, em cascata."""
+        with self.banco.transacao():
+            if _da_filial(self.tabela.obter(cliente_id)) is None:
+                return False
+            return self.banco.excluir("Clientes", cliente_id) is not None
+
+
+def _upsert(banco: BancoMemoria, tabela: str, unica: str, coluna_chave: str, valores: dict,
+            atualizaveis: Tuple[str, ...]) -> Tuple[dict, str]:
+    """Insere ou, se a chave já existir, atualiza só quando algum valor mudou (como o IS DISTINCT FROM)."""
+    with banco.transacao():
+        atual = banco[tabela].obter_unica(unica, valores["filial_id"], valores[coluna_chave])
+        if atual is None:
+            return banco.inserir(tabela, valores), "inserido"
+        novos = {coluna: valores[coluna] for coluna in atualizaveis}
+        if not _alterados(atual, novos):
+            return atual, "inalterado"
+        return banco.atualizar(tabela, banco[tabela].chave_de(atual), {**novos, "versao": atual["versao"] + 1}), "atualizado"
+
+
+def _upsert_lote(banco: BancoMemoria, tabela: str, coluna_id: str, unica: str, coluna_chave: str,
+                 linhas: List[dict], atualizaveis: Tuple[str, ...]) -> ResultadoUpsert:
+    """Como upsert_em_lote(): tudo ou nada, e chaves repetidas valem pela última ocorrência (duplicados)."""
+    unicas = {linha[coluna_chave]: linha for linha in linhas}
+    inseridos, atualizados, ids = [], [], {}
+    with banco.transacao():
+        for valor_chave, valores in unicas.items():
+            linha, acao = _upsert(banco, tabela, unica, coluna_chave, valores, atualizaveis)
+            if acao == "inserido":
+                inseridos.append(linha[coluna_id])
+            elif acao == "atualizado":
+                atualizados.append(linha[coluna_id])
+            ids[valor_chave] = linha[coluna_id]
+    return ResultadoUpsert(inseridos, atualizados, ids, len(linhas) - len(unicas))
+
+
+class AnimaisMemoria:
+    CAMPOS_ANIMAL = crud_animal.CAMPOS_ANIMAL
+
+    def __init__(self, banco: BancoMemoria):
+        self.banco = banco
+
+    @property
+    def tabela(self):
+        return self.banco["Animais"]
+
+    def create_animal(self, animal: AnimalCreate) -> Optional[Animal]:
+        """Cria um animal na filial do cliente; None se o cliente não for da filial atual."""
+        try:
+            with self.banco.transacao():
+                cliente = _da_filial(self.banco["Clientes"].obter(animal.cliente_id))
+                if cliente is None:
+                    print(f"Erro ao criar animal: Cliente com ID {animal.cliente_id} não existe nesta filial.")
+                    return None
+                linha = self.banco.inserir("Animais", {**animal.model_dump(), "filial_id": cliente["filial_id"]})
+        except ViolacaoRestricao as e:
+            print(f"Erro de banco de dados ao criar animal: {e}")
+            return None
+        return Animal(**linha)
+
+    def get_animal_by_id(self, animal_id: int) -> Optional[Animal]:
+        with self.banco.leitura():
+            linha = _da_filial(self.tabela.obter(animal_id))
+            return Animal(**linha) if linha else None
+
+    def ids_busca(self, termos: List[str]) -> set:
+        """IDs dos animais da filial que batem com a busca (pelo animal ou pelo dono)."""
+        clientes = self.banco["Clientes"]
+        donos = {c["cliente_id"] for c in clientes.ordenadas(filial_atual())
+                 if _bate_busca(termos, c["nome"], c["email"], c["telefone"])}
+        return {a["animal_id"] for a in self.tabela.ordenadas(filial_atual())
+                if a["cliente_id"] in donos or _bate_busca(termos, a["nome"], a["especie"], a["raca"])}
+
+    def _filtradas(self, cliente_id: Optional[int] = None, busca: Optional[str] = None) -> Iterable[dict]:
+        if cliente_id is not None:
+            linhas = sorted((a for a in self.tabela.onde("cliente_id", cliente_id) if a["filial_id"] == filial_atual()),
+                            key=lambda a: (a["nome"], a["animal_id"]))
+        else:
+            linhas = self.tabela.ordenadas(filial_atual())
+        termos = termos_busca(busca)
+        if termos:
+            ids = self.ids_busca(termos)
+            linhas = (a for a in linhas if a["animal_id"] in ids)
+        return linhas
+
+    def get_estatisticas_animal(self, animal_id: int) -> Optional[EstatisticasAnimal]:
+        with self.banco.leitura():
+            animal = _da_filial(self.tabela.obter(animal_id))
+            return EstatisticasAnimal(animal_id=animal_id, **_estatisticas(self.banco, [animal])) if animal else None
+
+    def get_animais_by_cliente(self, cliente_id: int, skip: int = 0, limit: int = 100,
+                               busca: Optional[str] = None) -> List[Animal]:
+        with self.banco.leitura():
+            return [Animal(**linha) for linha in _pagina(self._filtradas(cliente_id, busca), skip, limit)]
+
+    def get_animais(self, skip: int = 0, limit: int = 100, busca: Optional[str] = None) -> List[Animal]:
+        with self.banco.leitura():
+            return [Animal(**linha) for linha in _pagina(self._filtradas(busca=busca), skip, limit)]
+
+    def get_animais_campos(self, campos: List[str], skip: int = 0, limit: int = 100, cliente_id: Optional[int] = None,
+                           animal_id: Optional[int] = None, busca: Optional[str] = None) -> List[dict]:
+        with self.banco.leitura():
+            linhas = self._filtradas(cliente_id, busca)
+            if animal_id is not None:
+                linhas = (a for a in linhas if a["animal_id"] == animal_id)
+            clientes = self.banco["Clientes"]
+            return [
+                {campo: clientes.obter(linha["cliente_id"])["nome"] if campo == "cliente_nome" else linha[campo]
+                 for campo in campos}
+                for linha in _pagina(linhas, skip, limit)
+            ]
+
+    def count_animais(self, cliente_id: Optional[int] = None, busca: Optional[str] = None) -> Optional[Contagem]:
+        with self.banco.leitura():
+            if cliente_id is None and not termos_busca(busca):
+                return Contagem(self.tabela.contar("filial_id", filial_atual()), MODO_EXATO)
+            return _contagem(self._filtradas(cliente_id, busca))
+
+    def update_animal(self, animal_id: int, animal_update: AnimalUpdate) -> Optional[Animal]:
+        update_data = animal_update.model_dump(exclude_unset=True, exclude={"versao"})
+        if not update_data:
+            return conferir_versao(self.get_animal_by_id(animal_id), animal_update.versao)
+        try:
+            with self.banco.transacao():
+                linha = _atualizar_versionado(self.banco, "Animais", animal_id, update_data, animal_update.versao)
+                if linha is None:
+                    return None
+        except ViolacaoRestricao as e:
+            print(f"Erro ao atualizar animal: {e}")
+            return None
+        return Animal(**linha)
+
+    def delete_animal(self, animal_id: int) -> bool:
+        """Deleta o animal; os agendamentos dele vão junto, em cascata."""
+        with self.banco.transacao():
+            if _da_filial(self.tabela.obter(animal_id)) is None:
+                return False
+            return self.banco.excluir("Animais", animal_id) is not None
+
+
+class FuncionariosMemoria:
+    CAMPOS_FUNCIONARIO = crud_funcionario.CAMPOS_FUNCIONARIO
+
+    def __init__(self, banco: BancoMemoria):
+        self.banco = banco
+
+    @property
+    def tabela(self):
+        return self.banco["Funcionarios"]
+
+    def create_funcionario(self, funcionario: FuncionarioCreate) -> Optional[Funcionario]:
+        try:
+            linha = self.banco.inserir("Funcionarios", {**funcionario.model_dump(), "filial_id": filial_atual()})
+        except ViolacaoRestricao as e:
+            if e.pgcode == PG_UNIQUE:
+                raise RegistroDuplicadoError("Email já cadastrado para outro funcionário")
+            print(f"Erro de banco de dados ao criar funcionário: {e}")
+            return None
+        return Funcionario(**linha)
+
+    def get_funcionario_by_id(self, funcionario_id: int) -> Optional[Funcionario]:
+        with self.banco.leitura():
+            linha = _da_filial(self.tabela.obter(funcionario_id))
+            return Funcionario(**linha) if linha else None
+
+    def get_funcionario_by_email(self, email: str) -> Optional[Funcionario]:
+        with self.banco.leitura():
+            linha = self.tabela.obter_unica("uq_funcionarios_filial_email", filial_atual(), email)
+            return Funcionario(**linha) if linha else None
+
+    def ids_busca(self, termos: List[str]) -> set:
+        return {f["funcionario_id"] for f in self.tabela.ordenadas(filial_atual())
+                if _bate_busca(termos, f["nome"], f["cargo"], f["email"], f["telefone"])}
+
+    def _filtradas(self, apenas_ativos: bool = False, busca: Optional[str] = None) -> Iterable[dict]:
+        linhas = self.tabela.ordenadas(filial_atual())
+        if apenas_ativos:
+            linhas = (f for f in linhas if f["ativo"])
+        termos = termos_busca(busca)
+        if termos:
+            linhas = (f for f in linhas if _bate_busca(termos, f["nome"], f["cargo"], f["email"], f["telefone"]))
+        return linhas
+
+    def get_funcionarios(self, skip: int = 0, limit: int = 100, apenas_ativos: bool = False,
+                         busca: Optional[str] = None) -> List[Funcionario]:
+        with self.banco.leitura():
+            return [Funcionario(**linha) for linha in _pagina(self._filtradas(apenas_ativos, busca), skip, limit)]
+
+    def get_funcionarios_campos(self, campos: List[str], skip: int = 0, limit: int = 100, apenas_ativos: bool = False,
+                                funcionario_id: Optional[int] = None, busca: Optional[str] = None) -> List[dict]:
+        with self.banco.leitura():
+            linhas = self._filtradas(apenas_ativos, busca)
+            if funcionario_id is not None:
+                linhas = (f for f in linhas if f["funcionario_id"] == funcionario_id)
+            return [{campo: linha[campo] for campo in campos} for linha in _pagina(linhas, skip, limit)]
+
+    def count_funcionarios(self, apenas_ativos: bool = False, busca: Optional[str] = None) -> Optional[Contagem]:
+        with self.banco.leitura():
+            if not apenas_ativos and not termos_busca(busca):
+                return Contagem(self.tabela.contar("filial_id", filial_atual()), MODO_EXATO)
+            return _contagem(self._filtradas(apenas_ativos, busca))
+
+    def update_funcionario(self, funcionario_id: int, funcionario_update: FuncionarioUpdate) -> Optional[Funcionario]:
+        update_data = funcionario_update.model_dump(exclude_unset=True, exclude={"versao"})
+        if not update_data:
+            return conferir_versao(self.get_funcionario_by_id(funcionario_id), funcionario_update.versao)
+        try:
+            with self.banco.transacao():
+                linha = _atualizar_versionado(self.banco, "Funcionarios", funcionario_id, update_data,
+                                              funcionario_update.versao)
+                if linha is None:
+                    return None
+        except ViolacaoRestricao as e:
+            if e.pgcode == PG_UNIQUE:
+                raise RegistroDuplicadoError("Novo email já cadastrado para outro funcionário")
+            print(f"Erro ao atualizar funcionário: {e}")
+            return None
+        return Funcionario(**linha)
+
+    def upsert_funcionario(self, funcionario: FuncionarioUpsert) -> Optional[Tuple[Funcionario, str]]:
+        try:
+            linha, acao = _upsert(self.banco, "Funcionarios", "uq_funcionarios_filial_email", "email",
+                                  {**funcionario.model_dump(), "filial_id": filial_atual()},
+                                  ("nome", "cargo", "telefone", "data_contratacao", "ativo"))
+        except ViolacaoRestricao as e:
+            print(f"Erro ao gravar funcionário por email: {e}")
+            return None
+        return Funcionario(**linha), acao
+
+    def upsert_funcionarios(self, funcionarios: List[FuncionarioUpsert]) -> Optional[ResultadoUpsert]:
+        try:
+            return _upsert_lote(self.banco, "Funcionarios", "funcionario_id", "uq_funcionarios_filial_email", "email",
+                                [{**f.model_dump(), "filial_id": filial_atual()} for f in funcionarios],
+                                ("nome", "cargo", "telefone", "data_contratacao", "ativo"))
+        except ViolacaoRestricao as e:
+            print(f"Erro ao gravar lote de funcionários: {e}")
+            return None
+
+    def delete_funcionario(self, funcionario_id: int) -> bool:
+        """Deleta o funcionário; os agendamentos dele ficam sem funcionário (SET NULL)."""
+        with self.banco.transacao():
+            if _da_filial(self.tabela.obter(funcionario_id)) is None:
+                print(f"Funcionário ID {funcionario_id} não encontrado para deleção.")
+                return False
+            return self.banco.excluir("Funcionarios", funcionario_id) is not None
+
+
+class ServicosMemoria:
+    CAMPOS_SERVICO = crud_servico.CAMPOS_SERVICO
+
+    def __init__(self, banco: BancoMemoria):
+        self.banco = banco
+
+    @property
+    def tabela(self):
+        return self.banco["Servicos"]
+
+    def create_servico(self, servico: ServicoCreate) -> Optional[Servico]:
+        try:
+            linha = self.banco.inserir("Servicos", {**servico.model_dump(), "preco": numeric(servico.preco),
+                                                    "filial_id": filial_atual()})
+        except ViolacaoRestricao as e:
+            if e.pgcode == PG_UNIQUE:
+                print(f"Erro ao criar serviço: Nome '{servico.nome}' já existe.")
+            else:
+                print(f"Erro de banco de dados ao criar serviço: {e}")
+            return None
+        return Servico(**linha)
+
+    def get_servico_by_id(self, servico_id: int) -> Optional[Servico]:
+        with self.banco.leitura():
+            linha = _da_filial(self.tabela.obter(servico_id))
+            return Servico(**linha) if linha else None
+
+    def get_servico_by_nome(self, nome: str) -> Optional[Servico]:
+        with self.banco.leitura():
+            linha = self.tabela.obter_unica("uq_servicos_filial_nome", filial_atual(), nome)
+            return Servico(**linha) if linha else None
+
+    def _filtradas(self, busca: Optional[str] = None) -> Iterable[dict]:
+        linhas = self.tabela.ordenadas(filial_atual())
+        termos = termos_busca(busca)
+        if termos:
+            linhas = (s for s in linhas if _bate_busca(termos, s["nome"], s["descricao"]))
+        return linhas
+
+    def get_servicos(self, skip: int = 0, limit: int = 100, busca: Optional[str] = None) -> List[Servico]:
+        with self.banco.leitura():
+            return [Servico(**linha) for linha in _pagina(self._filtradas(busca), skip, limit)]
+
+    def get_servicos_campos(self, campos: List[str], skip: int = 0, limit: int = 100,
+                            servico_id: Optional[int] = None, busca: Optional[str] = None) -> List[dict]:
+        with self.banco.leitura():
+            linhas = self._filtradas(busca)
+            if servico_id is not None:
+                linhas = (s for s in linhas if s["servico_id"] == servico_id)
+            return [{campo: linha[campo] for campo in campos} for linha in _pagina(linhas, skip, limit)]
+
+    def count_servicos(self, busca: Optional[str] = None) -> Optional[Contagem]:
+        with self.banco.leitura():
+            if not termos_busca(busca):
+                return Contagem(self.tabela.contar("filial_id", filial_atual()), MODO_EXATO)
+            return _contagem(self._filtradas(busca))
+
+    def update_servico(self, servico_id: int, servico_update: ServicoUpdate) -> Optional[Servico]:
+        update_data = servico_update.model_dump(exclude_unset=True, exclude={"versao"})
+        if not update_data:
+            return conferir_versao(self.get_servico_by_id(servico_id), servico_update.versao)
+        if "preco" in update_data:
+            update_data["preco"] = numeric(update_data["preco"])
+        try:
+            with self.banco.transacao():
+                linha = _atualizar_versionado(self.banco, "Servicos", servico_id, update_data, servico_update.versao)
+                if linha is None:
+                    return None
+        except ViolacaoRestricao as e:
+            if e.pgcode == PG_UNIQUE:
+                raise RegistroDuplicadoError("Outro serviço já existe com este nome")
+            print(f"Erro ao atualizar serviço: {e}")
+            return None
+        return Servico(**linha)
+
+    def delete_servico(self, servico_id: int) -> bool:
+        """Deleta o serviço; RegistroEmUsoError se ele estiver em algum agendamento (RESTRICT)."""
+        try:
+            with self.banco.transacao():
+                if _da_filial(self.tabela.obter(servico_id)) is None:
+                    print(f"Serviço ID {servico_id} não encontrado para deleção.")
+                    return False
+                return self.banco.excluir("Servicos", servico_id) is not None
+        except ViolacaoRestricao as e:
+            if e.pgcode == PG_FOREIGN_KEY:
+                raise RegistroEmUsoError(crud_servico.SERVICO_EM_USO)
+            print(f"Erro ao deletar serviço: {e}")
+            return False
+
+
+def _servicos_do_agendamento(banco: BancoMemoria, agendamento_id: int) -> List[AgendamentoServicoDetalhe]:
+    servicos = banco["Servicos"]
+    return [
+        AgendamentoServicoDetalhe(
+            servico_id=ags["servico_id"],
+            nome_servico=servicos.obter(ags["servico_id"])["nome"],
+            preco_registrado=ags["preco_registrado"],
+            observacoes=ags["observacoes"]
+        )
+        for ags in sorted(banco["Agendamento_Servicos"].onde("agendamento_id", agendamento_id),
+                          key=lambda ags: ags["servico_id"])
+    ]
+
+
+class AgendamentosMemoria:
+    CAMPOS_AGENDAMENTO = crud_agendamento.CAMPOS_AGENDAMENTO
+
+    def __init__(self, banco: BancoMemoria, animais: AnimaisMemoria, funcionarios: FuncionariosMemoria):
+        self.banco = banco
+        self.animais = animais
+        self.funcionarios = funcionarios
+
+    @property
+    def tabela(self):
+        return self.banco["Agendamentos"]
+
+    def _servicos_com_preco(self, servico_ids: List[int]) -> List[Tuple[int, Decimal]]:
+        """Preço atual dos serviços da filial; levanta ValueError se algum não existir."""
+        encontrados = {sid: linha["preco"] for sid in set(servico_ids)
+                       if (linha := _da_filial(self.banco["Servicos"].obter(sid))) is not None}
+        if len(encontrados) != len(servico_ids):
+            raise ValueError(f"Serviços com IDs {set(servico_ids) - set(encontrados)} não encontrados.")
+        return list(encontrados.items())
+
+    def _inserir_servicos(self, agendamento_id: int, servicos_com_preco: List[Tuple[int, Decimal]]) -> None:
+        for servico_id, preco in servicos_com_preco:
+            self.banco.inserir("Agendamento_Servicos", {
+                "agendamento_id": agendamento_id, "servico_id": servico_id, "preco_registrado": preco})
+
+    def _validar_referencias(self, animal_id: Optional[int], funcionario_id: Optional[int]) -> bool:
+        if animal_id is not None and _da_filial(self.banco["Animais"].obter(animal_id)) is None:
+            return False
+        if funcionario_id is not None and _da_filial(self.banco["Funcionarios"].obter(funcionario_id)) is None:
+            return False
+        return True
+
+    def create_agendamento(self, agendamento: AgendamentoCreate) -> Optional[Agendamento]:
+        try:
+            with self.banco.transacao():
+                servicos_com_preco = self._servicos_com_preco(agendamento.servicos_ids)
+                if not self._validar_referencias(agendamento.animal_id, agendamento.funcionario_id):
+                    raise ValueError(
+                        f"Animal {agendamento.animal_id} ou funcionário {agendamento.funcionario_id} não encontrado nesta filial.")
+                linha = self.banco.inserir("Agendamentos", {
+                    **agendamento.model_dump(exclude={"servicos_ids"}),
+                    "data_hora_agendamento": timestamptz(agendamento.data_hora_agendamento),
+                    "filial_id": filial_atual(),
+                })
+                self._inserir_servicos(linha["agendamento_id"], servicos_com_preco)
+                return self._agendamento(linha)
+        except (ViolacaoRestricao, ValueError) as e:
+            print(f"Erro ao criar agendamento: {e}")
+        return None
+
+    def _agendamento(self, linha: dict, detalhado: bool = False) -> Agendamento:
+        servicos = _servicos_do_agendamento(self.banco, linha["agendamento_id"])
+        if not detalhado:
+            return Agendamento(**linha, servicos=servicos)
+        return Agendamento(**linha, **self._nomes(linha), valor_total=self._valor_total(linha["agendamento_id"]),
+                           servicos=servicos)
+
+    def _nomes(self, linha: dict) -> dict:
+        animal = self.banco["Animais"].obter(linha["animal_id"])
+        funcionario = self.banco["Funcionarios"].obter(linha["funcionario_id"])
+        return {
+            "animal_nome": animal["nome"],
+            "cliente_nome": self.banco["Clientes"].obter(animal["cliente_id"])["nome"],
+            "funcionario_nome": funcionario["nome"] if funcionario else None,
+        }
+
+    def _valor_total(self, agendamento_id: int) -> Decimal:
+        return sum((ags["preco_registrado"] for ags in self.banco["Agendamento_Servicos"].onde("agendamento_id", agendamento_id)),
+                   Decimal(0))
+
+    def get_agendamento_by_id(self, agendamento_id: int) -> Optional[Agendamento]:
+        with self.banco.leitura():
+            linha = _da_filial(self.tabela.obter(agendamento_id))
+            return self._agendamento(linha) if linha else None
+
+    def _filtradas(self, animal_id: Optional[int] = None, funcionario_id: Optional[int] = None,
+                   data_inicio: Optional[datetime] = None, data_fim: Optional[datetime] = None,
+                   status: Optional[str] = None, busca: Optional[str] = None) -> Iterable[dict]:
+        """Agendamentos da filial por data decrescente; o período é buscado no índice ordenado."""
+        data_inicio, data_fim = timestamptz(data_inicio), timestamptz(data_fim)
+        filial_id = filial_atual()
+        if animal_id is not None or funcionario_id is not None:
+            coluna, valor = ("animal_id", animal_id) if animal_id is not None else ("funcionario_id", funcionario_id)
+            linhas = sorted((a for a in self.tabela.onde(coluna, valor) if a["filial_id"] == filial_id),
+                            key=lambda a: (a["data_hora_agendamento"], a["agendamento_id"]), reverse=True)
+            if data_inicio is not None:
+                linhas = [a for a in linhas if a["data_hora_agendamento"] >= data_inicio]
+            if data_fim is not None:
+                linhas = [a for a in linhas if a["data_hora_agendamento"] <= data_fim]
+        else:
+            linhas = self.tabela.ordenadas(filial_id, decrescente=True, minimo=data_inicio, maximo=data_fim)
+        if animal_id is not None and funcionario_id is not None:
+            linhas = (a for a in linhas if a["funcionario_id"] == funcionario_id)
+        if status is not None:
+            linhas = (a for a in linhas if a["status"] == status)
+        termos = termos_busca(busca)
+        if termos:
+            animais, funcionarios = self.animais.ids_busca(termos), self.funcionarios.ids_busca(termos)
+            linhas = (a for a in linhas if a["animal_id"] in animais or a["funcionario_id"] in funcionarios)
+        return linhas
+
+    def get_agendamentos(self, skip: int = 0, limit: int = 100, **filtros) -> List[Agendamento]:
+        with self.banco.leitura():
+            return [self._agendamento(linha, detalhado=True) for linha in _pagina(self._filtradas(**filtros), skip, limit)]
+
+    def get_agendamentos_campos(self, campos: List[str], skip: int = 0, limit: int = 100,
+                                agendamento_id: Optional[int] = None, **filtros) -> List[dict]:
+        with self.banco.leitura():
+            linhas = self._filtradas(**filtros)
+            if agendamento_id is not None:
+                linhas = (a for a in linhas if a["agendamento_id"] == agendamento_id)
+            agendamentos = []
+            for linha in _pagina(linhas, skip, limit):
+                valores = dict(linha)
+                if {"animal_nome", "cliente_nome", "funcionario_nome"} & set(campos):
+                    valores.update(self._nomes(linha))
+                if "valor_total" in campos:
+                    valores["valor_total"] = self._valor_total(linha["agendamento_id"])
+                if "servicos" in campos:
+                    valores["servicos"] = _servicos_do_agendamento(self.banco, linha["agendamento_id"])
+                agendamentos.append({campo: valores[campo] for campo in campos})
+            return agendamentos
+
+    def count_agendamentos(self, **filtros) -> Optional[Contagem]:
+        with self.banco.leitura():
+            if not any(valor is not None for valor in filtros.values()):
+                return Contagem(self.tabela.contar("filial_id", filial_atual()), MODO_EXATO)
+            return _contagem(self._filtradas(**filtros))
+
+    def get_calendario_funcionarios(self, funcionario_ids: List[int], data_inicio: date, dias: int = 7,
+                                    fuso_horario: str = "America/Sao_Paulo") -> CalendarioAgendamentos:
+        fuso = ZoneInfo(fuso_horario)
+        inicio_periodo = datetime.combine(data_inicio, time.min, tzinfo=fuso)
+        fim_periodo = datetime.combine(data_inicio + timedelta(days=dias), time.min, tzinfo=fuso)
+        calendarios = {fid: CalendarioFuncionario(funcionario_id=fid) for fid in dict.fromkeys(funcionario_ids)}
+        with self.banco.leitura():
+            for fid, calendario in calendarios.items():
+                agendamentos = sorted(
+                    (a for a in self.tabela.onde("funcionario_id", fid)
+                     if a["filial_id"] == filial_atual() and inicio_periodo <= a["data_hora_agendamento"] < fim_periodo),
+                    key=lambda a: a["data_hora_agendamento"])
+                for ag in agendamentos:
+                    servicos = self.banco["Agendamento_Servicos"].onde("agendamento_id", ag["agendamento_id"])
+                    duracao = sum(self.banco["Servicos"].obter(s["servico_id"])["duracao_estimada_minutos"] for s in servicos)
+                    inicio = ag["data_hora_agendamento"].astimezone(fuso)
+                    calendario.agendamento_id.append(ag["agendamento_id"])
+                    calendario.dia.append(inicio.date())
+                    calendario.inicio.append(inicio)
+                    calendario.fim.append(inicio + timedelta(minutes=duracao))
+                    calendario.status.append(ag["status"])
+                    calendario.animal.append(self.banco["Animais"].obter(ag["animal_id"])["nome"])
+                    calendario.valor_total.append(sum((s["preco_registrado"] for s in servicos), Decimal(0)))
+        return CalendarioAgendamentos(
+            fuso_horario=fuso_horario,
+            data_inicio=data_inicio,
+            data_fim=data_inicio + timedelta(days=dias - 1),
+            funcionarios=list(calendarios.values())
+        )
+
+    def update_agendamento(self, agendamento_id: int, agendamento_update: AgendamentoUpdate) -> Optional[Agendamento]:
+        update_data = agendamento_update.model_dump(exclude_unset=True, exclude={"servicos_ids", "versao"})
+        servicos_ids = agendamento_update.servicos_ids
+        if not update_data and servicos_ids is None:
+            return conferir_versao(self.get_agendamento_by_id(agendamento_id), agendamento_update.versao)
+        if "data_hora_agendamento" in update_data:
+            update_data["data_hora_agendamento"] = timestamptz(update_data["data_hora_agendamento"])
+        try:
+            with self.banco.transacao():
+                atual = _da_filial(self.tabela.obter(agendamento_id))
+                if atual is None:
+                    return None
+                if agendamento_update.versao is not None and atual["versao"] != agendamento_update.versao:
+                    raise ConflitoVersaoError(atual["versao"])
+                if not self._validar_referencias(update_data.get("animal_id"), update_data.get("funcionario_id")):
+                    raise ValueError(f"Animal {update_data.get('animal_id')} ou funcionário {update_data.get('funcionario_id')} "
+                                     "não encontrado nesta filial.")
+                self.banco.atualizar("Agendamentos", agendamento_id, {**update_data, "versao": atual["versao"] + 1})
+                if servicos_ids is not None:
+                    if not servicos_ids:
+                        raise ValueError("Um agendamento deve ter pelo menos um serviço.")
+                    servicos_com_preco = self._servicos_com_preco(servicos_ids)
+                    for ags in self.banco["Agendamento_Servicos"].onde("agendamento_id", agendamento_id):
+                        self.banco.excluir("Agendamento_Servicos", (agendamento_id, ags["servico_id"]))
+                    self._inserir_servicos(agendamento_id, servicos_com_preco)
+                return self._agendamento(self.tabela.obter(agendamento_id))
+        except ViolacaoRestricao as e:
+            print(f"Erro ao atualizar agendamento ID {agendamento_id}: {e}")
+        return None
+
+    def delete_agendamento(self, agendamento_id: int) -> bool:
+        with self.banco.transacao():
+            if _da_filial(self.tabela.obter(agendamento_id)) is None:
+                print(f"Agendamento ID {agendamento_id} não encontrado para deleção.")
+                return False
+            return self.banco.excluir("Agendamentos", agendamento_id) is not None
+
+
+class FiliaisMemoria:
+    def __init__(self, banco: BancoMemoria):
+        self.banco = banco
+
+    def create_filial(self, filial: FilialCreate) -> Optional[Filial]:
+        try:
+            return Filial(**self.banco.inserir("Filiais", filial.model_dump()))
+        except ViolacaoRestricao as e:
+            if e.pgcode == PG_UNIQUE:
+                print(f"Erro ao criar filial: Nome '{filial.nome}' já existe.")
+            else:
+                print(f"Erro de banco de dados ao criar filial: {e}")
+        return None
+
+    def get_filial_by_id(self, filial_id: int) -> Optional[Filial]:
+        with self.banco.leitura():
+            linha = self.banco["Filiais"].obter(filial_id)
+            return Filial(**linha) if linha else None
+
+    def get_filiais(self) -> List[Filial]:
+        with self.banco.leitura():
+            return [Filial(**linha) for linha in sorted(self.banco["Filiais"].linhas.values(),
+                                                         key=lambda f: f["filial_id"])]
+
+
+class LoteMemoria:
+    """POST /lote sobre o banco em memória: a mesma execução de crud_lote, numa transacao() só."""
+
+    def __init__(self, banco: BancoMemoria, entidades: Dict[str, crud_lote.Entidade]):
+        self.banco = banco
+        self.entidades = entidades
+
+    def executar_operacoes(self, operacoes):
+        return crud_lote.executar_operacoes(operacoes, self.entidades, self.banco.transacao)
+
+
+banco = criar_banco_petshop()
+
+crud_cliente_memoria = ClientesMemoria(banco)
+crud_animal_memoria = AnimaisMemoria(banco)
+crud_funcionario_memoria = FuncionariosMemoria(banco)
+crud_servico_memoria = ServicosMemoria(banco)
+crud_agendamento_memoria = AgendamentosMemoria(banco, crud_animal_memoria, crud_funcionario_memoria)
+crud_filial_memoria = FiliaisMemoria(banco)
+crud_lote_memoria = LoteMemoria(banco, crud_lote.montar_entidades(
+    crud_cliente_memoria, crud_animal_memoria, crud_funcionario_memoria, crud_servico_memoria, crud_agendamento_memoria))
+
+
+def reiniciar() -> None:
+    """Volta o banco em memória ao estado inicial (ex.: entre testes)."""
+    with banco.transacao():
+        banco.limpar()
+        popular_inicial(banco)
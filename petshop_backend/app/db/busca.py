@@ -0,0 +1,46 @@
+import re
+from typing import List, Optional
+
+# --- Busca textual das listagens (?busca=) ---
+#
+# Usa o full text search do próprio Postgres, sem extensões: cada tabela tem um índice GIN
+# sobre to_tsvector('simple', ...) das colunas pesquisáveis (migração 005) e o texto digitado
+# vira uma tsquery de prefixos, em que cada palavra precisa ser o começo de alguma palavra
+# das colunas ("ana sil" encontra "Ana Silva"). A configuração 'simple' só converte para
+# minúsculas: não há stemming nem remoção de acentos.
+# A expressão montada por vetor_busca() precisa ser idêntica à do índice para que ele seja
+# usado; por isso cada crud guarda a sua numa constante VETOR_BUSCA_*.
+
+# Palavras aproveitadas do texto digitado (as demais são ignoradas).
+MAX_TERMOS = 8
+
+_TERMO = re.compile(r"[\w@.+-]*\w[\w@.+-]*")
+
+
+def vetor_busca(*colunas: str) -> str:
+    """Expressão to_tsvector das colunas (aceitam NULL), na forma usada pelos índices."""
+    return "to_tsvector('simple', " + " || ' ' || ".join(f"coalesce({coluna}, '')" for coluna in colunas) + ")"
+
+
+def condicao_busca(vetor: str) -> str:
+    """Condição do WHERE que compara o vetor com a tsquery passada como parâmetro."""
+    return f"{vetor} @@ to_tsquery('simple', %s)"
+
+
+def termos_busca(texto: Optional[str]) -> List[str]:
+    """Palavras aproveitadas do texto digitado, em minúsculas (no máximo MAX_TERMOS)."""
+    if not texto:
+        return []
+    return _TERMO.findall(texto.lower())[:MAX_TERMOS]
+
+
+def consulta_busca(texto: Optional[str]) -> Optional[str]:
+    """Converte o texto digitado numa tsquery de prefixos ("ana sil" -> 'ana':* & 'sil':*).
+
+    Retorna None quando não sobra nenhuma palavra (texto vazio ou só pontuação). As palavras
+    só têm letras, dígitos e @ . + - _, então podem ir entre aspas sem escape.
+    """
+    termos = termos_busca(texto)
+    if not termos:
+        return None
+    return " & ".join(f"'{termo}':*" for termo in termos)
@@ -0,0 +1,110 @@
+import os
+import random
+import threading
+import time
+from typing import Optional
+
+# --- Circuit breaker por banco ---
+#
+# Com o Postgres fora do ar, cada requisição tentaria abrir uma conexão e esperaria o
+# connect_timeout inteiro. O circuito conta as falhas de conexão seguidas de cada banco:
+# chegando a DB_CIRCUITO_FALHAS ele abre, e por DB_CIRCUITO_ABERTO_S as requisições falham
+# na hora (503), sem tocar no banco. Passado esse tempo o circuito fica meio aberto: uma
+# única requisição (a sonda) tenta o banco; se ela conseguir, o circuito fecha, senão volta
+# a abrir. As demais continuam falhando na hora enquanto a sonda não termina.
+#
+# Só falhas de conexão contam (banco fora, rede, conexão derrubada); timeouts, locks e erros
+# de SQL são do próprio comando e não dizem nada sobre o banco estar no ar.
+
+LIMITE_FALHAS = int(os.getenv("DB_CIRCUITO_FALHAS", "5"))
+ABERTO_S = float(os.getenv("DB_CIRCUITO_ABERTO_S", "5"))
+
+# Novas tentativas de falhas transitórias (conexão recusada, deadlock, serialização),
+# com espera aleatória entre 0 e min(MAX, BASE * 2^tentativa) ("full jitter"), para que os
+# workers não voltem todos juntos.
+RETENTATIVAS = int(os.getenv("DB_RETENTATIVAS", "2"))
+RETENTATIVA_BASE_S = float(os.getenv("DB_RETENTATIVA_BASE_MS", "50")) / 1000
+RETENTATIVA_MAX_S = float(os.getenv("DB_RETENTATIVA_MAX_MS", "1000")) / 1000
+
+FECHADO = "fechado"
+ABERTO = "aberto"
+MEIO_ABERTO = "meio_aberto"
+
+
+def espera_retentativa(tentativa: int) -> float:
+    """Segundos a esperar antes da tentativa seguinte (tentativa começa em 0)."""
+    return random.uniform(0, min(RETENTATIVA_MAX_S, RETENTATIVA_BASE_S * 2 ** tentativa))
+
+
+class Circuito:
+    """Estado do circuito de um banco, compartilhado pelas threads do processo."""
+
+    def __init__(self, nome: str, limite_falhas: int = LIMITE_FALHAS, aberto_s: float = ABERTO_S):
+        self.nome = nome
+        self.limite_falhas = limite_falhas
+        self.aberto_s = aberto_s
+        self.estado = FECHADO
+        self.falhas_seguidas = 0
+        self._aberto_em = 0.0
+        # Início da sonda em andamento; uma sonda que nunca respondeu é substituída após aberto_s.
+        self._sonda_em: Optional[float] = None
+        self._lock = threading.Lock()
+        self.aberturas = 0
+        self.rejeitadas = 0
+        self.retentativas = 0
+        self.ultimo_erro: Optional[str] = None
+
+    def permitir(self) -> Optional[bool]:
+        """None se a chamada deve falhar na hora; senão, se ela é a sonda do circuito meio aberto."""
+        agora = time.monotonic()
+        with self._lock:
+            if self.estado == FECHADO:
+                return False
+            if self.estado == ABERTO and agora - self._aberto_em >= self.aberto_s:
+                self.estado = MEIO_ABERTO
+                self._sonda_em = None
+            if self.estado == MEIO_ABERTO and (self._sonda_em is None or agora - self._sonda_em >= self.aberto_s):
+                self._sonda_em = agora
+                return True
+            self.rejeitadas += 1
+            return None
+
+    def tentar_em_s(self) -> float:
+        """Segundos até a próxima sonda (para o Retry-After)."""
+        with self._lock:
+            if self.estado != ABERTO:
+                return 1.0
+            return max(0.0, self.aberto_s - (time.monotonic() - self._aberto_em))
+
+    def registrar_sucesso(self) -> None:
+        with self._lock:
+            self.estado = FECHADO
+            self.falhas_seguidas = 0
+            self._sonda_em = None
+
+    def registrar_falha(self, erro: BaseException) -> None:
+        with self._lock:
+            self.falhas_seguidas += 1
+            self.ultimo_erro = str(erro).strip()
+            if self.estado == MEIO_ABERTO or (self.estado == FECHADO and self.falhas_seguidas >= self.limite_falhas):
+                if self.estado == FECHADO:
+                    print(f"Circuito do banco {self.nome} aberto após {self.falhas_seguidas} falhas: {self.ultimo_erro}")
+                self.estado = ABERTO
+                self._aberto_em = time.monotonic()
+                self._sonda_em = None
+                self.aberturas += 1
+
+    def registrar_retentativa(self) -> None:
+        with self._lock:
+            self.retentativas += 1
+
+    def metricas(self) -> dict:
+        with self._lock:
+            return {
+                "estado": self.estado,
+                "falhas_seguidas": self.falhas_seguidas,
+                "aberturas": self.aberturas,
+                "rejeitadas": self.rejeitadas,
+                "retentativas": self.retentativas,
+                "ultimo_erro": self.ultimo_erro,
+            }
@@ -0,0 +1,114 @@
+import psycopg2
+from typing import NamedTuple, Optional, Sequence
+
+from app.db.database import BancoDadosError, filial_atual, filial_exclusiva, get_db_cursor
+
+# --- Contagens baratas para listagens paginadas ---
+#
+# Listagens sem filtro usam a estimativa do catálogo (pg_class.reltuples), mantida pelo
+# ANALYZE/autovacuum. Listagens filtradas contam de verdade, mas param em LIMITE_CONTAGEM + 1
+# linhas: a consulta só lê a tabela filtrada (sem os JOINs da listagem) e, com os índices
+# compostos do modelo físico, costuma virar um Index Only Scan.
+# As listagens são sempre da filial atual. Na filial que tem um banco só seu a estimativa é
+# o reltuples da tabela; no banco compartilhado, o reltuples vezes a fração das linhas da
+# filial segundo as estatísticas de filial_id (pg_stats, também do ANALYZE).
+
+LIMITE_CONTAGEM = 1000
+
+MODO_ESTIMADO = "estimado"
+MODO_EXATO = "exato"
+MODO_LIMITADO = "limitado"
+
+
+class Contagem(NamedTuple):
+    total: int
+    modo: str
+
+    def header_value(self) -> str:
+        """Valor do cabeçalho X-Total-Count ("1000+" quando a contagem foi limitada)."""
+        return f"{self.total}+" if self.modo == MODO_LIMITADO else str(self.total)
+
+
+def count_capped(sql_from_where: str, params: Sequence = (), limite: int = LIMITE_CONTAGEM) -> Optional[Contagem]:
+    """Conta as linhas de um "FROM ... WHERE ..." até o limite, sem varrer além dele."""
+    sql = f"SELECT count(*) FROM (SELECT 1 {sql_from_where} LIMIT %s) AS limitado;"
+    try:
+        with get_db_cursor() as cursor:
+            cursor.execute(sql, (*params, limite + 1))
+            total = cursor.fetchone()[0]
+    except BancoDadosError:
+        raise
+    except psycopg2.Error as e:
+        print(f"Erro ao contar registros: {e}")
+        return None
+    if total > limite:
+        return Contagem(limite, MODO_LIMITADO)
+    return Contagem(total, MODO_EXATO)
+
+
+def count_table(tabela: str, limite: int = LIMITE_CONTAGEM) -> Optional[Contagem]:
+    """Total de linhas de uma tabela inteira: estimativa do catálogo, ou exato se ela for pequena.
+
+    Abaixo do limite a estimativa pode estar defasada (ex.: tabela recém-populada ainda sem
+    ANALYZE) e a contagem exata é barata, então ela é usada no lugar.
+    """
+    sql = "SELECT reltuples::bigint FROM pg_class WHERE oid = to_regclass(%s);"
+    try:
+        with get_db_cursor() as cursor:
+            cursor.execute(sql, (tabela,))
+            row = cursor.fetchone()
+    except BancoDadosError:
+        raise
+    except psycopg2.Error as e:
+        print(f"Erro ao estimar registros de {tabela}: {e}")
+        return None
+    # reltuples = -1 indica tabela nunca analisada.
+    if row and row[0] is not None and row[0] > limite:
+        return Contagem(int(row[0]), MODO_ESTIMADO)
+    return count_capped(f"FROM {tabela}", (), limite)
+
+
+def _fracao_filial(filial_id: int, valores, frequencias, n_distinct, fracao_nula) -> Optional[float]:
+    """Fração das linhas com filial_id = filial_id segundo o pg_stats (None sem estatísticas)."""
+    if n_distinct is None:
+        return None
+    valores, frequencias = valores or [], frequencias or []
+    if filial_id in valores:
+        return frequencias[valores.index(filial_id)]
+    # Fora dos valores mais comuns: o resto das linhas dividido igualmente entre os demais valores.
+    # n_distinct negativo é uma fração do número de linhas, não dá para saber quantos são.
+    outros = n_distinct - len(valores) if n_distinct > 0 else 0
+    if outros < 1:
+        return 0.0
+    return max(0.0, 1.0 - sum(frequencias) - (fracao_nula or 0.0)) / outros
+
+
+def count_filial(tabela: str, limite: int = LIMITE_CONTAGEM) -> Optional[Contagem]:
+    """Total de linhas da filial atual numa tabela com coluna filial_id.
+
+    Estimado pelo catálogo quando passa do limite; abaixo dele (ou sem ANALYZE), contagem exata.
+    """
+    filial_id = filial_atual()
+    if filial_exclusiva(filial_id):
+        return count_table(tabela, limite)
+    sql = """
+        SELECT c.reltuples::bigint, s.most_common_vals::text::int[], s.most_common_freqs, s.n_distinct, s.null_frac
+        FROM pg_class c
+        JOIN pg_namespace n ON n.oid = c.relnamespace
+        LEFT JOIN pg_stats s ON s.schemaname = n.nspname AND s.tablename = c.relname AND s.attname = 'filial_id'
+        WHERE c.oid = to_regclass(%s);
+    """
+    try:
+        with get_db_cursor() as cursor:
+            cursor.execute(sql, (tabela,))
+            row = cursor.fetchone()
+    except BancoDadosError:
+        raise
+    except psycopg2.Error as e:
+        print(f"Erro ao estimar registros de {tabela}: {e}")
+        row = None
+    if row and row[0] is not None and row[0] > limite:
+        fracao = _fracao_filial(filial_id, *row[1:])
+        if fracao is not None and row[0] * fracao > limite:
+            return Contagem(int(round(row[0] * fracao)), MODO_ESTIMADO)
+    return count_capped(f"FROM {tabela} WHERE filial_id = %s", (filial_id,), limite)
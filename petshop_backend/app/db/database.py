@@ -1,6 +1,17 @@
 import psycopg2
+import psycopg2.errors
+import psycopg2.extensions
+import psycopg2.pool
+import math
 import os
+import threading
+import time
 from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+from typing import Callable, Dict, List, NamedTuple, Optional
+
+from app.db.circuito import FECHADO, RETENTATIVAS, Circuito, espera_retentativa
 
 # --- CONFIGURAR CONEXÃO COM BANCO ---
 
@@ -10,47 +21,485 @@ DB_NAME = "petshop"
 DB_USER = "postgres"
 DB_PASSWORD = "root"
 
-DATABASE_URL = f"postgresql://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
+DATABASE_URL = os.getenv("DATABASE_URL", f"postgresql://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}")
+
+# Orçamento de conexões do processo. O controle de admissão (app/core/admission.py)
+# divide este número entre as classes de rota, e o pool comporta todas as vagas das
+# classes mais DB_POOL_RESERVA conexões para o que não passa pela admissão (a thread da
+# auditoria, /health/ready e o reaquecimento do pool), então nenhuma requisição admitida
+# fica sem conexão: o ThreadedConnectionPool não espera, levanta PoolError.
+# O pool do psycopg2 abre DB_POOL_MIN conexões na criação e fecha as que voltam acima
+# desse número; ele é, portanto, a quantidade de conexões mantidas aquecidas.
+DB_POOL_MAX = int(os.getenv("DB_POOL_MAX", "10"))
+DB_POOL_MIN = min(int(os.getenv("DB_POOL_MIN", "4")), DB_POOL_MAX)
+DB_POOL_RESERVA = int(os.getenv("DB_POOL_RESERVA", "2"))
+# Tempo máximo para abrir uma conexão: com o banco fora do ar, cada tentativa custa no máximo isto.
+DB_CONNECT_TIMEOUT_S = int(os.getenv("DB_CONNECT_TIMEOUT_S", "3"))
+
+# Um pool e um circuit breaker (app/db/circuito.py) por banco (DATABASE_URL e cada banco de
+# FILIAIS_BANCOS), criados sob demanda.
+_pools: Dict[str, psycopg2.pool.ThreadedConnectionPool] = {}
+_circuitos: Dict[str, Circuito] = {}
+_pool_lock = threading.Lock()
+
+# Cursor compartilhado (ver use_cursor). Quando definido, get_db_cursor o reutiliza
+# em vez de abrir uma conexão própria.
+_cursor_atual: ContextVar = ContextVar("cursor_atual", default=None)
+
+# Funções a executar depois do commit da transação em curso (ver apos_commit).
+_apos_commit: ContextVar = ContextVar("apos_commit", default=None)
+
+# --- Roteamento por filial ---
+#
+# Toda consulta dos módulos crud_* é da filial atual (filial_atual(), definida por requisição
+# a partir do header X-Filial-Id). Por padrão todas as filiais ficam no banco DATABASE_URL;
+# FILIAIS_BANCOS move filiais grandes para outro servidor (ou outro schema do mesmo banco,
+# com "?options=-csearch_path%3Dfilial_2" na URL), no formato "2=postgresql://...;5=postgresql://...".
+# O banco principal continua com a tabela Filiais, a fila de tarefas e o cache coerente.
+
+FILIAL_PADRAO = int(os.getenv("FILIAL_PADRAO", "1"))
+
+
+def _ler_bancos_filiais(valor: str) -> Dict[int, str]:
+    bancos = {}
+    for item in filter(None, (parte.strip() for parte in valor.split(";"))):
+        filial, _, url = item.partition("=")
+        bancos[int(filial)] = url.strip()
+    return bancos
+
+
+BANCOS_FILIAIS = _ler_bancos_filiais(os.getenv("FILIAIS_BANCOS", ""))
+
+_filial_atual: ContextVar = ContextVar("filial_atual", default=None)
+
+
+def filial_atual() -> int:
+    filial_id = _filial_atual.get()
+    return FILIAL_PADRAO if filial_id is None else filial_id
+
+def banco_da_filial(filial_id: int) -> str:
+    return BANCOS_FILIAIS.get(filial_id, DATABASE_URL)
+
+def banco_principal(filial_id: int) -> bool:
+    """A filial está no banco principal (onde ficam o ouvinte do cache e a fila de tarefas)?"""
+    return banco_da_filial(filial_id) == DATABASE_URL
+
+def filial_exclusiva(filial_id: int) -> bool:
+    """O banco da filial não guarda dados de nenhuma outra (contagens podem usar o catálogo)."""
+    url = BANCOS_FILIAIS.get(filial_id)
+    return url is not None and url != DATABASE_URL and list(BANCOS_FILIAIS.values()).count(url) == 1
+
+@contextmanager
+def usar_filial(filial_id: int):
+    """Faz com que as consultas dentro do bloco sejam da filial informada."""
+    token = _filial_atual.set(filial_id)
+    try:
+        yield filial_id
+    finally:
+        _filial_atual.reset(token)
+
+# --- Erros que viram resposta HTTP ---
+#
+# Os módulos crud_* tratam psycopg2.Error retornando None/[]; estes erros não herdam de
+# psycopg2.Error justamente para atravessar esse tratamento e chegar aos exception handlers
+# de app/main.py (503/504) em vez de virarem uma lista vazia.
+
+class BancoDadosError(Exception):
+    """Base das falhas de banco que devem virar 503/504."""
+
+class BancoIndisponivelError(BancoDadosError):
+    """Sem conexão, pool esgotado ou lock_timeout: tente de novo em instantes (503)."""
+
+    def __init__(self, mensagem: str, tentar_em_s: float = 1.0):
+        super().__init__(mensagem)
+        self.tentar_em_s = tentar_em_s
+
+    @property
+    def retry_after(self) -> str:
+        """Valor do cabeçalho Retry-After (segundos inteiros, no mínimo 1)."""
+        return str(max(1, math.ceil(self.tentar_em_s)))
+
+class ConflitoTransacaoError(BancoIndisponivelError):
+    """Deadlock ou falha de serialização: a transação inteira pode ser repetida (ver repetir_em_conflito)."""
+
+class TempoEsgotadoError(BancoDadosError):
+    """A consulta passou do statement_timeout da classe da rota (504)."""
+
+class ConsultaCanceladaError(BancoDadosError):
+    """A consulta foi cancelada porque o cliente desconectou."""
+
+class RegistroDuplicadoError(ValueError):
+    """Violação de restrição única (ex.: e-mail já cadastrado na filial); vira 400 com a mensagem."""
+
+class RegistroEmUsoError(ValueError):
+    """Exclusão barrada por chave estrangeira (ex.: serviço usado em agendamentos); vira 400 com a mensagem."""
+
+class ConflitoVersaoError(Exception):
+    """O registro mudou desde a versão informada no If-Match/campo versao (409, com a versão atual)."""
+
+    def __init__(self, versao_atual: int):
+        super().__init__(f"O registro foi alterado por outra pessoa (versão atual: {versao_atual}). "
+                         "Recarregue-o e tente de novo.")
+        self.versao_atual = versao_atual
+
+
+# --- Orçamento de tempo da requisição atual ---
+
+class OrcamentoConsulta(NamedTuple):
+    statement_timeout_ms: int
+    lock_timeout_ms: int
+
+
+class RequisicaoBanco:
+    """Estado da requisição HTTP em curso visto pelo acesso ao banco.
+
+    Guarda o orçamento de tempo aplicado em cada conexão retirada do pool e as conexões em
+    uso, para que a consulta possa ser cancelada no servidor se o cliente desconectar.
+    O scope ASGI identifica o endpoint no perfil de consultas.
+    """
+
+    def __init__(self, orcamento: Optional[OrcamentoConsulta], scope: Optional[dict] = None):
+        self.orcamento = orcamento
+        self.scope = scope
+        self.cancelada = False
+        self._conexoes = set()
+        self._lock = threading.Lock()
+
+    @property
+    def endpoint(self) -> str:
+        """"MÉTODO /rota/{param}" da rota atendida (o roteador grava a rota no próprio scope)."""
+        if self.scope is None:
+            return "-"
+        rota = self.scope.get("route")
+        caminho = getattr(rota, "path", None) or self.scope.get("path", "-")
+        return f"{self.scope.get('method', '-')} {caminho}"
+
+    def registrar(self, conn):
+        with self._lock:
+            if self.cancelada:
+                raise ConsultaCanceladaError("Requisição cancelada pelo cliente")
+            self._conexoes.add(conn)
+
+    def liberar(self, conn):
+        with self._lock:
+            self._conexoes.discard(conn)
+
+    def cancelar(self):
+        """Marca a requisição como cancelada e interrompe as consultas em andamento."""
+        with self._lock:
+            self.cancelada = True
+            # Sob o lock: uma conexão já devolvida ao pool (e talvez em uso por outra
+            # requisição) nunca é cancelada por engano.
+            for conn in self._conexoes:
+                try:
+                    conn.cancel()
+                except psycopg2.Error as e:
+                    print(f"Erro ao cancelar consulta: {e}")
+
+
+_requisicao_atual: ContextVar = ContextVar("requisicao_atual", default=None)
+
+@contextmanager
+def requisicao_banco(requisicao: RequisicaoBanco):
+    """Associa a requisição (orçamento + cancelamento) às conexões retiradas dentro do bloco."""
+    token = _requisicao_atual.set(requisicao)
+    try:
+        yield requisicao
+    finally:
+        _requisicao_atual.reset(token)
+
+def requisicao_atual() -> Optional[RequisicaoBanco]:
+    return _requisicao_atual.get()
+
+def _traduzir_erro(e: psycopg2.Error) -> Optional[BancoDadosError]:
+    requisicao = _requisicao_atual.get()
+    if isinstance(e, psycopg2.errors.QueryCanceled):
+        if requisicao is not None and requisicao.cancelada:
+            return ConsultaCanceladaError("Consulta cancelada: o cliente desconectou")
+        return TempoEsgotadoError("A consulta excedeu o tempo limite")
+    if isinstance(e, psycopg2.errors.LockNotAvailable):
+        return BancoIndisponivelError("Registro bloqueado por outra operação")
+    if isinstance(e, (psycopg2.errors.DeadlockDetected, psycopg2.errors.SerializationFailure)):
+        return ConflitoTransacaoError("Conflito com outra operação simultânea")
+    if isinstance(e, (psycopg2.OperationalError, psycopg2.InterfaceError, psycopg2.pool.PoolError)):
+        return BancoIndisponivelError("Banco de dados indisponível")
+    return None
+
+def _relancar(e: psycopg2.Error):
+    """Relança o erro como BancoDadosError quando ele tem tradução; senão, como veio."""
+    erro = _traduzir_erro(e)
+    if erro is not None:
+        raise erro from e
+    raise e
+
+def tamanho_pool() -> int:
+    """Máximo de conexões de cada pool: as vagas do controle de admissão mais a reserva."""
+    from app.core.admission import CONEXOES_ADMITIDAS
+
+    return CONEXOES_ADMITIDAS + DB_POOL_RESERVA
+
+def get_pool(url: Optional[str] = None) -> psycopg2.pool.ThreadedConnectionPool:
+    """Retorna o pool do banco (por padrão, o da filial atual), criando-o na primeira chamada."""
+    url = url or banco_da_filial(filial_atual())
+    pool = _pools.get(url)
+    if pool is None:
+        with _pool_lock:
+            pool = _pools.get(url)
+            if pool is None:
+                from app.db import profiler
+
+                kwargs = {"cursor_factory": profiler.CursorPerfilado} if profiler.PERFIL_CONSULTAS else {}
+                pool = _pools[url] = psycopg2.pool.ThreadedConnectionPool(
+                    DB_POOL_MIN, tamanho_pool(), url, connect_timeout=DB_CONNECT_TIMEOUT_S, **kwargs)
+    return pool
+
+def _nome_banco(url: str) -> str:
+    """host:porta/banco da URL, sem usuário e senha (para logs e métricas)."""
+    try:
+        dsn = psycopg2.extensions.parse_dsn(url)
+    except psycopg2.Error:
+        return "?"
+    nome = f"{dsn.get('host', 'localhost')}:{dsn.get('port', '5432')}/{dsn.get('dbname', '')}"
+    return f"{nome} ({dsn['options']})" if dsn.get("options") else nome
+
+def get_circuito(url: Optional[str] = None) -> Circuito:
+    """Circuit breaker do banco (por padrão, o da filial atual)."""
+    url = url or banco_da_filial(filial_atual())
+    circuito = _circuitos.get(url)
+    if circuito is None:
+        with _pool_lock:
+            circuito = _circuitos.setdefault(url, Circuito(_nome_banco(url)))
+    return circuito
+
+def _checkout():
+    """Retira uma conexão do pool da filial atual aplicando o orçamento da requisição, se houver.
+
+    Retorna (conexão, pool, circuito): a conexão precisa voltar ao pool de onde saiu.
+    Os limites valem só para a transação corrente (set_config com is_local), então a
+    conexão volta ao pool sem eles.
+
+    Com o circuito do banco aberto falha na hora. Uma conexão que não abre é tentada de novo
+    até RETENTATIVAS vezes, com espera aleatória crescente; uma conexão ociosa que o servidor
+    derrubou (ex.: Postgres reiniciado) é descartada e trocada por outra, quando o primeiro
+    comando (o orçamento, ou o SELECT 1 da sonda) revela isso.
+    """
+    requisicao = _requisicao_atual.get()
+    url = banco_da_filial(filial_atual())
+    circuito = get_circuito(url)
+    sonda = circuito.permitir()
+    if sonda is None:
+        raise BancoIndisponivelError("Banco de dados indisponível (muitas falhas seguidas; tente em instantes)",
+                                     circuito.tentar_em_s())
+    tentativa = descartadas = 0
+    while True:
+        try:
+            pool = get_pool(url)
+            conn = pool.getconn()
+        except psycopg2.pool.PoolError as e:
+            # Pool esgotado: o banco está no ar, não conta como falha.
+            print(f"Erro ao obter conexão do pool: {e}")
+            _relancar(e)
+        except psycopg2.Error as e:
+            print(f"Erro ao obter conexão do pool: {e}")
+            circuito.registrar_falha(e)
+            if sonda or tentativa >= RETENTATIVAS or circuito.estado != FECHADO:
+                _relancar(e)
+            circuito.registrar_retentativa()
+            time.sleep(espera_retentativa(tentativa))
+            tentativa += 1
+            continue
+
+        orcamento = requisicao.orcamento if requisicao is not None else None
+        try:
+            if requisicao is not None:
+                requisicao.registrar(conn)
+            if orcamento is not None or sonda:
+                with conn.cursor() as cursor:
+                    if orcamento is not None:
+                        cursor.execute(
+                            "SELECT set_config('statement_timeout', %s, true), set_config('lock_timeout', %s, true);",
+                            (f"{orcamento.statement_timeout_ms}ms", f"{orcamento.lock_timeout_ms}ms"),
+                        )
+                    else:
+                        cursor.execute("SELECT 1;")
+        except psycopg2.Error as e:
+            _release_connection(conn, pool)
+            if conn.closed and descartadas < tamanho_pool():
+                descartadas += 1
+                continue
+            if conn.closed:
+                circuito.registrar_falha(e)
+            _relancar(e)
+        except BancoDadosError:
+            _release_connection(conn, pool)
+            raise
+        if orcamento is not None or sonda:
+            circuito.registrar_sucesso()
+        return conn, pool, circuito
+
+def repetir_em_conflito(funcao):
+    """Repete a função inteira (uma transação) em deadlock ou falha de serialização.
+
+    O Postgres desfaz a transação que perdeu o conflito, então executá-la de novo é seguro.
+    São até RETENTATIVAS novas tentativas, com espera aleatória crescente; esgotadas, o
+    ConflitoTransacaoError vira 503. Dentro de use_cursor quem repete é o dono da transação
+    (ex.: o lote inteiro), porque a transação compartilhada já foi abortada.
+    """
+    @wraps(funcao)
+    def envolvida(*args, **kwargs):
+        tentativa = 0
+        while True:
+            try:
+                return funcao(*args, **kwargs)
+            except ConflitoTransacaoError as e:
+                if em_cursor_compartilhado() or tentativa >= RETENTATIVAS:
+                    raise
+                print(f"Conflito em {funcao.__name__} (tentativa {tentativa + 1}), repetindo: {e.__cause__ or e}")
+                get_circuito().registrar_retentativa()
+                time.sleep(espera_retentativa(tentativa))
+                tentativa += 1
+    return envolvida
+
+def _release_connection(conn, pool):
+    """Devolve a conexão ao pool, descartando-a se estiver quebrada."""
+    requisicao = _requisicao_atual.get()
+    if requisicao is not None:
+        requisicao.liberar(conn)
+    if conn.closed:
+        pool.putconn(conn, close=True)
+        return
+    try:
+        # Leituras não fazem commit; encerra a transação aberta antes de reutilizar.
+        conn.rollback()
+    except psycopg2.Error:
+        pool.putconn(conn, close=True)
+        return
+    pool.putconn(conn)
 
 @contextmanager
 def get_db_connection():
     """Fornece uma conexão gerenciada com o banco de dados PostgreSQL."""
-    conn = None
+    conn, pool, circuito = _checkout()
     try:
-        conn = psycopg2.connect(DATABASE_URL)
         yield conn
         conn.commit()
     except psycopg2.Error as e:
         print(f"Erro de conexão com o banco de dados: {e}")
-        if conn:
+        if conn and not conn.closed:
             conn.rollback()
+        elif conn:
+            circuito.registrar_falha(e)
 
-        raise
+        _relancar(e)
     finally:
         if conn:
-            conn.close()
+            _release_connection(conn, pool)
+
+@contextmanager
+def use_cursor(cursor):
+    """Faz com que as chamadas a get_db_cursor dentro do bloco reutilizem o cursor fornecido.
+
+    Quem fornece o cursor é dono da conexão: commit, rollback e fechamento ficam a cargo dele.
+    """
+    token = _cursor_atual.set(cursor)
+    try:
+        yield cursor
+    finally:
+        _cursor_atual.reset(token)
+
+def em_cursor_compartilhado() -> bool:
+    """Há um cursor de use_cursor ativo (ex.: transação de um lote de operações)?"""
+    return _cursor_atual.get() is not None
+
+def apos_commit(funcao: Callable[[], None]) -> None:
+    """Agenda funcao() para depois do commit da transação de get_db_cursor em curso.
+
+    Dentro de use_cursor vale o commit de quem abriu a transação (ex.: o lote inteiro). Se a
+    transação for desfeita, ou não houver commit, a função não é chamada. Fora de
+    get_db_cursor não há transação a esperar: a função roda na hora.
+    """
+    pendentes = _apos_commit.get()
+    if pendentes is None:
+        funcao()
+    else:
+        pendentes.append(funcao)
 
 @contextmanager
 def get_db_cursor(commit=False):
     """Fornece um cursor gerenciado e opcionalmente faz commit."""
-    conn = None
+    cursor_compartilhado = _cursor_atual.get()
+    if cursor_compartilhado is not None:
+        yield cursor_compartilhado
+        return
+
+    conn, pool, circuito = _checkout()
     cursor = None
+    pendentes: List[Callable[[], None]] = []
+    token = _apos_commit.set(pendentes)
     try:
-        conn = psycopg2.connect(DATABASE_URL)
         cursor = conn.cursor()
         yield cursor
         if commit:
             conn.commit()
     except psycopg2.Error as e:
         print(f"Erro no banco de dados: {e}")
-        if conn:
+        if conn and not conn.closed:
             conn.rollback()
-        raise
+        elif conn:
+            # A conexão caiu no meio do comando: conta para o circuito do banco.
+            circuito.registrar_falha(e)
+        _relancar(e)
     finally:
+        _apos_commit.reset(token)
         if cursor:
             cursor.close()
         if conn:
-            conn.close()
+            _release_connection(conn, pool)
+    # Só depois de devolver a conexão: quem foi agendado não a segura.
+    if commit:
+        for funcao in pendentes:
+            funcao()
+
+def aquecer_pool(aquecer_conexao) -> int:
+    """Cria o pool do banco principal e executa aquecer_conexao(cursor) em cada uma das DB_POOL_MIN conexões.
+
+    As conexões são retiradas todas ao mesmo tempo para garantir que cada uma seja aquecida.
+    Retorna quantas foram aquecidas.
+    """
+    pool = get_pool(DATABASE_URL)
+    conexoes = []
+    try:
+        for _ in range(DB_POOL_MIN):
+            conexoes.append(pool.getconn())
+        for conn in conexoes:
+            with conn.cursor() as cursor, use_cursor(cursor):
+                aquecer_conexao(cursor)
+    finally:
+        for conn in conexoes:
+            _release_connection(conn, pool)
+    return len(conexoes)
+
+def medir_latencia() -> float:
+    """Tempo (ms) de um SELECT 1 usando uma conexão do pool."""
+    inicio = time.perf_counter()
+    with get_db_cursor() as cursor:
+        cursor.execute("SELECT 1;")
+        cursor.fetchone()
+    return (time.perf_counter() - inicio) * 1000
+
+def circuitos_status() -> dict:
+    """Estado do circuit breaker de cada banco já usado pelo processo."""
+    return {circuito.nome: circuito.metricas() for circuito in list(_circuitos.values())}
+
+def pool_status() -> dict:
+    """Conexões do pool principal em uso e ociosas (None se o pool ainda não foi criado)."""
+    pool = _pools.get(DATABASE_URL)
+    if pool is None:
+        return None
+    return {
+        "min": DB_POOL_MIN, "max": tamanho_pool(), "reserva": DB_POOL_RESERVA, "em_uso": len(pool._used), "ociosas": len(pool._pool),
+        "bancos": len(_pools),
+    }
 
 #TESTAR CONEXÃO COM O BANCO
 def test_connection():
@@ -0,0 +1,381 @@
+import bisect
+import threading
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from decimal import Decimal
+from typing import Any, Callable, Dict, Iterator, List, NamedTuple, Optional, Sequence, Tuple
+
+# --- Banco em memória (ARMAZENAMENTO=memoria) ---
+#
+# Tabelas em dicionários, com os índices de que os crud em memória precisam: restrições
+# únicas, colunas de chave estrangeira e uma ordem por filial (nome, data...) mantida em
+# listas ordenadas com bisect, para paginar sem ordenar a tabela a cada listagem.
+# As restrições do modelo_fisico.sql são conferidas em cada escrita (NOT NULL, CHECK,
+# UNIQUE e FOREIGN KEY, com CASCADE / SET NULL / RESTRICT na exclusão) e falham com
+# ViolacaoRestricao, que traz o mesmo pgcode que o Postgres daria.
+#
+# Uma trava única serializa leituras e escritas. transacao() guarda como desfazer cada
+# alteração: se o bloco falhar, tudo volta (rollback); blocos aninhados funcionam como
+# savepoints. Os seriais, como as sequences do Postgres, não voltam.
+
+PG_NOT_NULL = "23502"
+PG_FOREIGN_KEY = "23503"
+PG_UNIQUE = "23505"
+PG_CHECK = "23514"
+
+RESTRICT = "restrict"
+CASCADE = "cascade"
+SET_NULL = "set null"
+
+STATUS_AGENDAMENTO = ("Agendado", "Confirmado", "Cancelado", "Concluído", "Não Compareceu")
+
+
+class ViolacaoRestricao(Exception):
+    """Escrita recusada por uma restrição; pgcode é o código de erro equivalente do Postgres."""
+
+    def __init__(self, pgcode: str, restricao: str, mensagem: str):
+        super().__init__(mensagem)
+        self.pgcode = pgcode
+        self.restricao = restricao
+
+
+class Unica(NamedTuple):
+    nome: str
+    colunas: Tuple[str, ...]
+
+
+class Checagem(NamedTuple):
+    nome: str
+    valida: Callable[[dict], bool]
+
+
+class ChaveEstrangeira(NamedTuple):
+    nome: str
+    coluna: str
+    referencia: str
+    ao_excluir: str = RESTRICT
+
+
+def timestamptz(valor: Optional[datetime]) -> Optional[datetime]:
+    """Data/hora em UTC, como o Postgres devolve (TimeZone padrão da sessão); sem fuso vale como UTC."""
+    if valor is None:
+        return None
+    if valor.tzinfo is None:
+        return valor.replace(tzinfo=timezone.utc)
+    return valor.astimezone(timezone.utc)
+
+
+def numeric(valor, casas: int = 2) -> Optional[Decimal]:
+    """Valor arredondado como numa coluna DECIMAL(p, casas)."""
+    if valor is None:
+        return None
+    return Decimal(valor).quantize(Decimal(1).scaleb(-casas))
+
+
+def _agora() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+class Tabela:
+    """Linhas (dicts) por chave primária, com os índices usados pelos crud em memória.
+
+    Com serial, a chave é uma coluna inteira preenchida na inserção; sem ele, a chave é a
+    tupla das colunas de chave (ex.: Agendamento_Servicos).
+    """
+
+    def __init__(self, nome: str, chave: Sequence[str], colunas: Sequence[str], serial: bool = True,
+                 padroes: Optional[Dict[str, Callable[[], Any]]] = None, obrigatorias: Sequence[str] = (),
+                 unicas: Sequence[Unica] = (), checagens: Sequence[Checagem] = (),
+                 estrangeiras: Sequence[ChaveEstrangeira] = (), ordem: Optional[Sequence[str]] = None):
+        self.nome = nome
+        self.chave = tuple(chave)
+        self.colunas = tuple(colunas)
+        self.serial = serial
+        self.padroes = padroes or {}
+        self.obrigatorias = tuple(obrigatorias)
+        self.unicas = tuple(unicas)
+        self.checagens = tuple(checagens)
+        self.estrangeiras = tuple(estrangeiras)
+        self.ordem = tuple(ordem) if ordem else None
+        self.linhas: Dict[Any, dict] = {}
+        self._proximo_id = 1
+        self._unicas: Dict[str, Dict[tuple, Any]] = {unica.nome: {} for unica in self.unicas}
+        indexadas = {fk.coluna for fk in self.estrangeiras} | set(self.chave if not serial else ())
+        if "filial_id" in self.colunas:
+            indexadas.add("filial_id")
+        self._por_coluna: Dict[str, Dict[Any, set]] = {coluna: {} for coluna in indexadas}
+        self._ordenadas: Dict[Any, List[tuple]] = {}
+
+    def chave_de(self, linha: dict):
+        if len(self.chave) == 1:
+            return linha[self.chave[0]]
+        return tuple(linha[coluna] for coluna in self.chave)
+
+    def nova_linha(self, valores: Dict[str, Any]) -> dict:
+        desconhecidas = set(valores) - set(self.colunas)
+        if desconhecidas:
+            raise KeyError(f"Colunas inexistentes em {self.nome}: {', '.join(sorted(desconhecidas))}")
+        linha = {coluna: valores[coluna] if coluna in valores else self.padroes.get(coluna, lambda: None)()
+                 for coluna in self.colunas}
+        if self.serial and linha[self.chave[0]] is None:
+            linha[self.chave[0]] = self._proximo_id
+        if self.serial:
+            self._proximo_id = max(self._proximo_id, linha[self.chave[0]] + 1)
+        return linha
+
+    # Leituras (as linhas devolvidas não devem ser alteradas por quem as recebe).
+
+    def obter(self, chave) -> Optional[dict]:
+        return self.linhas.get(chave)
+
+    def obter_unica(self, nome_unica: str, *valores) -> Optional[dict]:
+        chave = self._unicas[nome_unica].get(tuple(valores))
+        return None if chave is None else self.linhas[chave]
+
+    def onde(self, coluna: str, valor) -> List[dict]:
+        """Linhas com coluna = valor, por uma coluna indexada (chave estrangeira ou filial)."""
+        return [self.linhas[chave] for chave in self._por_coluna[coluna].get(valor, ())]
+
+    def contar(self, coluna: str, valor) -> int:
+        return len(self._por_coluna[coluna].get(valor, ()))
+
+    def ordenadas(self, filial_id, decrescente: bool = False, minimo=None, maximo=None) -> Iterator[dict]:
+        """Linhas da filial na ordem da tabela (ex.: por nome), sem ordenar a cada chamada.
+
+        minimo/maximo limitam (inclusive) a primeira coluna da ordem, por busca binária.
+        """
+        entradas = self._ordenadas.get(filial_id, [])
+        inicio = 0 if minimo is None else bisect.bisect_left(entradas, minimo, key=lambda entrada: entrada[0])
+        fim = len(entradas) if maximo is None else bisect.bisect_right(entradas, maximo, key=lambda entrada: entrada[0])
+        faixa = range(fim - 1, inicio - 1, -1) if decrescente else range(inicio, fim)
+        for posicao in faixa:
+            yield self.linhas[entradas[posicao][-1]]
+
+    # Manutenção dos índices (usada pelo BancoMemoria, que confere as restrições antes).
+
+    def _limpar(self) -> None:
+        self.linhas.clear()
+        self._proximo_id = 1
+        for indice in (*self._unicas.values(), *self._por_coluna.values(), self._ordenadas):
+            indice.clear()
+
+    def _entrada_ordem(self, linha: dict) -> tuple:
+        return (*(linha[coluna] for coluna in self.ordem), self.chave_de(linha))
+
+    def _incluir(self, linha: dict) -> None:
+        chave = self.chave_de(linha)
+        self.linhas[chave] = linha
+        for unica in self.unicas:
+            valores = tuple(linha[coluna] for coluna in unica.colunas)
+            if None not in valores:
+                self._unicas[unica.nome][valores] = chave
+        for coluna, indice in self._por_coluna.items():
+            indice.setdefault(linha[coluna], set()).add(chave)
+        if self.ordem:
+            bisect.insort(self._ordenadas.setdefault(linha["filial_id"], []), self._entrada_ordem(linha))
+
+    def _remover(self, linha: dict) -> None:
+        chave = self.chave_de(linha)
+        del self.linhas[chave]
+        for unica in self.unicas:
+            valores = tuple(linha[coluna] for coluna in unica.colunas)
+            if self._unicas[unica.nome].get(valores) == chave:
+                del self._unicas[unica.nome][valores]
+        for coluna, indice in self._por_coluna.items():
+            chaves = indice[linha[coluna]]
+            chaves.discard(chave)
+            if not chaves:
+                del indice[linha[coluna]]
+        if self.ordem:
+            entradas = self._ordenadas[linha["filial_id"]]
+            del entradas[bisect.bisect_left(entradas, self._entrada_ordem(linha))]
+
+
+class BancoMemoria:
+    """Conjunto de tabelas com restrições entre elas e transações com rollback."""
+
+    def __init__(self, tabelas: Sequence[Tabela] = ()):
+        self.tabelas: Dict[str, Tabela] = {}
+        self._referencias: Dict[str, List[Tuple[Tabela, ChaveEstrangeira]]] = {}
+        self._trava = threading.RLock()
+        self._local = threading.local()
+        for tabela in tabelas:
+            self.criar_tabela(tabela)
+
+    def criar_tabela(self, tabela: Tabela) -> None:
+        self.tabelas[tabela.nome] = tabela
+        self._referencias.setdefault(tabela.nome, [])
+        for fk in tabela.estrangeiras:
+            self._referencias.setdefault(fk.referencia, []).append((tabela, fk))
+
+    def __getitem__(self, nome: str) -> Tabela:
+        return self.tabelas[nome]
+
+    @contextmanager
+    def transacao(self):
+        """Bloco atômico: uma exceção desfaz o que foi alterado dentro dele e é relançada."""
+        with self._trava:
+            desfazer = getattr(self._local, "desfazer", None)
+            externa = desfazer is None
+            if externa:
+                desfazer = self._local.desfazer = []
+            inicio = len(desfazer)
+            try:
+                yield
+            except BaseException:
+                while len(desfazer) > inicio:
+                    desfazer.pop()()
+                raise
+            finally:
+                if externa:
+                    self._local.desfazer = None
+
+    @contextmanager
+    def leitura(self):
+        """Leitura consistente: espera as escritas em andamento terminarem."""
+        with self._trava:
+            yield
+
+    def limpar(self) -> None:
+        """Apaga todas as linhas e reinicia os seriais."""
+        with self._trava:
+            for tabela in self.tabelas.values():
+                tabela._limpar()
+
+    def _registrar(self, desfazer: Callable[[], None]) -> None:
+        self._local.desfazer.append(desfazer)
+
+    def _validar(self, tabela: Tabela, linha: dict, anterior: Optional[dict]) -> None:
+        for coluna in tabela.obrigatorias:
+            if linha[coluna] is None:
+                raise ViolacaoRestricao(PG_NOT_NULL, coluna,
+                                        f'null value in column "{coluna}" of relation "{tabela.nome}" violates not-null constraint')
+        for checagem in tabela.checagens:
+            if not checagem.valida(linha):
+                raise ViolacaoRestricao(PG_CHECK, checagem.nome,
+                                        f'new row for relation "{tabela.nome}" violates check constraint "{checagem.nome}"')
+        chave = tabela.chave_de(linha)
+        if anterior is None and chave in tabela.linhas:
+            raise ViolacaoRestricao(PG_UNIQUE, f"{tabela.nome}_pkey",
+                                    f'duplicate key value violates unique constraint "{tabela.nome}_pkey"')
+        for unica in tabela.unicas:
+            valores = tuple(linha[coluna] for coluna in unica.colunas)
+            existente = tabela._unicas[unica.nome].get(valores)
+            if None not in valores and existente is not None and existente != chave:
+                raise ViolacaoRestricao(PG_UNIQUE, unica.nome,
+                                        f'duplicate key value violates unique constraint "{unica.nome}"')
+        for fk in tabela.estrangeiras:
+            valor = linha[fk.coluna]
+            if valor is not None and (anterior is None or anterior[fk.coluna] != valor) \
+                    and self.tabelas[fk.referencia].obter(valor) is None:
+                raise ViolacaoRestricao(PG_FOREIGN_KEY, fk.nome,
+                                        f'insert or update on table "{tabela.nome}" violates foreign key constraint "{fk.nome}"')
+
+    def inserir(self, nome: str, valores: Dict[str, Any]) -> dict:
+        with self.transacao():
+            tabela = self.tabelas[nome]
+            linha = tabela.nova_linha(valores)
+            self._validar(tabela, linha, None)
+            tabela._incluir(linha)
+            self._registrar(lambda: tabela._remover(linha))
+            return linha
+
+    def atualizar(self, nome: str, chave, valores: Dict[str, Any]) -> Optional[dict]:
+        """Atualiza as colunas da linha; retorna a linha nova, ou None se a chave não existir."""
+        with self.transacao():
+            tabela = self.tabelas[nome]
+            atual = tabela.obter(chave)
+            if atual is None:
+                return None
+            nova = {**atual, **valores}
+            self._validar(tabela, nova, atual)
+            tabela._remover(atual)
+            tabela._incluir(nova)
+
+            def desfazer():
+                tabela._remover(nova)
+                tabela._incluir(atual)
+            self._registrar(desfazer)
+            return nova
+
+    def excluir(self, nome: str, chave) -> Optional[dict]:
+        """Exclui a linha aplicando as ações das chaves estrangeiras; retorna a linha excluída."""
+        with self.transacao():
+            tabela = self.tabelas[nome]
+            linha = tabela.obter(chave)
+            if linha is None:
+                return None
+            for dependente, fk in self._referencias[nome]:
+                filhas = dependente.onde(fk.coluna, chave)
+                if filhas and fk.ao_excluir == RESTRICT:
+                    raise ViolacaoRestricao(PG_FOREIGN_KEY, fk.nome,
+                                            f'update or delete on table "{nome}" violates foreign key constraint '
+                                            f'"{fk.nome}" on table "{dependente.nome}"')
+                for filha in filhas:
+                    if fk.ao_excluir == CASCADE:
+                        self.excluir(dependente.nome, dependente.chave_de(filha))
+                    else:
+                        self.atualizar(dependente.nome, dependente.chave_de(filha), {fk.coluna: None})
+            tabela._remover(linha)
+            self._registrar(lambda: tabela._incluir(linha))
+            return linha
+
+
+def _fk_filial(nome: str) -> ChaveEstrangeira:
+    return ChaveEstrangeira(nome, "filial_id", "Filiais")
+
+
+def popular_inicial(banco: BancoMemoria) -> None:
+    """Linhas que o modelo_fisico.sql já insere (a filial Matriz)."""
+    banco.inserir("Filiais", {"nome": "Matriz"})
+
+
+def criar_banco_petshop() -> BancoMemoria:
+    """Tabelas e restrições do modelo_fisico.sql (sem Tarefas e Auditoria, que só existem no Postgres)."""
+    banco = BancoMemoria([
+        Tabela("Filiais", ("filial_id",), ("filial_id", "nome", "data_cadastro"),
+               padroes={"data_cadastro": _agora}, obrigatorias=("nome",),
+               unicas=[Unica("filiais_nome_key", ("nome",))]),
+        Tabela("Clientes", ("cliente_id",),
+               ("cliente_id", "filial_id", "nome", "telefone", "email", "endereco", "data_cadastro", "versao"),
+               padroes={"filial_id": lambda: 1, "data_cadastro": _agora, "versao": lambda: 1},
+               obrigatorias=("filial_id", "nome", "telefone", "email"),
+               unicas=[Unica("uq_clientes_filial_email", ("filial_id", "email"))],
+               estrangeiras=[_fk_filial("fk_clientes_filial")], ordem=("nome",)),
+        Tabela("Funcionarios", ("funcionario_id",),
+               ("funcionario_id", "filial_id", "nome", "cargo", "telefone", "email", "data_contratacao", "ativo", "versao"),
+               padroes={"filial_id": lambda: 1, "ativo": lambda: True, "versao": lambda: 1},
+               obrigatorias=("filial_id", "nome", "cargo", "data_contratacao"),
+               unicas=[Unica("uq_funcionarios_filial_email", ("filial_id", "email"))],
+               estrangeiras=[_fk_filial("fk_funcionarios_filial")], ordem=("nome",)),
+        Tabela("Servicos", ("servico_id",),
+               ("servico_id", "filial_id", "nome", "descricao", "preco", "duracao_estimada_minutos", "versao"),
+               padroes={"filial_id": lambda: 1, "versao": lambda: 1},
+               obrigatorias=("filial_id", "nome", "preco", "duracao_estimada_minutos"),
+               unicas=[Unica("uq_servicos_filial_nome", ("filial_id", "nome"))],
+               checagens=[Checagem("servicos_preco_check", lambda l: l["preco"] >= 0),
+                          Checagem("servicos_duracao_estimada_minutos_check", lambda l: l["duracao_estimada_minutos"] > 0)],
+               estrangeiras=[_fk_filial("fk_servicos_filial")], ordem=("nome",)),
+        Tabela("Animais", ("animal_id",),
+               ("animal_id", "filial_id", "cliente_id", "nome", "especie", "raca", "data_nascimento", "observacoes", "versao"),
+               padroes={"filial_id": lambda: 1, "versao": lambda: 1},
+               obrigatorias=("filial_id", "cliente_id", "nome", "especie"),
+               estrangeiras=[ChaveEstrangeira("fk_cliente", "cliente_id", "Clientes", CASCADE),
+                             _fk_filial("fk_animais_filial")], ordem=("nome",)),
+        Tabela("Agendamentos", ("agendamento_id",),
+               ("agendamento_id", "filial_id", "animal_id", "funcionario_id", "data_hora_agendamento",
+                "data_hora_criacao", "status", "observacoes", "versao"),
+               padroes={"filial_id": lambda: 1, "data_hora_criacao": _agora, "versao": lambda: 1},
+               obrigatorias=("filial_id", "animal_id", "data_hora_agendamento", "status"),
+               checagens=[Checagem("agendamentos_status_check", lambda l: l["status"] in STATUS_AGENDAMENTO)],
+               estrangeiras=[ChaveEstrangeira("fk_animal", "animal_id", "Animais", CASCADE),
+                             ChaveEstrangeira("fk_funcionario", "funcionario_id", "Funcionarios", SET_NULL),
+                             _fk_filial("fk_agendamentos_filial")], ordem=("data_hora_agendamento",)),
+        Tabela("Agendamento_Servicos", ("agendamento_id", "servico_id"),
+               ("agendamento_id", "servico_id", "preco_registrado", "observacoes"), serial=False,
+               obrigatorias=("agendamento_id", "servico_id", "preco_registrado"),
+               estrangeiras=[ChaveEstrangeira("fk_agendamento", "agendamento_id", "Agendamentos", CASCADE),
+                             ChaveEstrangeira("fk_servico", "servico_id", "Servicos", RESTRICT)]),
+    ])
+    popular_inicial(banco)
+    return banco
@@ -0,0 +1,278 @@
+import hashlib
+import os
+import re
+import threading
+import time
+from collections import deque
+from contextvars import ContextVar
+from functools import lru_cache
+from typing import Dict, Optional, Tuple
+
+import psycopg2
+import psycopg2.extensions
+from psycopg2.extras import execute_values
+
+# --- Perfil de consultas por fingerprint ---
+#
+# As conexões do pool usam CursorPerfilado: cada execute() é cronometrado e agregado pelo
+# fingerprint do SQL (texto normalizado, sem literais) e pelo endpoint que o disparou.
+# O custo por consulta é um perf_counter, a normalização memorizada do texto (o SQL dos
+# crud_* é um template com %s, então se repete) e um update de dicionário sob lock.
+# execute_values() manda o SQL com todas as linhas inline, um texto novo a cada lote:
+# chamado por executar_valores(), ele é agrupado pelo template. Textos acima de
+# LIMITE_CACHE_SQL (de outras origens) são normalizados sem passar pelo cache.
+# Consultas acima de SLOW_QUERY_MS são registradas com o EXPLAIN, no máximo uma vez por
+# fingerprint a cada INTERVALO_EXPLAIN_S.
+
+PERFIL_CONSULTAS = os.getenv("PERFIL_CONSULTAS", "1") not in ("0", "false", "False")
+SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS", "500"))
+INTERVALO_EXPLAIN_S = float(os.getenv("SLOW_QUERY_INTERVALO_EXPLAIN_S", "60"))
+MAX_FINGERPRINTS = 2000
+MAX_LENTAS = 100
+LIMITE_CACHE_SQL = 4000
+
+FORA_DE_REQUISICAO = "(fora de requisição)"
+
+_RE_STRING = re.compile(r"'(?:[^']|'')*'")
+_RE_NUMERO = re.compile(r"\b\d+(?:\.\d+)?\b")
+_RE_CAST = re.compile(r"\?::\w+(?:\[\])?")
+_RE_CONSTANTE = re.compile(r"(?<=[(,])\s*(?:null|true|false)\b(?=\s*[,)])", re.IGNORECASE)
+_RE_LISTA = re.compile(r"\?(?:\s*,\s*\?)+")
+_RE_LINHAS = re.compile(r"\(\?\)(?:\s*,\s*\(\?\))+")
+_RE_ESPACOS = re.compile(r"\s+")
+_RE_EXPLICAVEL = re.compile(r"^\s*(select|with|insert|update|delete)\b", re.IGNORECASE)
+
+
+# Template da chamada de executar_valores() em curso (o SQL executado traz as linhas inline).
+_template_atual: ContextVar = ContextVar("template_atual", default=None)
+
+
+def _normalizar(sql: str) -> Tuple[str, str]:
+    texto = _RE_STRING.sub("?", sql)
+    texto = texto.replace("%s", "?")
+    texto = re.sub(r"%\(\w+\)s", "?", texto)
+    texto = _RE_NUMERO.sub("?", texto)
+    texto = _RE_CAST.sub("?", texto)
+    texto = _RE_CONSTANTE.sub("?", texto)
+    texto = _RE_LISTA.sub("?", texto)
+    texto = _RE_LINHAS.sub("(?)", texto)
+    texto = _RE_ESPACOS.sub(" ", texto).strip().rstrip(";").strip()
+    return hashlib.sha1(texto.lower().encode()).hexdigest()[:12], texto
+
+
+_normalizar_em_cache = lru_cache(maxsize=4096)(_normalizar)
+
+
+def normalizar(sql: str) -> Tuple[str, str]:
+    """Retorna (fingerprint, SQL normalizado): literais e placeholders viram "?", listas
+    "?, ?, ?" viram um único "?" e linhas "(?), (?)" uma única "(?)", para que IN (...) e
+    VALUES de tamanhos diferentes agrupem juntos. Só textos curtos ficam no cache."""
+    if len(sql) > LIMITE_CACHE_SQL:
+        return _normalizar(sql)
+    return _normalizar_em_cache(sql)
+
+
+def executar_valores(cursor, sql: str, linhas, **kwargs):
+    """execute_values() com o perfil agrupando as páginas pelo template sql."""
+    token = _template_atual.set(sql)
+    try:
+        return execute_values(cursor, sql, linhas, **kwargs)
+    finally:
+        _template_atual.reset(token)
+
+
+class Estatistica:
+    __slots__ = ("chamadas", "erros", "total_ms", "max_ms", "linhas")
+
+    def __init__(self):
+        self.chamadas = 0
+        self.erros = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.linhas = 0
+
+    def registrar(self, duracao_ms: float, linhas: int, erro: bool):
+        self.chamadas += 1
+        self.total_ms += duracao_ms
+        if duracao_ms > self.max_ms:
+            self.max_ms = duracao_ms
+        if erro:
+            self.erros += 1
+        elif linhas > 0:
+            self.linhas += linhas
+
+    def como_dict(self) -> dict:
+        return {
+            "chamadas": self.chamadas,
+            "erros": self.erros,
+            "total_ms": round(self.total_ms, 2),
+            "media_ms": round(self.total_ms / self.chamadas, 3) if self.chamadas else 0.0,
+            "max_ms": round(self.max_ms, 2),
+            "linhas": self.linhas,
+            "linhas_por_chamada": round(self.linhas / self.chamadas, 1) if self.chamadas else 0.0,
+        }
+
+
+class PerfilConsultas:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._sql: Dict[str, str] = {}
+        self._por_fingerprint: Dict[str, Estatistica] = {}
+        self._por_endpoint: Dict[Tuple[str, str], Estatistica] = {}
+        self._ultimo_explain: Dict[str, float] = {}
+        self.lentas: deque = deque(maxlen=MAX_LENTAS)
+        self.iniciado_em = time.time()
+
+    def registrar(self, sql: str, duracao_ms: float, linhas: int, erro: bool, endpoint: str) -> str:
+        fingerprint, normalizado = normalizar(sql)
+        with self._lock:
+            estatistica = self._por_fingerprint.get(fingerprint)
+            if estatistica is None:
+                if len(self._por_fingerprint) >= MAX_FINGERPRINTS:
+                    fingerprint, normalizado = "outros", "(fingerprints acima do limite)"
+                    estatistica = self._por_fingerprint.setdefault(fingerprint, Estatistica())
+                else:
+                    estatistica = self._por_fingerprint[fingerprint] = Estatistica()
+                self._sql.setdefault(fingerprint, normalizado)
+            estatistica.registrar(duracao_ms, linhas, erro)
+            chave = (endpoint, fingerprint)
+            por_endpoint = self._por_endpoint.get(chave)
+            if por_endpoint is None:
+                por_endpoint = self._por_endpoint[chave] = Estatistica()
+            por_endpoint.registrar(duracao_ms, linhas, erro)
+        return fingerprint
+
+    def deve_explicar(self, fingerprint: str) -> bool:
+        agora = time.monotonic()
+        with self._lock:
+            if agora - self._ultimo_explain.get(fingerprint, -INTERVALO_EXPLAIN_S) < INTERVALO_EXPLAIN_S:
+                return False
+            self._ultimo_explain[fingerprint] = agora
+            return True
+
+    def registrar_lenta(self, entrada: dict):
+        with self._lock:
+            self.lentas.append(entrada)
+
+    def relatorio(self, ordenar: str = "total_ms", limite: int = 20, por_endpoint: bool = False) -> dict:
+        with self._lock:
+            consultas = [
+                {"fingerprint": fp, "sql": self._sql.get(fp), **estatistica.como_dict()}
+                for fp, estatistica in self._por_fingerprint.items()
+            ]
+            endpoints = [
+                {"endpoint": endpoint, "fingerprint": fp, "sql": self._sql.get(fp), **estatistica.como_dict()}
+                for (endpoint, fp), estatistica in self._por_endpoint.items()
+            ] if por_endpoint else None
+            lentas = list(self.lentas)
+        consultas.sort(key=lambda c: c[ordenar], reverse=True)
+        resultado = {
+            "habilitado": PERFIL_CONSULTAS,
+            "desde": self.iniciado_em,
+            "limite_lenta_ms": SLOW_QUERY_MS,
+            "fingerprints": len(consultas),
+            "consultas": consultas[:limite],
+            "lentas": lentas[-limite:],
+        }
+        if endpoints is not None:
+            endpoints.sort(key=lambda c: c[ordenar], reverse=True)
+            resultado["por_endpoint"] = endpoints[:limite]
+        return resultado
+
+    def reset(self):
+        with self._lock:
+            self._sql.clear()
+            self._por_fingerprint.clear()
+            self._por_endpoint.clear()
+            self._ultimo_explain.clear()
+            self.lentas.clear()
+            self.iniciado_em = time.time()
+
+
+perfil = PerfilConsultas()
+
+
+def _endpoint_atual() -> str:
+    from app.db.database import requisicao_atual
+
+    requisicao = requisicao_atual()
+    if requisicao is None:
+        return FORA_DE_REQUISICAO
+    return requisicao.endpoint
+
+
+def _explain(cursor, sql_executado: str) -> Optional[str]:
+    """EXPLAIN (sem ANALYZE) num cursor separado da mesma conexão, dentro de um savepoint
+    para não abortar a transação de quem chamou se algo der errado."""
+    if not _RE_EXPLICAVEL.match(sql_executado):
+        return None
+    conn = cursor.connection
+    if conn.autocommit:
+        return None
+    explain = conn.cursor(cursor_factory=psycopg2.extensions.cursor)
+    try:
+        explain.execute("SAVEPOINT perfil_explain;")
+        try:
+            explain.execute("EXPLAIN " + sql_executado)
+            plano = "\n".join(row[0] for row in explain.fetchall())
+            explain.execute("RELEASE SAVEPOINT perfil_explain;")
+            return plano
+        except psycopg2.Error as e:
+            explain.execute("ROLLBACK TO SAVEPOINT perfil_explain;")
+            return f"(EXPLAIN falhou: {e})"
+    except psycopg2.Error:
+        return None
+    finally:
+        explain.close()
+
+
+class CursorPerfilado(psycopg2.extensions.cursor):
+    """Cursor que cronometra execute/executemany/copy_expert e alimenta o perfil."""
+
+    def _medir(self, sql, executar):
+        inicio = time.perf_counter()
+        erro = False
+        try:
+            return executar()
+        except Exception:
+            erro = True
+            raise
+        finally:
+            duracao_ms = (time.perf_counter() - inicio) * 1000
+            texto = _template_atual.get() or (sql.decode() if isinstance(sql, bytes) else str(sql))
+            endpoint = _endpoint_atual()
+            fingerprint = perfil.registrar(texto, duracao_ms, self.rowcount, erro, endpoint)
+            if duracao_ms >= SLOW_QUERY_MS and not erro:
+                self._registrar_lenta(fingerprint, texto, duracao_ms, endpoint)
+
+    def _registrar_lenta(self, fingerprint: str, texto: str, duracao_ms: float, endpoint: str):
+        executado = self.query.decode(errors="replace") if isinstance(self.query, bytes) else texto
+        plano = _explain(self, executado) if perfil.deve_explicar(fingerprint) else None
+        print(f"Consulta lenta ({duracao_ms:.0f} ms) em {endpoint} [{fingerprint}]: {' '.join(executado.split())}")
+        if plano:
+            print(plano)
+        perfil.registrar_lenta({
+            "quando": time.time(),
+            "endpoint": endpoint,
+            "fingerprint": fingerprint,
+            "duracao_ms": round(duracao_ms, 2),
+            "sql": " ".join(executado.split())[:2000],
+            "explain": plano,
+        })
+
+    def execute(self, query, vars=None):
+        return self._medir(query, lambda: super(CursorPerfilado, self).execute(query, vars))
+
+    def executemany(self, query, vars_list):
+        return self._medir(query, lambda: super(CursorPerfilado, self).executemany(query, vars_list))
+
+    def copy_expert(self, sql, file, size=8192):
+        return self._medir(sql, lambda: super(CursorPerfilado, self).copy_expert(sql, file, size))
+
+
+def relatorio(ordenar: str = "total_ms", limite: int = 20, por_endpoint: bool = False) -> dict:
+    return perfil.relatorio(ordenar, limite, por_endpoint)
+
+
+def reset() -> None:
+    perfil.reset()
@@ -0,0 +1,67 @@
+from typing import Dict, List, NamedTuple, Sequence
+
+from app.db.profiler import executar_valores
+
+# --- Upsert em lote por chave única ---
+#
+# Cada página de linhas vira um único INSERT ... VALUES (...), (...) ON CONFLICT DO UPDATE.
+# O UPDATE só acontece quando algum valor mudou (IS DISTINCT FROM), então linhas iguais às
+# do banco não geram versões novas (nem somam a coluna versao) nem avisos de invalidação.
+# RETURNING traz só as linhas inseridas ou alteradas; (xmax = 0) distingue as inseridas. Os
+# IDs das inalteradas saem de uma consulta pela chave, no mesmo cursor.
+
+TAMANHO_PAGINA = 1000
+
+
+class ResultadoUpsert(NamedTuple):
+    inseridos: List[int]
+    atualizados: List[int]
+    ids: Dict[str, int]  # chave -> ID, de todas as linhas do lote
+    duplicados: int = 0  # linhas do lote com a chave de uma linha seguinte (descartadas)
+
+    @property
+    def inalterados(self) -> int:
+        return len(self.ids) - len(self.inseridos) - len(self.atualizados)
+
+
+def upsert_em_lote(cursor, tabela: str, coluna_id: str, colunas: Sequence[str], chave: Sequence[str],
+                   atualizaveis: Sequence[str], linhas: Sequence[tuple]) -> ResultadoUpsert:
+    """Insere ou atualiza as linhas (tuplas na ordem de colunas) pela restrição única em chave.
+
+    A última coluna da chave identifica a linha no resultado (ex.: o e-mail, com a filial
+    fixa no lote). Linhas repetidas no lote valem pela última ocorrência (as anteriores
+    contam em duplicados): o Postgres não aceita atualizar a mesma linha duas vezes no
+    mesmo comando.
+    """
+    posicoes_chave = [colunas.index(coluna) for coluna in chave]
+    unicas = {tuple(linha[p] for p in posicoes_chave): linha for linha in linhas}
+
+    set_sql = "".join(f"{coluna} = EXCLUDED.{coluna}, " for coluna in atualizaveis) + "versao = t.versao + 1"
+    atual = ", ".join(f"t.{coluna}" for coluna in atualizaveis)
+    novo = ", ".join(f"EXCLUDED.{coluna}" for coluna in atualizaveis)
+    sql = f"""
+        INSERT INTO {tabela} AS t ({', '.join(colunas)})
+        VALUES %s
+        ON CONFLICT ({', '.join(chave)}) DO UPDATE
+        SET {set_sql}
+        WHERE ({atual}) IS DISTINCT FROM ({novo})
+        RETURNING t.{coluna_id}, t.{chave[-1]}, (t.xmax = 0) AS inserido
+    """
+    retornadas = executar_valores(cursor, sql, list(unicas.values()), page_size=TAMANHO_PAGINA, fetch=True)
+
+    inseridos, atualizados, ids = [], [], {}
+    for entidade_id, valor_chave, inserido in retornadas:
+        (inseridos if inserido else atualizados).append(entidade_id)
+        ids[valor_chave] = entidade_id
+
+    faltantes = [chave_linha for chave_linha in unicas if chave_linha[-1] not in ids]
+    if faltantes:
+        filtro = " AND ".join(f"{coluna} = %s" for coluna in chave[:-1])
+        valores_fixos = list(faltantes[0][:-1])
+        cursor.execute(
+            f"SELECT {coluna_id}, {chave[-1]} FROM {tabela} "
+            f"WHERE {filtro + ' AND ' if filtro else ''}{chave[-1]} = ANY(%s);",
+            (*valores_fixos, [chave_linha[-1] for chave_linha in faltantes]),
+        )
+        ids.update({valor_chave: entidade_id for entidade_id, valor_chave in cursor.fetchall()})
+    return ResultadoUpsert(inseridos, atualizados, ids, len(linhas) - len(unicas))
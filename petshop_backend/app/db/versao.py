@@ -0,0 +1,72 @@
+from typing import Iterable, Optional, Sequence
+
+from app.db.database import ConflitoVersaoError
+
+# --- Controle de concorrência otimista (coluna versao) ---
+#
+# Clientes, Animais, Funcionarios, Servicos e Agendamentos têm uma versão, somada a cada
+# alteração. O PUT pode informar a versão que foi editada (header If-Match ou campo versao):
+# a alteração só é aplicada se ela ainda for a do banco; se não, responde 409 em vez de
+# sobrescrever a alteração de outra pessoa.
+#
+# Um único comando faz tudo: uma CTE lê e trava (FOR UPDATE) a linha, com os valores
+# anteriores dos campos alterados (auditoria), o UPDATE só acontece na versão esperada e o
+# SELECT final devolve a versão encontrada mesmo quando nada foi alterado. Nenhuma linha
+# quer dizer que o registro não existe na filial; a versão diferente, que ele mudou.
+
+
+def sql_update_versionado(tabela: str, coluna_id: str, set_parts: Sequence[str], retorno: Sequence[str],
+                          campos: Iterable[str], condicoes: Sequence[str] = ()) -> str:
+    """UPDATE de um registro da filial atual que só é aplicado na versão esperada; soma a versão.
+
+    Parâmetros, na ordem: o ID e a filial, os valores de set_parts, a versão esperada (None
+    aceita qualquer uma) e os das condicoes extras do WHERE. Cada linha do resultado traz as
+    colunas de retorno (a primeira não pode ser nula: use o ID), os valores anteriores dos
+    campos e, por último, a versão encontrada; ver executar_update_versionado().
+    """
+    campos = list(campos)
+    colunas = "".join(f", {campo} AS anterior_{campo}" for campo in campos)
+    anteriores = "".join(f", anterior.anterior_{campo}" for campo in campos)
+    where = [f"{coluna_id} = anterior.id_anterior",
+             "anterior.versao_anterior = COALESCE(%s, anterior.versao_anterior)", *condicoes]
+    return f"""
+        WITH anterior AS (
+            SELECT {coluna_id} AS id_anterior, versao AS versao_anterior{colunas}
+            FROM {tabela}
+            WHERE {coluna_id} = %s AND filial_id = %s
+            FOR UPDATE
+        ), atualizado AS (
+            UPDATE {tabela}
+            SET {"".join(parte + ", " for parte in set_parts)}versao = versao + 1
+            FROM anterior
+            WHERE {" AND ".join(where)}
+            RETURNING {", ".join(retorno)}{anteriores}
+        )
+        SELECT atualizado.*, anterior.versao_anterior
+        FROM anterior
+        LEFT JOIN atualizado ON TRUE;
+    """
+
+
+def executar_update_versionado(cursor, sql: str, valores: Sequence, versao: Optional[int]) -> Optional[tuple]:
+    """Executa o UPDATE de sql_update_versionado(); retorna a linha (retorno + anteriores).
+
+    None se o registro não existir na filial; levanta ConflitoVersaoError se a versão do
+    banco não for a esperada. Com condicoes extras que não foram atendidas, a linha vem
+    com as colunas todas nulas.
+    """
+    cursor.execute(sql, tuple(valores))
+    row = cursor.fetchone()
+    if row is None:
+        return None
+    *linha, versao_atual = row
+    if versao is not None and versao != versao_atual:
+        raise ConflitoVersaoError(versao_atual)
+    return tuple(linha)
+
+
+def conferir_versao(registro, versao: Optional[int]):
+    """Update sem campos: devolve o registro atual (ou None), conferindo a versão esperada."""
+    if registro is not None and versao is not None and registro.versao != versao:
+        raise ConflitoVersaoError(registro.versao)
+    return registro
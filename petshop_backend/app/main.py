@@ -1,27 +1,49 @@
-
-from fastapi import FastAPI, Depends, HTTPException, status, Query
+from fastapi import FastAPI, Depends, Header, HTTPException, status, Query, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
-from typing import List, Optional
-from datetime import datetime
+from fastapi.responses import FileResponse, JSONResponse
+from typing import List, Literal, Optional
+from datetime import date, datetime, timedelta, timezone
+import hmac
+import os
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
 
 # Importações dos modelos Pydantic
-from app.models.cliente import Cliente, ClienteCreate, ClienteUpdate
+from app.models.cliente import Cliente, ClienteCreate, ClienteUpdate, ClientesLote
 from app.models.animal import Animal, AnimalCreate, AnimalUpdate
-from app.models.funcionario import Funcionario, FuncionarioCreate, FuncionarioUpdate
+from app.models.estatisticas import EstatisticasAnimal, EstatisticasCliente, OrdenacaoClientes
+from app.models.funcionario import Funcionario, FuncionarioCreate, FuncionarioUpdate, FuncionarioUpsert, FuncionariosLote
 from app.models.servico import Servico, ServicoCreate, ServicoUpdate
-from app.models.agendamento import Agendamento, AgendamentoCreate, AgendamentoUpdate, AgendamentoSimple
-
-# Importações das funções CRUD
-from app.crud import crud_cliente
-from app.crud import crud_animal
-from app.crud import crud_funcionario
-from app.crud import crud_servico
-from app.crud import crud_agendamento
+from app.models.agendamento import Agendamento, AgendamentoCreate, AgendamentoUpdate, AgendamentoSimple, CalendarioAgendamentos, AtribuicaoPedido, ResultadoAtribuicao
+from app.models.relatorio import RelatorioJob, RelatorioJobCreate
+from app.models.filial import Filial, FilialCreate
+from app.models.lote import OperacoesLote, ResultadoOperacoesLote, ResultadoUpsertLote
+from app.models.auditoria import EntidadeAuditada, RegistroAuditoria
+
+# Importações das funções CRUD (Postgres ou em memória, conforme ARMAZENAMENTO)
+from app.crud.armazenamento import (ARMAZENAMENTO, crud_agendamento, crud_animal, crud_cliente, crud_filial,
+                                    crud_funcionario, crud_lote, crud_servico, em_memoria)
+from app.crud import crud_atribuicao
+from app.crud import crud_auditoria
+
+from app.core.admission import AdmissionControlMiddleware, controle_admissao
+from app.core.query_budget import QueryBudgetMiddleware
+from app.core.branches import FilialMiddleware
+from app.db.database import (BancoDadosError, BancoIndisponivelError, ConflitoVersaoError, ConsultaCanceladaError, RegistroDuplicadoError,
+                             RegistroEmUsoError,
+                             TempoEsgotadoError, circuitos_status, filial_atual)
+from app.db.counts import Contagem
+from app.db import profiler
+from app.core.fieldsets import parse_fields, partial_response
+from app.core import cache as cache_entidades
+from app.core.audit import gravador as gravador_auditoria
+from app.core.startup import estado, lifespan
+from app.reports.jobs import gerenciador_jobs, MEDIA_TYPES, STATUS_CONCLUIDO, STATUS_ERRO
 
 app = FastAPI(
     title="API PetShop Agendamentos",
     description="API para gerenciar clientes, animais, funcionários, serviços e agendamentos de um pet shop.",
-    version="0.1.0"
+    version="0.1.0",
+    lifespan=lifespan
 )
 
 # Configuração do CORS
@@ -31,51 +53,213 @@ origins = [
     "http://localhost:5173",    
 ]
 
+# Filial da requisição (header X-Filial-Id); por dentro do orçamento de tempo, que também
+# vale para a consulta ao cadastro de filiais.
+app.add_middleware(FilialMiddleware)
+
+# Orçamento de tempo das consultas (statement/lock timeout) e cancelamento quando o
+# cliente desconecta; fica por dentro do controle de admissão.
+app.add_middleware(QueryBudgetMiddleware)
+
+# Controle de admissão: registrado antes do CORS para que as respostas 503
+# também recebam os cabeçalhos de CORS.
+app.add_middleware(AdmissionControlMiddleware, controle=controle_admissao)
+
 app.add_middleware(
     CORSMiddleware,
     allow_origins=origins,
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],  
+    expose_headers=["X-Total-Count", "X-Total-Count-Mode", "ETag"],
 )
 
+# Falhas do banco viram 503/504 em vez de listas vazias ou 404.
+@app.exception_handler(BancoIndisponivelError)
+def banco_indisponivel_handler(request, exc: BancoIndisponivelError):
+    return JSONResponse(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, content={"detail": str(exc)},
+                        headers={"Retry-After": exc.retry_after})
+
+@app.exception_handler(TempoEsgotadoError)
+def tempo_esgotado_handler(request, exc: TempoEsgotadoError):
+    return JSONResponse(status_code=status.HTTP_504_GATEWAY_TIMEOUT, content={"detail": str(exc)})
+
+# Violações de unicidade e de chave estrangeira detectadas no próprio INSERT/UPDATE/DELETE
+# (sem consulta prévia).
+@app.exception_handler(RegistroDuplicadoError)
+@app.exception_handler(RegistroEmUsoError)
+def registro_duplicado_handler(request, exc: ValueError):
+    return JSONResponse(status_code=status.HTTP_400_BAD_REQUEST, content={"detail": str(exc)})
+
+# Alteração sobre uma versão antiga do registro: 409 com a versão atual no ETag.
+@app.exception_handler(ConflitoVersaoError)
+def conflito_versao_handler(request, exc: ConflitoVersaoError):
+    return JSONResponse(status_code=status.HTTP_409_CONFLICT, content={"detail": str(exc), "versao_atual": exc.versao_atual},
+                        headers={"ETag": _etag(exc.versao_atual)})
+
+@app.exception_handler(ConsultaCanceladaError)
+def consulta_cancelada_handler(request, exc: ConsultaCanceladaError):
+    # O cliente já foi embora; 499 só aparece nos logs.
+    return JSONResponse(status_code=499, content={"detail": str(exc)})
+
+LIMITE_MAXIMO_PAGINA = 500
+SKIP_QUERY = Query(0, ge=0, description="Registros a pular")
+LIMIT_QUERY = Query(100, ge=1, le=LIMITE_MAXIMO_PAGINA, description=f"Registros por página (máximo {LIMITE_MAXIMO_PAGINA})")
+
+def _set_total_headers(response: Response, contagem: Optional[Contagem]):
+    """Preenche X-Total-Count e X-Total-Count-Mode (estimado, exato ou limitado)."""
+    if contagem is None:
+        return
+    response.headers["X-Total-Count"] = contagem.header_value()
+    response.headers["X-Total-Count-Mode"] = contagem.modo
+
+COM_TOTAL_DESCRICAO = "Inclui o total de registros no cabeçalho X-Total-Count"
+FIELDS_DESCRICAO = "Campos a retornar, separados por vírgula (ex.: nome,email). Se omitido, retorna todos."
+BUSCA_QUERY = Query(None, max_length=200, description="Busca por início de palavra (ex.: 'ana sil' encontra 'Ana Silva')")
+
+IF_MATCH_HEADER = Header(None, description='Versão editada, como no ETag (ex.: "3"); se o registro mudou desde então, 409. "*" não confere')
+
+def _etag(versao: int) -> str:
+    return f'"{versao}"'
+
+def _com_versao(modelo, if_match: Optional[str]):
+    """Aplica o If-Match ao campo versao do update; os dois, se informados, devem coincidir."""
+    if if_match is None or if_match.strip() == "*":
+        return modelo
+    valor = if_match.strip().removeprefix("W/").strip('"')
+    if not valor.isdigit() or int(valor) < 1:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"If-Match inválido: {if_match}")
+    if modelo.versao is not None and modelo.versao != int(valor):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="If-Match e o campo versao informam versões diferentes")
+    return modelo.model_copy(update={"versao": int(valor)})
+
+def _validar_fuso_horario(fuso_horario: str):
+    try:
+        ZoneInfo(fuso_horario)
+    except (ZoneInfoNotFoundError, ValueError):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Fuso horário '{fuso_horario}' inválido")
+
+def requer_postgres():
+    """Recursos que só existem sobre o Postgres (SQL analítico, auditoria, jobs) não rodam em memória."""
+    if em_memoria():
+        raise HTTPException(status_code=status.HTTP_501_NOT_IMPLEMENTED,
+                            detail=f"Recurso indisponível com ARMAZENAMENTO={ARMAZENAMENTO}")
+
+def _parse_fields(fields: Optional[str], disponiveis) -> Optional[List[str]]:
+    try:
+        return parse_fields(fields, disponiveis)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+def _resultado_lote(recebidos: int, resultado) -> ResultadoUpsertLote:
+    return ResultadoUpsertLote(
+        recebidos=recebidos,
+        inseridos=len(resultado.inseridos),
+        atualizados=len(resultado.atualizados),
+        inalterados=resultado.inalterados,
+        duplicados=resultado.duplicados,
+        ids=resultado.ids,
+    )
+
 # --- Endpoints para Clientes --- 
 
 @app.post("/clientes/", response_model=Cliente, status_code=status.HTTP_201_CREATED, tags=["Clientes"])
 def create_new_cliente(cliente: ClienteCreate):
-    db_cliente = crud_cliente.get_cliente_by_email(email=cliente.email)
-    if db_cliente:
-        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Email já cadastrado")
     created_cliente = crud_cliente.create_cliente(cliente=cliente)
     if not created_cliente:
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Erro ao criar cliente")
     return created_cliente
 
+@app.put("/clientes/por-email", response_model=Cliente, tags=["Clientes"])
+def upsert_cliente_por_email(cliente: ClienteCreate, response: Response):
+    """Cria o cliente (201) ou atualiza o cliente da filial com o mesmo e-mail (200)."""
+    resultado = crud_cliente.upsert_cliente(cliente=cliente)
+    if resultado is None:
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Erro ao gravar cliente")
+    db_cliente, acao = resultado
+    if acao == "inserido":
+        response.status_code = status.HTTP_201_CREATED
+    return db_cliente
+
+@app.post("/clientes/lote", response_model=ResultadoUpsertLote, tags=["Clientes"])
+def upsert_clientes_lote(lote: ClientesLote):
+    """Cria ou atualiza clientes pelo e-mail (ex.: sincronização do programa de fidelidade), em uma transação."""
+    resultado = crud_cliente.upsert_clientes(lote.clientes)
+    if resultado is None:
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Erro ao gravar lote de clientes")
+    return _resultado_lote(len(lote.clientes), resultado)
+
+ORDENAR_CLIENTES_DESCRICAO = ("Ordem da listagem: nome, ou gasto_total, visitas, ultima_visita, nao_comparecimentos "
+                              "(maiores primeiro, com as estatísticas de cada cliente)")
+
 @app.get("/clientes/", response_model=List[Cliente], tags=["Clientes"])
-def read_clientes(skip: int = 0, limit: int = 100):
-    clientes = crud_cliente.get_clientes(skip=skip, limit=limit)
+def read_clientes(response: Response, skip: int = SKIP_QUERY, limit: int = LIMIT_QUERY,
+                  busca: Optional[str] = BUSCA_QUERY,
+                  com_total: bool = Query(False, description=COM_TOTAL_DESCRICAO),
+                  fields: Optional[str] = Query(None, description=FIELDS_DESCRICAO),
+                  ordenar: OrdenacaoClientes = Query("nome", description=ORDENAR_CLIENTES_DESCRICAO)):
+    """Clientes da filial por nome ou por estatística; busca procura em nome, e-mail e telefone."""
+    campos = _parse_fields(fields, crud_cliente.CAMPOS_CLIENTE)
+    if com_total:
+        _set_total_headers(response, crud_cliente.count_clientes(busca=busca))
+    if campos:
+        clientes = crud_cliente.get_clientes_campos(campos, skip=skip, limit=limit, busca=busca, ordenar=ordenar)
+        return partial_response(Cliente, campos, clientes, headers=dict(response.headers))
+    clientes = crud_cliente.get_clientes(skip=skip, limit=limit, busca=busca, ordenar=ordenar)
     return clientes
 
+INCLUDE_DESCRICAO = ("Partes da ficha do cliente a incluir, separadas por vírgula: "
+                     "animais, agendamentos, servicos (detalhe dos agendamentos), estatisticas.")
+
+def _cliente_completo(cliente_id: int, partes, limite_agendamentos: int) -> Response:
+    # O JSON já vem pronto do banco: vai para a resposta sem passar por modelos.
+    conteudo = crud_cliente.get_cliente_completo_json(cliente_id, partes, limite_agendamentos)
+    if conteudo is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Cliente não encontrado")
+    return Response(content=conteudo, media_type="application/json")
+
+@app.get("/clientes/{cliente_id}/completo", tags=["Clientes"])
+def read_cliente_completo(cliente_id: int,
+                          include: Optional[str] = Query(None, description=INCLUDE_DESCRICAO + " Padrão: todas."),
+                          limite_agendamentos: int = Query(10, ge=1, le=100, description="Máximo de próximos e de recentes")):
+    """Cliente com animais, agendamentos próximos e recentes (com serviços) e estatísticas em uma consulta."""
+    partes = _parse_fields(include, crud_cliente.PARTES_COMPLETO) or crud_cliente.PARTES_COMPLETO
+    return _cliente_completo(cliente_id, partes, limite_agendamentos)
+
+@app.get("/clientes/{cliente_id}/estatisticas", response_model=EstatisticasCliente, tags=["Clientes"])
+def read_cliente_estatisticas(cliente_id: int):
+    """Visitas (agendamentos concluídos), gasto total, última visita, não comparecimentos e serviço favorito."""
+    estatisticas = crud_cliente.get_estatisticas_cliente(cliente_id=cliente_id)
+    if estatisticas is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Cliente não encontrado")
+    return estatisticas
+
 @app.get("/clientes/{cliente_id}", response_model=Cliente, tags=["Clientes"])
-def read_cliente_by_id(cliente_id: int):
+def read_cliente_by_id(cliente_id: int, response: Response, fields: Optional[str] = Query(None, description=FIELDS_DESCRICAO),
+                       include: Optional[str] = Query(None, description=INCLUDE_DESCRICAO)):
+    if include is not None:
+        if fields is not None:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Use fields ou include, não os dois")
+        return _cliente_completo(cliente_id, _parse_fields(include, crud_cliente.PARTES_COMPLETO), 10)
+    campos = _parse_fields(fields, crud_cliente.CAMPOS_CLIENTE)
+    if campos:
+        clientes = crud_cliente.get_clientes_campos(campos, limit=1, cliente_id=cliente_id)
+        if not clientes:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Cliente não encontrado")
+        return partial_response(Cliente, campos, clientes[0])
     db_cliente = crud_cliente.get_cliente_by_id(cliente_id=cliente_id)
     if db_cliente is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Cliente não encontrado")
+    response.headers["ETag"] = _etag(db_cliente.versao)
     return db_cliente
 
 @app.put("/clientes/{cliente_id}", response_model=Cliente, tags=["Clientes"])
-def update_existing_cliente(cliente_id: int, cliente: ClienteUpdate):
-    db_cliente = crud_cliente.get_cliente_by_id(cliente_id=cliente_id)
-    if db_cliente is None:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Cliente não encontrado")
-    if cliente.email and cliente.email != db_cliente.email:
-        existing_email_cliente = crud_cliente.get_cliente_by_email(email=cliente.email)
-        if existing_email_cliente and existing_email_cliente.cliente_id != cliente_id:
-            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Novo email já cadastrado para outro cliente")
-            
-    updated_cliente = crud_cliente.update_cliente(cliente_id=cliente_id, cliente_update=cliente)
+def update_existing_cliente(cliente_id: int, cliente: ClienteUpdate, response: Response,
+                            if_match: Optional[str] = IF_MATCH_HEADER):
+    updated_cliente = crud_cliente.update_cliente(cliente_id=cliente_id, cliente_update=_com_versao(cliente, if_match))
     if updated_cliente is None:
-         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Erro ao atualizar cliente")
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Cliente não encontrado")
+    response.headers["ETag"] = _etag(updated_cliente.versao)
     return updated_cliente
 
 @app.delete("/clientes/{cliente_id}", status_code=status.HTTP_204_NO_CONTENT, tags=["Clientes"])
@@ -102,32 +286,56 @@ def create_new_animal(animal: AnimalCreate):
     return created_animal
 
 @app.get("/animais/", response_model=List[Animal], tags=["Animais"])
-def read_animais(cliente_id: Optional[int] = None, skip: int = 0, limit: int = 100):
-    if cliente_id is not None:
-        db_cliente = crud_cliente.get_cliente_by_id(cliente_id=cliente_id)
-        if not db_cliente:
-             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Cliente com ID {cliente_id} não encontrado")
-        animais = crud_animal.get_animais_by_cliente(cliente_id=cliente_id, skip=skip, limit=limit)
+def read_animais(response: Response, cliente_id: Optional[int] = None, skip: int = SKIP_QUERY, limit: int = LIMIT_QUERY,
+                 busca: Optional[str] = BUSCA_QUERY,
+                 com_total: bool = Query(False, description=COM_TOTAL_DESCRICAO),
+                 fields: Optional[str] = Query(None, description=FIELDS_DESCRICAO)):
+    """Animais da filial por nome; busca procura em nome, espécie, raça e no dono (nome, e-mail, telefone)."""
+    campos = _parse_fields(fields, crud_animal.CAMPOS_ANIMAL)
+    if campos:
+        animais = crud_animal.get_animais_campos(campos, skip=skip, limit=limit, cliente_id=cliente_id, busca=busca)
+    elif cliente_id is not None:
+        animais = crud_animal.get_animais_by_cliente(cliente_id=cliente_id, skip=skip, limit=limit, busca=busca)
     else:
-        animais = crud_animal.get_animais(skip=skip, limit=limit)
+        animais = crud_animal.get_animais(skip=skip, limit=limit, busca=busca)
+    # A existência do cliente só precisa ser verificada quando a lista vem vazia.
+    if cliente_id is not None and not animais and not crud_cliente.get_cliente_by_id(cliente_id=cliente_id):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Cliente com ID {cliente_id} não encontrado")
+    if com_total:
+        _set_total_headers(response, crud_animal.count_animais(cliente_id=cliente_id, busca=busca))
+    if campos:
+        return partial_response(Animal, campos, animais, headers=dict(response.headers))
     return animais
 
+@app.get("/animais/{animal_id}/estatisticas", response_model=EstatisticasAnimal, tags=["Animais"])
+def read_animal_estatisticas(animal_id: int):
+    """Visitas (agendamentos concluídos), gasto total, última visita, não comparecimentos e serviço favorito."""
+    estatisticas = crud_animal.get_estatisticas_animal(animal_id=animal_id)
+    if estatisticas is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Animal não encontrado")
+    return estatisticas
+
 @app.get("/animais/{animal_id}", response_model=Animal, tags=["Animais"])
-def read_animal_by_id(animal_id: int):
+def read_animal_by_id(animal_id: int, response: Response, fields: Optional[str] = Query(None, description=FIELDS_DESCRICAO)):
+    campos = _parse_fields(fields, crud_animal.CAMPOS_ANIMAL)
+    if campos:
+        animais = crud_animal.get_animais_campos(campos, limit=1, animal_id=animal_id)
+        if not animais:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Animal não encontrado")
+        return partial_response(Animal, campos, animais[0])
     db_animal = crud_animal.get_animal_by_id(animal_id=animal_id)
     if db_animal is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Animal não encontrado")
+    response.headers["ETag"] = _etag(db_animal.versao)
     return db_animal
 
 @app.put("/animais/{animal_id}", response_model=Animal, tags=["Animais"])
-def update_existing_animal(animal_id: int, animal: AnimalUpdate):
-    db_animal = crud_animal.get_animal_by_id(animal_id=animal_id)
-    if db_animal is None:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Animal não encontrado")
-    
-    updated_animal = crud_animal.update_animal(animal_id=animal_id, animal_update=animal)
+def update_existing_animal(animal_id: int, animal: AnimalUpdate, response: Response,
+                           if_match: Optional[str] = IF_MATCH_HEADER):
+    updated_animal = crud_animal.update_animal(animal_id=animal_id, animal_update=_com_versao(animal, if_match))
     if updated_animal is None:
-         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Erro ao atualizar animal")
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Animal não encontrado")
+    response.headers["ETag"] = _etag(updated_animal.versao)
     return updated_animal
 
 @app.delete("/animais/{animal_id}", status_code=status.HTTP_204_NO_CONTENT, tags=["Animais"])
@@ -144,43 +352,70 @@ def delete_existing_animal(animal_id: int):
 
 @app.post("/funcionarios/", response_model=Funcionario, status_code=status.HTTP_201_CREATED, tags=["Funcionários"])
 def create_new_funcionario(funcionario: FuncionarioCreate):
-    if funcionario.email:
-        db_funcionario = crud_funcionario.get_funcionario_by_email(email=funcionario.email)
-        if db_funcionario:
-            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Email já cadastrado para outro funcionário")
-            
     created_funcionario = crud_funcionario.create_funcionario(funcionario=funcionario)
     if not created_funcionario:
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Erro ao criar funcionário")
     return created_funcionario
 
+@app.put("/funcionarios/por-email", response_model=Funcionario, tags=["Funcionários"])
+def upsert_funcionario_por_email(funcionario: FuncionarioUpsert, response: Response):
+    """Cria o funcionário (201) ou atualiza o funcionário da filial com o mesmo e-mail (200)."""
+    resultado = crud_funcionario.upsert_funcionario(funcionario=funcionario)
+    if resultado is None:
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Erro ao gravar funcionário")
+    db_funcionario, acao = resultado
+    if acao == "inserido":
+        response.status_code = status.HTTP_201_CREATED
+    return db_funcionario
+
+@app.post("/funcionarios/lote", response_model=ResultadoUpsertLote, tags=["Funcionários"])
+def upsert_funcionarios_lote(lote: FuncionariosLote):
+    """Cria ou atualiza funcionários pelo e-mail, em uma transação."""
+    resultado = crud_funcionario.upsert_funcionarios(lote.funcionarios)
+    if resultado is None:
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Erro ao gravar lote de funcionários")
+    return _resultado_lote(len(lote.funcionarios), resultado)
+
 
 @app.get("/funcionarios/", response_model=List[Funcionario], tags=["Funcionários"])
-def read_funcionarios(apenas_ativos: bool = False, skip: int = 0, limit: int = 100):
-    funcionarios = crud_funcionario.get_funcionarios(skip=skip, limit=limit, apenas_ativos=apenas_ativos)
+def read_funcionarios(response: Response, apenas_ativos: bool = False, skip: int = SKIP_QUERY, limit: int = LIMIT_QUERY,
+                      busca: Optional[str] = BUSCA_QUERY,
+                      com_total: bool = Query(False, description=COM_TOTAL_DESCRICAO),
+                      fields: Optional[str] = Query(None, description=FIELDS_DESCRICAO)):
+    """Funcionários da filial por nome; busca procura em nome, cargo, e-mail e telefone."""
+    campos = _parse_fields(fields, crud_funcionario.CAMPOS_FUNCIONARIO)
+    if com_total:
+        _set_total_headers(response, crud_funcionario.count_funcionarios(apenas_ativos=apenas_ativos, busca=busca))
+    if campos:
+        funcionarios = crud_funcionario.get_funcionarios_campos(
+            campos, skip=skip, limit=limit, apenas_ativos=apenas_ativos, busca=busca
+        )
+        return partial_response(Funcionario, campos, funcionarios, headers=dict(response.headers))
+    funcionarios = crud_funcionario.get_funcionarios(skip=skip, limit=limit, apenas_ativos=apenas_ativos, busca=busca)
     return funcionarios
 
 @app.get("/funcionarios/{funcionario_id}", response_model=Funcionario, tags=["Funcionários"])
-def read_funcionario_by_id(funcionario_id: int):
+def read_funcionario_by_id(funcionario_id: int, response: Response, fields: Optional[str] = Query(None, description=FIELDS_DESCRICAO)):
+    campos = _parse_fields(fields, crud_funcionario.CAMPOS_FUNCIONARIO)
+    if campos:
+        funcionarios = crud_funcionario.get_funcionarios_campos(campos, limit=1, funcionario_id=funcionario_id)
+        if not funcionarios:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Funcionário não encontrado")
+        return partial_response(Funcionario, campos, funcionarios[0])
     db_funcionario = crud_funcionario.get_funcionario_by_id(funcionario_id=funcionario_id)
     if db_funcionario is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Funcionário não encontrado")
+    response.headers["ETag"] = _etag(db_funcionario.versao)
     return db_funcionario
 
 @app.put("/funcionarios/{funcionario_id}", response_model=Funcionario, tags=["Funcionários"])
-def update_existing_funcionario(funcionario_id: int, funcionario: FuncionarioUpdate):
-    db_funcionario = crud_funcionario.get_funcionario_by_id(funcionario_id=funcionario_id)
-    if db_funcionario is None:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Funcionário não encontrado")
-
-    if funcionario.email and funcionario.email != db_funcionario.email:
-         existing_email_func = crud_funcionario.get_funcionario_by_email(email=funcionario.email)
-         if existing_email_func and existing_email_func.funcionario_id != funcionario_id:
-              raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Novo email já cadastrado para outro funcionário")
-
-    updated_funcionario = crud_funcionario.update_funcionario(funcionario_id=funcionario_id, funcionario_update=funcionario)
+def update_existing_funcionario(funcionario_id: int, funcionario: FuncionarioUpdate, response: Response,
+                                if_match: Optional[str] = IF_MATCH_HEADER):
+    updated_funcionario = crud_funcionario.update_funcionario(funcionario_id=funcionario_id,
+                                                              funcionario_update=_com_versao(funcionario, if_match))
     if updated_funcionario is None:
-         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Erro ao atualizar funcionário")
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Funcionário não encontrado")
+    response.headers["ETag"] = _etag(updated_funcionario.versao)
     return updated_funcionario
 
 @app.delete("/funcionarios/{funcionario_id}", status_code=status.HTTP_204_NO_CONTENT, tags=["Funcionários"])
@@ -208,31 +443,42 @@ def create_new_servico(servico: ServicoCreate):
 
 
 @app.get("/servicos/", response_model=List[Servico], tags=["Serviços"])
-def read_servicos(skip: int = 0, limit: int = 100):
-    servicos = crud_servico.get_servicos(skip=skip, limit=limit)
+def read_servicos(response: Response, skip: int = SKIP_QUERY, limit: int = LIMIT_QUERY,
+                  busca: Optional[str] = BUSCA_QUERY,
+                  com_total: bool = Query(False, description=COM_TOTAL_DESCRICAO),
+                  fields: Optional[str] = Query(None, description=FIELDS_DESCRICAO)):
+    """Serviços da filial por nome; busca procura em nome e descrição."""
+    campos = _parse_fields(fields, crud_servico.CAMPOS_SERVICO)
+    if com_total:
+        _set_total_headers(response, crud_servico.count_servicos(busca=busca))
+    if campos:
+        servicos = crud_servico.get_servicos_campos(campos, skip=skip, limit=limit, busca=busca)
+        return partial_response(Servico, campos, servicos, headers=dict(response.headers))
+    servicos = crud_servico.get_servicos(skip=skip, limit=limit, busca=busca)
     return servicos
 
 @app.get("/servicos/{servico_id}", response_model=Servico, tags=["Serviços"])
-def read_servico_by_id(servico_id: int):
+def read_servico_by_id(servico_id: int, response: Response, fields: Optional[str] = Query(None, description=FIELDS_DESCRICAO)):
+    campos = _parse_fields(fields, crud_servico.CAMPOS_SERVICO)
+    if campos:
+        servicos = crud_servico.get_servicos_campos(campos, limit=1, servico_id=servico_id)
+        if not servicos:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Serviço não encontrado")
+        return partial_response(Servico, campos, servicos[0])
     db_servico = crud_servico.get_servico_by_id(servico_id=servico_id)
     if db_servico is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Serviço não encontrado")
+    response.headers["ETag"] = _etag(db_servico.versao)
     return db_servico
 
 @app.put("/servicos/{servico_id}", response_model=Servico, tags=["Serviços"])
-def update_existing_servico(servico_id: int, servico: ServicoUpdate):
-    db_servico = crud_servico.get_servico_by_id(servico_id=servico_id)
-    if db_servico is None:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Serviço não encontrado")
-
-    if servico.nome and servico.nome != db_servico.nome:
-        existing_name_servico = crud_servico.get_servico_by_nome(nome=servico.nome)
-        if existing_name_servico and existing_name_servico.servico_id != servico_id:
-            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Outro serviço já existe com este nome")
-
-    updated_servico = crud_servico.update_servico(servico_id=servico_id, servico_update=servico)
+def update_existing_servico(servico_id: int, servico: ServicoUpdate, response: Response,
+                            if_match: Optional[str] = IF_MATCH_HEADER):
+    # Nome repetido vem do próprio UPDATE (RegistroDuplicadoError -> 400).
+    updated_servico = crud_servico.update_servico(servico_id=servico_id, servico_update=_com_versao(servico, if_match))
     if updated_servico is None:
-         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Erro ao atualizar serviço")
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Serviço não encontrado")
+    response.headers["ETag"] = _etag(updated_servico.versao)
     return updated_servico
 
 @app.delete("/servicos/{servico_id}", status_code=status.HTTP_204_NO_CONTENT, tags=["Serviços"])
@@ -240,12 +486,10 @@ def delete_existing_servico(servico_id: int):
     db_servico = crud_servico.get_servico_by_id(servico_id=servico_id)
     if db_servico is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Serviço não encontrado")
+    # Serviço em uso por agendamentos vem do próprio DELETE (RegistroEmUsoError -> 400).
     deleted = crud_servico.delete_servico(servico_id=servico_id)
     if not deleted:
-        if crud_servico.get_servico_by_id(servico_id=servico_id):
-             raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Serviço não pode ser deletado pois está associado a agendamentos")
-        else:
-             raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Erro ao deletar serviço")
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Erro ao deletar serviço")
     return
 
 # --- Endpoints para Agendamentos --- 
@@ -264,59 +508,105 @@ def create_new_agendamento(agendamento: AgendamentoCreate):
         return created_agendamento
     except ValueError as ve:
          raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(ve))
+    except BancoDadosError:
+         raise
     except Exception as e:
          raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Erro interno ao criar agendamento")
 
 @app.get("/agendamentos/", response_model=List[Agendamento], tags=["Agendamentos"])
 def read_agendamentos(
-    skip: int = 0, limit: int = 100,
+    response: Response,
+    skip: int = SKIP_QUERY, limit: int = LIMIT_QUERY,
     animal_id: Optional[int] = Query(None, description="Filtrar por ID do animal"),
     funcionario_id: Optional[int] = Query(None, description="Filtrar por ID do funcionário"),
     data_inicio: Optional[datetime] = Query(None, description="Data/hora inicial do período (ISO format)"),
     data_fim: Optional[datetime] = Query(None, description="Data/hora final do período (ISO format)"),
-    status: Optional[str] = Query(None, description="Filtrar por status (Agendado, Confirmado, etc.)")
+    status: Optional[str] = Query(None, description="Filtrar por status (Agendado, Confirmado, etc.)"),
+    busca: Optional[str] = Query(None, max_length=200, description="Busca pelo animal, dono ou funcionário (início de palavra)"),
+    com_total: bool = Query(False, description=COM_TOTAL_DESCRICAO),
+    fields: Optional[str] = Query(None, description=FIELDS_DESCRICAO + " Serviços só são carregados se 'servicos' for pedido.")
 ):
-    agendamentos = crud_agendamento.get_agendamentos(
-        skip=skip, limit=limit,
+    campos = _parse_fields(fields, crud_agendamento.CAMPOS_AGENDAMENTO)
+    filtros = dict(
         animal_id=animal_id,
         funcionario_id=funcionario_id,
         data_inicio=data_inicio,
         data_fim=data_fim,
-        status=status
+        status=status,
+        busca=busca
     )
+    if com_total:
+        _set_total_headers(response, crud_agendamento.count_agendamentos(**filtros))
+    if campos:
+        agendamentos = crud_agendamento.get_agendamentos_campos(campos, skip=skip, limit=limit, **filtros)
+        return partial_response(Agendamento, campos, agendamentos, headers=dict(response.headers))
+    agendamentos = crud_agendamento.get_agendamentos(skip=skip, limit=limit, **filtros)
     return agendamentos
     return agendamentos
 
+@app.get("/agendamentos/calendario", response_model=CalendarioAgendamentos, tags=["Agendamentos"])
+def read_calendario_agendamentos(
+    funcionario_ids: List[int] = Query(..., max_length=50, description="IDs dos funcionários (repita o parâmetro para vários)"),
+    data_inicio: date = Query(..., description="Primeiro dia do período (no fuso horário informado)"),
+    dias: int = Query(7, ge=1, le=31, description="Quantidade de dias a partir de data_inicio"),
+    fuso_horario: str = Query("America/Sao_Paulo", description="Fuso horário usado para agrupar por dia")
+):
+    _validar_fuso_horario(fuso_horario)
+    return crud_agendamento.get_calendario_funcionarios(
+        funcionario_ids=funcionario_ids,
+        data_inicio=data_inicio,
+        dias=dias,
+        fuso_horario=fuso_horario
+    )
+
+@app.post("/agendamentos/atribuir", response_model=ResultadoAtribuicao, tags=["Agendamentos"],
+          dependencies=[Depends(requer_postgres)])
+def atribuir_funcionarios(pedido: AtribuicaoPedido):
+    """Atribui funcionários ativos aos agendamentos sem funcionário (Agendado/Confirmado) do período.
+
+    Cada agendamento vai para o funcionário livre no horário com menos minutos ocupados no
+    período; os que conflitam com todos ficam em sem_funcionario. Com dry_run nada é gravado.
+    """
+    data_inicio, data_fim = _periodo_analytics(pedido.data_inicio, pedido.data_fim)
+    if data_fim - data_inicio > timedelta(days=31):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="O período de atribuição é de no máximo 31 dias")
+    resultado = crud_atribuicao.atribuir_agendamentos(data_inicio, data_fim, pedido.cargo, pedido.dry_run)
+    if resultado is None:
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Erro ao atribuir funcionários aos agendamentos")
+    return resultado
+
 @app.get("/agendamentos/{agendamento_id}", response_model=Agendamento, tags=["Agendamentos"])
-def read_agendamento_by_id(agendamento_id: int):
+def read_agendamento_by_id(agendamento_id: int, response: Response, fields: Optional[str] = Query(None, description=FIELDS_DESCRICAO)):
+    campos = _parse_fields(fields, crud_agendamento.CAMPOS_AGENDAMENTO)
+    if campos:
+        agendamentos = crud_agendamento.get_agendamentos_campos(campos, limit=1, agendamento_id=agendamento_id)
+        if not agendamentos:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Agendamento não encontrado")
+        return partial_response(Agendamento, campos, agendamentos[0])
     db_agendamento = crud_agendamento.get_agendamento_by_id(agendamento_id=agendamento_id)
     if db_agendamento is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Agendamento não encontrado")
+    response.headers["ETag"] = _etag(db_agendamento.versao)
     return db_agendamento
 
 @app.put("/agendamentos/{agendamento_id}", response_model=Agendamento, tags=["Agendamentos"])
-def update_existing_agendamento(agendamento_id: int, agendamento: AgendamentoUpdate):
-    db_agendamento = crud_agendamento.get_agendamento_by_id(agendamento_id=agendamento_id)
-    if db_agendamento is None:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Agendamento não encontrado")
-
-    if agendamento.animal_id and agendamento.animal_id != db_agendamento.animal_id:
-         if not crud_animal.get_animal_by_id(agendamento.animal_id):
-             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Novo Animal com ID {agendamento.animal_id} não encontrado")
-    if agendamento.funcionario_id and agendamento.funcionario_id != db_agendamento.funcionario_id:
-         if not crud_funcionario.get_funcionario_by_id(agendamento.funcionario_id):
-             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Novo Funcionário com ID {agendamento.funcionario_id} não encontrado")
-
+def update_existing_agendamento(agendamento_id: int, agendamento: AgendamentoUpdate, response: Response,
+                                if_match: Optional[str] = IF_MATCH_HEADER):
+    # Animal/funcionário novos são conferidos no próprio UPDATE (ValueError -> 400).
+    agendamento = _com_versao(agendamento, if_match)
     try:
         updated_agendamento = crud_agendamento.update_agendamento(agendamento_id=agendamento_id, agendamento_update=agendamento)
-        if updated_agendamento is None:
-            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Erro ao atualizar agendamento. Verifique os IDs fornecidos.")
-        return updated_agendamento
     except ValueError as ve:
          raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(ve))
+    except (BancoDadosError, ConflitoVersaoError):
+         raise
     except Exception as e:
          # Log e
          raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Erro interno ao atualizar agendamento")
+    if updated_agendamento is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Agendamento não encontrado")
+    response.headers["ETag"] = _etag(updated_agendamento.versao)
+    return updated_agendamento
 
 @app.delete("/agendamentos/{agendamento_id}", status_code=status.HTTP_204_NO_CONTENT, tags=["Agendamentos"])
 def delete_existing_agendamento(agendamento_id: int):
@@ -328,6 +618,222 @@ def delete_existing_agendamento(agendamento_id: int):
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Erro ao deletar agendamento")
     return
 
+# --- Lote de operações (transação única) ---
+
+@app.post("/lote", response_model=ResultadoOperacoesLote, tags=["Lote"])
+def executar_lote(lote: OperacoesLote, response: Response):
+    """Executa operações de create/update/delete em ordem, numa única transação.
+
+    Um create com "ref" pode ser referenciado depois como "$ref" (em id ou em campos *_id/*_ids).
+    Se uma operação falhar nada é aplicado: a resposta tem o status dela e as demais ficam com 424.
+    """
+    sucesso, resultados = crud_lote.executar_operacoes(lote.operacoes)
+    if not sucesso:
+        response.status_code = next(r.status for r in resultados if r.status != status.HTTP_424_FAILED_DEPENDENCY)
+    return ResultadoOperacoesLote(sucesso=sucesso, resultados=resultados)
+
+# --- Endpoints de Auditoria ---
+
+@app.get("/auditoria/", response_model=List[RegistroAuditoria], tags=["Auditoria"],
+         dependencies=[Depends(requer_postgres)])
+def read_auditoria(
+    entidade: EntidadeAuditada = Query(..., description="Entidade alterada"),
+    entidade_id: Optional[int] = Query(None, description="Só as alterações deste registro"),
+    data_inicio: Optional[datetime] = Query(None, description="Início do período"),
+    data_fim: Optional[datetime] = Query(None, description="Fim do período, exclusivo"),
+    skip: int = SKIP_QUERY,
+    limit: int = LIMIT_QUERY
+):
+    """Quem alterou o quê e quando, mais recentes primeiro (autor = header X-Usuario da alteração).
+
+    Os registros são gravados em lotes em segundo plano: uma alteração pode levar alguns
+    instantes para aparecer.
+    """
+    if data_inicio is not None and data_fim is not None and data_inicio >= data_fim:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="data_inicio deve ser anterior a data_fim")
+    return crud_auditoria.get_registros_auditoria(entidade, entidade_id, data_inicio, data_fim, skip, limit)
+
+# --- Endpoints de Filiais ---
+
+@app.post("/filiais/", response_model=Filial, status_code=status.HTTP_201_CREATED, tags=["Filiais"])
+def create_filial(filial: FilialCreate):
+    db_filial = crud_filial.create_filial(filial=filial)
+    if db_filial is None:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Erro ao criar filial. Verifique se o nome já existe.")
+    return db_filial
+
+@app.get("/filiais/", response_model=List[Filial], tags=["Filiais"])
+def read_filiais():
+    return crud_filial.get_filiais()
+
+@app.get("/filiais/{filial_id}", response_model=Filial, tags=["Filiais"])
+def read_filial(filial_id: int):
+    db_filial = crud_filial.get_filial_by_id(filial_id=filial_id)
+    if db_filial is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Filial não encontrada")
+    return db_filial
+
+# --- Endpoints de Analytics --- 
+
+def _periodo_analytics(data_inicio: Optional[datetime], data_fim: Optional[datetime]):
+    """Período padrão: últimos 365 dias. Datas sem fuso são tratadas como UTC."""
+    data_fim = data_fim or datetime.now(timezone.utc)
+    data_inicio = data_inicio or data_fim - timedelta(days=365)
+    if data_inicio.tzinfo is None:
+        data_inicio = data_inicio.replace(tzinfo=timezone.utc)
+    if data_fim.tzinfo is None:
+        data_fim = data_fim.replace(tzinfo=timezone.utc)
+    if data_inicio >= data_fim:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="data_inicio deve ser anterior a data_fim")
+    return data_inicio, data_fim
+
+@app.get("/analytics/agendamentos/metricas", tags=["Analytics"], dependencies=[Depends(requer_postgres)])
+def read_metricas_agendamentos(
+    data_inicio: Optional[datetime] = Query(None, description="Início do período (padrão: 365 dias atrás)"),
+    data_fim: Optional[datetime] = Query(None, description="Fim do período, exclusivo (padrão: agora)"),
+    fuso_horario: str = Query("America/Sao_Paulo", description="Fuso horário usado para dia da semana/hora"),
+    todas_filiais: bool = Query(False, description="Consolidar todas as filiais (em vez da filial do header X-Filial-Id)")
+):
+    from app.analytics import agendamentos as analytics_agendamentos  # pandas/NumPy: import sob demanda
+
+    _validar_fuso_horario(fuso_horario)
+    data_inicio, data_fim = _periodo_analytics(data_inicio, data_fim)
+    filiais = [filial.filial_id for filial in crud_filial.get_filiais()] if todas_filiais else None
+    return analytics_agendamentos.compute_metricas(data_inicio, data_fim, fuso_horario, filiais)
+
+@app.get("/analytics/funcionarios/ocupacao", tags=["Analytics"], dependencies=[Depends(requer_postgres)])
+def read_ocupacao_funcionarios(
+    data_inicio: Optional[datetime] = Query(None, description="Início do período (padrão: 365 dias atrás)"),
+    data_fim: Optional[datetime] = Query(None, description="Fim do período, exclusivo (padrão: agora)"),
+    fuso_horario: str = Query("America/Sao_Paulo", description="Fuso horário usado para dia da semana/hora"),
+    granularidade_minutos: int = Query(60, description="Tamanho de cada faixa de horário: 15, 30 ou 60 minutos"),
+    funcionario_ids: Optional[List[int]] = Query(None, description="Restringe a estes funcionários (padrão: todos)")
+):
+    """Mapa de calor de ocupação: minutos reservados por funcionário, dia da semana (0 = segunda) e faixa.
+
+    minutos_reservados[f][dia][faixa] soma a duração estimada dos serviços dos agendamentos
+    não cancelados; dividir por minutos_disponiveis[dia][faixa] dá a taxa de ocupação.
+    """
+    from app.analytics import agendamentos as analytics_agendamentos  # pandas/NumPy: import sob demanda
+
+    _validar_fuso_horario(fuso_horario)
+    if granularidade_minutos not in (15, 30, 60):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="granularidade_minutos deve ser 15, 30 ou 60")
+    data_inicio, data_fim = _periodo_analytics(data_inicio, data_fim)
+    return analytics_agendamentos.capacity_heatmap(data_inicio, data_fim, fuso_horario,
+                                                   granularidade_minutos, funcionario_ids)
+
+FORMATOS_EXPORTACAO = {
+    "parquet": ("application/vnd.apache.parquet", "parquet"),
+    "arrow": ("application/vnd.apache.arrow.stream", "arrows"),
+}
+
+@app.get("/analytics/agendamentos/export", tags=["Analytics"], dependencies=[Depends(requer_postgres)])
+def export_agendamentos(
+    formato: Literal["parquet", "arrow"] = Query("parquet", description="Formato do arquivo (parquet ou arrow IPC stream)"),
+    conjunto: Literal["agendamentos", "servicos"] = Query("agendamentos", description="Agendamentos ou linhas de serviço"),
+    data_inicio: Optional[datetime] = Query(None, description="Início do período (padrão: 365 dias atrás)"),
+    data_fim: Optional[datetime] = Query(None, description="Fim do período, exclusivo (padrão: agora)")
+):
+    from app.analytics import agendamentos as analytics_agendamentos  # pandas/pyarrow: import sob demanda
+
+    data_inicio, data_fim = _periodo_analytics(data_inicio, data_fim)
+    conteudo = analytics_agendamentos.export_bytes(conjunto, formato, data_inicio, data_fim)
+    media_type, extensao = FORMATOS_EXPORTACAO[formato]
+    nome_arquivo = f"{conjunto}_{data_inicio:%Y%m%d}_{data_fim:%Y%m%d}.{extensao}"
+    return Response(content=conteudo, media_type=media_type,
+                    headers={"Content-Disposition": f'attachment; filename="{nome_arquivo}"'})
+
+# --- Endpoints de Relatórios (jobs em segundo plano) --- 
+
+def _periodo_mes_corrente():
+    hoje = datetime.now(timezone.utc)
+    inicio = hoje.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+    fim = (inicio + timedelta(days=32)).replace(day=1)
+    return inicio, fim
+
+@app.post("/relatorios/jobs", response_model=RelatorioJob, status_code=status.HTTP_202_ACCEPTED, tags=["Relatórios"],
+          dependencies=[Depends(requer_postgres)])
+def create_relatorio_job(pedido: RelatorioJobCreate):
+    padrao_inicio, padrao_fim = _periodo_mes_corrente()
+    data_inicio, data_fim = _periodo_analytics(pedido.data_inicio or padrao_inicio, pedido.data_fim or padrao_fim)
+    job, em_cache = gerenciador_jobs.submit(pedido.tipo, pedido.formato, data_inicio, data_fim, filial_atual())
+    return RelatorioJob.model_validate(job).model_copy(update={"em_cache": em_cache})
+
+def _job_da_filial(job_id: str):
+    """Job de relatório da filial atual; os de outras filiais respondem 404, como inexistentes."""
+    job = gerenciador_jobs.get(job_id)
+    if job is None or job.filial_id != filial_atual():
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Job de relatório não encontrado")
+    return job
+
+@app.get("/relatorios/jobs/{job_id}", response_model=RelatorioJob, tags=["Relatórios"],
+         dependencies=[Depends(requer_postgres)])
+def read_relatorio_job(job_id: str):
+    return _job_da_filial(job_id)
+
+@app.get("/relatorios/jobs/{job_id}/download", tags=["Relatórios"], dependencies=[Depends(requer_postgres)])
+def download_relatorio_job(job_id: str):
+    job = _job_da_filial(job_id)
+    if job.status == STATUS_ERRO:
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"Falha ao gerar relatório: {job.erro}")
+    if job.status != STATUS_CONCLUIDO:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=f"Relatório ainda não está pronto (status: {job.status})")
+    return FileResponse(job.caminho, media_type=MEDIA_TYPES[job.formato], filename=job.nome_arquivo)
+
+
+# --- Endpoints de Monitoramento --- 
+
+@app.get("/metrics", tags=["Monitoramento"])
+def read_metrics():
+    return {
+        "admissao": controle_admissao.metricas(),
+        "relatorios": gerenciador_jobs.metricas(),
+        "cache": cache_entidades.metricas(),
+        "auditoria": gravador_auditoria.metricas(),
+        "armazenamento": ARMAZENAMENTO,
+        "circuitos_banco": circuitos_status(),
+    }
+
+@app.get("/health/live", tags=["Monitoramento"])
+def health_live():
+    return estado.live()
+
+@app.get("/health/ready", tags=["Monitoramento"])
+def health_ready(response: Response):
+    relatorio = estado.ready()
+    if not relatorio["pronto"]:
+        response.status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    return relatorio
+
+# --- Endpoints de Diagnóstico (administração) --- 
+
+DEBUG_ADMIN_TOKEN = os.getenv("DEBUG_ADMIN_TOKEN")
+HOSTS_LOCAIS = ("127.0.0.1", "::1", "localhost", "testclient")
+
+def verificar_admin(request: Request, x_admin_token: Optional[str] = Header(None)):
+    """Com DEBUG_ADMIN_TOKEN definido exige o header X-Admin-Token; sem ele, só aceita acesso local."""
+    if DEBUG_ADMIN_TOKEN:
+        if x_admin_token is None or not hmac.compare_digest(x_admin_token, DEBUG_ADMIN_TOKEN):
+            raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Token de administração inválido")
+    elif request.client is None or request.client.host not in HOSTS_LOCAIS:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Defina DEBUG_ADMIN_TOKEN para acesso remoto")
+
+@app.get("/debug/queries", tags=["Diagnóstico"], dependencies=[Depends(verificar_admin)])
+def read_debug_queries(
+    ordenar: Literal["total_ms", "media_ms", "max_ms", "chamadas", "linhas", "erros"] = "total_ms",
+    limite: int = Query(20, ge=1, le=LIMITE_MAXIMO_PAGINA),
+    por_endpoint: bool = False,
+):
+    """Consultas agregadas por fingerprint (e por endpoint) e as últimas consultas lentas com EXPLAIN."""
+    return profiler.relatorio(ordenar, limite, por_endpoint)
+
+@app.delete("/debug/queries", status_code=status.HTTP_204_NO_CONTENT, tags=["Diagnóstico"],
+            dependencies=[Depends(verificar_admin)])
+def reset_debug_queries():
+    profiler.reset()
+    return None
+
 # --- Endpoint Raiz --- 
 
 @app.get("/", tags=["Root"])
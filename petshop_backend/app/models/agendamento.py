@@ -1,6 +1,6 @@
 from pydantic import BaseModel, Field
 from typing import Optional, List
-from datetime import datetime
+from datetime import date, datetime
 from decimal import Decimal
 
 class AgendamentoServicoDetalhe(BaseModel):
@@ -26,10 +26,13 @@ class AgendamentoUpdate(BaseModel):
     status: Optional[str] = Field(None, max_length=50, pattern=r"^(Agendado|Confirmado|Cancelado|Concluído|Não Compareceu)$")
     observacoes: Optional[str] = None
     servicos_ids: Optional[List[int]] = None
+    versao: Optional[int] = Field(None, ge=1, description="Versão que foi editada (como o If-Match); se o registro mudou desde então, 409")
 
 class AgendamentoInDBBase(AgendamentoBase):
     agendamento_id: int
+    filial_id: int
     data_hora_criacao: datetime
+    versao: int
 
     class Config:
         from_attributes = True
@@ -45,4 +48,46 @@ class AgendamentoSimple(AgendamentoInDBBase):
     animal_nome: Optional[str] = None
     cliente_nome: Optional[str] = None
     funcionario_nome: Optional[str] = None
-    valor_total: Optional[Decimal] = None
\ No newline at end of file
+    valor_total: Optional[Decimal] = None
+
+class CalendarioFuncionario(BaseModel):
+    """Agenda de um funcionário em formato colunar: a posição i de cada lista é o i-ésimo agendamento."""
+    funcionario_id: int
+    agendamento_id: List[int] = []
+    dia: List[date] = []
+    inicio: List[datetime] = []
+    fim: List[datetime] = []
+    status: List[str] = []
+    animal: List[str] = []
+    valor_total: List[Decimal] = []
+
+class CalendarioAgendamentos(BaseModel):
+    fuso_horario: str
+    data_inicio: date
+    data_fim: date
+    funcionarios: List[CalendarioFuncionario]
+
+class AtribuicaoPedido(BaseModel):
+    """Período (data_hora_agendamento em [data_inicio, data_fim)) dos agendamentos sem funcionário a atribuir."""
+    data_inicio: datetime
+    data_fim: datetime
+    cargo: Optional[str] = Field(None, max_length=50, description="Só funcionários ativos deste cargo")
+    dry_run: bool = Field(False, description="Calcula as atribuições sem gravá-las")
+
+class AtribuicaoAgendamento(BaseModel):
+    agendamento_id: int
+    funcionario_id: int
+    inicio: datetime
+    fim: datetime
+
+class CargaFuncionario(BaseModel):
+    funcionario_id: int
+    agendamentos_atribuidos: int
+    minutos_ocupados: int
+
+class ResultadoAtribuicao(BaseModel):
+    dry_run: bool
+    pendentes: int
+    atribuicoes: List[AtribuicaoAgendamento]
+    sem_funcionario: List[int]
+    funcionarios: List[CargaFuncionario]
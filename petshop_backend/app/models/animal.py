@@ -19,15 +19,18 @@ class AnimalUpdate(BaseModel):
     raca: Optional[str] = Field(None, max_length=50)
     data_nascimento: Optional[date] = None
     observacoes: Optional[str] = None
-   
+    versao: Optional[int] = Field(None, ge=1, description="Versão que foi editada (como o If-Match); se o registro mudou desde então, 409")
 
 class AnimalInDB(AnimalBase):
     animal_id: int
+    filial_id: int
+    versao: int
 
     class Config:
         from_attributes = True
 
 class Animal(AnimalInDB):
-    pass
+    # Nome do dono: preenchido apenas quando pedido em ?fields= (listagem de animais).
+    cliente_nome: Optional[str] = None
 
 
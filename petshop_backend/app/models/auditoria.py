@@ -0,0 +1,17 @@
+from pydantic import BaseModel
+from typing import Any, Dict, Literal, Optional
+from datetime import datetime
+
+EntidadeAuditada = Literal["clientes", "animais", "funcionarios", "servicos", "agendamentos"]
+AcaoAuditada = Literal["create", "update", "delete"]
+
+class RegistroAuditoria(BaseModel):
+    auditoria_id: int
+    entidade: EntidadeAuditada
+    entidade_id: int
+    acao: AcaoAuditada
+    # create/delete: valores do registro; update: {"campo": {"de": ..., "para": ...}}
+    alteracoes: Dict[str, Any]
+    autor: Optional[str] = None  # header X-Usuario
+    endpoint: Optional[str] = None
+    data_hora: datetime
@@ -1,7 +1,10 @@
 from pydantic import BaseModel, EmailStr, Field
-from typing import Optional
+from typing import List, Optional
 from datetime import datetime
 
+from app.models.estatisticas import Estatisticas
+from app.models.lote import LIMITE_LOTE
+
 class ClienteBase(BaseModel):
     nome: str = Field(..., min_length=3, max_length=255)
     telefone: str = Field(..., max_length=20)
@@ -16,14 +19,21 @@ class ClienteUpdate(BaseModel):
     telefone: Optional[str] = Field(None, max_length=20)
     email: Optional[EmailStr] = None
     endereco: Optional[str] = Field(None, max_length=500)
+    versao: Optional[int] = Field(None, ge=1, description="Versão que foi editada (como o If-Match); se o registro mudou desde então, 409")
 
 class ClienteInDB(ClienteBase):
     cliente_id: int
+    filial_id: int
     data_cadastro: datetime
+    versao: int
 
     class Config:
         from_attributes = True 
 
 class Cliente(ClienteInDB):
-    pass
+    # Preenchidas apenas na listagem ordenada por estatística (?ordenar=gasto_total etc.).
+    estatisticas: Optional[Estatisticas] = None
+
+class ClientesLote(BaseModel):
+    clientes: List[ClienteCreate] = Field(..., min_length=1, max_length=LIMITE_LOTE)
 
@@ -0,0 +1,21 @@
+from pydantic import BaseModel
+from typing import Literal, Optional
+from datetime import datetime
+from decimal import Decimal
+
+# ?ordenar= da listagem de clientes: nome ou uma das estatísticas (maiores primeiro).
+OrdenacaoClientes = Literal["nome", "gasto_total", "visitas", "ultima_visita", "nao_comparecimentos"]
+
+class Estatisticas(BaseModel):
+    visitas: int = 0  # agendamentos concluídos
+    gasto_total: Decimal = Decimal("0.00")  # soma dos preços registrados nas visitas
+    ultima_visita: Optional[datetime] = None
+    nao_comparecimentos: int = 0
+    servico_favorito_id: Optional[int] = None  # serviço mais feito nas visitas
+    servico_favorito_nome: Optional[str] = None
+
+class EstatisticasCliente(Estatisticas):
+    cliente_id: int
+
+class EstatisticasAnimal(Estatisticas):
+    animal_id: int
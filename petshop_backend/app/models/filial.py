@@ -0,0 +1,18 @@
+from pydantic import BaseModel, Field
+from datetime import datetime
+
+class FilialBase(BaseModel):
+    nome: str = Field(..., min_length=2, max_length=150)
+
+class FilialCreate(FilialBase):
+    pass
+
+class FilialInDB(FilialBase):
+    filial_id: int
+    data_cadastro: datetime
+
+    class Config:
+        from_attributes = True
+
+class Filial(FilialInDB):
+    banco_proprio: bool = False  # dados em um banco separado (FILIAIS_BANCOS)
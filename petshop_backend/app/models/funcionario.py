@@ -1,7 +1,9 @@
 from pydantic import BaseModel, EmailStr, Field
-from typing import Optional
+from typing import List, Optional
 from datetime import date
 
+from app.models.lote import LIMITE_LOTE
+
 class FuncionarioBase(BaseModel):
     nome: str = Field(..., min_length=3, max_length=255)
     cargo: str = Field(..., max_length=100)
@@ -13,6 +15,9 @@ class FuncionarioBase(BaseModel):
 class FuncionarioCreate(FuncionarioBase):
     pass
 
+class FuncionarioUpsert(FuncionarioBase):
+    email: EmailStr  # Chave do upsert: obrigatório.
+
 class FuncionarioUpdate(BaseModel):
     nome: Optional[str] = Field(None, min_length=3, max_length=255)
     cargo: Optional[str] = Field(None, max_length=100)
@@ -20,9 +25,12 @@ class FuncionarioUpdate(BaseModel):
     email: Optional[EmailStr] = None
     data_contratacao: Optional[date] = None
     ativo: Optional[bool] = None
+    versao: Optional[int] = Field(None, ge=1, description="Versão que foi editada (como o If-Match); se o registro mudou desde então, 409")
 
 class FuncionarioInDB(FuncionarioBase):
     funcionario_id: int
+    filial_id: int
+    versao: int
 
     class Config:
         from_attributes = True
@@ -30,3 +38,6 @@ class FuncionarioInDB(FuncionarioBase):
 class Funcionario(FuncionarioInDB):
     pass
 
+class FuncionariosLote(BaseModel):
+    funcionarios: List[FuncionarioUpsert] = Field(..., min_length=1, max_length=LIMITE_LOTE)
+
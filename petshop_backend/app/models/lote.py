@@ -0,0 +1,53 @@
+from pydantic import BaseModel, Field, model_validator
+from typing import Any, Dict, List, Literal, Optional, Union
+
+# Máximo de registros por requisição de upsert em lote.
+LIMITE_LOTE = 10000
+
+# Máximo de operações por requisição em POST /lote.
+LIMITE_OPERACOES = 100
+
+class ResultadoUpsertLote(BaseModel):
+    recebidos: int
+    inseridos: int
+    atualizados: int
+    inalterados: int
+    # Linhas com o e-mail de outra linha seguinte do lote: vale a última ocorrência.
+    duplicados: int
+    ids: Dict[str, int]  # e-mail -> ID do registro
+
+class OperacaoLote(BaseModel):
+    acao: Literal["create", "update", "delete"]
+    entidade: Literal["clientes", "animais", "funcionarios", "servicos", "agendamentos"]
+    # ID do registro (update/delete): um número ou "$ref" de um create anterior do mesmo lote.
+    id: Optional[Union[int, str]] = None
+    # Nome pelo qual operações seguintes referenciam o ID criado (só em create).
+    ref: Optional[str] = Field(None, pattern=r"^\w+$", max_length=50)
+    # Corpo da operação, como no endpoint da entidade. Campos *_id/*_ids aceitam "$ref".
+    dados: Dict[str, Any] = Field(default_factory=dict)
+
+    @model_validator(mode="after")
+    def validar_acao(self):
+        if self.acao == "create" and self.id is not None:
+            raise ValueError("create não recebe id")
+        if self.acao != "create" and self.id is None:
+            raise ValueError(f"{self.acao} exige id")
+        if self.acao != "create" and self.ref is not None:
+            raise ValueError("ref só pode ser usado em create")
+        return self
+
+class OperacoesLote(BaseModel):
+    operacoes: List[OperacaoLote] = Field(..., min_length=1, max_length=LIMITE_OPERACOES)
+
+class ResultadoOperacao(BaseModel):
+    indice: int
+    acao: str
+    entidade: str
+    status: int  # status HTTP que a operação teria isoladamente (424: não aplicada)
+    id: Optional[int] = None
+    resultado: Optional[Dict[str, Any]] = None
+    erro: Optional[str] = None
+
+class ResultadoOperacoesLote(BaseModel):
+    sucesso: bool
+    resultados: List[ResultadoOperacao]
@@ -0,0 +1,30 @@
+from pydantic import BaseModel
+from typing import Literal, Optional
+from datetime import datetime
+
+TipoRelatorio = Literal["agendamentos", "faturamento"]
+FormatoRelatorio = Literal["pdf", "xlsx"]
+StatusJob = Literal["pendente", "executando", "concluido", "erro"]
+
+class RelatorioJobCreate(BaseModel):
+    tipo: TipoRelatorio
+    formato: FormatoRelatorio = "pdf"
+    data_inicio: Optional[datetime] = None  # padrão: início do mês corrente
+    data_fim: Optional[datetime] = None  # exclusivo; padrão: início do mês seguinte
+
+class RelatorioJob(BaseModel):
+    job_id: str
+    tipo: TipoRelatorio
+    formato: FormatoRelatorio
+    data_inicio: datetime
+    data_fim: datetime
+    filial_id: int
+    status: StatusJob
+    criado_em: datetime
+    concluido_em: Optional[datetime] = None
+    linhas: Optional[int] = None
+    erro: Optional[str] = None
+    em_cache: bool = False
+
+    class Config:
+        from_attributes = True
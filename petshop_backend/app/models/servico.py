@@ -15,9 +15,12 @@ class ServicoUpdate(BaseModel):
     descricao: Optional[str] = None
     preco: Optional[condecimal(max_digits=10, decimal_places=2)] = Field(None, ge=0)
     duracao_estimada_minutos: Optional[int] = Field(None, gt=0)
+    versao: Optional[int] = Field(None, ge=1, description="Versão que foi editada (como o If-Match); se o registro mudou desde então, 409")
 
 class ServicoInDB(ServicoBase):
     servico_id: int
+    filial_id: int
+    versao: int
 
     class Config:
         from_attributes = True
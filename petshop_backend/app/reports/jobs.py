@@ -0,0 +1,163 @@
+import hashlib
+import multiprocessing
+import os
+import tempfile
+import threading
+import time
+import uuid
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime, timezone
+from typing import Dict, Optional, Tuple
+
+from app.reports.render import render_report
+
+# --- Jobs de relatórios em segundo plano ---
+#
+# A renderização (PDF/XLSX) roda num pool de processos, fora do processo da API, para não
+# disputar o GIL com os handlers. O registro dos jobs fica em memória, neste processo;
+# os arquivos ficam em RELATORIOS_DIR, nomeados pelo hash dos parâmetros, e um pedido com
+# os mesmos parâmetros dentro de RELATORIOS_CACHE_TTL_S reaproveita o job existente.
+
+RELATORIOS_WORKERS = int(os.getenv("RELATORIOS_WORKERS", "2"))
+RELATORIOS_CACHE_TTL_S = int(os.getenv("RELATORIOS_CACHE_TTL_S", "900"))
+RELATORIOS_DIR = os.getenv("RELATORIOS_DIR", os.path.join(tempfile.gettempdir(), "petshop_relatorios"))
+
+STATUS_PENDENTE = "pendente"
+STATUS_EXECUTANDO = "executando"
+STATUS_CONCLUIDO = "concluido"
+STATUS_ERRO = "erro"
+
+MEDIA_TYPES = {
+    "pdf": "application/pdf",
+    "xlsx": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+}
+
+
+class JobRelatorio:
+    """Estado de um job; `status` é derivado do Future enquanto ele não termina."""
+
+    def __init__(self, chave: str, tipo: str, formato: str, data_inicio: datetime, data_fim: datetime, filial_id: int):
+        self.job_id = uuid.uuid4().hex
+        self.chave = chave
+        self.tipo = tipo
+        self.formato = formato
+        self.data_inicio = data_inicio
+        self.data_fim = data_fim
+        self.filial_id = filial_id
+        self.criado_em = datetime.now(timezone.utc)
+        self.concluido_em: Optional[datetime] = None
+        self.linhas: Optional[int] = None
+        self.erro: Optional[str] = None
+        self.future: Optional[Future] = None
+        self._criado_monotonic = time.monotonic()
+
+    @property
+    def status(self) -> str:
+        if self.erro is not None:
+            return STATUS_ERRO
+        if self.concluido_em is not None:
+            return STATUS_CONCLUIDO
+        if self.future is not None and self.future.running():
+            return STATUS_EXECUTANDO
+        return STATUS_PENDENTE
+
+    @property
+    def caminho(self) -> str:
+        return os.path.join(RELATORIOS_DIR, f"{self.chave}.{self.formato}")
+
+    @property
+    def nome_arquivo(self) -> str:
+        return f"{self.tipo}_filial{self.filial_id}_{self.data_inicio:%Y%m%d}_{self.data_fim:%Y%m%d}.{self.formato}"
+
+    def expirado(self) -> bool:
+        return time.monotonic() - self._criado_monotonic > RELATORIOS_CACHE_TTL_S
+
+
+def chave_parametros(tipo: str, formato: str, data_inicio: datetime, data_fim: datetime, filial_id: int) -> str:
+    texto = "|".join([tipo, formato, data_inicio.isoformat(), data_fim.isoformat(), str(filial_id)])
+    return hashlib.sha256(texto.encode()).hexdigest()[:32]
+
+
+class GerenciadorJobs:
+    def __init__(self, workers: int = RELATORIOS_WORKERS):
+        self.workers = workers
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._jobs: Dict[str, JobRelatorio] = {}
+        self._por_chave: Dict[str, str] = {}
+        self._lock = threading.Lock()
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            # "spawn" evita herdar, via fork, as threads e as conexões do pool do processo da API.
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers, mp_context=multiprocessing.get_context("spawn")
+            )
+        return self._executor
+
+    def submit(self, tipo: str, formato: str, data_inicio: datetime, data_fim: datetime, filial_id: int) -> Tuple[JobRelatorio, bool]:
+        """Enfileira o relatório, ou devolve o job existente com os mesmos parâmetros.
+
+        Retorna (job, em_cache).
+        """
+        chave = chave_parametros(tipo, formato, data_inicio, data_fim, filial_id)
+        with self._lock:
+            self._limpar_expirados()
+            existente = self._jobs.get(self._por_chave.get(chave, ""))
+            if existente is not None and existente.status != STATUS_ERRO:
+                return existente, True
+
+            job = JobRelatorio(chave, tipo, formato, data_inicio, data_fim, filial_id)
+            os.makedirs(RELATORIOS_DIR, exist_ok=True)
+            try:
+                job.future = self._get_executor().submit(
+                    render_report, tipo, formato, data_inicio, data_fim, filial_id, job.caminho
+                )
+            except BrokenProcessPool:
+                # Um processo do pool morreu (ex.: OOM); recria o pool e tenta de novo.
+                self._executor = None
+                job.future = self._get_executor().submit(
+                    render_report, tipo, formato, data_inicio, data_fim, filial_id, job.caminho
+                )
+            self._jobs[job.job_id] = job
+            self._por_chave[chave] = job.job_id
+        job.future.add_done_callback(lambda future: self._finalizar(job, future))
+        return job, False
+
+    def _finalizar(self, job: JobRelatorio, future: Future) -> None:
+        try:
+            job.linhas = future.result()
+            job.concluido_em = datetime.now(timezone.utc)
+        except Exception as e:
+            print(f"Erro ao gerar relatório {job.job_id} ({job.tipo}/{job.formato}): {e}")
+            job.erro = str(e) or e.__class__.__name__
+
+    def get(self, job_id: str) -> Optional[JobRelatorio]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def _limpar_expirados(self) -> None:
+        """Descarta jobs terminados além do TTL e seus arquivos. Chamado com o lock adquirido."""
+        for job_id, job in list(self._jobs.items()):
+            if not job.expirado() or job.status in (STATUS_PENDENTE, STATUS_EXECUTANDO):
+                continue
+            del self._jobs[job_id]
+            if self._por_chave.get(job.chave) == job_id:
+                del self._por_chave[job.chave]
+                if os.path.exists(job.caminho):
+                    os.remove(job.caminho)
+
+    def metricas(self) -> dict:
+        with self._lock:
+            por_status: Dict[str, int] = {}
+            for job in self._jobs.values():
+                por_status[job.status] = por_status.get(job.status, 0) + 1
+        return {"workers": self.workers, "jobs": por_status}
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+gerenciador_jobs = GerenciadorJobs()
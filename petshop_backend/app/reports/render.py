@@ -0,0 +1,187 @@
+from datetime import datetime
+from decimal import Decimal
+
+import os
+
+import psycopg2
+
+from app.db.database import banco_da_filial
+
+# --- Renderização de relatórios (executada nos processos do pool de jobs) ---
+#
+# Cada processo abre sua própria conexão (no banco da filial do relatório) e lê as linhas
+# com um cursor nomeado (server-side),
+# em lotes de TAMANHO_LOTE, entregando-as uma a uma ao renderizador: nem o resultado da
+# consulta nem o documento inteiro ficam em memória.
+
+TAMANHO_LOTE = 2000
+
+SQL_AGENDAMENTOS = """
+    SELECT
+        a.agendamento_id,
+        a.data_hora_agendamento,
+        c.nome AS cliente_nome,
+        ani.nome AS animal_nome,
+        COALESCE(f.nome, '') AS funcionario_nome,
+        a.status,
+        COALESCE((
+            SELECT SUM(ags.preco_registrado)
+            FROM Agendamento_Servicos ags
+            WHERE ags.agendamento_id = a.agendamento_id
+        ), 0) AS valor_total
+    FROM Agendamentos a
+    JOIN Animais ani ON a.animal_id = ani.animal_id
+    JOIN Clientes c ON ani.cliente_id = c.cliente_id
+    LEFT JOIN Funcionarios f ON a.funcionario_id = f.funcionario_id
+    WHERE a.filial_id = %s
+      AND a.data_hora_agendamento >= %s AND a.data_hora_agendamento < %s
+    ORDER BY a.data_hora_agendamento;
+"""
+
+SQL_FATURAMENTO = """
+    SELECT
+        c.cliente_id,
+        c.nome AS cliente_nome,
+        COUNT(DISTINCT a.agendamento_id) AS atendimentos,
+        SUM(ags.preco_registrado) AS valor_total
+    FROM Agendamentos a
+    JOIN Agendamento_Servicos ags ON ags.agendamento_id = a.agendamento_id
+    JOIN Animais ani ON a.animal_id = ani.animal_id
+    JOIN Clientes c ON ani.cliente_id = c.cliente_id
+    WHERE a.filial_id = %s
+      AND a.status = 'Concluído'
+      AND a.data_hora_agendamento >= %s AND a.data_hora_agendamento < %s
+    GROUP BY c.cliente_id, c.nome
+    ORDER BY c.nome;
+"""
+
+RELATORIOS = {
+    "agendamentos": {
+        "titulo": "Agendamentos",
+        "sql": SQL_AGENDAMENTOS,
+        "colunas": ["ID", "Data/hora", "Cliente", "Animal", "Funcionário", "Status", "Valor total"],
+        "larguras_pdf": [40, 95, 120, 90, 100, 75, 60],
+        "coluna_total": 6,
+    },
+    "faturamento": {
+        "titulo": "Faturamento por cliente",
+        "sql": SQL_FATURAMENTO,
+        "colunas": ["ID", "Cliente", "Atendimentos", "Valor total"],
+        "larguras_pdf": [50, 280, 90, 100],
+        "coluna_total": 3,
+    },
+}
+
+
+def _iter_rows(filial_id: int, sql: str, params):
+    conn = psycopg2.connect(banco_da_filial(filial_id))
+    try:
+        with conn.cursor(name="relatorio") as cursor:
+            cursor.itersize = TAMANHO_LOTE
+            cursor.execute(sql, params)
+            for row in cursor:
+                yield row
+    finally:
+        conn.close()
+
+
+def _formatar(valor) -> str:
+    if valor is None:
+        return ""
+    if isinstance(valor, datetime):
+        return valor.strftime("%d/%m/%Y %H:%M")
+    if isinstance(valor, Decimal):
+        return f"{valor:,.2f}".replace(",", "X").replace(".", ",").replace("X", ".")
+    return str(valor)
+
+
+def _render_xlsx(definicao, linhas, caminho: str, subtitulo: str) -> int:
+    from openpyxl import Workbook
+
+    workbook = Workbook(write_only=True)
+    planilha = workbook.create_sheet(definicao["titulo"][:31])
+    planilha.append([definicao["titulo"], subtitulo])
+    planilha.append(definicao["colunas"])
+    total_geral = Decimal(0)
+    quantidade = 0
+    for linha in linhas:
+        linha = list(linha)
+        if isinstance(linha[1], datetime):
+            # Excel não aceita datetime com fuso horário.
+            linha[1] = linha[1].replace(tzinfo=None)
+        planilha.append(linha)
+        total_geral += linha[definicao["coluna_total"]] or 0
+        quantidade += 1
+    planilha.append([])
+    planilha.append(["Total", *[""] * (definicao["coluna_total"] - 1), total_geral])
+    workbook.save(caminho)
+    return quantidade
+
+
+def _render_pdf(definicao, linhas, caminho: str, subtitulo: str) -> int:
+    from reportlab.lib.pagesizes import A4, landscape
+    from reportlab.pdfgen import canvas
+
+    largura, altura = landscape(A4)
+    margem = 30
+    altura_linha = 14
+    pdf = canvas.Canvas(caminho, pagesize=(largura, altura))
+    posicoes = [margem]
+    for largura_coluna in definicao["larguras_pdf"][:-1]:
+        posicoes.append(posicoes[-1] + largura_coluna)
+
+    def cabecalho(pagina: int) -> float:
+        pdf.setFont("Helvetica-Bold", 14)
+        pdf.drawString(margem, altura - margem, definicao["titulo"])
+        pdf.setFont("Helvetica", 9)
+        pdf.drawString(margem, altura - margem - 14, subtitulo)
+        pdf.drawRightString(largura - margem, altura - margem, f"Página {pagina}")
+        y = altura - margem - 36
+        pdf.setFont("Helvetica-Bold", 9)
+        for x, titulo in zip(posicoes, definicao["colunas"]):
+            pdf.drawString(x, y, titulo)
+        pdf.setFont("Helvetica", 8)
+        return y - altura_linha
+
+    pagina = 1
+    y = cabecalho(pagina)
+    total_geral = Decimal(0)
+    quantidade = 0
+    for linha in linhas:
+        if y < margem + altura_linha:
+            pdf.showPage()
+            pagina += 1
+            y = cabecalho(pagina)
+        for x, largura_coluna, valor in zip(posicoes, definicao["larguras_pdf"], linha):
+            texto = _formatar(valor)
+            # Corta o texto que não cabe na coluna (aprox. 4.5pt por caractere na fonte 8).
+            pdf.drawString(x, y, texto[: max(1, int(largura_coluna / 4.5))])
+        total_geral += linha[definicao["coluna_total"]] or 0
+        quantidade += 1
+        y -= altura_linha
+
+    pdf.setFont("Helvetica-Bold", 10)
+    pdf.drawString(margem, max(y - altura_linha, margem), f"{quantidade} registros — Total: R$ {_formatar(total_geral)}")
+    pdf.save()
+    return quantidade
+
+
+RENDERIZADORES = {"xlsx": _render_xlsx, "pdf": _render_pdf}
+
+
+def render_report(tipo: str, formato: str, data_inicio: datetime, data_fim: datetime, filial_id: int, caminho: str) -> int:
+    """Gera o relatório em `caminho` e retorna a quantidade de linhas. Roda no processo do pool.
+
+    O arquivo é escrito com outro nome e renomeado no fim, para nunca servir um relatório pela metade.
+    """
+    definicao = RELATORIOS[tipo]
+    subtitulo = f"Filial {filial_id} - Período: {data_inicio:%d/%m/%Y} a {data_fim:%d/%m/%Y} (fim exclusivo)"
+    linhas = _iter_rows(filial_id, definicao["sql"], (filial_id, data_inicio, data_fim))
+    parcial = f"{caminho}.parcial"
+    try:
+        quantidade = RENDERIZADORES[formato](definicao, linhas, parcial, subtitulo)
+        os.replace(parcial, caminho)
+    finally:
+        if os.path.exists(parcial):
+            os.remove(parcial)
+    return quantidade
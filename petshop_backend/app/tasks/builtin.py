@@ -0,0 +1,119 @@
+import os
+from datetime import datetime, timedelta
+from zoneinfo import ZoneInfo
+
+from app.core.audit import ACAO_UPDATE, registrar_auditoria
+from app.crud import crud_estatisticas
+from app.tasks.mailer import enviar_email
+from app.tasks.queue import Recorrente, tarefa
+
+# --- Tarefas operacionais embutidas ---
+#
+# Cada handler recebe (payload, cursor) e roda na mesma transação que marca a tarefa como
+# concluída: se ele falhar, nada do que fez no banco é gravado.
+
+FUSO_HORARIO_PADRAO = os.getenv("PETSHOP_FUSO_HORARIO", "America/Sao_Paulo")
+DIAS_RETENCAO_TAREFAS = int(os.getenv("TAREFAS_DIAS_RETENCAO", "7"))
+
+RECORRENTES = [
+    Recorrente("lembretes_diarios", "enviar_lembretes", "18:00"),
+    Recorrente("varredura_nao_comparecimento", "marcar_nao_comparecimento", "01:00"),
+    Recorrente("limpeza_tarefas", "limpar_tarefas", "03:30"),
+]
+
+
+def _inicio_do_dia(fuso_horario: str, deslocamento_dias: int = 0) -> datetime:
+    agora = datetime.now(ZoneInfo(fuso_horario))
+    inicio = agora.replace(hour=0, minute=0, second=0, microsecond=0)
+    return inicio + timedelta(days=deslocamento_dias)
+
+
+@tarefa("marcar_nao_comparecimento")
+def marcar_nao_comparecimento(payload: dict, cursor) -> int:
+    """Marca como 'Não Compareceu' os agendamentos ainda 'Agendado' de dias anteriores.
+
+    Um único UPDATE para todo o período (usa idx_agendamentos_status_data); as estatísticas
+    dos animais e clientes recebem os não comparecimentos em um comando.
+    """
+    limite = _inicio_do_dia(payload.get("fuso_horario", FUSO_HORARIO_PADRAO))
+    cursor.execute(
+        """
+        UPDATE Agendamentos
+        SET status = 'Não Compareceu', versao = versao + 1
+        WHERE status = 'Agendado' AND data_hora_agendamento < %s
+        RETURNING agendamento_id, filial_id, animal_id;
+        """,
+        (limite,),
+    )
+    marcados = cursor.fetchall()
+    crud_estatisticas.somar_nao_comparecimentos(cursor, [animal_id for _, _, animal_id in marcados])
+    for agendamento_id, filial_id, _ in marcados:
+        registrar_auditoria("agendamentos", agendamento_id, ACAO_UPDATE, antes={"status": "Agendado"},
+                            depois={"status": "Não Compareceu"}, filial_id=filial_id)
+    return len(marcados)
+
+
+@tarefa("enviar_lembretes")
+def enviar_lembretes(payload: dict, cursor) -> int:
+    """Enfileira uma tarefa 'enviar_lembrete' por agendamento de amanhã (INSERT ... SELECT).
+
+    A chave_unica por agendamento/horário impede lembretes duplicados se a tarefa rodar de novo.
+    """
+    fuso_horario = payload.get("fuso_horario", FUSO_HORARIO_PADRAO)
+    inicio = _inicio_do_dia(fuso_horario, 1)
+    fim = _inicio_do_dia(fuso_horario, 2)
+    cursor.execute(
+        """
+        INSERT INTO Tarefas (tipo, payload, chave_unica)
+        SELECT 'enviar_lembrete',
+               jsonb_build_object('agendamento_id', a.agendamento_id, 'fuso_horario', %s::text),
+               'lembrete:' || a.agendamento_id || ':' || extract(epoch FROM a.data_hora_agendamento)::bigint
+        FROM Agendamentos a
+        WHERE a.status IN ('Agendado', 'Confirmado')
+          AND a.data_hora_agendamento >= %s AND a.data_hora_agendamento < %s
+        ON CONFLICT (chave_unica) DO NOTHING;
+        """,
+        (fuso_horario, inicio, fim),
+    )
+    return cursor.rowcount
+
+
+@tarefa("enviar_lembrete")
+def enviar_lembrete(payload: dict, cursor) -> bool:
+    """Envia o lembrete de um agendamento, se ele ainda estiver em aberto."""
+    cursor.execute(
+        """
+        SELECT c.nome, c.email, ani.nome, a.data_hora_agendamento, a.status
+        FROM Agendamentos a
+        JOIN Animais ani ON a.animal_id = ani.animal_id
+        JOIN Clientes c ON ani.cliente_id = c.cliente_id
+        WHERE a.agendamento_id = %s;
+        """,
+        (payload["agendamento_id"],),
+    )
+    row = cursor.fetchone()
+    if row is None or row[4] not in ("Agendado", "Confirmado"):
+        return False
+    cliente_nome, email, animal_nome, data_hora, _ = row
+    data_local = data_hora.astimezone(ZoneInfo(payload.get("fuso_horario", FUSO_HORARIO_PADRAO)))
+    enviar_email(
+        email,
+        f"Lembrete: {animal_nome} tem horário amanhã",
+        f"Olá, {cliente_nome}!\n\nLembramos que {animal_nome} tem atendimento agendado para "
+        f"{data_local:%d/%m/%Y} às {data_local:%H:%M}.\n\nAté lá!",
+    )
+    return True
+
+
+@tarefa("limpar_tarefas")
+def limpar_tarefas(payload: dict, cursor) -> int:
+    """Remove tarefas concluídas há mais de TAREFAS_DIAS_RETENCAO dias."""
+    dias = payload.get("dias", DIAS_RETENCAO_TAREFAS)
+    cursor.execute(
+        """
+        DELETE FROM Tarefas
+        WHERE status = 'concluida' AND data_hora_conclusao < CURRENT_TIMESTAMP - make_interval(days => %s);
+        """,
+        (dias,),
+    )
+    return cursor.rowcount
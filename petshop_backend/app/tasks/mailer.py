@@ -0,0 +1,29 @@
+import os
+import smtplib
+from email.message import EmailMessage
+
+# --- Envio de e-mails ---
+#
+# Sem SMTP_HOST configurado (ambiente local) o e-mail só é impresso no console.
+
+SMTP_HOST = os.getenv("SMTP_HOST")
+SMTP_PORT = int(os.getenv("SMTP_PORT", "587"))
+SMTP_USER = os.getenv("SMTP_USER")
+SMTP_PASSWORD = os.getenv("SMTP_PASSWORD")
+EMAIL_REMETENTE = os.getenv("EMAIL_REMETENTE", "agendamentos@petshop.local")
+
+
+def enviar_email(para: str, assunto: str, corpo: str) -> None:
+    if not SMTP_HOST:
+        print(f"[e-mail] Para: {para} | Assunto: {assunto}\n{corpo}")
+        return
+    mensagem = EmailMessage()
+    mensagem["From"] = EMAIL_REMETENTE
+    mensagem["To"] = para
+    mensagem["Subject"] = assunto
+    mensagem.set_content(corpo)
+    with smtplib.SMTP(SMTP_HOST, SMTP_PORT, timeout=30) as smtp:
+        smtp.starttls()
+        if SMTP_USER:
+            smtp.login(SMTP_USER, SMTP_PASSWORD)
+        smtp.send_message(mensagem)
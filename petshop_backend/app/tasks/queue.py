@@ -0,0 +1,182 @@
+import json
+import os
+import random
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, NamedTuple, Optional
+
+import psycopg2
+
+from app.db.database import BancoDadosError, get_db_cursor
+
+# --- Fila de tarefas no Postgres (tabela Tarefas) ---
+#
+# Workers pegam lotes com FOR UPDATE SKIP LOCKED: cada linha pronta vai para um único
+# worker sem que eles esperem uns pelos outros, então basta subir mais processos para
+# escalar. Ao pegar uma tarefa o worker recebe um prazo (bloqueada_ate); se ele morrer,
+# a tarefa volta a ser elegível quando o prazo vence. Falhas são reagendadas com backoff
+# exponencial e, esgotadas as tentativas, a tarefa fica com status 'falhou' (fila morta).
+
+STATUS_PENDENTE = "pendente"
+STATUS_EXECUTANDO = "executando"
+STATUS_CONCLUIDA = "concluida"
+STATUS_FALHOU = "falhou"
+
+PRAZO_EXECUCAO_S = int(os.getenv("TAREFAS_PRAZO_EXECUCAO_S", "300"))
+BACKOFF_BASE_S = int(os.getenv("TAREFAS_BACKOFF_BASE_S", "30"))
+BACKOFF_MAXIMO_S = int(os.getenv("TAREFAS_BACKOFF_MAXIMO_S", "3600"))
+
+
+class Tarefa(NamedTuple):
+    tarefa_id: int
+    tipo: str
+    payload: dict
+    tentativas: int
+    max_tentativas: int
+
+
+# Tipo da tarefa -> função(payload, cursor). Preenchido por @tarefa (ver app/tasks/builtin.py).
+HANDLERS: Dict[str, Callable] = {}
+
+
+def tarefa(tipo: str):
+    """Registra a função como handler das tarefas do tipo informado."""
+    def registrar(funcao: Callable) -> Callable:
+        HANDLERS[tipo] = funcao
+        return funcao
+    return registrar
+
+
+def enfileirar(tipo: str, payload: Optional[dict] = None, executar_em: Optional[datetime] = None,
+               chave_unica: Optional[str] = None, max_tentativas: int = 5) -> Optional[int]:
+    """Enfileira uma tarefa. Retorna o id, ou None se a chave_unica já estava na fila."""
+    sql = """
+        INSERT INTO Tarefas (tipo, payload, executar_em, chave_unica, max_tentativas)
+        VALUES (%s, %s, COALESCE(%s, CURRENT_TIMESTAMP), %s, %s)
+        ON CONFLICT (chave_unica) DO NOTHING
+        RETURNING tarefa_id;
+    """
+    with get_db_cursor(commit=True) as cursor:
+        cursor.execute(sql, (tipo, json.dumps(payload or {}), executar_em, chave_unica, max_tentativas))
+        row = cursor.fetchone()
+    return row[0] if row else None
+
+
+def claim(lote: int, prazo_s: int = PRAZO_EXECUCAO_S) -> List[Tarefa]:
+    """Pega até `lote` tarefas prontas (ou com prazo vencido) e as marca como em execução."""
+    sql = """
+        WITH prontas AS (
+            SELECT tarefa_id
+            FROM Tarefas
+            WHERE (status = 'pendente' AND executar_em <= CURRENT_TIMESTAMP)
+               OR (status = 'executando' AND bloqueada_ate < CURRENT_TIMESTAMP)
+            ORDER BY executar_em
+            LIMIT %s
+            FOR UPDATE SKIP LOCKED
+        )
+        UPDATE Tarefas t
+        SET status = 'executando',
+            tentativas = t.tentativas + 1,
+            bloqueada_ate = CURRENT_TIMESTAMP + make_interval(secs => %s)
+        FROM prontas
+        WHERE t.tarefa_id = prontas.tarefa_id
+        RETURNING t.tarefa_id, t.tipo, t.payload, t.tentativas, t.max_tentativas;
+    """
+    with get_db_cursor(commit=True) as cursor:
+        cursor.execute(sql, (lote, prazo_s))
+        return [Tarefa(*row) for row in cursor.fetchall()]
+
+
+def marcar_concluida(cursor, tarefa_id: int) -> None:
+    """Marca a tarefa como concluída no cursor informado (mesma transação do trabalho feito)."""
+    cursor.execute(
+        """
+        UPDATE Tarefas
+        SET status = 'concluida', bloqueada_ate = NULL, ultimo_erro = NULL,
+            data_hora_conclusao = CURRENT_TIMESTAMP
+        WHERE tarefa_id = %s;
+        """,
+        (tarefa_id,),
+    )
+
+
+def backoff(tentativas: int) -> float:
+    """Espera antes da próxima tentativa: exponencial, com teto e jitter de até 20%."""
+    espera = min(BACKOFF_BASE_S * 2 ** (tentativas - 1), BACKOFF_MAXIMO_S)
+    return espera * random.uniform(0.8, 1.0)
+
+
+def marcar_falha(tarefa: Tarefa, erro: str) -> str:
+    """Reagenda a tarefa com backoff ou a move para a fila morta. Retorna o novo status."""
+    novo_status = STATUS_FALHOU if tarefa.tentativas >= tarefa.max_tentativas else STATUS_PENDENTE
+    sql = """
+        UPDATE Tarefas
+        SET status = %(status)s, bloqueada_ate = NULL, ultimo_erro = %(erro)s,
+            executar_em = CASE WHEN %(status)s = 'pendente'
+                               THEN CURRENT_TIMESTAMP + make_interval(secs => %(espera)s)
+                               ELSE executar_em END
+        WHERE tarefa_id = %(tarefa_id)s;
+    """
+    params = {"status": novo_status, "erro": erro, "espera": backoff(tarefa.tentativas), "tarefa_id": tarefa.tarefa_id}
+    with get_db_cursor(commit=True) as cursor:
+        cursor.execute(sql, params)
+    return novo_status
+
+
+def reprocessar_falhas(tipo: Optional[str] = None) -> int:
+    """Devolve as tarefas da fila morta para a fila, zerando as tentativas."""
+    sql = """
+        UPDATE Tarefas
+        SET status = 'pendente', tentativas = 0, executar_em = CURRENT_TIMESTAMP
+        WHERE status = 'falhou' AND (%s::varchar IS NULL OR tipo = %s);
+    """
+    try:
+        with get_db_cursor(commit=True) as cursor:
+            cursor.execute(sql, (tipo, tipo))
+            return cursor.rowcount
+    except (psycopg2.Error, BancoDadosError) as e:
+        print(f"Erro ao reprocessar tarefas: {e}")
+        return 0
+
+
+def contar_por_status() -> Dict[str, int]:
+    try:
+        with get_db_cursor() as cursor:
+            cursor.execute("SELECT status, count(*) FROM Tarefas GROUP BY status;")
+            return dict(cursor.fetchall())
+    except (psycopg2.Error, BancoDadosError) as e:
+        print(f"Erro ao contar tarefas: {e}")
+        return {}
+
+
+# --- Tarefas recorrentes ---
+
+class Recorrente(NamedTuple):
+    """Tarefa agendada diariamente no horário local `hora` ("HH:MM") do fuso informado."""
+    nome: str
+    tipo: str
+    hora: str
+    payload: dict = {}
+
+
+def proxima_execucao(recorrente: Recorrente, agora: datetime) -> datetime:
+    """Próximo horário da recorrência a partir de `agora` (timezone-aware, no fuso desejado)."""
+    hora, minuto = (int(parte) for parte in recorrente.hora.split(":"))
+    candidato = agora.replace(hour=hora, minute=minuto, second=0, microsecond=0)
+    if candidato <= agora:
+        candidato += timedelta(days=1)
+    return candidato
+
+
+def agendar_recorrentes(recorrentes: List[Recorrente], agora: datetime) -> int:
+    """Garante que a próxima ocorrência de cada recorrência esteja na fila.
+
+    A chave_unica (nome + horário) torna a operação idempotente: vários workers podem
+    chamá-la ao mesmo tempo sem duplicar ocorrências.
+    """
+    agendadas = 0
+    for recorrente in recorrentes:
+        quando = proxima_execucao(recorrente, agora)
+        chave = f"recorrente:{recorrente.nome}:{quando.isoformat()}"
+        if enfileirar(recorrente.tipo, recorrente.payload, executar_em=quando, chave_unica=chave) is not None:
+            agendadas += 1
+    return agendadas
@@ -0,0 +1,114 @@
+"""Worker da fila de tarefas (tabela Tarefas).
+
+Uso (a partir de petshop_backend/; rode quantos processos quiser em paralelo):
+
+    python -m app.tasks.worker
+    python -m app.tasks.worker --uma-vez          # processa o que estiver pronto e sai
+    python -m app.tasks.worker --status
+    python -m app.tasks.worker --reprocessar-falhas [TIPO]
+"""
+import argparse
+import signal
+import sys
+import time
+from datetime import datetime
+from zoneinfo import ZoneInfo
+
+import psycopg2
+
+from app.db.database import BancoDadosError, get_db_cursor, use_cursor
+from app.tasks import builtin
+from app.tasks.queue import (
+    HANDLERS, STATUS_FALHOU, Tarefa, agendar_recorrentes, claim, contar_por_status,
+    marcar_concluida, marcar_falha, reprocessar_falhas,
+)
+
+INTERVALO_RECORRENTES_S = 60
+
+_parar = False
+
+
+def _sinal_parada(signum, frame):
+    global _parar
+    print("Encerrando após o lote atual...")
+    _parar = True
+
+
+def executar(tarefa: Tarefa) -> None:
+    """Roda o handler e marca a tarefa como concluída numa única transação."""
+    handler = HANDLERS.get(tarefa.tipo)
+    if handler is None:
+        # Nada a tentar de novo: vai direto para a fila morta.
+        marcar_falha(tarefa._replace(tentativas=tarefa.max_tentativas), f"Tipo de tarefa desconhecido: {tarefa.tipo}")
+        print(f"Tarefa {tarefa.tarefa_id}: tipo desconhecido '{tarefa.tipo}'")
+        return
+    if tarefa.tentativas > tarefa.max_tentativas:
+        # Retomada após prazo vencido mais vezes do que o permitido (worker morrendo na tarefa).
+        marcar_falha(tarefa, "Prazo de execução esgotado em todas as tentativas")
+        print(f"Tarefa {tarefa.tarefa_id} ({tarefa.tipo}) movida para a fila morta")
+        return
+
+    inicio = time.perf_counter()
+    try:
+        with get_db_cursor(commit=True) as cursor, use_cursor(cursor):
+            resultado = handler(tarefa.payload, cursor)
+            marcar_concluida(cursor, tarefa.tarefa_id)
+    except Exception as e:
+        status = marcar_falha(tarefa, f"{e.__class__.__name__}: {e}")
+        destino = "movida para a fila morta" if status == STATUS_FALHOU else "reagendada"
+        print(f"Erro na tarefa {tarefa.tarefa_id} ({tarefa.tipo}, tentativa {tarefa.tentativas}): {e} — {destino}")
+        return
+    duracao_ms = (time.perf_counter() - inicio) * 1000
+    print(f"Tarefa {tarefa.tarefa_id} ({tarefa.tipo}) concluída em {duracao_ms:.0f} ms: {resultado}")
+
+
+def run(lote: int, intervalo: float, uma_vez: bool) -> None:
+    fuso = ZoneInfo(builtin.FUSO_HORARIO_PADRAO)
+    ultimo_agendamento = 0.0
+    while not _parar:
+        try:
+            if time.monotonic() - ultimo_agendamento >= INTERVALO_RECORRENTES_S:
+                agendar_recorrentes(builtin.RECORRENTES, datetime.now(fuso))
+                ultimo_agendamento = time.monotonic()
+            tarefas = claim(lote)
+        except (psycopg2.Error, BancoDadosError) as e:
+            print(f"Erro ao buscar tarefas: {e}")
+            if uma_vez:
+                return
+            time.sleep(intervalo)
+            continue
+
+        for tarefa in tarefas:
+            executar(tarefa)
+        if not tarefas:
+            if uma_vez:
+                return
+            time.sleep(intervalo)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Worker da fila de tarefas do PetShop")
+    parser.add_argument("--lote", type=int, default=10, help="tarefas pegas por vez")
+    parser.add_argument("--intervalo", type=float, default=5.0, help="segundos de espera com a fila vazia")
+    parser.add_argument("--uma-vez", action="store_true", help="processa as tarefas prontas e sai")
+    parser.add_argument("--status", action="store_true", help="mostra a quantidade de tarefas por status e sai")
+    parser.add_argument("--reprocessar-falhas", nargs="?", const="", metavar="TIPO",
+                        help="devolve as tarefas da fila morta (opcionalmente só de um tipo) e sai")
+    args = parser.parse_args(argv)
+
+    if args.status:
+        for status, quantidade in sorted(contar_por_status().items()):
+            print(f"{status}: {quantidade}")
+        return 0
+    if args.reprocessar_falhas is not None:
+        print(f"{reprocessar_falhas(args.reprocessar_falhas or None)} tarefa(s) devolvida(s) para a fila")
+        return 0
+
+    signal.signal(signal.SIGTERM, _sinal_parada)
+    signal.signal(signal.SIGINT, _sinal_parada)
+    run(args.lote, args.intervalo, args.uma_vez)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,155 @@
+"""Benchmark da atribuição automática de funcionários (POST /agendamentos/atribuir).
+
+Cria um schema temporário com o modelo físico, gera funcionários, agendamentos já
+atribuídos e milhares de agendamentos sem funcionário por dia (horário comercial, em
+faixas de 15 minutos), e mede crud_atribuicao.atribuir_agendamentos em dry_run e gravando.
+Depois confere no banco que nenhum funcionário ficou com agendamentos sobrepostos e
+mostra a distribuição da carga.
+
+Uso (a partir de petshop_backend/):
+
+    python -m scripts.bench_assignment
+    python -m scripts.bench_assignment --por-dia 5000 --funcionarios 400 --dias 7
+"""
+import argparse
+import statistics
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+import psycopg2
+
+from app.db.database import DATABASE_URL, use_cursor
+from app.crud import crud_atribuicao
+
+SCHEMA = "bench_atribuicao"
+MODELO_FISICO = Path(__file__).resolve().parents[2] / "Modelagem Banco de Dados" / "Modelo Físico" / "modelo_fisico.sql"
+
+SQL_POPULAR = """
+    SELECT setseed(%(semente)s);
+
+    INSERT INTO Clientes (nome, telefone, email)
+    SELECT 'Cliente ' || g, '11' || lpad(g::text, 9, '0'), 'cliente' || g || '@exemplo.com'
+    FROM generate_series(1, 1000) g;
+
+    INSERT INTO Animais (cliente_id, nome, especie)
+    SELECT 1 + g %% 1000, 'Animal ' || g, 'Cão' FROM generate_series(1, 2000) g;
+
+    INSERT INTO Funcionarios (nome, cargo, email, data_contratacao, ativo)
+    SELECT 'Funcionário ' || g, (ARRAY['Tosador', 'Veterinário', 'Atendente'])[1 + g %% 3],
+           'funcionario' || g || '@exemplo.com', DATE '2020-01-01', g %% 20 <> 0
+    FROM generate_series(1, %(funcionarios)s) g;
+
+    INSERT INTO Servicos (nome, preco, duracao_estimada_minutos)
+    SELECT 'Serviço ' || g, 40 + g * 5, 15 * (1 + g %% 4) FROM generate_series(1, 12) g;
+
+    -- Horários de 8h às 19h45 (UTC), em faixas de 15 minutos; uma parte já tem funcionário.
+    INSERT INTO Agendamentos (animal_id, funcionario_id, data_hora_agendamento, status)
+    SELECT 1 + (random() * 1999)::int,
+           CASE WHEN g %% 10 < %(atribuidos_decimos)s THEN 1 + (random() * (%(funcionarios)s - 1))::int END,
+           %(inicio)s::timestamptz + (g %% %(dias)s) * interval '1 day'
+               + interval '8 hours' + (random() * 47)::int * interval '15 minutes',
+           (ARRAY['Agendado', 'Confirmado'])[1 + g %% 2]
+    FROM generate_series(1, %(agendamentos)s) g;
+
+    INSERT INTO Agendamento_Servicos (agendamento_id, servico_id, preco_registrado)
+    SELECT a.agendamento_id, 1 + a.agendamento_id %% 12, 50 FROM Agendamentos a;
+
+    ANALYZE;
+"""
+
+SQL_SOBREPOSTOS = """
+    WITH intervalos AS (
+        SELECT a.agendamento_id, a.funcionario_id,
+               tstzrange(a.data_hora_agendamento,
+                         a.data_hora_agendamento + make_interval(mins => sv.duracao_estimada_minutos)) AS periodo
+        FROM Agendamentos a
+        JOIN Agendamento_Servicos ags ON ags.agendamento_id = a.agendamento_id
+        JOIN Servicos sv ON sv.servico_id = ags.servico_id
+        WHERE a.funcionario_id IS NOT NULL
+    )
+    SELECT count(*)
+    FROM intervalos x
+    JOIN intervalos y ON x.funcionario_id = y.funcionario_id AND x.agendamento_id < y.agendamento_id
+                     AND x.periodo && y.periodo
+    WHERE x.agendamento_id = ANY(%(atribuidos)s) OR y.agendamento_id = ANY(%(atribuidos)s);
+"""
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--dias", type=int, default=7, help="dias do período de atribuição")
+    parser.add_argument("--por-dia", type=int, default=3000, help="agendamentos por dia (com e sem funcionário)")
+    parser.add_argument("--funcionarios", type=int, default=300, help="funcionários gerados (1 em 20 inativo)")
+    parser.add_argument("--atribuidos", type=int, default=3, choices=range(0, 10),
+                        help="décimos dos agendamentos que já chegam com funcionário")
+    parser.add_argument("--cargo", help="atribui só funcionários deste cargo")
+    parser.add_argument("--semente", type=float, default=0.42, help="semente do gerador (entre -1 e 1)")
+    parser.add_argument("--manter", action="store_true", help="não remove o schema ao final")
+    args = parser.parse_args(argv)
+
+    inicio = datetime.now(timezone.utc).replace(hour=0, minute=0, second=0, microsecond=0) + timedelta(days=1)
+    fim = inicio + timedelta(days=args.dias)
+
+    conn = psycopg2.connect(DATABASE_URL)
+    cursor = conn.cursor()
+    try:
+        cursor.execute(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE; CREATE SCHEMA {SCHEMA}; SET search_path TO {SCHEMA};")
+        cursor.execute(MODELO_FISICO.read_text(encoding="utf-8"))
+        print(f"Populando {SCHEMA}: {args.por_dia * args.dias} agendamentos, {args.funcionarios} funcionários...")
+        cursor.execute(SQL_POPULAR, {
+            "semente": args.semente,
+            "funcionarios": args.funcionarios,
+            "agendamentos": args.por_dia * args.dias,
+            "dias": args.dias,
+            "atribuidos_decimos": args.atribuidos,
+            "inicio": inicio,
+        })
+        conn.commit()
+
+        # O cursor do schema temporário é usado por todas as consultas da atribuição.
+        with use_cursor(cursor):
+            t0 = time.perf_counter()
+            simulado = crud_atribuicao.atribuir_agendamentos(inicio, fim, args.cargo, dry_run=True)
+            tempo_simulado = time.perf_counter() - t0
+            conn.rollback()
+
+            t0 = time.perf_counter()
+            resultado = crud_atribuicao.atribuir_agendamentos(inicio, fim, args.cargo)
+            tempo_gravado = time.perf_counter() - t0
+            conn.commit()
+        if simulado is None or resultado is None:
+            print("Erro na atribuição.")
+            return 1
+
+        print(f"\n{resultado.pendentes} agendamentos sem funcionário em {args.dias} dias "
+              f"({resultado.pendentes / args.dias:.0f}/dia), {len(resultado.funcionarios)} funcionários elegíveis")
+        print(f"dry_run   {tempo_simulado * 1000:>8.1f} ms  {len(simulado.atribuicoes)} atribuições")
+        print(f"gravando  {tempo_gravado * 1000:>8.1f} ms  {len(resultado.atribuicoes)} atribuições, "
+              f"{len(resultado.sem_funcionario)} sem funcionário livre")
+
+        cursor.execute(SQL_SOBREPOSTOS, {"atribuidos": [a.agendamento_id for a in resultado.atribuicoes]})
+        sobrepostos = cursor.fetchone()[0]
+        cargas = [f.minutos_ocupados for f in resultado.funcionarios]
+        if cargas:
+            print(f"carga (min) menor={min(cargas)} maior={max(cargas)} "
+                  f"média={statistics.mean(cargas):.0f} desvio={statistics.pstdev(cargas):.0f}")
+        print(f"sobreposições criadas: {sobrepostos}")
+        conn.rollback()
+    finally:
+        conn.rollback()
+        if not args.manter:
+            cursor.execute(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE;")
+            conn.commit()
+        cursor.close()
+        conn.close()
+
+    if simulado.atribuicoes != resultado.atribuicoes:
+        print("dry_run e gravação divergiram.")
+        return 1
+    return 1 if sobrepostos else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,183 @@
+"""Benchmark das funções crud no Postgres e no banco em memória (ARMAZENAMENTO=memoria).
+
+Roda a mesma carga nos dois armazenamentos: cria clientes, animais, funcionários, serviços
+e agendamentos, lê por ID, lista com busca e por período, atualiza e exclui. Mostra
+operações por segundo e as latências p50/p95 de cada tipo de operação. O banco em memória
+é a referência: a diferença para o Postgres é o custo de rede, SQL e transação.
+
+O Postgres usa o pool da aplicação num schema temporário (search_path via PGOPTIONS), com
+um commit por operação, como nos endpoints; a auditoria também grava nesse schema.
+
+Uso (a partir de petshop_backend/):
+
+    python -m scripts.bench_storage
+    python -m scripts.bench_storage --clientes 2000 --so memoria
+"""
+import os
+
+SCHEMA = "bench_armazenamento"
+# Antes de importar app: as conexões do pool (e a da auditoria) nascem com o search_path do schema.
+os.environ["PGOPTIONS"] = f"{os.environ.get('PGOPTIONS', '')} -c search_path={SCHEMA}".strip()
+
+import argparse
+import random
+import statistics
+import sys
+import time
+from collections import defaultdict
+from datetime import date, datetime, timedelta, timezone
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Callable, Dict, List
+
+import psycopg2
+
+from app.core.audit import gravador as gravador_auditoria
+from app.crud import crud_agendamento, crud_animal, crud_cliente, crud_funcionario, crud_servico
+from app.crud import memoria
+from app.db.database import DATABASE_URL
+from app.models.agendamento import AgendamentoCreate, AgendamentoUpdate
+from app.models.animal import AnimalCreate
+from app.models.cliente import ClienteCreate, ClienteUpdate
+from app.models.funcionario import FuncionarioCreate
+from app.models.servico import ServicoCreate
+
+MODELO_FISICO = Path(__file__).resolve().parents[2] / "Modelagem Banco de Dados" / "Modelo Físico" / "modelo_fisico.sql"
+NOMES = ["Ana", "Bruno", "Carla", "Diego", "Elisa", "Fábio", "Gabriela", "Hugo", "Isabela", "João"]
+SOBRENOMES = ["Silva", "Souza", "Costa", "Oliveira", "Pereira", "Lima", "Gomes", "Ribeiro"]
+
+
+def _percentil(valores: List[float], p: float) -> float:
+    ordenados = sorted(valores)
+    return ordenados[min(len(ordenados) - 1, int(round(p / 100 * (len(ordenados) - 1))))]
+
+
+class Medidor:
+    def __init__(self):
+        self.tempos: Dict[str, List[float]] = defaultdict(list)
+
+    def medir(self, operacao: str, funcao: Callable, *args, **kwargs):
+        t0 = time.perf_counter()
+        resultado = funcao(*args, **kwargs)
+        self.tempos[operacao].append(time.perf_counter() - t0)
+        return resultado
+
+
+def executar_carga(crud: SimpleNamespace, clientes: int, semente: int) -> Medidor:
+    """A mesma sequência de operações (pela semente) sobre as funções crud recebidas."""
+    aleatorio = random.Random(semente)
+    medidor = Medidor()
+    m = medidor.medir
+
+    servicos = [m("create_servico", crud.servico.create_servico,
+                  ServicoCreate(nome=f"Serviço {i}", preco=40 + 5 * i, duracao_estimada_minutos=15 * (1 + i % 4)))
+                for i in range(10)]
+    funcionarios = [m("create_funcionario", crud.funcionario.create_funcionario,
+                      FuncionarioCreate(nome=f"Funcionário {i}", cargo="Tosador", email=f"funcionario{i}@exemplo.com",
+                                        data_contratacao=date(2020, 1, 1)))
+                    for i in range(max(5, clientes // 50))]
+
+    inicio = datetime.now(timezone.utc).replace(minute=0, second=0, microsecond=0)
+    ids_clientes, ids_animais, ids_agendamentos = [], [], []
+    for i in range(clientes):
+        nome = f"{aleatorio.choice(NOMES)} {aleatorio.choice(SOBRENOMES)} {i}"
+        cliente = m("create_cliente", crud.cliente.create_cliente,
+                    ClienteCreate(nome=nome, telefone=f"11{i:09d}", email=f"cliente{i}@exemplo.com"))
+        ids_clientes.append(cliente.cliente_id)
+        for j in range(2):
+            animal = m("create_animal", crud.animal.create_animal,
+                       AnimalCreate(cliente_id=cliente.cliente_id, nome=f"Pet {i}-{j}", especie="Cão"))
+            ids_animais.append(animal.animal_id)
+            agendamento = m("create_agendamento", crud.agendamento.create_agendamento, AgendamentoCreate(
+                animal_id=animal.animal_id,
+                funcionario_id=aleatorio.choice(funcionarios).funcionario_id,
+                data_hora_agendamento=inicio + timedelta(minutes=15 * aleatorio.randrange(-2000, 2000)),
+                status="Agendado",
+                servicos_ids=[s.servico_id for s in aleatorio.sample(servicos, 2)],
+            ))
+            ids_agendamentos.append(agendamento.agendamento_id)
+
+    for _ in range(clientes):
+        m("get_cliente_by_id", crud.cliente.get_cliente_by_id, aleatorio.choice(ids_clientes))
+        m("get_agendamento_by_id", crud.agendamento.get_agendamento_by_id, aleatorio.choice(ids_agendamentos))
+    for _ in range(max(1, clientes // 10)):
+        m("get_clientes (página)", crud.cliente.get_clientes, skip=aleatorio.randrange(clientes), limit=50)
+        m("get_clientes (busca)", crud.cliente.get_clientes, limit=50,
+          busca=f"{aleatorio.choice(NOMES)[:3]} {aleatorio.choice(SOBRENOMES)[:2]}")
+        m("get_animais_by_cliente", crud.animal.get_animais_by_cliente, aleatorio.choice(ids_clientes))
+        dia = inicio + timedelta(days=aleatorio.randrange(-20, 20))
+        m("get_agendamentos (dia)", crud.agendamento.get_agendamentos, limit=50,
+          data_inicio=dia, data_fim=dia + timedelta(days=1))
+        m("count_clientes (busca)", crud.cliente.count_clientes, busca=aleatorio.choice(NOMES))
+
+    for cliente_id in aleatorio.sample(ids_clientes, max(1, clientes // 5)):
+        m("update_cliente", crud.cliente.update_cliente, cliente_id,
+          ClienteUpdate(telefone=f"21{aleatorio.randrange(10 ** 9):09d}"))
+    for agendamento_id in aleatorio.sample(ids_agendamentos, max(1, clientes // 5)):
+        m("update_agendamento", crud.agendamento.update_agendamento, agendamento_id,
+          AgendamentoUpdate(status="Confirmado", servicos_ids=[aleatorio.choice(servicos).servico_id]))
+    for agendamento_id in aleatorio.sample(ids_agendamentos, max(1, clientes // 10)):
+        m("delete_agendamento", crud.agendamento.delete_agendamento, agendamento_id)
+    # Exclusão em cascata: animais e agendamentos vão junto.
+    for cliente_id in aleatorio.sample(ids_clientes, max(1, clientes // 10)):
+        m("delete_cliente", crud.cliente.delete_cliente, cliente_id)
+    return medidor
+
+
+def _imprimir(nome: str, medidor: Medidor, duracao: float):
+    total = sum(len(t) for t in medidor.tempos.values())
+    print(f"\n{nome}: {total} operações em {duracao:.2f} s ({total / duracao:,.0f} ops/s)")
+    print(f"{'operação':<26}{'qtd':>7}{'ops/s':>11}{'p50 ms':>10}{'p95 ms':>10}")
+    for operacao, tempos in medidor.tempos.items():
+        print(f"{operacao:<26}{len(tempos):>7}{len(tempos) / sum(tempos):>11,.0f}"
+              f"{_percentil(tempos, 50) * 1000:>10.3f}{_percentil(tempos, 95) * 1000:>10.3f}")
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--clientes", type=int, default=500, help="clientes gerados (2 animais e 2 agendamentos cada)")
+    parser.add_argument("--so", choices=("postgres", "memoria"), help="roda apenas um dos armazenamentos")
+    parser.add_argument("--semente", type=int, default=42, help="semente do gerador")
+    parser.add_argument("--manter", action="store_true", help="não remove o schema do Postgres ao final")
+    args = parser.parse_args(argv)
+
+    medidores = {}
+    if args.so != "postgres":
+        memoria.reiniciar()
+        t0 = time.perf_counter()
+        medidores["memoria"] = (executar_carga(SimpleNamespace(
+            cliente=memoria.crud_cliente_memoria, animal=memoria.crud_animal_memoria,
+            funcionario=memoria.crud_funcionario_memoria, servico=memoria.crud_servico_memoria,
+            agendamento=memoria.crud_agendamento_memoria), args.clientes, args.semente), time.perf_counter() - t0)
+
+    if args.so != "memoria":
+        conn = psycopg2.connect(DATABASE_URL, options="-c search_path=public")
+        conn.autocommit = True
+        cursor = conn.cursor()
+        try:
+            cursor.execute(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE; CREATE SCHEMA {SCHEMA}; SET search_path TO {SCHEMA};")
+            cursor.execute(MODELO_FISICO.read_text(encoding="utf-8"))
+            t0 = time.perf_counter()
+            medidores["postgres"] = (executar_carga(SimpleNamespace(
+                cliente=crud_cliente, animal=crud_animal, funcionario=crud_funcionario, servico=crud_servico,
+                agendamento=crud_agendamento), args.clientes, args.semente), time.perf_counter() - t0)
+        finally:
+            # Grava a auditoria pendente antes de remover o schema.
+            gravador_auditoria.stop()
+            if not args.manter:
+                cursor.execute(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE;")
+            cursor.close()
+            conn.close()
+
+    for nome, (medidor, duracao) in medidores.items():
+        _imprimir(nome, medidor, duracao)
+    if len(medidores) == 2:
+        (mem, t_mem), (pg, t_pg) = medidores["memoria"], medidores["postgres"]
+        print(f"\nPostgres / memória (tempo total): {t_pg / t_mem:.1f}x")
+        for operacao in mem.tempos:
+            print(f"  {operacao:<26}{statistics.median(pg.tempos[operacao]) / statistics.median(mem.tempos[operacao]):>8.1f}x (p50)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,297 @@
+"""Verificação de planos de consulta das funções de leitura dos módulos crud_*.
+
+Cria um schema temporário com o modelo físico, popula com um volume realista de dados,
+executa EXPLAIN (FORMAT JSON) para cada consulta de listagem/detalhe (incluindo as 32
+combinações de filtros de get_agendamentos) e falha se algum plano fizer Seq Scan em
+tabela grande ou passar do orçamento de custo.
+
+Uso (a partir de petshop_backend/):
+
+    python -m scripts.check_query_plans
+    python -m scripts.check_query_plans --agendamentos 1000000 --custo-maximo 8000
+"""
+import argparse
+import itertools
+import json
+import sys
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+from pathlib import Path
+
+import psycopg2
+
+from app.db.database import DATABASE_URL, use_cursor
+from app.crud import (crud_agendamento, crud_animal, crud_auditoria, crud_cliente, crud_estatisticas, crud_funcionario,
+                      crud_servico)
+
+SCHEMA = "verificacao_planos"
+MODELO_FISICO = Path(__file__).resolve().parents[2] / "Modelagem Banco de Dados" / "Modelo Físico" / "modelo_fisico.sql"
+
+SQL_POPULAR = """
+    SELECT setseed(%(semente)s);
+
+    INSERT INTO Clientes (nome, telefone, email, endereco, data_cadastro)
+    SELECT 'Cliente ' || g, '11' || lpad(g::text, 9, '0'), 'cliente' || g || '@exemplo.com',
+           'Rua ' || g || ', ' || (g %% 900 + 1), now() - random() * interval '1500 days'
+    FROM generate_series(1, %(clientes)s) g;
+
+    INSERT INTO Animais (cliente_id, nome, especie, raca, data_nascimento, observacoes)
+    SELECT 1 + (g %% %(clientes)s), 'Animal ' || g, (ARRAY['Cão', 'Gato', 'Ave', 'Roedor'])[1 + g %% 4],
+           'SRD', DATE '2010-01-01' + (random() * 5000)::int, CASE WHEN g %% 5 = 0 THEN 'Alérgico a shampoo comum' END
+    FROM generate_series(1, %(animais)s) g;
+
+    INSERT INTO Funcionarios (nome, cargo, telefone, email, data_contratacao, ativo)
+    SELECT 'Funcionário ' || g, (ARRAY['Tosador', 'Veterinário', 'Atendente'])[1 + g %% 3],
+           '11' || lpad(g::text, 9, '0'), 'funcionario' || g || '@exemplo.com', DATE '2018-01-01' + g * 20, g %% 6 <> 0
+    FROM generate_series(1, %(funcionarios)s) g;
+
+    INSERT INTO Servicos (nome, descricao, preco, duracao_estimada_minutos)
+    SELECT 'Serviço ' || g, 'Descrição do serviço ' || g, 20 + g * 7.5, 15 * (1 + g %% 6)
+    FROM generate_series(1, %(servicos)s) g;
+
+    INSERT INTO Agendamentos (animal_id, funcionario_id, data_hora_agendamento, data_hora_criacao, status, observacoes)
+    SELECT animal_id, funcionario_id, quando, quando - interval '7 days',
+           CASE
+               WHEN quando > now() THEN (ARRAY['Agendado', 'Confirmado'])[1 + (random() * 1)::int]
+               ELSE (ARRAY['Concluído', 'Concluído', 'Concluído', 'Concluído', 'Concluído', 'Cancelado', 'Não Compareceu'])[1 + (random() * 6)::int]
+           END,
+           CASE WHEN random() < 0.2 THEN 'Observação do agendamento' END
+    FROM (
+        SELECT 1 + (random() * (%(animais)s - 1))::int AS animal_id,
+               CASE WHEN random() < 0.1 THEN NULL ELSE 1 + (random() * (%(funcionarios)s - 1))::int END AS funcionario_id,
+               date_trunc('hour', now() - interval '1000 days' + random() * interval '1060 days') AS quando
+        FROM generate_series(1, %(agendamentos)s)
+    ) g;
+
+    INSERT INTO Agendamento_Servicos (agendamento_id, servico_id, preco_registrado)
+    SELECT a.agendamento_id, s.servico_id, s.preco
+    FROM Agendamentos a
+    JOIN Servicos s ON s.servico_id IN (1 + a.agendamento_id %% %(servicos)s, 1 + (a.agendamento_id * 7) %% %(servicos)s);
+
+    ANALYZE;
+"""
+
+
+class ExplainCursor:
+    """Cursor que troca cada consulta pelo seu EXPLAIN (FORMAT JSON) e guarda os planos.
+
+    As funções crud recebem resultados vazios, então apenas as consultas de nível
+    superior são capturadas; consultas aninhadas são verificadas como casos próprios.
+    """
+
+    def __init__(self, cursor):
+        self._cursor = cursor
+        self.planos = []
+        self.rowcount = 0
+
+    def execute(self, sql, params=None):
+        self._cursor.execute("EXPLAIN (FORMAT JSON) " + sql, params)
+        self.planos.append((sql, self._cursor.fetchone()[0][0]["Plan"]))
+
+    def executemany(self, sql, params_seq):
+        for params in params_seq:
+            self.execute(sql, params)
+            break
+
+    def fetchone(self):
+        return None
+
+    def fetchall(self):
+        return []
+
+
+def _nos(plano):
+    yield plano
+    for filho in plano.get("Plans", []):
+        yield from _nos(filho)
+
+
+def _problemas(plano, tabelas_grandes, custo_maximo):
+    problemas = []
+    for no in _nos(plano):
+        relacao = no.get("Relation Name")
+        if no["Node Type"] == "Seq Scan" and relacao in tabelas_grandes:
+            problemas.append(f"Seq Scan em {relacao} ({tabelas_grandes[relacao]:.0f} linhas)")
+    if plano["Total Cost"] > custo_maximo:
+        problemas.append(f"custo {plano['Total Cost']:.0f} > {custo_maximo:.0f}")
+    return problemas
+
+
+def _casos(valores):
+    """Gera (nome, função) para cada consulta de leitura dos módulos crud_*."""
+    agora = valores["agora"]
+    filtros = {
+        "animal_id": valores["animal_id"],
+        "funcionario_id": valores["funcionario_id"],
+        "data_inicio": agora - timedelta(days=7),
+        "data_fim": agora,
+        "status": "Confirmado",
+    }
+    for n in range(len(filtros) + 1):
+        for combinacao in itertools.combinations(filtros, n):
+            kwargs = {chave: filtros[chave] for chave in combinacao}
+            nome = "get_agendamentos(" + ", ".join(combinacao) + ")"
+            yield nome, lambda kwargs=kwargs: crud_agendamento.get_agendamentos(**kwargs)
+
+    yield "get_agendamento_by_id", lambda: crud_agendamento.get_agendamento_by_id(valores["agendamento_id"])
+    yield "get_calendario_funcionarios", lambda: crud_agendamento.get_calendario_funcionarios(
+        [valores["funcionario_id"], valores["funcionario_id"] + 1], agora.date(), dias=7)
+    yield "get_agendamentos_campos(status, cliente_nome, valor_total)", lambda: crud_agendamento.get_agendamentos_campos(
+        ["status", "cliente_nome", "valor_total"], funcionario_id=valores["funcionario_id"])
+    yield "get_clientes", lambda: crud_cliente.get_clientes()
+    yield "get_clientes(skip=1000)", lambda: crud_cliente.get_clientes(skip=1000)
+    yield "get_cliente_by_id", lambda: crud_cliente.get_cliente_by_id(valores["cliente_id"])
+    yield "get_cliente_by_email", lambda: crud_cliente.get_cliente_by_email(valores["cliente_email"])
+    yield "get_cliente_completo_json", lambda: crud_cliente.get_cliente_completo_json(valores["cliente_id"])
+    yield "get_estatisticas_cliente", lambda: crud_cliente.get_estatisticas_cliente(valores["cliente_id"])
+    for ordenar in crud_cliente.ORDENACOES_CLIENTE:
+        yield f"get_clientes(ordenar={ordenar})", lambda ordenar=ordenar: crud_cliente.get_clientes(ordenar=ordenar)
+    yield "get_clientes(busca, ordenar=gasto_total)", lambda: crud_cliente.get_clientes(
+        busca="cliente 12", ordenar="gasto_total")
+    yield "get_estatisticas_animal", lambda: crud_animal.get_estatisticas_animal(valores["animal_id"])
+    yield "get_animais", lambda: crud_animal.get_animais()
+    yield "get_animal_by_id", lambda: crud_animal.get_animal_by_id(valores["animal_id"])
+    yield "get_animais_by_cliente", lambda: crud_animal.get_animais_by_cliente(valores["cliente_id"])
+    yield "get_funcionarios", lambda: crud_funcionario.get_funcionarios()
+    yield "get_funcionarios(apenas_ativos)", lambda: crud_funcionario.get_funcionarios(apenas_ativos=True)
+    yield "get_funcionario_by_id", lambda: crud_funcionario.get_funcionario_by_id(valores["funcionario_id"])
+    yield "get_funcionario_by_email", lambda: crud_funcionario.get_funcionario_by_email(valores["funcionario_email"])
+    yield "get_servicos", lambda: crud_servico.get_servicos()
+    yield "get_servico_by_id", lambda: crud_servico.get_servico_by_id(valores["servico_id"])
+    yield "get_servico_by_nome", lambda: crud_servico.get_servico_by_nome(valores["servico_nome"])
+    yield "get_clientes(busca)", lambda: crud_cliente.get_clientes(busca="cliente 12")
+    yield "get_animais(busca)", lambda: crud_animal.get_animais(busca="animal 12")
+    yield "get_funcionarios(busca)", lambda: crud_funcionario.get_funcionarios(busca="vet")
+    yield "get_servicos(busca)", lambda: crud_servico.get_servicos(busca="banho")
+    yield "get_agendamentos_campos(busca)", lambda: crud_agendamento.get_agendamentos_campos(
+        ["animal_nome", "cliente_nome", "data_hora_agendamento"], busca="animal 12")
+    yield "get_registros_auditoria", lambda: crud_auditoria.get_registros_auditoria("agendamentos")
+    yield "get_registros_auditoria(entidade_id, periodo)", lambda: crud_auditoria.get_registros_auditoria(
+        "agendamentos", valores["agendamento_id"], valores["agora"] - timedelta(days=30), valores["agora"])
+
+
+def _casos_com_cursor(valores):
+    """Consultas auxiliares que recebem o cursor diretamente."""
+    yield "_get_servicos_for_agendamento", lambda cursor: crud_agendamento._get_servicos_for_agendamento(
+        cursor, valores["agendamento_id"])
+    yield "_get_servicos_for_agendamentos", lambda cursor: crud_agendamento._get_servicos_for_agendamentos(
+        cursor, list(range(valores["agendamento_id"], valores["agendamento_id"] + 100)))
+    yield "_fetch_servicos_details", lambda cursor: crud_agendamento._fetch_servicos_details(
+        cursor, [valores["servico_id"]])
+    yield "crud_estatisticas.contribuicao_atual", lambda cursor: crud_estatisticas.contribuicao_atual(
+        cursor, valores["agendamento_id"], 1)
+    yield "crud_estatisticas.aplicar", lambda cursor: crud_estatisticas.aplicar(
+        cursor, crud_estatisticas.Contribuicao(valores["animal_id"], "Concluído", valores["agora"], Decimal(50),
+                                               (valores["servico_id"],)), None)
+    yield "crud_estatisticas.recalcular_clientes", lambda cursor: crud_estatisticas.recalcular_clientes(
+        cursor, [valores["cliente_id"]])
+    yield "crud_estatisticas.retirar_animal", lambda cursor: crud_estatisticas.retirar_animal(
+        cursor, valores["animal_id"], 1)
+
+
+def _valores_de_exemplo(cursor):
+    cursor.execute("""
+        SELECT a.agendamento_id, a.animal_id, ani.cliente_id, c.email
+        FROM Agendamentos a
+        JOIN Animais ani ON a.animal_id = ani.animal_id
+        JOIN Clientes c ON ani.cliente_id = c.cliente_id
+        ORDER BY a.agendamento_id LIMIT 1;
+    """)
+    agendamento_id, animal_id, cliente_id, cliente_email = cursor.fetchone()
+    cursor.execute("SELECT funcionario_id, email FROM Funcionarios ORDER BY funcionario_id LIMIT 1;")
+    funcionario_id, funcionario_email = cursor.fetchone()
+    cursor.execute("SELECT servico_id, nome FROM Servicos ORDER BY servico_id LIMIT 1;")
+    servico_id, servico_nome = cursor.fetchone()
+    return {
+        "agora": datetime.now(timezone.utc),
+        "agendamento_id": agendamento_id,
+        "animal_id": animal_id,
+        "cliente_id": cliente_id,
+        "cliente_email": cliente_email,
+        "funcionario_id": funcionario_id,
+        "funcionario_email": funcionario_email,
+        "servico_id": servico_id,
+        "servico_nome": servico_nome,
+    }
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--agendamentos", type=int, default=200_000, help="quantidade de agendamentos gerados")
+    parser.add_argument("--semente", type=float, default=0.42, help="semente do gerador (entre -1 e 1)")
+    parser.add_argument("--custo-maximo", type=float, default=5_000, help="custo total máximo por plano")
+    parser.add_argument("--linhas-tabela-grande", type=int, default=5_000,
+                        help="tabelas com ao menos esse número de linhas não podem ter Seq Scan")
+    parser.add_argument("--manter", action="store_true", help="não remove o schema ao final")
+    parser.add_argument("--verbose", action="store_true", help="imprime os planos que falharam")
+    args = parser.parse_args(argv)
+
+    conn = psycopg2.connect(DATABASE_URL)
+    cursor = conn.cursor()
+    falhas = 0
+    try:
+        cursor.execute(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE; CREATE SCHEMA {SCHEMA}; SET search_path TO {SCHEMA};")
+        cursor.execute(MODELO_FISICO.read_text(encoding="utf-8"))
+        print(f"Populando {SCHEMA} com {args.agendamentos} agendamentos...")
+        cursor.execute(SQL_POPULAR, {
+            "semente": args.semente,
+            "agendamentos": args.agendamentos,
+            "clientes": max(10, args.agendamentos // 10),
+            "animais": max(15, args.agendamentos // 7),
+            "funcionarios": 60,
+            "servicos": 40,
+        })
+        crud_estatisticas.reconstruir(cursor)
+        cursor.execute("ANALYZE;")
+        conn.commit()
+
+        cursor.execute("""
+            SELECT c.relname, c.reltuples FROM pg_class c
+            JOIN pg_namespace n ON n.oid = c.relnamespace
+            WHERE n.nspname = %s AND c.relkind = 'r' AND c.reltuples >= %s;
+        """, (SCHEMA, args.linhas_tabela_grande))
+        tabelas_grandes = dict(cursor.fetchall())
+        print(f"Tabelas grandes: {', '.join(sorted(tabelas_grandes))}")
+        valores = _valores_de_exemplo(cursor)
+
+        casos = [(nome, lambda explain, f=f: f(explain)) for nome, f in _casos_com_cursor(valores)]
+        for nome, funcao in _casos(valores):
+            def executar(explain, funcao=funcao):
+                with use_cursor(explain):
+                    funcao()
+            casos.append((nome, executar))
+
+        for nome, executar in casos:
+            explain = ExplainCursor(cursor)
+            try:
+                executar(explain)
+            except ValueError:
+                # Validações de contagem (ex.: serviços não encontrados) falham com resultados vazios.
+                pass
+            if not explain.planos:
+                print(f"ERRO  {nome}: nenhuma consulta capturada")
+                falhas += 1
+                continue
+            for sql, plano in explain.planos:
+                problemas = _problemas(plano, tabelas_grandes, args.custo_maximo)
+                marcador = "FALHA" if problemas else "ok   "
+                print(f"{marcador} {nome:<70} custo={plano['Total Cost']:>9.1f}  {'; '.join(problemas)}")
+                if problemas:
+                    falhas += 1
+                    if args.verbose:
+                        print(" ".join(sql.split()))
+                        print(json.dumps(plano, indent=2, ensure_ascii=False))
+        conn.rollback()
+    finally:
+        if not args.manter:
+            cursor.execute(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE;")
+            conn.commit()
+        cursor.close()
+        conn.close()
+
+    print(f"\n{len(casos)} consultas verificadas, {falhas} com problemas.")
+    return 1 if falhas else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,165 @@
+"""Perfil de inicialização da API: tempo de import e tempo até a primeira requisição.
+
+Importa app.main num interpretador novo com -X importtime, confere que nenhum módulo pesado
+foi carregado na subida e sobe o uvicorn medindo quanto tempo leva até /health/ready
+responder 200 e até a primeira listagem ser servida. Falha se algum orçamento for excedido.
+
+Uso (a partir de petshop_backend/):
+
+    python -m scripts.check_startup
+    python -m scripts.check_startup --orcamento-import-ms 800 --orcamento-primeira-requisicao-ms 2000
+"""
+import argparse
+import json
+import os
+import socket
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+from pathlib import Path
+from typing import Optional
+
+RAIZ_BACKEND = Path(__file__).resolve().parents[1]
+
+# Não podem estar em sys.modules depois de "import app.main".
+MODULOS_PESADOS = (
+    "pandas", "numpy", "pyarrow", "matplotlib", "openpyxl", "reportlab",
+    "weasyprint", "fpdf", "playwright", "selenium", "sklearn", "scipy",
+)
+
+
+def _ambiente() -> dict:
+    return {**os.environ, "PYTHONPATH": str(RAIZ_BACKEND)}
+
+
+def perfil_import(mostrar: int):
+    """Retorna (ms do import de app.main, [(ms cumulativo, módulo)] dos imports de 1º nível mais caros)."""
+    resultado = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import app.main"],
+        cwd=RAIZ_BACKEND, env=_ambiente(), capture_output=True, text=True, check=True,
+    )
+    total_us = 0
+    primeiro_nivel = []
+    for linha in resultado.stderr.splitlines():
+        if not linha.startswith("import time:") or "cumulative" in linha:
+            continue
+        _, cumulativo, nome = linha[len("import time:"):].split("|")
+        # O nome vem indentado em 2 espaços por nível; app.main é o nível 0.
+        profundidade = (len(nome) - len(nome.lstrip()) - 1) // 2
+        if nome.strip() == "app.main":
+            total_us = int(cumulativo)
+        elif profundidade == 1:
+            primeiro_nivel.append((int(cumulativo) / 1000, nome.strip()))
+    primeiro_nivel.sort(reverse=True)
+    return total_us / 1000, primeiro_nivel[:mostrar]
+
+
+def modulos_pesados_carregados():
+    codigo = (
+        "import json, sys, app.main; "
+        f"print(json.dumps(sorted(m for m in {MODULOS_PESADOS!r} if m in sys.modules)))"
+    )
+    resultado = subprocess.run([sys.executable, "-c", codigo], cwd=RAIZ_BACKEND, env=_ambiente(),
+                               capture_output=True, text=True, check=True)
+    return json.loads(resultado.stdout.strip().splitlines()[-1])
+
+
+def _porta_livre() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _get(url: str, timeout: float = 2.0):
+    try:
+        with urllib.request.urlopen(url, timeout=timeout) as resposta:
+            return resposta.status, resposta.read()
+    except urllib.error.HTTPError as e:
+        return e.code, e.read()
+    except (urllib.error.URLError, ConnectionError, socket.timeout):
+        return None, b""
+
+
+def tempo_primeira_requisicao(caminho_pronto: str, caminho_requisicao: Optional[str], limite_s: float):
+    """Sobe o uvicorn e mede (ms até caminho_pronto responder 200, ms da primeira requisição)."""
+    porta = _porta_livre()
+    base = f"http://127.0.0.1:{porta}"
+    inicio = time.perf_counter()
+    processo = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(porta), "--log-level", "warning"],
+        cwd=RAIZ_BACKEND, env=_ambiente(),
+    )
+    try:
+        pronto_ms = None
+        while time.perf_counter() - inicio < limite_s:
+            if processo.poll() is not None:
+                raise RuntimeError(f"uvicorn encerrou com código {processo.returncode}")
+            codigo, _ = _get(base + caminho_pronto, timeout=0.5)
+            if codigo == 200:
+                pronto_ms = (time.perf_counter() - inicio) * 1000
+                break
+            time.sleep(0.02)
+        if pronto_ms is None or caminho_requisicao is None:
+            return pronto_ms, None
+        inicio_requisicao = time.perf_counter()
+        codigo, _ = _get(base + caminho_requisicao)
+        requisicao_ms = (time.perf_counter() - inicio_requisicao) * 1000
+        if codigo != 200:
+            raise RuntimeError(f"{caminho_requisicao} respondeu {codigo}")
+        return pronto_ms, requisicao_ms
+    finally:
+        processo.terminate()
+        try:
+            processo.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            processo.kill()
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--orcamento-import-ms", type=float, default=1_000, help="tempo máximo do import de app.main")
+    parser.add_argument("--orcamento-primeira-requisicao-ms", type=float, default=4_000,
+                        help="tempo máximo do início do processo até a primeira listagem respondida")
+    parser.add_argument("--sem-banco", action="store_true",
+                        help="espera apenas /health/live (ambiente sem PostgreSQL) e não faz a listagem")
+    parser.add_argument("--mostrar", type=int, default=10, help="imports de 1º nível mais caros a exibir")
+    args = parser.parse_args(argv)
+    falhas = []
+
+    import_ms, mais_caros = perfil_import(args.mostrar)
+    print(f"import app.main: {import_ms:.0f} ms (orçamento {args.orcamento_import_ms:.0f} ms)")
+    for ms, modulo in mais_caros:
+        print(f"  {ms:>8.1f} ms  {modulo}")
+    if import_ms > args.orcamento_import_ms:
+        falhas.append("tempo de import acima do orçamento")
+
+    pesados = modulos_pesados_carregados()
+    if pesados:
+        print(f"Módulos pesados carregados na subida: {', '.join(pesados)}")
+        falhas.append("módulos pesados importados na subida")
+
+    caminho_pronto = "/health/live" if args.sem_banco else "/health/ready"
+    limite_s = args.orcamento_primeira_requisicao_ms / 1000 * 3
+    caminho_requisicao = None if args.sem_banco else "/clientes/?limit=1"
+    pronto_ms, requisicao_ms = tempo_primeira_requisicao(caminho_pronto, caminho_requisicao, limite_s)
+    if pronto_ms is None:
+        print(f"{caminho_pronto} não respondeu 200 em {limite_s:.0f} s")
+        falhas.append("aplicação não ficou pronta")
+    else:
+        total_ms = pronto_ms if args.sem_banco else pronto_ms + requisicao_ms
+        print(f"{caminho_pronto} = 200 após {pronto_ms:.0f} ms")
+        if not args.sem_banco:
+            print(f"primeira listagem (/clientes/?limit=1): {requisicao_ms:.1f} ms")
+        print(f"tempo até a primeira requisição: {total_ms:.0f} ms (orçamento {args.orcamento_primeira_requisicao_ms:.0f} ms)")
+        if total_ms > args.orcamento_primeira_requisicao_ms:
+            falhas.append("tempo até a primeira requisição acima do orçamento")
+
+    for falha in falhas:
+        print(f"FALHA: {falha}")
+    return 1 if falhas else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
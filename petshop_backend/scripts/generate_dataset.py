@@ -0,0 +1,533 @@
+"""Gera um conjunto de dados sintético, realista e consistente, para testes de escala.
+
+Popula as seis tabelas de dados (clientes com 1 a 4 animais, funcionários por filial,
+catálogo de serviços por filial, anos de agendamentos com distribuição de status e 1 a 4
+serviços cada) numa escala escolhida. A mesma semente, escala, --agora e --tamanho-lote
+geram sempre os mesmos dados, qualquer que seja o número de processos.
+
+Os lotes são gerados com NumPy e carregados com COPY em paralelo (um processo e uma
+conexão por worker). Os índices secundários são removidos antes da carga e recriados no
+fim, também em paralelo; chaves primárias, únicas e estrangeiras continuam valendo. As
+tabelas precisam estar vazias (--limpar as esvazia) e os IDs são gerados pelo script. As
+estatísticas de clientes e animais são recalculadas no fim (scripts/rebuild_stats.py).
+
+Uso (a partir de petshop_backend/):
+
+    python -m scripts.generate_dataset --agendamentos 1000000
+    python -m scripts.generate_dataset --agendamentos 10000000 --filiais 3 --processos 8 --limpar
+    python -m scripts.generate_dataset --schema escala --criar-schema --agendamentos 200000
+
+Em outros scripts:
+
+    from scripts.generate_dataset import Escala, gerar_dataset
+    gerar_dataset(DATABASE_URL, Escala(agendamentos=200_000), schema="bench", criar_schema=True)
+"""
+import argparse
+import io
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, List, NamedTuple, Optional
+
+import numpy as np
+import pandas as pd
+import psycopg2
+
+from app.core.cache import CANAL_INVALIDACAO, CACHES
+from app.crud.crud_estatisticas import reconstruir as reconstruir_estatisticas
+from app.db.database import DATABASE_URL
+
+MODELO_FISICO = Path(__file__).resolve().parents[2] / "Modelagem Banco de Dados" / "Modelo Físico" / "modelo_fisico.sql"
+
+# Ordem de carga (chaves estrangeiras) e coluna de ID de cada tabela.
+TABELAS = {
+    "Clientes": "cliente_id",
+    "Funcionarios": "funcionario_id",
+    "Servicos": "servico_id",
+    "Animais": "animal_id",
+    "Agendamentos": "agendamento_id",
+    "Agendamento_Servicos": None,
+}
+
+DIA = 86_400
+ANO = 365 * DIA
+# Horário comercial em America/Sao_Paulo (UTC-3, sem horário de verão desde 2019).
+FUSO_SEGUNDOS = 3 * 3600
+
+NOMES = np.array([
+    "Ana", "Beatriz", "Camila", "Daniela", "Eduarda", "Fernanda", "Gabriela", "Helena", "Isabela", "Juliana",
+    "Larissa", "Mariana", "Natália", "Patrícia", "Rafaela", "Sofia", "Tatiane", "Vitória", "Alice", "Luiza",
+    "André", "Bruno", "Carlos", "Diego", "Eduardo", "Felipe", "Gustavo", "Henrique", "Igor", "João",
+    "Lucas", "Marcelo", "Nicolas", "Otávio", "Pedro", "Rafael", "Samuel", "Thiago", "Vinícius", "Miguel",
+], dtype=object)
+SOBRENOMES = np.array([
+    "Silva", "Santos", "Oliveira", "Souza", "Rodrigues", "Ferreira", "Alves", "Pereira", "Lima", "Gomes",
+    "Costa", "Ribeiro", "Martins", "Carvalho", "Almeida", "Lopes", "Soares", "Fernandes", "Vieira", "Barbosa",
+    "Rocha", "Dias", "Nascimento", "Andrade", "Moreira", "Nunes", "Marques", "Machado", "Mendes", "Freitas",
+], dtype=object)
+RUAS = np.array([
+    "Rua das Flores", "Avenida Paulista", "Rua Augusta", "Rua XV de Novembro", "Avenida Brasil",
+    "Rua São João", "Rua Sete de Setembro", "Avenida Independência", "Rua da Consolação", "Rua Bela Vista",
+    "Rua dos Pinheiros", "Avenida Rebouças", "Rua Vergueiro", "Rua Oscar Freire", "Alameda Santos",
+], dtype=object)
+BAIRROS = np.array([
+    "Centro", "Jardins", "Vila Mariana", "Pinheiros", "Moema", "Tatuapé", "Santana", "Perdizes",
+    "Lapa", "Butantã", "Ipiranga", "Mooca",
+], dtype=object)
+NOMES_ANIMAIS = np.array([
+    "Thor", "Luna", "Mel", "Bob", "Nina", "Max", "Belinha", "Fred", "Pipoca", "Bidu", "Lola", "Toby",
+    "Amora", "Paçoca", "Simba", "Mia", "Chico", "Frida", "Zeus", "Lili", "Pingo", "Jade", "Rex", "Meg",
+], dtype=object)
+# (espécie, peso, raças)
+ESPECIES = [
+    ("Cão", 0.62, ["SRD", "Shih Tzu", "Poodle", "Yorkshire", "Labrador", "Golden Retriever", "Bulldog Francês",
+                   "Spitz Alemão", "Pinscher", "Lhasa Apso"]),
+    ("Gato", 0.31, ["SRD", "Siamês", "Persa", "Maine Coon", "Angorá"]),
+    ("Ave", 0.04, ["Calopsita", "Periquito", "Canário"]),
+    ("Roedor", 0.03, ["Hamster", "Porquinho-da-índia", "Coelho"]),
+]
+OBS_ANIMAIS = np.array(["Alérgico a shampoo comum", "Agressivo com outros animais", "Idoso, manusear com cuidado",
+                        "Medo de secador", "Castrado", "Dieta especial"], dtype=object)
+OBS_AGENDAMENTOS = np.array(["Cliente pediu para ligar antes", "Levar e buscar (táxi dog)", "Primeira visita",
+                             "Retorno", "Usar perfume suave", "Pagamento na retirada"], dtype=object)
+# (nome, descrição, preço base, duração em minutos)
+CATALOGO = [
+    ("Banho Pequeno Porte", "Banho com secagem para cães de até 10 kg", 55.0, 45),
+    ("Banho Médio Porte", "Banho com secagem para cães de 10 a 25 kg", 70.0, 60),
+    ("Banho Grande Porte", "Banho com secagem para cães acima de 25 kg", 95.0, 75),
+    ("Tosa Higiênica", "Tosa das regiões íntimas, patas e rosto", 45.0, 30),
+    ("Tosa Completa Pequeno Porte", "Tosa na máquina ou tesoura", 80.0, 60),
+    ("Tosa Completa Médio Porte", "Tosa na máquina ou tesoura", 100.0, 75),
+    ("Tosa Completa Grande Porte", "Tosa na máquina ou tesoura", 130.0, 90),
+    ("Banho Terapêutico", "Banho com produtos dermatológicos", 90.0, 60),
+    ("Hidratação de Pelos", "Máscara hidratante e escovação", 40.0, 20),
+    ("Corte de Unhas", "Corte e lixamento das unhas", 25.0, 15),
+    ("Limpeza de Ouvidos", "Higienização do canal auditivo", 25.0, 15),
+    ("Escovação de Dentes", "Escovação com pasta enzimática", 30.0, 15),
+    ("Consulta Veterinária", "Avaliação clínica geral", 150.0, 30),
+    ("Retorno de Consulta", "Reavaliação em até 30 dias", 80.0, 20),
+    ("Vacina V10", "Vacina polivalente canina", 110.0, 15),
+    ("Vacina Antirrábica", "Vacina contra raiva", 80.0, 15),
+    ("Vacina Gripe Canina", "Vacina contra tosse dos canis", 120.0, 15),
+    ("Vacina V4 Felina", "Vacina polivalente felina", 130.0, 15),
+    ("Vermifugação", "Aplicação de vermífugo", 45.0, 10),
+    ("Aplicação de Antipulgas", "Aplicação de antipulgas e carrapatos", 50.0, 10),
+    ("Exame de Sangue", "Hemograma completo", 120.0, 20),
+    ("Microchipagem", "Implantação de microchip de identificação", 150.0, 20),
+    ("Creche Diária", "Diária da creche com recreação", 85.0, 480),
+    ("Táxi Dog", "Busca e entrega do animal", 35.0, 30),
+]
+CARGOS = (["Tosador", "Banhista", "Veterinário", "Atendente", "Auxiliar Veterinário"], [0.3, 0.25, 0.2, 0.15, 0.1])
+STATUS_PASSADO = (["Concluído", "Cancelado", "Não Compareceu"], [0.84, 0.09, 0.07])
+STATUS_FUTURO = (["Agendado", "Confirmado", "Cancelado"], [0.55, 0.38, 0.07])
+REAJUSTE_ANUAL = 0.06
+
+
+class Escala(NamedTuple):
+    """Tamanho do conjunto; as demais quantidades derivam do número de agendamentos."""
+    agendamentos: int
+    filiais: int = 1
+    anos: int = 3
+
+    @property
+    def clientes(self) -> int:
+        return max(20, self.agendamentos // 20)
+
+    @property
+    def funcionarios_por_filial(self) -> int:
+        return max(5, self.agendamentos // (self.filiais * 40_000))
+
+
+class Plano(NamedTuple):
+    """Sorteios globais (feitos uma vez) que os lotes precisam para manter as referências coerentes."""
+    semente: int
+    escala: Escala
+    agora: int  # segundos desde a época
+    cliente_filial: np.ndarray
+    cliente_cadastro: np.ndarray
+    animal_cliente: np.ndarray  # cliente_id de cada animal (animal_id - 1)
+    precos: np.ndarray  # preço atual por (filial - 1, item do catálogo)
+
+
+def _rng(semente: int, *chave: int) -> np.random.Generator:
+    return np.random.default_rng([semente, *chave])
+
+
+def planejar(escala: Escala, semente: int, agora: int) -> Plano:
+    rng = _rng(semente, 0)
+    filiais = np.arange(1, escala.filiais + 1)
+    pesos = 1 / np.sqrt(filiais)
+    cliente_filial = rng.choice(filiais, size=escala.clientes, p=pesos / pesos.sum()).astype(np.int32)
+    # Cadastros crescentes com o ID, do início do histórico até 30 dias atrás.
+    inicio = agora - escala.anos * ANO
+    cliente_cadastro = np.sort(rng.uniform(inicio - 180 * DIA, agora - 30 * DIA, escala.clientes)).astype(np.int64)
+    animais_por_cliente = rng.choice([1, 2, 3, 4], size=escala.clientes, p=[0.55, 0.28, 0.12, 0.05])
+    animal_cliente = np.repeat(np.arange(1, escala.clientes + 1, dtype=np.int32), animais_por_cliente)
+    base = np.array([item[2] for item in CATALOGO])
+    precos = np.round(base[None, :] * rng.uniform(0.9, 1.15, (escala.filiais, 1)), 2)
+    return Plano(semente, escala, agora, cliente_filial, cliente_cadastro, animal_cliente, precos)
+
+
+def _timestamps(segundos: np.ndarray) -> np.ndarray:
+    return np.datetime_as_string(segundos.astype("datetime64[s]"), unit="s", timezone="UTC")
+
+
+def _datas(segundos: np.ndarray) -> np.ndarray:
+    return np.datetime_as_string(segundos.astype("datetime64[s]").astype("datetime64[D]"))
+
+
+def _texto(valores: np.ndarray) -> np.ndarray:
+    return valores.astype(str).astype(object)
+
+
+def _opcional(rng: np.random.Generator, opcoes: np.ndarray, probabilidade: float, n: int) -> np.ndarray:
+    valores = opcoes[rng.integers(len(opcoes), size=n)]
+    valores[rng.random(n) >= probabilidade] = None
+    return valores
+
+
+def _slug(valores: np.ndarray) -> np.ndarray:
+    return pd.Series(valores).str.normalize("NFKD").str.encode("ascii", "ignore").str.decode("ascii").str.lower().to_numpy()
+
+
+def _clientes(rng, plano: Plano, inicio: int, fim: int) -> pd.DataFrame:
+    n = fim - inicio
+    ids = np.arange(inicio + 1, fim + 1)
+    primeiro = rng.integers(len(NOMES), size=n)
+    sobrenome = rng.integers(len(SOBRENOMES), size=n)
+    return pd.DataFrame({
+        "cliente_id": ids,
+        "filial_id": plano.cliente_filial[inicio:fim],
+        "nome": NOMES[primeiro] + " " + SOBRENOMES[sobrenome],
+        "telefone": "119" + _texto(rng.integers(10**7, 10**8, size=n)),
+        "email": _slug(NOMES[primeiro]) + "." + _slug(SOBRENOMES[sobrenome]) + "." + _texto(ids) + "@exemplo.com",
+        "endereco": RUAS[rng.integers(len(RUAS), size=n)] + ", " + _texto(rng.integers(1, 3000, size=n))
+                    + " - " + BAIRROS[rng.integers(len(BAIRROS), size=n)],
+        "data_cadastro": _timestamps(plano.cliente_cadastro[inicio:fim]),
+    })
+
+
+def _animais(rng, plano: Plano, inicio: int, fim: int) -> pd.DataFrame:
+    n = fim - inicio
+    cliente = plano.animal_cliente[inicio:fim]
+    especie = rng.choice(len(ESPECIES), size=n, p=[peso for _, peso, _ in ESPECIES])
+    racas = np.array([[*r, *[None] * (10 - len(r))] for _, _, r in ESPECIES], dtype=object)
+    quantidade_racas = np.array([len(r) for _, _, r in ESPECIES])
+    nascimento = plano.cliente_cadastro[cliente - 1] - (rng.uniform(0.2, 14, size=n) * ANO).astype(np.int64)
+    return pd.DataFrame({
+        "animal_id": np.arange(inicio + 1, fim + 1),
+        "filial_id": plano.cliente_filial[cliente - 1],
+        "cliente_id": cliente,
+        "nome": NOMES_ANIMAIS[rng.integers(len(NOMES_ANIMAIS), size=n)],
+        "especie": np.array([nome for nome, _, _ in ESPECIES], dtype=object)[especie],
+        "raca": racas[especie, (rng.random(n) * quantidade_racas[especie]).astype(int)],
+        "data_nascimento": _datas(nascimento),
+        "observacoes": _opcional(rng, OBS_ANIMAIS, 0.12, n),
+    })
+
+
+def _funcionarios(rng, plano: Plano) -> pd.DataFrame:
+    por_filial = plano.escala.funcionarios_por_filial
+    n = por_filial * plano.escala.filiais
+    ids = np.arange(1, n + 1)
+    primeiro = rng.integers(len(NOMES), size=n)
+    sobrenome = rng.integers(len(SOBRENOMES), size=n)
+    contratacao = rng.uniform(plano.agora - (plano.escala.anos + 5) * ANO, plano.agora - 7 * DIA, n).astype(np.int64)
+    return pd.DataFrame({
+        "funcionario_id": ids,
+        "filial_id": (ids - 1) // por_filial + 1,
+        "nome": NOMES[primeiro] + " " + SOBRENOMES[sobrenome],
+        "cargo": rng.choice(CARGOS[0], size=n, p=CARGOS[1]),
+        "telefone": "119" + _texto(rng.integers(10**7, 10**8, size=n)),
+        "email": _slug(NOMES[primeiro]) + "." + _texto(ids) + "@petshop.com.br",
+        "data_contratacao": _datas(contratacao),
+        "ativo": rng.random(n) < 0.92,
+    })
+
+
+def _servicos(plano: Plano) -> pd.DataFrame:
+    itens = len(CATALOGO)
+    filiais = plano.escala.filiais
+    return pd.DataFrame({
+        "servico_id": np.arange(1, filiais * itens + 1),
+        "filial_id": np.repeat(np.arange(1, filiais + 1), itens),
+        "nome": [item[0] for item in CATALOGO] * filiais,
+        "descricao": [item[1] for item in CATALOGO] * filiais,
+        "preco": plano.precos.ravel(),
+        "duracao_estimada_minutos": [item[3] for item in CATALOGO] * filiais,
+    })
+
+
+def _agendamentos(rng, plano: Plano, inicio: int, fim: int):
+    """Agendamentos [inicio, fim) e as linhas de Agendamento_Servicos deles."""
+    n = fim - inicio
+    ids = np.arange(inicio + 1, fim + 1)
+    por_filial = plano.escala.funcionarios_por_filial
+    itens = len(CATALOGO)
+    agora = plano.agora
+
+    animal_indice = rng.integers(len(plano.animal_cliente), size=n)
+    cliente = plano.animal_cliente[animal_indice]
+    filial = plano.cliente_filial[cliente - 1]
+    cadastro = plano.cliente_cadastro[cliente - 1]
+
+    # Dia sorteado entre o cadastro do cliente e 60 dias à frente (mais movimento nos anos
+    # recentes, como numa base que cresce), em meia hora cheia das 8h às 17h30 locais;
+    # domingos viram sábado. A folga de 2 dias cobre os dois recuos (início do dia e domingo).
+    limite = agora + 60 * DIA
+    sorteado = cadastro + 2 * DIA + (rng.random(n) * (limite - cadastro - 2 * DIA)).astype(np.int64)
+    dia_local = (sorteado - FUSO_SEGUNDOS) // DIA
+    dia_local -= (dia_local + 3) % 7 == 6
+    quando = dia_local * DIA + FUSO_SEGUNDOS + 8 * 3600 + rng.integers(0, 20, size=n) * 1800
+
+    passado = quando < agora
+    status = np.where(passado, rng.choice(STATUS_PASSADO[0], size=n, p=STATUS_PASSADO[1]),
+                      rng.choice(STATUS_FUTURO[0], size=n, p=STATUS_FUTURO[1]))
+    funcionario = pd.array((filial - 1) * por_filial + rng.integers(1, por_filial + 1, size=n), dtype="Int64")
+    funcionario[rng.random(n) < np.where(passado, 0.02, 0.10)] = pd.NA
+    criacao = quando - rng.exponential(7 * DIA, size=n).astype(np.int64)
+    criacao = np.minimum(np.maximum(criacao, cadastro), np.minimum(quando, agora))
+
+    agendamentos = pd.DataFrame({
+        "agendamento_id": ids,
+        "filial_id": filial,
+        "animal_id": animal_indice + 1,
+        "funcionario_id": funcionario,
+        "data_hora_agendamento": _timestamps(quando),
+        "data_hora_criacao": _timestamps(criacao),
+        "status": status,
+        "observacoes": _opcional(rng, OBS_AGENDAMENTOS, 0.1, n),
+    })
+
+    # 1 a 4 serviços distintos do catálogo da filial: posições início + j * passo (mod
+    # itens), com passo <= itens / 4, nunca se repetem para j < 4.
+    quantidade = rng.choice([1, 2, 3, 4], size=n, p=[0.5, 0.3, 0.15, 0.05])
+    j = np.arange(quantidade.sum()) - np.repeat(np.cumsum(quantidade) - quantidade, quantidade)
+    item = (np.repeat(rng.integers(itens, size=n), quantidade)
+            + j * np.repeat(rng.integers(1, itens // 4 + 1, size=n), quantidade)) % itens
+    filial_linha = np.repeat(filial, quantidade)
+    # Preço registrado na época: o preço atual descontado do reajuste anual.
+    anos_atras = np.repeat(np.maximum(agora - quando, 0) / ANO, quantidade)
+    servicos = pd.DataFrame({
+        "agendamento_id": np.repeat(ids, quantidade),
+        "servico_id": (filial_linha - 1) * itens + item + 1,
+        "preco_registrado": np.round(plano.precos[filial_linha - 1, item] / (1 + REAJUSTE_ANUAL) ** anos_atras, 2),
+    })
+    return agendamentos, servicos
+
+
+# --- Workers ---
+
+_plano: Optional[Plano] = None
+_conn = None
+
+
+def _conectar(url: str, schema: Optional[str]):
+    conn = psycopg2.connect(url, options=f"-c search_path={schema}" if schema else None)
+    with conn.cursor() as cursor:
+        # Cada lote é confirmado ao fim; perder os últimos numa queda do servidor não importa aqui.
+        cursor.execute("SET synchronous_commit = off;")
+    conn.commit()
+    return conn
+
+
+def _iniciar_worker(url: str, schema: Optional[str], plano: Plano) -> None:
+    global _plano, _conn
+    _plano = plano
+    _conn = _conectar(url, schema)
+
+
+def _copiar(cursor, tabela: str, frame: pd.DataFrame) -> int:
+    buffer = io.StringIO()
+    frame.to_csv(buffer, header=False, index=False)
+    buffer.seek(0)
+    cursor.copy_expert(f"COPY {tabela} ({', '.join(frame.columns)}) FROM STDIN WITH (FORMAT csv)", buffer)
+    return len(frame)
+
+
+def _carregar_lote(tabela: str, inicio: int, fim: int) -> Dict[str, int]:
+    """Gera e carrega um lote de uma tabela; retorna as linhas carregadas por tabela."""
+    chave = list(TABELAS).index(tabela) + 1
+    rng = _rng(_plano.semente, chave, inicio)
+    with _conn.cursor() as cursor:
+        if tabela == "Clientes":
+            contagem = {tabela: _copiar(cursor, tabela, _clientes(rng, _plano, inicio, fim))}
+        elif tabela == "Animais":
+            contagem = {tabela: _copiar(cursor, tabela, _animais(rng, _plano, inicio, fim))}
+        elif tabela == "Funcionarios":
+            contagem = {tabela: _copiar(cursor, tabela, _funcionarios(rng, _plano))}
+        elif tabela == "Servicos":
+            contagem = {tabela: _copiar(cursor, tabela, _servicos(_plano))}
+        else:
+            agendamentos, servicos = _agendamentos(rng, _plano, inicio, fim)
+            contagem = {
+                "Agendamentos": _copiar(cursor, "Agendamentos", agendamentos),
+                "Agendamento_Servicos": _copiar(cursor, "Agendamento_Servicos", servicos),
+            }
+    _conn.commit()
+    return contagem
+
+
+def _executar(sql: str) -> None:
+    with _conn.cursor() as cursor:
+        cursor.execute(sql)
+    _conn.commit()
+
+
+# --- Orquestração ---
+
+def _indices_secundarios(cursor) -> List[tuple]:
+    """(nome, definição) dos índices das tabelas de dados que não pertencem a uma constraint."""
+    cursor.execute("""
+        SELECT i.indexname, i.indexdef
+        FROM pg_indexes i
+        WHERE i.schemaname = current_schema()
+          AND i.tablename = ANY(%s)
+          AND NOT EXISTS (
+              SELECT 1 FROM pg_constraint c
+              WHERE c.conindid = format('%%I.%%I', i.schemaname, i.indexname)::regclass
+          )
+        ORDER BY i.indexname;
+    """, ([tabela.lower() for tabela in TABELAS],))
+    return cursor.fetchall()
+
+
+def _lotes(tabela: str, total: int, tamanho: int):
+    return [(tabela, inicio, min(inicio + tamanho, total)) for inicio in range(0, total, tamanho)]
+
+
+def _fase(executor, nome: str, lotes: list, contagens: Dict[str, int]) -> None:
+    t0 = time.perf_counter()
+    futuros = [executor.submit(_carregar_lote, *lote) for lote in lotes]
+    linhas = 0
+    for futuro in futuros:
+        for tabela, quantidade in futuro.result().items():
+            contagens[tabela] = contagens.get(tabela, 0) + quantidade
+            linhas += quantidade
+    duracao = time.perf_counter() - t0
+    print(f"{nome:<34} {linhas:>12,} linhas em {duracao:7.1f} s ({linhas / duracao:>10,.0f} linhas/s)")
+
+
+def gerar_dataset(
+    url: str,
+    escala: Escala,
+    semente: int = 42,
+    schema: Optional[str] = None,
+    criar_schema: bool = False,
+    limpar: bool = False,
+    processos: Optional[int] = None,
+    tamanho_lote: int = 100_000,
+    agora: Optional[datetime] = None,
+    recriar_indices: bool = True,
+) -> Dict[str, int]:
+    """Gera e carrega o conjunto; retorna as linhas carregadas por tabela.
+
+    Com schema, as tabelas são as desse schema (criar_schema aplica o modelo físico nele).
+    """
+    agora = agora or datetime.now(timezone.utc).replace(minute=0, second=0, microsecond=0)
+    plano = planejar(escala, semente, int(agora.timestamp()))
+    processos = processos or os.cpu_count() or 1
+
+    if schema and criar_schema:
+        conn = psycopg2.connect(url)
+        with conn.cursor() as cursor:
+            cursor.execute(f"CREATE SCHEMA IF NOT EXISTS {schema};")
+        conn.commit()
+        conn.close()
+    conn = _conectar(url, schema)
+    contagens: Dict[str, int] = {}
+    try:
+        cursor = conn.cursor()
+        if criar_schema:
+            cursor.execute(MODELO_FISICO.read_text(encoding="utf-8"))
+        if limpar:
+            cursor.execute(f"TRUNCATE {', '.join(reversed(TABELAS))} RESTART IDENTITY CASCADE;")
+        for tabela in TABELAS:
+            cursor.execute(f"SELECT EXISTS (SELECT 1 FROM {tabela});")
+            if cursor.fetchone()[0]:
+                raise ValueError(f"A tabela {tabela} não está vazia (use --limpar).")
+        for filial_id in range(1, escala.filiais + 1):
+            cursor.execute("INSERT INTO Filiais (filial_id, nome) VALUES (%s, %s) ON CONFLICT DO NOTHING;",
+                           (filial_id, "Matriz" if filial_id == 1 else f"Filial {filial_id}"))
+        cursor.execute("SELECT setval(pg_get_serial_sequence('filiais', 'filial_id'), (SELECT MAX(filial_id) FROM Filiais));")
+        indices = _indices_secundarios(cursor) if recriar_indices else []
+        for nome, _ in indices:
+            cursor.execute(f"DROP INDEX {nome};")
+        conn.commit()
+
+        print(f"Gerando {escala.agendamentos:,} agendamentos, {escala.clientes:,} clientes, "
+              f"{len(plano.animal_cliente):,} animais, {escala.filiais} filial(is); {processos} processo(s)")
+        with ProcessPoolExecutor(max_workers=processos, initializer=_iniciar_worker,
+                                 initargs=(url, schema, plano)) as executor:
+            _fase(executor, "Clientes, funcionários e serviços",
+                  [("Funcionarios", 0, 0), ("Servicos", 0, 0), *_lotes("Clientes", escala.clientes, tamanho_lote)],
+                  contagens)
+            _fase(executor, "Animais", _lotes("Animais", len(plano.animal_cliente), tamanho_lote), contagens)
+            _fase(executor, "Agendamentos e serviços", _lotes("Agendamentos", escala.agendamentos, tamanho_lote),
+                  contagens)
+            if indices:
+                t0 = time.perf_counter()
+                for futuro in [executor.submit(_executar, definicao) for _, definicao in indices]:
+                    futuro.result()
+                print(f"{len(indices)} índices recriados em {time.perf_counter() - t0:.1f} s")
+
+        for tabela, coluna_id in TABELAS.items():
+            if coluna_id:
+                cursor.execute(f"SELECT setval(pg_get_serial_sequence(%s, %s), "
+                               f"GREATEST((SELECT COALESCE(MAX({coluna_id}), 0) FROM {tabela}), 1));",
+                               (tabela.lower(), coluna_id))
+        conn.commit()
+        t0 = time.perf_counter()
+        reconstruir_estatisticas(cursor)
+        conn.commit()
+        print(f"Estatísticas de clientes e animais recalculadas em {time.perf_counter() - t0:.1f} s")
+        conn.autocommit = True
+        cursor.execute("ANALYZE;")
+        # Workers da API ligados a este banco podem ter entidades antigas em cache.
+        for nome in CACHES:
+            cursor.execute("SELECT pg_notify(%s, %s);", (CANAL_INVALIDACAO, f"{nome}:*"))
+    finally:
+        conn.close()
+    return contagens
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--agendamentos", type=int, default=1_000_000, help="quantidade de agendamentos")
+    parser.add_argument("--filiais", type=int, default=1, help="filiais entre as quais os dados se dividem")
+    parser.add_argument("--anos", type=int, default=3, help="anos de histórico (mais 60 dias à frente)")
+    parser.add_argument("--semente", type=int, default=42, help="semente do gerador")
+    parser.add_argument("--agora", type=datetime.fromisoformat,
+                        help="instante de referência (ISO; padrão: a hora cheia atual), para reproduzir um conjunto")
+    parser.add_argument("--processos", type=int, help="processos de carga (padrão: número de CPUs)")
+    parser.add_argument("--tamanho-lote", type=int, default=100_000, help="linhas por lote/COPY")
+    parser.add_argument("--schema", help="schema de destino (padrão: o do DATABASE_URL)")
+    parser.add_argument("--criar-schema", action="store_true", help="aplica o modelo físico antes da carga")
+    parser.add_argument("--limpar", action="store_true", help="esvazia as tabelas de dados antes da carga")
+    parser.add_argument("--manter-indices", action="store_true",
+                        help="carrega com os índices secundários (mais lento; não os remove e recria)")
+    args = parser.parse_args(argv)
+
+    agora = args.agora
+    if agora is not None and agora.tzinfo is None:
+        agora = agora.replace(tzinfo=timezone.utc)
+    t0 = time.perf_counter()
+    try:
+        contagens = gerar_dataset(
+            DATABASE_URL, Escala(args.agendamentos, args.filiais, args.anos), args.semente, args.schema,
+            args.criar_schema, args.limpar, args.processos, args.tamanho_lote, agora, not args.manter_indices,
+        )
+    except (ValueError, psycopg2.Error) as e:
+        print(f"Erro ao gerar os dados: {e}")
+        return 1
+    print(f"\nConcluído em {time.perf_counter() - t0:.1f} s:")
+    for tabela, quantidade in contagens.items():
+        print(f"  {tabela:<22} {quantidade:>12,}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,56 @@
+"""Recalcula as estatísticas de clientes e animais a partir dos agendamentos.
+
+As funções crud mantêm Estatisticas_Clientes, Estatisticas_Animais e
+Estatisticas_Animais_Servicos a cada alteração de agendamento; este script as refaz do zero:
+depois da migração 007, de cargas feitas direto no banco (COPY, scripts) ou para conferir
+divergências. Roda numa transação, travando só as tabelas de estatísticas: as alterações
+de agendamentos feitas enquanto isso esperam e somam sobre o resultado novo.
+
+Uso (a partir de petshop_backend/):
+
+    python -m scripts.rebuild_stats              # todas as filiais do DATABASE_URL
+    python -m scripts.rebuild_stats --filial 2   # só a filial 2, no banco dela (FILIAIS_BANCOS)
+"""
+import argparse
+import sys
+import time
+
+import psycopg2
+
+from app.crud.crud_estatisticas import reconstruir
+from app.db.database import DATABASE_URL, banco_da_filial
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--filial", type=int, help="recalcula apenas esta filial (padrão: todas)")
+    parser.add_argument("--url", help="URL do banco (padrão: o banco da filial, ou DATABASE_URL)")
+    args = parser.parse_args(argv)
+
+    url = args.url or (banco_da_filial(args.filial) if args.filial is not None else DATABASE_URL)
+    conn = psycopg2.connect(url)
+    try:
+        with conn.cursor() as cursor:
+            t0 = time.perf_counter()
+            reconstruir(cursor, args.filial)
+            conn.commit()
+            cursor.execute("""
+                SELECT (SELECT count(*) FROM Estatisticas_Clientes WHERE %(filial)s::integer IS NULL OR filial_id = %(filial)s),
+                       (SELECT count(*) FROM Estatisticas_Animais WHERE %(filial)s::integer IS NULL OR filial_id = %(filial)s);
+            """, {"filial": args.filial})
+            clientes, animais = cursor.fetchone()
+    except psycopg2.Error as e:
+        conn.rollback()
+        print(f"Erro ao recalcular as estatísticas: {e}")
+        return 1
+    finally:
+        conn.close()
+
+    alvo = f"filial {args.filial}" if args.filial is not None else "todas as filiais"
+    print(f"Estatísticas recalculadas ({alvo}): {clientes} clientes e {animais} animais "
+          f"em {time.perf_counter() - t0:.1f} s.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,43 @@
+"""Fixtures dos testes: a API sobre o armazenamento em memória, sem Postgres."""
+import os
+
+# Precisa valer antes do primeiro import de app.*: o armazenamento é escolhido na importação.
+os.environ["ARMAZENAMENTO"] = "memoria"
+os.environ.pop("DATABASE_URL", None)
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.crud import memoria
+from app.main import app
+
+
+@pytest.fixture
+def client():
+    """Cliente HTTP da API, com o banco em memória zerado a cada teste."""
+    memoria.reiniciar()
+    with TestClient(app) as c:
+        yield c
+
+
+def criar(client, caminho: str, dados: dict) -> dict:
+    """POST que deve criar o registro (201); devolve o JSON da resposta."""
+    r = client.post(caminho, json=dados)
+    assert r.status_code == 201, r.text
+    return r.json()
+
+
+@pytest.fixture
+def cenario(client):
+    """Um cliente com um animal, um funcionário, um serviço e um agendamento ligando todos."""
+    cliente = criar(client, "/clientes/", {"nome": "Ana Silva", "telefone": "11999990000", "email": "ana@exemplo.com"})
+    animal = criar(client, "/animais/", {"cliente_id": cliente["cliente_id"], "nome": "Rex", "especie": "Cão"})
+    funcionario = criar(client, "/funcionarios/", {"nome": "Carla Souza", "cargo": "Tosadora",
+                                                   "email": "carla@exemplo.com", "data_contratacao": "2024-01-01"})
+    servico = criar(client, "/servicos/", {"nome": "Banho", "preco": "30.50", "duracao_estimada_minutos": 30})
+    agendamento = criar(client, "/agendamentos/", {
+        "animal_id": animal["animal_id"], "funcionario_id": funcionario["funcionario_id"],
+        "data_hora_agendamento": "2030-01-01T10:00:00", "status": "Agendado",
+        "servicos_ids": [servico["servico_id"]]})
+    return {"cliente": cliente, "animal": animal, "funcionario": funcionario,
+            "servico": servico, "agendamento": agendamento}
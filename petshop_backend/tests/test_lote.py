@@ -0,0 +1,41 @@
+"""POST /lote: tudo ou nada, no armazenamento em memória."""
+
+
+def test_lote_resolve_referencias(client):
+    r = client.post("/lote", json={"operacoes": [
+        {"acao": "create", "entidade": "clientes", "ref": "c",
+         "dados": {"nome": "Lote Um", "telefone": "1", "email": "lote@exemplo.com"}},
+        {"acao": "create", "entidade": "animais", "dados": {"cliente_id": "$c", "nome": "Tom", "especie": "Gato"}},
+    ]})
+    assert r.status_code == 200
+    corpo = r.json()
+    assert corpo["sucesso"] is True
+    cliente_id = corpo["resultados"][0]["id"]
+    assert [a["nome"] for a in client.get(f"/animais/?cliente_id={cliente_id}").json()] == ["Tom"]
+
+
+def test_falha_no_lote_desfaz_as_operacoes_anteriores(client, cenario):
+    r = client.post("/lote", json={"operacoes": [
+        {"acao": "create", "entidade": "clientes",
+         "dados": {"nome": "Lote Dois", "telefone": "1", "email": "lote2@exemplo.com"}},
+        {"acao": "delete", "entidade": "clientes", "id": cenario["cliente"]["cliente_id"]},
+        {"acao": "delete", "entidade": "clientes", "id": 9999},
+    ]})
+    assert r.status_code == 404
+    corpo = r.json()
+    assert corpo["sucesso"] is False
+    assert [resultado["status"] for resultado in corpo["resultados"]] == [424, 424, 404]
+    assert client.get("/clientes/?busca=lote").json() == []
+    # O delete anterior (com cascata) também foi desfeito.
+    assert client.get(f"/animais/{cenario['animal']['animal_id']}").status_code == 200
+    assert client.get(f"/agendamentos/{cenario['agendamento']['agendamento_id']}").status_code == 200
+
+
+def test_restricao_violada_no_lote_retorna_status_da_operacao(client, cenario):
+    r = client.post("/lote", json={"operacoes": [
+        {"acao": "create", "entidade": "servicos", "dados": {"nome": "Tosa", "preco": "50.00", "duracao_estimada_minutos": 60}},
+        {"acao": "delete", "entidade": "servicos", "id": cenario["servico"]["servico_id"]},
+    ]})
+    assert r.status_code == 400
+    assert [resultado["status"] for resultado in r.json()["resultados"]] == [424, 400]
+    assert [s["nome"] for s in client.get("/servicos/").json()] == ["Banho"]
@@ -0,0 +1,82 @@
+"""Restrições do modelo físico (UNIQUE, FK, CHECK) vistas pela API no armazenamento em memória."""
+import pytest
+
+from app.crud import memoria
+from app.db.memoria import PG_CHECK, ViolacaoRestricao
+
+from tests.conftest import criar
+
+
+def test_email_de_cliente_duplicado_retorna_400(client, cenario):
+    r = client.post("/clientes/", json={"nome": "Outra Ana", "telefone": "1100", "email": "ana@exemplo.com"})
+    assert r.status_code == 400
+
+
+def test_email_de_funcionario_duplicado_retorna_400(client, cenario):
+    r = client.post("/funcionarios/", json={"nome": "Outra Carla", "cargo": "Veterinária",
+                                            "email": "carla@exemplo.com", "data_contratacao": "2024-02-01"})
+    assert r.status_code == 400
+
+
+def test_nome_de_servico_duplicado_retorna_400(client, cenario):
+    r = client.post("/servicos/", json={"nome": "Banho", "preco": "40.00", "duracao_estimada_minutos": 45})
+    assert r.status_code == 400
+
+
+def test_update_para_email_existente_retorna_400(client, cenario):
+    outro = criar(client, "/clientes/", {"nome": "Bruno Costa", "telefone": "1188", "email": "bruno@exemplo.com"})
+    r = client.put(f"/clientes/{outro['cliente_id']}", json={"email": "ana@exemplo.com"})
+    assert r.status_code == 400
+    assert client.get(f"/clientes/{outro['cliente_id']}").json()["email"] == "bruno@exemplo.com"
+
+
+def test_servico_em_uso_nao_pode_ser_removido(client, cenario):
+    servico_id = cenario["servico"]["servico_id"]
+    assert client.delete(f"/servicos/{servico_id}").status_code == 400
+    assert client.get(f"/servicos/{servico_id}").status_code == 200
+
+
+def test_servico_sem_agendamentos_pode_ser_removido(client, cenario):
+    servico = criar(client, "/servicos/", {"nome": "Tosa", "preco": "50.00", "duracao_estimada_minutos": 60})
+    assert client.delete(f"/servicos/{servico['servico_id']}").status_code == 204
+
+
+def test_remover_cliente_remove_animais_e_agendamentos(client, cenario):
+    assert client.delete(f"/clientes/{cenario['cliente']['cliente_id']}").status_code == 204
+    assert client.get(f"/animais/{cenario['animal']['animal_id']}").status_code == 404
+    assert client.get(f"/agendamentos/{cenario['agendamento']['agendamento_id']}").status_code == 404
+    # Sem agendamentos, o serviço deixa de estar em uso.
+    assert client.delete(f"/servicos/{cenario['servico']['servico_id']}").status_code == 204
+
+
+def test_remover_animal_remove_agendamentos(client, cenario):
+    assert client.delete(f"/animais/{cenario['animal']['animal_id']}").status_code == 204
+    assert client.get(f"/agendamentos/{cenario['agendamento']['agendamento_id']}").status_code == 404
+    assert client.get(f"/clientes/{cenario['cliente']['cliente_id']}").status_code == 200
+
+
+def test_remover_funcionario_mantem_agendamento_sem_funcionario(client, cenario):
+    assert client.delete(f"/funcionarios/{cenario['funcionario']['funcionario_id']}").status_code == 204
+    agendamento = client.get(f"/agendamentos/{cenario['agendamento']['agendamento_id']}").json()
+    assert agendamento["funcionario_id"] is None
+
+
+def test_animal_de_cliente_inexistente_nao_e_criado(client):
+    r = client.post("/animais/", json={"cliente_id": 999, "nome": "Tom", "especie": "Gato"})
+    assert r.status_code >= 400
+    assert client.get("/animais/").json() == []
+
+
+def test_status_invalido_e_rejeitado_pela_api(client, cenario):
+    agendamento_id = cenario["agendamento"]["agendamento_id"]
+    r = client.put(f"/agendamentos/{agendamento_id}", json={"status": "Esquecido"})
+    assert r.status_code == 422
+    assert client.get(f"/agendamentos/{agendamento_id}").json()["status"] == "Agendado"
+
+
+def test_status_invalido_viola_check_do_banco(client, cenario):
+    agendamento_id = cenario["agendamento"]["agendamento_id"]
+    with pytest.raises(ViolacaoRestricao) as erro:
+        memoria.banco.atualizar("Agendamentos", agendamento_id, {"status": "Esquecido"})
+    assert erro.value.pgcode == PG_CHECK
+    assert client.get(f"/agendamentos/{agendamento_id}").json()["status"] == "Agendado"
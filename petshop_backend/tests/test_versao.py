@@ -0,0 +1,37 @@
+"""Controle otimista de versão (If-Match/ETag) no armazenamento em memória."""
+from tests.conftest import criar
+
+
+def test_get_e_put_devolvem_etag_da_versao(client):
+    cliente = criar(client, "/clientes/", {"nome": "Ana Silva", "telefone": "1199", "email": "ana@exemplo.com"})
+    caminho = f"/clientes/{cliente['cliente_id']}"
+    assert client.get(caminho).headers["ETag"] == '"1"'
+    r = client.put(caminho, json={"telefone": "1100"}, headers={"If-Match": '"1"'})
+    assert r.status_code == 200
+    assert r.headers["ETag"] == '"2"'
+    assert r.json()["versao"] == 2
+
+
+def test_put_sobre_versao_antiga_retorna_409_com_versao_atual(client):
+    cliente = criar(client, "/clientes/", {"nome": "Ana Silva", "telefone": "1199", "email": "ana@exemplo.com"})
+    caminho = f"/clientes/{cliente['cliente_id']}"
+    assert client.put(caminho, json={"telefone": "1100"}, headers={"If-Match": '"1"'}).status_code == 200
+
+    r = client.put(caminho, json={"telefone": "1111"}, headers={"If-Match": '"1"'})
+    assert r.status_code == 409
+    assert r.headers["ETag"] == '"2"'
+    assert r.json()["versao_atual"] == 2
+    assert client.get(caminho).json()["telefone"] == "1100"
+
+
+def test_versao_no_corpo_tambem_confere(client, cenario):
+    caminho = f"/agendamentos/{cenario['agendamento']['agendamento_id']}"
+    r = client.put(caminho, json={"status": "Confirmado", "versao": 5})
+    assert r.status_code == 409
+    assert r.headers["ETag"] == '"1"'
+
+
+def test_if_match_diferente_do_corpo_retorna_400(client, cenario):
+    caminho = f"/clientes/{cenario['cliente']['cliente_id']}"
+    r = client.put(caminho, json={"telefone": "1100", "versao": 1}, headers={"If-Match": '"2"'})
+    assert r.status_code == 400
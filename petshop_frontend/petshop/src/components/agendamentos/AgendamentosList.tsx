@@ -1,16 +1,22 @@
-import { useState, useEffect, Component, ErrorInfo } from "react";
+import { useState, Component, ErrorInfo } from "react";
 import { PlusCircle, Search, Edit, Trash2, X, Calendar } from "lucide-react";
 import agendamentoService, {
   Agendamento,
   AgendamentoCreate,
   AgendamentoUpdate,
-  AgendamentoServico,
 } from "../../services/agendamentoService";
 import animalService, { Animal } from "../../services/animalService";
 import funcionarioService, {
   Funcionario,
 } from "../../services/funcionarioService";
 import servicoService, { Servico } from "../../services/servicoService";
+import { useDebouncedValue } from "../../hooks/use-debounced-value";
+import { usePaginatedList } from "../../hooks/use-paginated-list";
+import VirtualTable from "../layout/VirtualTable";
+import BuscaSelect from "../layout/BuscaSelect";
+
+// Altura fixa das linhas (animal e cliente em duas linhas), usada pela virtualização.
+const ROW_HEIGHT = 73;
 
 // Tipos
 interface AgendamentoFormData {
@@ -53,12 +59,14 @@ class ErrorBoundary extends Component<ErrorBoundaryProps, ErrorBoundaryState> {
   }
 }
 
+// Rótulos das opções dos campos de busca do formulário
+const animalLabel = (animal: Animal) =>
+  `${animal.nome} (${animal.especie}, ${animal.cliente_nome || "Desconhecido"})`;
+const funcionarioLabel = (funcionario: Funcionario) =>
+  `${funcionario.nome} (${funcionario.cargo})`;
+
 const AgendamentosList = () => {
-  const [agendamentos, setAgendamentos] = useState<Agendamento[]>([]);
-  const [animais, setAnimais] = useState<Animal[]>([]);
-  const [funcionarios, setFuncionarios] = useState<Funcionario[]>([]);
-  const [servicos, setServicos] = useState<Servico[]>([]);
-  const [loading, setLoading] = useState(true);
+  const [saving, setSaving] = useState(false);
   const [error, setError] = useState<string | null>(null);
   const [searchTerm, setSearchTerm] = useState("");
   const [showForm, setShowForm] = useState(false);
@@ -73,62 +81,18 @@ const AgendamentosList = () => {
     servicos_ids: [],
   });
   const [selectedServicos, setSelectedServicos] = useState<Servico[]>([]);
+  // Textos do animal e do funcionário escolhidos, mostrados nos campos de busca
+  const [animalNome, setAnimalNome] = useState("");
+  const [funcionarioNome, setFuncionarioNome] = useState("");
 
-  // Carregar dados da API
-  useEffect(() => {
-    const fetchData = async () => {
-      try {
-        setLoading(true);
-        console.log(
-          "Carregando dados de agendamentos, animais, funcionários e serviços..."
-        );
-        const [agendamentosData, animaisData, funcionariosData, servicosData] =
-          await Promise.all([
-            agendamentoService.getAll(),
-            animalService.getAll(),
-            funcionarioService.getAll(),
-            servicoService.getAll(),
-          ]);
-        console.log(
-          "Agendamentos recebidos:",
-          JSON.stringify(agendamentosData, null, 2)
-        );
-        setAgendamentos(agendamentosData);
-        setAnimais(animaisData);
-        setFuncionarios(funcionariosData);
-        setServicos(servicosData);
-        setError(null);
-      } catch (err: any) {
-        console.error("Erro ao buscar dados:", err);
-        setError(
-          err.response?.data?.detail ||
-            "Não foi possível carregar os dados. Tente novamente."
-        );
-      } finally {
-        setLoading(false);
-      }
-    };
-    fetchData();
-  }, []);
-
-  // Filtrar agendamentos
-  const filteredAgendamentos = agendamentos.filter(
-    (agendamento) =>
-      (agendamento.animal_nome &&
-        agendamento.animal_nome
-          .toLowerCase()
-          .includes(searchTerm.toLowerCase())) ||
-      (agendamento.cliente_nome &&
-        agendamento.cliente_nome
-          .toLowerCase()
-          .includes(searchTerm.toLowerCase())) ||
-      (agendamento.funcionario_nome &&
-        agendamento.funcionario_nome
-          .toLowerCase()
-          .includes(searchTerm.toLowerCase())) ||
-      agendamento.status.toLowerCase().includes(searchTerm.toLowerCase()) ||
-      formatDateTime(agendamento.data_hora_agendamento).includes(searchTerm)
-  );
+  // Busca (animal, dono ou funcionário) e paginação no servidor, após uma pausa na digitação
+  const busca = useDebouncedValue(searchTerm.trim());
+  const agendamentos = usePaginatedList<Agendamento>({
+    fetchPage: (params) => agendamentoService.getPage({ ...params, busca }),
+    getKey: (agendamento) => agendamento.agendamento_id,
+    filtros: { busca },
+    errorMessage: "Não foi possível carregar os dados. Tente novamente.",
+  });
 
   const handleInputChange = (
     e: React.ChangeEvent<
@@ -136,32 +100,39 @@ const AgendamentosList = () => {
     >
   ) => {
     const { name, value } = e.target;
-    if (name === "animal_id" || name === "funcionario_id") {
-      setFormData({
-        ...formData,
-        [name]: value ? parseInt(value, 10) : undefined,
-      });
-    } else {
-      setFormData({
-        ...formData,
-        [name]: value,
-      });
+    setFormData({
+      ...formData,
+      [name]: value,
+    });
+  };
+
+  // Animais, funcionários e serviços são buscados no servidor conforme a digitação
+  // (BuscaSelect), em vez de carregar as listas inteiras ao abrir o formulário.
+  const handleAnimalSelect = (animal: Animal | null) => {
+    if (animal && !animal.especie) {
+      setError("O animal selecionado não possui uma espécie válida.");
+      return;
     }
+    setFormData({ ...formData, animal_id: animal?.animal_id ?? 0 });
+    setAnimalNome(animal ? animalLabel(animal) : "");
   };
 
-  const handleServicoChange = (e: React.ChangeEvent<HTMLSelectElement>) => {
-    const servicoId = parseInt(e.target.value, 10);
-    const servico = servicos.find((s) => s.servico_id === servicoId);
+  const handleFuncionarioSelect = (funcionario: Funcionario | null) => {
+    setFormData({ ...formData, funcionario_id: funcionario?.funcionario_id });
+    setFuncionarioNome(funcionario ? funcionarioLabel(funcionario) : "");
+  };
 
-    if (servico && !selectedServicos.some((s) => s.servico_id === servicoId)) {
+  const handleServicoSelect = (servico: Servico | null) => {
+    if (
+      servico &&
+      !selectedServicos.some((s) => s.servico_id === servico.servico_id)
+    ) {
       setSelectedServicos([...selectedServicos, servico]);
       setFormData({
         ...formData,
-        servicos_ids: [...formData.servicos_ids, servicoId],
+        servicos_ids: [...formData.servicos_ids, servico.servico_id],
       });
     }
-
-    e.target.value = "";
   };
 
   const handleRemoveServico = (servicoId: number) => {
@@ -184,27 +155,21 @@ const AgendamentosList = () => {
       servicos_ids: [],
     });
     setSelectedServicos([]);
+    setAnimalNome("");
+    setFuncionarioNome("");
     setEditingAgendamento(null);
   };
 
   const handleOpenForm = async (agendamento?: Agendamento) => {
-    console.log(
-      "handleOpenForm chamado com agendamento:",
-      JSON.stringify(agendamento, null, 2)
-    );
     try {
       if (agendamento) {
         const fullAgendamento = await agendamentoService.getById(
           agendamento.agendamento_id
         );
-        console.log(
-          "Agendamento completo carregado para edição:",
-          JSON.stringify(fullAgendamento, null, 2)
-        );
         setEditingAgendamento(fullAgendamento);
         setFormData({
           animal_id: fullAgendamento.animal_id,
-          funcionario_id: fullAgendamento.funcionario_id,
+          funcionario_id: fullAgendamento.funcionario_id ?? undefined,
           data_hora_agendamento: fullAgendamento.data_hora_agendamento.slice(
             0,
             16
@@ -214,21 +179,32 @@ const AgendamentosList = () => {
           servicos_ids:
             fullAgendamento.servicos?.map((s) => s.servico_id) || [],
         });
+        // Os serviços vêm do próprio agendamento, com o preço registrado
         const servicosSelecionados =
-          fullAgendamento.servicos?.map((as) => {
-            const servico = servicos.find(
-              (s) => s.servico_id === as.servico_id
-            );
-            return (
-              servico || {
-                servico_id: as.servico_id,
-                nome: as.nome_servico,
-                preco: as.preco_registrado,
-                duracao_estimada_minutos: 0,
-              }
-            );
-          }) || [];
+          fullAgendamento.servicos?.map((as) => ({
+            servico_id: as.servico_id,
+            nome: as.nome_servico,
+            preco: as.preco_registrado,
+            duracao_estimada_minutos: 0,
+          })) || [];
         setSelectedServicos(servicosSelecionados);
+        // Os nomes vêm da linha da listagem (o detalhe não traz os nomes calculados)
+        const animalNomeAtual =
+          fullAgendamento.animal_nome ?? agendamento.animal_nome;
+        const clienteNomeAtual =
+          fullAgendamento.cliente_nome ?? agendamento.cliente_nome;
+        setAnimalNome(
+          animalNomeAtual
+            ? `${animalNomeAtual} (${clienteNomeAtual || "Desconhecido"})`
+            : `Animal #${fullAgendamento.animal_id}`
+        );
+        setFuncionarioNome(
+          fullAgendamento.funcionario_nome ??
+            agendamento.funcionario_nome ??
+            (fullAgendamento.funcionario_id
+              ? `Funcionário #${fullAgendamento.funcionario_id}`
+              : "")
+        );
       } else {
         resetForm();
       }
@@ -239,13 +215,11 @@ const AgendamentosList = () => {
           (err.response?.data?.detail || err.message)
       );
     } finally {
-      console.log("Definindo showForm como true");
       setShowForm(true);
     }
   };
 
   const handleCloseForm = () => {
-    console.log("Fechando formulário");
     setShowForm(false);
     resetForm();
   };
@@ -267,39 +241,23 @@ const AgendamentosList = () => {
 
   const handleSubmit = async (e: React.FormEvent) => {
     e.preventDefault();
-    console.log(
-      "Iniciando handleSubmit com formData:",
-      JSON.stringify(formData, null, 2)
-    );
     if (
       !formData.animal_id ||
       !formData.data_hora_agendamento ||
       !formData.status ||
       formData.servicos_ids.length === 0
     ) {
-      const errorMsg =
-        "Por favor, preencha todos os campos obrigatórios e selecione pelo menos um serviço.";
-      console.warn("Validação falhou:", errorMsg);
-      setError(errorMsg);
-      return;
-    }
-    const animal = animais.find((a) => a.animal_id === formData.animal_id);
-    if (!animal?.especie) {
-      const errorMsg = "O animal selecionado não possui uma espécie válida.";
-      console.warn("Validação falhou:", errorMsg);
-      setError(errorMsg);
+      setError(
+        "Por favor, preencha todos os campos obrigatórios e selecione pelo menos um serviço."
+      );
       return;
     }
     try {
-      setLoading(true);
+      setSaving(true);
       const formattedData = {
         ...formData,
         data_hora_agendamento: formatToISO(formData.data_hora_agendamento),
       };
-      console.log(
-        "Dados formatados para envio:",
-        JSON.stringify(formattedData, null, 2)
-      );
       if (editingAgendamento) {
         const agendamentoData: AgendamentoUpdate = {
           animal_id: formattedData.animal_id,
@@ -309,25 +267,11 @@ const AgendamentosList = () => {
           observacoes: formattedData.observacoes,
           servicos_ids: formattedData.servicos_ids,
         };
-        console.log(
-          "Enviando atualização:",
-          JSON.stringify(agendamentoData, null, 2)
-        );
         const updatedAgendamento = await agendamentoService.update(
           editingAgendamento.agendamento_id,
           agendamentoData
         );
-        console.log(
-          "Agendamento atualizado:",
-          JSON.stringify(updatedAgendamento, null, 2)
-        );
-        setAgendamentos(
-          agendamentos.map((a) =>
-            a.agendamento_id === updatedAgendamento.agendamento_id
-              ? updatedAgendamento
-              : a
-          )
-        );
+        agendamentos.replaceItem(updatedAgendamento);
       } else {
         const agendamentoData: AgendamentoCreate = {
           animal_id: formattedData.animal_id,
@@ -337,39 +281,30 @@ const AgendamentosList = () => {
           observacoes: formattedData.observacoes,
           servicos_ids: formattedData.servicos_ids,
         };
-        console.log(
-          "Enviando criação:",
-          JSON.stringify(agendamentoData, null, 2)
-        );
-        const newAgendamento = await agendamentoService.create(agendamentoData);
-        console.log(
-          "Novo agendamento criado:",
-          JSON.stringify(newAgendamento, null, 2)
-        );
-        setAgendamentos([...agendamentos, newAgendamento]);
+        await agendamentoService.create(agendamentoData);
+        // A posição do novo agendamento depende da data: recarrega a partir da primeira página
+        agendamentos.reload();
       }
-      setLoading(false);
+      setSaving(false);
       setShowForm(false);
       resetForm();
       setError(null);
     } catch (err: any) {
       console.error("Erro ao salvar agendamento:", err);
-      const errorMsg =
+      setError(
         err.response?.data?.detail ||
-        "Erro ao salvar agendamento. Tente novamente.";
-      console.error("Mensagem de erro detalhada:", errorMsg);
-      setError(errorMsg);
-      setLoading(false);
+          "Erro ao salvar agendamento. Tente novamente."
+      );
+      setSaving(false);
     }
   };
 
   const handleDelete = async (id: number) => {
     if (window.confirm("Tem certeza que deseja excluir este agendamento?")) {
       try {
-        setLoading(true);
-        console.log(`Excluindo agendamento ID: ${id}`);
+        setSaving(true);
         await agendamentoService.delete(id);
-        setAgendamentos(agendamentos.filter((a) => a.agendamento_id !== id));
+        agendamentos.removeItem(id);
         setError(null);
       } catch (err: any) {
         console.error("Erro ao excluir agendamento:", err);
@@ -378,7 +313,7 @@ const AgendamentosList = () => {
             "Erro ao excluir agendamento. Tente novamente."
         );
       } finally {
-        setLoading(false);
+        setSaving(false);
       }
     }
   };
@@ -450,19 +385,24 @@ const AgendamentosList = () => {
           <div className="relative">
             <input
               type="text"
-              placeholder="Buscar agendamentos..."
+              placeholder="Buscar por animal, cliente ou funcionário..."
               className="w-full p-3 pl-10 border border-gray-300 rounded-md focus:outline-none focus:ring-2 focus:ring-blue-500"
               value={searchTerm}
               onChange={(e) => setSearchTerm(e.target.value)}
             />
             <Search className="absolute left-3 top-3 h-5 w-5 text-gray-400" />
           </div>
+          {agendamentos.total !== null && (
+            <p className="mt-2 text-sm text-gray-500">
+              {agendamentos.total} agendamento(s) encontrado(s)
+            </p>
+          )}
         </div>
 
         {}
-        {error && !showForm && (
+        {(error || agendamentos.error) && !showForm && (
           <div className="text-red-500 p-4 mb-4 bg-red-100 rounded-md">
-            {error}
+            {error || agendamentos.error}
           </div>
         )}
 
@@ -498,22 +438,15 @@ const AgendamentosList = () => {
                     >
                       Animal*
                     </label>
-                    <select
+                    <BuscaSelect<Animal>
                       id="animal_id"
-                      name="animal_id"
-                      value={formData.animal_id || ""}
-                      onChange={handleInputChange}
-                      className="w-full p-2 border border-gray-300 rounded-md focus:outline-none focus:ring-2 focus:ring-blue-500"
-                      required
-                    >
-                      <option value="">Selecione um animal</option>
-                      {animais.map((animal) => (
-                        <option key={animal.animal_id} value={animal.animal_id}>
-                          {animal.nome} ({animal.especie},{" "}
-                          {animal.cliente_nome || "Desconhecido"})
-                        </option>
-                      ))}
-                    </select>
+                      fetchPage={animalService.getPage}
+                      getKey={(animal) => animal.animal_id}
+                      getLabel={animalLabel}
+                      selectedLabel={animalNome}
+                      onSelect={handleAnimalSelect}
+                      placeholder="Selecione um animal"
+                    />
                   </div>
                   <div>
                     <label
@@ -522,23 +455,16 @@ const AgendamentosList = () => {
                     >
                       Funcionário
                     </label>
-                    <select
+                    <BuscaSelect<Funcionario>
                       id="funcionario_id"
-                      name="funcionario_id"
-                      value={formData.funcionario_id || ""}
-                      onChange={handleInputChange}
-                      className="w-full p-2 border border-gray-300 rounded-md focus:outline-none focus:ring-2 focus:ring-blue-500"
-                    >
-                      <option value="">Selecione um funcionário</option>
-                      {funcionarios.map((funcionario) => (
-                        <option
-                          key={funcionario.funcionario_id}
-                          value={funcionario.funcionario_id}
-                        >
-                          {funcionario.nome} ({funcionario.cargo})
-                        </option>
-                      ))}
-                    </select>
+                      fetchPage={(params) => funcionarioService.getPage(params)}
+                      getKey={(funcionario) => funcionario.funcionario_id}
+                      getLabel={funcionarioLabel}
+                      selectedLabel={funcionarioNome}
+                      onSelect={handleFuncionarioSelect}
+                      placeholder="Selecione um funcionário"
+                      allowEmpty
+                    />
                   </div>
                 </div>
                 <div className="grid grid-cols-1 md:grid-cols-2 gap-4 mb-4">
@@ -601,28 +527,24 @@ const AgendamentosList = () => {
                 <div className="mb-6">
                   <label className="block text-gray-700 mb-2">Serviços*</label>
                   <div className="flex items-center mb-2">
-                    <select
-                      id="servico_select"
-                      onChange={handleServicoChange}
-                      className="w-full p-2 border border-gray-300 rounded-md focus:outline-none focus:ring-2 focus:ring-blue-500"
-                    >
-                      <option value="">Adicionar serviço</option>
-                      {servicos
-                        .filter(
-                          (s) =>
-                            !selectedServicos.some(
-                              (selected) => selected.servico_id === s.servico_id
-                            )
-                        )
-                        .map((servico) => (
-                          <option
-                            key={servico.servico_id}
-                            value={servico.servico_id}
-                          >
-                            {servico.nome} - {formatPrice(servico.preco)}
-                          </option>
-                        ))}
-                    </select>
+                    <div className="w-full">
+                      <BuscaSelect<Servico>
+                        id="servico_select"
+                        fetchPage={servicoService.getPage}
+                        getKey={(servico) => servico.servico_id}
+                        getLabel={(servico) =>
+                          `${servico.nome} - ${formatPrice(servico.preco)}`
+                        }
+                        selectedLabel=""
+                        onSelect={handleServicoSelect}
+                        placeholder="Adicionar serviço"
+                        exclude={(servico) =>
+                          selectedServicos.some(
+                            (selected) => selected.servico_id === servico.servico_id
+                          )
+                        }
+                      />
+                    </div>
                   </div>
                   {selectedServicos.length === 0 ? (
                     <div className="text-red-500 text-sm">
@@ -681,9 +603,9 @@ const AgendamentosList = () => {
                   <button
                     type="submit"
                     className="px-4 py-2 bg-blue-600 text-white rounded-md hover:bg-blue-700"
-                    disabled={loading}
+                    disabled={saving}
                   >
-                    {loading ? "Salvando..." : "Salvar"}
+                    {saving ? "Salvando..." : "Salvar"}
                   </button>
                 </div>
               </form>
@@ -691,136 +613,113 @@ const AgendamentosList = () => {
           </div>
         )}
 
-        {/* Tabela de agendamentos */}
+        {/* Tabela de agendamentos (virtualizada; próximas páginas carregadas na rolagem) */}
         <div className="bg-white shadow-md rounded-lg overflow-hidden">
-          <div className="overflow-x-auto">
-            <table className="min-w-full divide-y divide-gray-200">
-              <thead className="bg-gray-50">
-                <tr>
-                  <th className="px-6 py-3 text-left text-xs font-medium text-gray-500 uppercase tracking-wider">
-                    Data/Hora
-                  </th>
-                  <th className="px-6 py-3 text-left text-xs font-medium text-gray-500 uppercase tracking-wider">
-                    Animal/Cliente
-                  </th>
-                  <th className="px-6 py-3 text-left text-xs font-medium text-gray-500 uppercase tracking-wider">
-                    Serviços
-                  </th>
-                  <th className="px-6 py-3 text-left text-xs font-medium text-gray-500 uppercase tracking-wider">
-                    Funcionário
-                  </th>
-                  <th className="px-6 py-3 text-left text-xs font-medium text-gray-500 uppercase tracking-wider">
-                    Status
-                  </th>
-                  <th className="px-6 py-3 text-left text-xs font-medium text-gray-500 uppercase tracking-wider">
-                    Valor
-                  </th>
-                  <th className="px-6 py-3 text-right text-xs font-medium text-gray-500 uppercase tracking-wider">
-                    Ações
-                  </th>
-                </tr>
-              </thead>
-              <tbody className="bg-white divide-y divide-gray-200">
-                {loading ? (
-                  <tr>
-                    <td colSpan={7} className="px-6 py-4 text-center">
-                      <div className="flex justify-center">
-                        <div className="animate-spin rounded-full h-6 w-6 border-b-2 border-blue-600"></div>
+          <VirtualTable
+            items={agendamentos.items}
+            rowHeight={ROW_HEIGHT}
+            colSpan={7}
+            loading={agendamentos.loading}
+            loadingMore={agendamentos.loadingMore}
+            hasMore={agendamentos.hasMore}
+            onEndReached={agendamentos.loadMore}
+            resetKey={busca}
+            emptyMessage="Nenhum agendamento encontrado"
+            header={
+              <tr>
+                <th className="px-6 py-3 text-left text-xs font-medium text-gray-500 uppercase tracking-wider">
+                  Data/Hora
+                </th>
+                <th className="px-6 py-3 text-left text-xs font-medium text-gray-500 uppercase tracking-wider">
+                  Animal/Cliente
+                </th>
+                <th className="px-6 py-3 text-left text-xs font-medium text-gray-500 uppercase tracking-wider">
+                  Serviços
+                </th>
+                <th className="px-6 py-3 text-left text-xs font-medium text-gray-500 uppercase tracking-wider">
+                  Funcionário
+                </th>
+                <th className="px-6 py-3 text-left text-xs font-medium text-gray-500 uppercase tracking-wider">
+                  Status
+                </th>
+                <th className="px-6 py-3 text-left text-xs font-medium text-gray-500 uppercase tracking-wider">
+                  Valor
+                </th>
+                <th className="px-6 py-3 text-right text-xs font-medium text-gray-500 uppercase tracking-wider">
+                  Ações
+                </th>
+              </tr>
+            }
+            renderRow={(agendamento, style) => {
+              // Numa linha só (a altura das linhas é fixa); a lista completa fica no title.
+              const nomesServicos =
+                agendamento.servicos?.map((s) => s.nome_servico).join(", ") ||
+                "-";
+              return (
+                <tr
+                  key={agendamento.agendamento_id}
+                  className="hover:bg-gray-50"
+                  style={style}
+                >
+                  <td className="px-6 py-4 whitespace-nowrap">
+                    <div className="flex items-center">
+                      <Calendar className="h-4 w-4 mr-1 text-gray-500" />
+                      <div className="text-sm text-gray-900">
+                        {formatDateTime(agendamento.data_hora_agendamento)}
                       </div>
-                    </td>
-                  </tr>
-                ) : filteredAgendamentos.length === 0 ? (
-                  <tr>
-                    <td
-                      colSpan={7}
-                      className="px-6 py-4 text-center text-gray-500"
+                    </div>
+                  </td>
+                  <td className="px-6 py-4 whitespace-nowrap">
+                    <div className="text-sm font-medium text-gray-900">
+                      {agendamento.animal_nome || "Desconhecido"}
+                    </div>
+                    <div className="text-sm text-gray-500">
+                      {agendamento.cliente_nome || "Desconhecido"}
+                    </div>
+                  </td>
+                  <td className="px-6 py-4">
+                    <div
+                      className="text-sm text-gray-900 truncate max-w-xs"
+                      title={nomesServicos}
                     >
-                      Nenhum agendamento encontrado
-                    </td>
-                  </tr>
-                ) : (
-                  filteredAgendamentos.map((agendamento) => {
-                    console.log(
-                      "Renderizando agendamento:",
-                      JSON.stringify(agendamento, null, 2)
-                    );
-                    return (
-                      <tr
-                        key={agendamento.agendamento_id}
-                        className="hover:bg-gray-50"
-                      >
-                        <td className="px-6 py-4 whitespace-nowrap">
-                          <div className="flex items-center">
-                            <Calendar className="h-4 w-4 mr-1 text-gray-500" />
-                            <div className="text-sm text-gray-900">
-                              {formatDateTime(
-                                agendamento.data_hora_agendamento
-                              )}
-                            </div>
-                          </div>
-                        </td>
-                        <td className="px-6 py-4 whitespace-nowrap">
-                          <div className="text-sm font-medium text-gray-900">
-                            {agendamento.animal_nome || "Desconhecido"}
-                          </div>
-                          <div className="text-sm text-gray-500">
-                            {agendamento.cliente_nome || "Desconhecido"}
-                          </div>
-                        </td>
-                        <td className="px-6 py-4">
-                          <ul className="text-sm text-gray-900">
-                            {agendamento.servicos &&
-                            agendamento.servicos.length > 0 ? (
-                              agendamento.servicos.map((servico) => (
-                                <li key={servico.servico_id} className="mb-1">
-                                  {servico.nome_servico}
-                                </li>
-                              ))
-                            ) : (
-                              <li>-</li>
-                            )}
-                          </ul>
-                        </td>
-                        <td className="px-6 py-4 whitespace-nowrap">
-                          <div className="text-sm text-gray-900">
-                            {agendamento.funcionario_nome || "-"}
-                          </div>
-                        </td>
-                        <td className="px-6 py-4 whitespace-nowrap">
-                          <span
-                            className={`px-2 py-1 inline-flex text-xs leading-5 font-semibold rounded-full ${getStatusColorClass(
-                              agendamento.status
-                            )}`}
-                          >
-                            {agendamento.status}
-                          </span>
-                        </td>
-                        <td className="px-6 py-4 whitespace-nowrap text-sm font-medium text-gray-900">
-                          {formatPrice(agendamento.valor_total)}
-                        </td>
-                        <td className="px-6 py-4 whitespace-nowrap text-right text-sm font-medium">
-                          <button
-                            onClick={() => handleOpenForm(agendamento)}
-                            className="text-blue-600 hover:text-blue-900 mr-3"
-                          >
-                            <Edit className="h-5 w-5" />
-                          </button>
-                          <button
-                            onClick={() =>
-                              handleDelete(agendamento.agendamento_id)
-                            }
-                            className="text-red-600 hover:text-red-900"
-                          >
-                            <Trash2 className="h-5 w-5" />
-                          </button>
-                        </td>
-                      </tr>
-                    );
-                  })
-                )}
-              </tbody>
-            </table>
-          </div>
+                      {nomesServicos}
+                    </div>
+                  </td>
+                  <td className="px-6 py-4 whitespace-nowrap">
+                    <div className="text-sm text-gray-900">
+                      {agendamento.funcionario_nome || "-"}
+                    </div>
+                  </td>
+                  <td className="px-6 py-4 whitespace-nowrap">
+                    <span
+                      className={`px-2 py-1 inline-flex text-xs leading-5 font-semibold rounded-full ${getStatusColorClass(
+                        agendamento.status
+                      )}`}
+                    >
+                      {agendamento.status}
+                    </span>
+                  </td>
+                  <td className="px-6 py-4 whitespace-nowrap text-sm font-medium text-gray-900">
+                    {formatPrice(agendamento.valor_total)}
+                  </td>
+                  <td className="px-6 py-4 whitespace-nowrap text-right text-sm font-medium">
+                    <button
+                      onClick={() => handleOpenForm(agendamento)}
+                      className="text-blue-600 hover:text-blue-900 mr-3"
+                    >
+                      <Edit className="h-5 w-5" />
+                    </button>
+                    <button
+                      onClick={() => handleDelete(agendamento.agendamento_id)}
+                      className="text-red-600 hover:text-red-900"
+                    >
+                      <Trash2 className="h-5 w-5" />
+                    </button>
+                  </td>
+                </tr>
+              );
+            }}
+          />
         </div>
       </div>
     </ErrorBoundary>
@@ -1,4 +1,4 @@
-import { useState, useEffect } from "react";
+import { useState } from "react";
 import { PlusCircle, Search, Edit, Trash2, X } from "lucide-react";
 import animalService, {
   Animal,
@@ -6,6 +6,13 @@ import animalService, {
   AnimalUpdate,
 } from "../../services/animalService";
 import clienteService, { Cliente } from "../../services/clienteService";
+import { useDebouncedValue } from "../../hooks/use-debounced-value";
+import { usePaginatedList } from "../../hooks/use-paginated-list";
+import VirtualTable from "../layout/VirtualTable";
+import BuscaSelect from "../layout/BuscaSelect";
+
+// Altura fixa das linhas (duas linhas de texto em "Espécie/Raça"), usada pela virtualização.
+const ROW_HEIGHT = 73;
 
 // Tipos
 interface AnimalFormData {
@@ -18,9 +25,9 @@ interface AnimalFormData {
 }
 
 const AnimaisList = () => {
-  const [animais, setAnimais] = useState<Animal[]>([]);
-  const [clientes, setClientes] = useState<Cliente[]>([]);
-  const [loading, setLoading] = useState(true);
+  // Nome do dono escolhido, mostrado no campo de busca de clientes
+  const [clienteNome, setClienteNome] = useState("");
+  const [saving, setSaving] = useState(false);
   const [error, setError] = useState<string | null>(null);
   const [searchTerm, setSearchTerm] = useState("");
   const [showForm, setShowForm] = useState(false);
@@ -34,48 +41,19 @@ const AnimaisList = () => {
     observacoes: "",
   });
 
-  // Carregar dados da API
-  useEffect(() => {
-    const fetchData = async () => {
-      try {
-        setLoading(true);
-        const [animaisData, clientesData] = await Promise.all([
-          animalService.getAll(),
-          clienteService.getAll(),
-        ]);
-        setAnimais(
-          animaisData.map((animal) => ({
-            ...animal,
-            cliente_nome:
-              clientesData.find((c) => c.cliente_id === animal.cliente_id)
-                ?.nome || "Desconhecido",
-          }))
-        );
-        setClientes(clientesData);
-        setError(null);
-      } catch (err: any) {
-        console.error("Erro ao buscar dados:", err);
-        setError(
-          err.response?.data?.detail ||
-            "Não foi possível carregar os dados. Tente novamente."
-        );
-      } finally {
-        setLoading(false);
-      }
-    };
-    fetchData();
-  }, []);
+  // Busca (nome, espécie, raça ou dono) e paginação no servidor, após uma pausa na digitação
+  const busca = useDebouncedValue(searchTerm.trim());
+  const animais = usePaginatedList<Animal>({
+    fetchPage: (params) => animalService.getPage({ ...params, busca }),
+    getKey: (animal) => animal.animal_id,
+    filtros: { busca },
+    errorMessage: "Não foi possível carregar os dados. Tente novamente.",
+  });
 
-  // Filtrar animais
-  const filteredAnimais = animais.filter(
-    (animal) =>
-      animal.nome.toLowerCase().includes(searchTerm.toLowerCase()) ||
-      animal.especie.toLowerCase().includes(searchTerm.toLowerCase()) ||
-      (animal.raca &&
-        animal.raca.toLowerCase().includes(searchTerm.toLowerCase())) ||
-      (animal.cliente_nome &&
-        animal.cliente_nome.toLowerCase().includes(searchTerm.toLowerCase()))
-  );
+  const handleClienteSelect = (cliente: Cliente | null) => {
+    setFormData({ ...formData, cliente_id: cliente?.cliente_id ?? 0 });
+    setClienteNome(cliente?.nome ?? "");
+  };
 
   const handleInputChange = (
     e: React.ChangeEvent<
@@ -85,7 +63,7 @@ const AnimaisList = () => {
     const { name, value } = e.target;
     setFormData({
       ...formData,
-      [name]: name === "cliente_id" ? parseInt(value, 10) : value,
+      [name]: value,
     });
   };
 
@@ -98,6 +76,7 @@ const AnimaisList = () => {
       data_nascimento: "",
       observacoes: "",
     });
+    setClienteNome("");
     setEditingAnimal(null);
   };
 
@@ -112,6 +91,7 @@ const AnimaisList = () => {
         data_nascimento: animal.data_nascimento || "",
         observacoes: animal.observacoes || "",
       });
+      setClienteNome(animal.cliente_nome || "");
     } else {
       resetForm();
     }
@@ -133,10 +113,7 @@ const AnimaisList = () => {
     }
 
     try {
-      setLoading(true);
-      const clienteNome =
-        clientes.find((c) => c.cliente_id === formData.cliente_id)?.nome ||
-        "Desconhecido";
+      setSaving(true);
       if (editingAnimal) {
         const animalData: AnimalUpdate = {
           nome: formData.nome,
@@ -149,13 +126,11 @@ const AnimaisList = () => {
           editingAnimal.animal_id,
           animalData
         );
-        setAnimais(
-          animais.map((a) =>
-            a.animal_id === updatedAnimal.animal_id
-              ? { ...updatedAnimal, cliente_nome: clienteNome }
-              : a
-          )
-        );
+        // O dono não muda na edição
+        animais.replaceItem({
+          ...updatedAnimal,
+          cliente_nome: editingAnimal.cliente_nome,
+        });
       } else {
         // Adicionar novo animal
         const animalData: AnimalCreate = {
@@ -166,11 +141,12 @@ const AnimaisList = () => {
           data_nascimento: formData.data_nascimento,
           observacoes: formData.observacoes,
         };
-        const newAnimal = await animalService.create(animalData);
-        setAnimais([...animais, { ...newAnimal, cliente_nome: clienteNome }]);
+        await animalService.create(animalData);
+        // O novo animal entra na posição do nome: recarrega a partir da primeira página
+        animais.reload();
       }
 
-      setLoading(false);
+      setSaving(false);
       setShowForm(false);
       resetForm();
       setError(null);
@@ -179,16 +155,16 @@ const AnimaisList = () => {
       setError(
         err.response?.data?.detail || "Erro ao salvar animal. Tente novamente."
       );
-      setLoading(false);
+      setSaving(false);
     }
   };
 
   const handleDelete = async (id: number) => {
     if (window.confirm("Tem certeza que deseja excluir este animal?")) {
       try {
-        setLoading(true);
+        setSaving(true);
         await animalService.delete(id);
-        setAnimais(animais.filter((a) => a.animal_id !== id));
+        animais.removeItem(id);
         setError(null);
       } catch (err: any) {
         console.error("Erro ao excluir animal:", err);
@@ -197,7 +173,7 @@ const AnimaisList = () => {
             "Erro ao excluir animal. Tente novamente."
         );
       } finally {
-        setLoading(false);
+        setSaving(false);
       }
     }
   };
@@ -209,8 +185,9 @@ const AnimaisList = () => {
     return date.toLocaleDateString("pt-BR");
   };
 
-  if (error && !loading) {
-    return <div className="text-red-500 p-4">{error}</div>;
+  const pageError = error || animais.error;
+  if (pageError && !saving && !animais.loading) {
+    return <div className="text-red-500 p-4">{pageError}</div>;
   }
 
   return (
@@ -238,6 +215,11 @@ const AnimaisList = () => {
           />
           <Search className="absolute left-3 top-3 h-5 w-5 text-gray-400" />
         </div>
+        {animais.total !== null && (
+          <p className="mt-2 text-sm text-gray-500">
+            {animais.total} animal(is) encontrado(s)
+          </p>
+        )}
       </div>
 
       {}
@@ -264,21 +246,17 @@ const AnimaisList = () => {
                 >
                   Cliente*
                 </label>
-                <select
+                {/* Busca no servidor: a lista de clientes não cabe num select. O dono não muda na edição. */}
+                <BuscaSelect<Cliente>
                   id="cliente_id"
-                  name="cliente_id"
-                  value={formData.cliente_id}
-                  onChange={handleInputChange}
-                  className="w-full p-2 border border-gray-300 rounded-md focus:outline-none focus:ring-2 focus:ring-blue-500"
-                  required
-                >
-                  <option value="">Selecione um cliente</option>
-                  {clientes.map((cliente) => (
-                    <option key={cliente.cliente_id} value={cliente.cliente_id}>
-                      {cliente.nome}
-                    </option>
-                  ))}
-                </select>
+                  fetchPage={clienteService.getPage}
+                  getKey={(cliente) => cliente.cliente_id}
+                  getLabel={(cliente) => `${cliente.nome} (${cliente.email})`}
+                  selectedLabel={clienteNome}
+                  onSelect={handleClienteSelect}
+                  placeholder="Selecione um cliente"
+                  disabled={editingAnimal !== null}
+                />
               </div>
 
               <div className="mb-4">
@@ -370,9 +348,9 @@ const AnimaisList = () => {
                 <button
                   type="submit"
                   className="px-4 py-2 bg-blue-600 text-white rounded-md hover:bg-blue-700"
-                  disabled={loading}
+                  disabled={saving}
                 >
-                  {loading ? "Salvando..." : "Salvar"}
+                  {saving ? "Salvando..." : "Salvar"}
                 </button>
               </div>
             </form>
@@ -380,99 +358,81 @@ const AnimaisList = () => {
         </div>
       )}
 
-      {/* Tabela de animais */}
+      {/* Tabela de animais (virtualizada; próximas páginas carregadas na rolagem) */}
       <div className="bg-white shadow-md rounded-lg overflow-hidden">
-        <div className="overflow-x-auto">
-          <table className="min-w-full divide-y divide-gray-200">
-            <thead className="bg-gray-50">
-              <tr>
-                <th className="px-6 py-3 text-left text-xs font-medium text-gray-500 uppercase tracking-wider">
-                  Nome
-                </th>
-                <th className="px-6 py-3 text-left text-xs font-medium text-gray-500 uppercase tracking-wider">
-                  Espécie/Raça
-                </th>
-                <th className="px-6 py-3 text-left text-xs font-medium text-gray-500 uppercase tracking-wider">
-                  Cliente
-                </th>
-                <th className="px-6 py-3 text-left text-xs font-medium text-gray-500 uppercase tracking-wider">
-                  Nascimento
-                </th>
-                <th className="px-6 py-3 text-left text-xs font-medium text-gray-500 uppercase tracking-wider">
-                  Observações
-                </th>
-                <th className="px-6 py-3 text-right text-xs font-medium text-gray-500 uppercase tracking-wider">
-                  Ações
-                </th>
-              </tr>
-            </thead>
-            <tbody className="bg-white divide-y divide-gray-200">
-              {loading ? (
-                <tr>
-                  <td colSpan={6} className="px-6 py-4 text-center">
-                    <div className="flex justify-center">
-                      <div className="animate-spin rounded-full h-6 w-6 border-b-2 border-blue-600"></div>
-                    </div>
-                  </td>
-                </tr>
-              ) : filteredAnimais.length === 0 ? (
-                <tr>
-                  <td
-                    colSpan={6}
-                    className="px-6 py-4 text-center text-gray-500"
-                  >
-                    Nenhum animal encontrado
-                  </td>
-                </tr>
-              ) : (
-                filteredAnimais.map((animal) => (
-                  <tr key={animal.animal_id} className="hover:bg-gray-50">
-                    <td className="px-6 py-4 whitespace-nowrap">
-                      <div className="text-sm font-medium text-gray-900">
-                        {animal.nome}
-                      </div>
-                    </td>
-                    <td className="px-6 py-4 whitespace-nowrap">
-                      <div className="text-sm text-gray-900">
-                        {animal.especie}
-                      </div>
-                      <div className="text-sm text-gray-500">
-                        {animal.raca || "-"}
-                      </div>
-                    </td>
-                    <td className="px-6 py-4 whitespace-nowrap">
-                      <div className="text-sm text-gray-900">
-                        {animal.cliente_nome}
-                      </div>
-                    </td>
-                    <td className="px-6 py-4 whitespace-nowrap text-sm text-gray-500">
-                      {formatDate(animal.data_nascimento)}
-                    </td>
-                    <td className="px-6 py-4">
-                      <div className="text-sm text-gray-500 truncate max-w-xs">
-                        {animal.observacoes || "-"}
-                      </div>
-                    </td>
-                    <td className="px-6 py-4 whitespace-nowrap text-right text-sm font-medium">
-                      <button
-                        onClick={() => handleOpenForm(animal)}
-                        className="text-blue-600 hover:text-blue-900 mr-3"
-                      >
-                        <Edit className="h-5 w-5" />
-                      </button>
-                      <button
-                        onClick={() => handleDelete(animal.animal_id)}
-                        className="text-red-600 hover:text-red-900"
-                      >
-                        <Trash2 className="h-5 w-5" />
-                      </button>
-                    </td>
-                  </tr>
-                ))
-              )}
-            </tbody>
-          </table>
-        </div>
+        <VirtualTable
+          items={animais.items}
+          rowHeight={ROW_HEIGHT}
+          colSpan={6}
+          loading={animais.loading}
+          loadingMore={animais.loadingMore}
+          hasMore={animais.hasMore}
+          onEndReached={animais.loadMore}
+          resetKey={busca}
+          emptyMessage="Nenhum animal encontrado"
+          header={
+            <tr>
+              <th className="px-6 py-3 text-left text-xs font-medium text-gray-500 uppercase tracking-wider">
+                Nome
+              </th>
+              <th className="px-6 py-3 text-left text-xs font-medium text-gray-500 uppercase tracking-wider">
+                Espécie/Raça
+              </th>
+              <th className="px-6 py-3 text-left text-xs font-medium text-gray-500 uppercase tracking-wider">
+                Cliente
+              </th>
+              <th className="px-6 py-3 text-left text-xs font-medium text-gray-500 uppercase tracking-wider">
+                Nascimento
+              </th>
+              <th className="px-6 py-3 text-left text-xs font-medium text-gray-500 uppercase tracking-wider">
+                Observações
+              </th>
+              <th className="px-6 py-3 text-right text-xs font-medium text-gray-500 uppercase tracking-wider">
+                Ações
+              </th>
+            </tr>
+          }
+          renderRow={(animal, style) => (
+            <tr key={animal.animal_id} className="hover:bg-gray-50" style={style}>
+              <td className="px-6 py-4 whitespace-nowrap">
+                <div className="text-sm font-medium text-gray-900">
+                  {animal.nome}
+                </div>
+              </td>
+              <td className="px-6 py-4 whitespace-nowrap">
+                <div className="text-sm text-gray-900">{animal.especie}</div>
+                <div className="text-sm text-gray-500">{animal.raca || "-"}</div>
+              </td>
+              <td className="px-6 py-4 whitespace-nowrap">
+                <div className="text-sm text-gray-900">
+                  {animal.cliente_nome || "Desconhecido"}
+                </div>
+              </td>
+              <td className="px-6 py-4 whitespace-nowrap text-sm text-gray-500">
+                {formatDate(animal.data_nascimento)}
+              </td>
+              <td className="px-6 py-4">
+                <div className="text-sm text-gray-500 truncate max-w-xs">
+                  {animal.observacoes || "-"}
+                </div>
+              </td>
+              <td className="px-6 py-4 whitespace-nowrap text-right text-sm font-medium">
+                <button
+                  onClick={() => handleOpenForm(animal)}
+                  className="text-blue-600 hover:text-blue-900 mr-3"
+                >
+                  <Edit className="h-5 w-5" />
+                </button>
+                <button
+                  onClick={() => handleDelete(animal.animal_id)}
+                  className="text-red-600 hover:text-red-900"
+                >
+                  <Trash2 className="h-5 w-5" />
+                </button>
+              </td>
+            </tr>
+          )}
+        />
       </div>
     </div>
   );
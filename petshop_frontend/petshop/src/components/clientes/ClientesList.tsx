@@ -1,11 +1,19 @@
-import { useState, useEffect } from "react";
+import { useState } from "react";
 import { PlusCircle, Search, Edit, Trash2, X, PawPrint } from "lucide-react";
 import clienteService, {
   Cliente,
+  ClienteCompleto,
   ClienteCreate,
   ClienteUpdate,
 } from "../../services/clienteService";
-import animalService, { Animal } from "../../services/animalService";
+import { Animal } from "../../services/animalService";
+import { Agendamento } from "../../services/agendamentoService";
+import { useDebouncedValue } from "../../hooks/use-debounced-value";
+import { usePaginatedList } from "../../hooks/use-paginated-list";
+import VirtualTable from "../layout/VirtualTable";
+
+// Altura fixa das linhas (duas linhas de texto em "Contato"), usada pela virtualização.
+const ROW_HEIGHT = 73;
 
 interface ClienteFormData {
   nome: string;
@@ -15,8 +23,7 @@ interface ClienteFormData {
 }
 
 const ClientesList = () => {
-  const [clientes, setClientes] = useState<Cliente[]>([]);
-  const [loading, setLoading] = useState(true);
+  const [saving, setSaving] = useState(false);
   const [error, setError] = useState<string | null>(null);
   const [searchTerm, setSearchTerm] = useState("");
   const [showForm, setShowForm] = useState(false);
@@ -30,35 +37,31 @@ const ClientesList = () => {
   const [showAnimaisModal, setShowAnimaisModal] = useState(false);
   const [selectedCliente, setSelectedCliente] = useState<Cliente | null>(null);
   const [animaisCliente, setAnimaisCliente] = useState<Animal[]>([]);
+  const [proximosAgendamentos, setProximosAgendamentos] = useState<
+    Agendamento[]
+  >([]);
   const [animaisLoading, setAnimaisLoading] = useState(false);
 
-  // Carregar dados da API
-  useEffect(() => {
-    const fetchClientes = async () => {
-      try {
-        setLoading(true);
-        const data = await clienteService.getAll();
-        setClientes(data);
-        setError(null);
-      } catch (err: any) {
-        console.error("Erro ao buscar clientes:", err);
-        setError(
-          err.response?.data?.detail ||
-            "Não foi possível carregar os clientes. Por favor, tente novamente."
-        );
-      } finally {
-        setLoading(false);
-      }
-    };
-    fetchClientes();
-  }, []);
+  // Busca e paginação no servidor; a busca só é enviada após uma pausa na digitação
+  const busca = useDebouncedValue(searchTerm.trim());
+  const clientes = usePaginatedList<Cliente>({
+    fetchPage: (params) => clienteService.getPage({ ...params, busca }),
+    getKey: (cliente) => cliente.cliente_id,
+    filtros: { busca },
+    errorMessage:
+      "Não foi possível carregar os clientes. Por favor, tente novamente.",
+  });
 
-  // Função para carregar animais de um cliente
+  // Carrega animais e próximos agendamentos do cliente em uma única requisição
   const fetchAnimaisCliente = async (clienteId: number) => {
     try {
       setAnimaisLoading(true);
-      const data = await animalService.getByCliente(clienteId);
-      setAnimaisCliente(data);
+      const data: ClienteCompleto = await clienteService.getCompleto(
+        clienteId,
+        ["animais", "agendamentos"]
+      );
+      setAnimaisCliente(data.animais ?? []);
+      setProximosAgendamentos(data.proximos_agendamentos ?? []);
     } catch (err: any) {
       console.error("Erro ao buscar animais:", err);
       setError(
@@ -70,14 +73,6 @@ const ClientesList = () => {
     }
   };
 
-  // Filtrar clientes
-  const filteredClientes = clientes.filter(
-    (cliente) =>
-      cliente.nome.toLowerCase().includes(searchTerm.toLowerCase()) ||
-      cliente.email.toLowerCase().includes(searchTerm.toLowerCase()) ||
-      cliente.telefone.includes(searchTerm)
-  );
-
   const handleInputChange = (e: React.ChangeEvent<HTMLInputElement>) => {
     const { name, value } = e.target;
     setFormData({
@@ -125,7 +120,7 @@ const ClientesList = () => {
     }
 
     try {
-      setLoading(true);
+      setSaving(true);
       if (editingCliente) {
         const clienteData: ClienteUpdate = {
           nome: formData.nome,
@@ -137,11 +132,7 @@ const ClientesList = () => {
           editingCliente.cliente_id,
           clienteData
         );
-        setClientes(
-          clientes.map((c) =>
-            c.cliente_id === updatedCliente.cliente_id ? updatedCliente : c
-          )
-        );
+        clientes.replaceItem(updatedCliente);
       } else {
         const clienteData: ClienteCreate = {
           nome: formData.nome,
@@ -149,8 +140,9 @@ const ClientesList = () => {
           email: formData.email,
           endereco: formData.endereco,
         };
-        const newCliente = await clienteService.create(clienteData);
-        setClientes([...clientes, newCliente]);
+        await clienteService.create(clienteData);
+        // O novo cliente entra na posição do nome: recarrega a partir da primeira página
+        clientes.reload();
       }
 
       setShowForm(false);
@@ -163,16 +155,16 @@ const ClientesList = () => {
           "Erro ao salvar cliente. Por favor, tente novamente."
       );
     } finally {
-      setLoading(false);
+      setSaving(false);
     }
   };
 
   const handleDelete = async (id: number) => {
     if (window.confirm("Tem certeza que deseja excluir este cliente?")) {
       try {
-        setLoading(true);
+        setSaving(true);
         await clienteService.delete(id);
-        setClientes(clientes.filter((c) => c.cliente_id !== id));
+        clientes.removeItem(id);
         setError(null);
       } catch (err: any) {
         console.error("Erro ao excluir cliente:", err);
@@ -181,7 +173,7 @@ const ClientesList = () => {
             "Erro ao excluir cliente. Por favor, tente novamente."
         );
       } finally {
-        setLoading(false);
+        setSaving(false);
       }
     }
   };
@@ -196,6 +188,7 @@ const ClientesList = () => {
     setShowAnimaisModal(false);
     setSelectedCliente(null);
     setAnimaisCliente([]);
+    setProximosAgendamentos([]);
   };
 
   // Formatação de data
@@ -206,8 +199,9 @@ const ClientesList = () => {
     );
   };
 
-  if (error && !loading) {
-    return <div className="text-red-500 p-4">{error}</div>;
+  const pageError = error || clientes.error;
+  if (pageError && !saving && !clientes.loading) {
+    return <div className="text-red-500 p-4">{pageError}</div>;
   }
 
   return (
@@ -235,6 +229,11 @@ const ClientesList = () => {
           />
           <Search className="absolute left-3 top-3 h-5 w-5 text-gray-400" />
         </div>
+        {clientes.total !== null && (
+          <p className="mt-2 text-sm text-gray-500">
+            {clientes.total} cliente(s) encontrado(s)
+          </p>
+        )}
       </div>
 
       {}
@@ -324,9 +323,9 @@ const ClientesList = () => {
                 <button
                   type="submit"
                   className="px-4 py-2 bg-blue-600 text-white rounded-md hover:bg-blue-700"
-                  disabled={loading}
+                  disabled={saving}
                 >
-                  {loading ? "Salvando..." : "Salvar"}
+                  {saving ? "Salvando..." : "Salvar"}
                 </button>
               </div>
             </form>
@@ -371,6 +370,34 @@ const ClientesList = () => {
                 ))}
               </ul>
             )}
+            {!animaisLoading && proximosAgendamentos.length > 0 && (
+              <div className="mt-4">
+                <h3 className="text-sm font-semibold text-gray-700 mb-2">
+                  Próximos agendamentos
+                </h3>
+                <ul className="divide-y divide-gray-200">
+                  {proximosAgendamentos.map((agendamento) => (
+                    <li key={agendamento.agendamento_id} className="py-2">
+                      <div className="text-sm font-medium text-gray-900">
+                        {new Date(
+                          agendamento.data_hora_agendamento
+                        ).toLocaleString("pt-BR", {
+                          dateStyle: "short",
+                          timeStyle: "short",
+                        })}{" "}
+                        - {agendamento.animal_nome}
+                      </div>
+                      <div className="text-sm text-gray-500">
+                        {agendamento.status}
+                        {agendamento.funcionario_nome
+                          ? ` com ${agendamento.funcionario_nome}`
+                          : ""}
+                      </div>
+                    </li>
+                  ))}
+                </ul>
+              </div>
+            )}
             <div className="flex justify-end mt-4">
               <button
                 onClick={handleCloseAnimaisModal}
@@ -383,98 +410,84 @@ const ClientesList = () => {
         </div>
       )}
 
-      {/* Tabela de clientes */}
+      {/* Tabela de clientes (virtualizada; próximas páginas carregadas na rolagem) */}
       <div className="bg-white shadow-md rounded-lg overflow-hidden">
-        <div className="overflow-x-auto">
-          <table className="min-w-full divide-y divide-gray-200">
-            <thead className="bg-gray-50">
-              <tr>
-                <th className="px-6 py-3 text-left text-xs font-medium text-gray-500 uppercase tracking-wider">
-                  Nome
-                </th>
-                <th className="px-6 py-3 text-left text-xs font-medium text-gray-500 uppercase tracking-wider">
-                  Contato
-                </th>
-                <th className="px-6 py-3 text-left text-xs font-medium text-gray-500 uppercase tracking-wider">
-                  Endereço
-                </th>
-                <th className="px-6 py-3 text-left text-xs font-medium text-gray-500 uppercase tracking-wider">
-                  Cadastro
-                </th>
-                <th className="px-6 py-3 text-right text-xs font-medium text-gray-500 uppercase tracking-wider">
-                  Ações
-                </th>
-              </tr>
-            </thead>
-            <tbody className="bg-white divide-y divide-gray-200">
-              {loading && clientes.length === 0 ? (
-                <tr>
-                  <td colSpan={5} className="px-6 py-4 text-center">
-                    <div className="flex justify-center">
-                      <div className="animate-spin rounded-full h-6 w-6 border-b-2 border-blue-600"></div>
-                    </div>
-                  </td>
-                </tr>
-              ) : filteredClientes.length === 0 ? (
-                <tr>
-                  <td
-                    colSpan={5}
-                    className="px-6 py-4 text-center text-gray-500"
-                  >
-                    Nenhum cliente encontrado
-                  </td>
-                </tr>
-              ) : (
-                filteredClientes.map((cliente) => (
-                  <tr key={cliente.cliente_id} className="hover:bg-gray-50">
-                    <td className="px-6 py-4 whitespace-nowrap">
-                      <div className="text-sm font-medium text-gray-900">
-                        {cliente.nome}
-                      </div>
-                    </td>
-                    <td className="px-6 py-4 whitespace-nowrap">
-                      <div className="text-sm text-gray-900">
-                        {cliente.telefone}
-                      </div>
-                      <div className="text-sm text-gray-500">
-                        {cliente.email}
-                      </div>
-                    </td>
-                    <td className="px-6 py-4 whitespace-nowrap">
-                      <div className="text-sm text-gray-500">
-                        {cliente.endereco || "-"}
-                      </div>
-                    </td>
-                    <td className="px-6 py-4 whitespace-nowrap text-sm text-gray-500">
-                      {formatDate(cliente.data_cadastro)}
-                    </td>
-                    <td className="px-6 py-4 whitespace-nowrap text-right text-sm font-medium">
-                      <button
-                        onClick={() => handleOpenAnimaisModal(cliente)}
-                        className="text-green-600 hover:text-green-900 mr-3"
-                        title="Ver Animais"
-                      >
-                        <PawPrint className="h-5 w-5" />
-                      </button>
-                      <button
-                        onClick={() => handleOpenForm(cliente)}
-                        className="text-blue-600 hover:text-blue-900 mr-3"
-                      >
-                        <Edit className="h-5 w-5" />
-                      </button>
-                      <button
-                        onClick={() => handleDelete(cliente.cliente_id)}
-                        className="text-red-600 hover:text-red-900"
-                      >
-                        <Trash2 className="h-5 w-5" />
-                      </button>
-                    </td>
-                  </tr>
-                ))
-              )}
-            </tbody>
-          </table>
-        </div>
+        <VirtualTable
+          items={clientes.items}
+          rowHeight={ROW_HEIGHT}
+          colSpan={5}
+          loading={clientes.loading}
+          loadingMore={clientes.loadingMore}
+          hasMore={clientes.hasMore}
+          onEndReached={clientes.loadMore}
+          resetKey={busca}
+          emptyMessage="Nenhum cliente encontrado"
+          header={
+            <tr>
+              <th className="px-6 py-3 text-left text-xs font-medium text-gray-500 uppercase tracking-wider">
+                Nome
+              </th>
+              <th className="px-6 py-3 text-left text-xs font-medium text-gray-500 uppercase tracking-wider">
+                Contato
+              </th>
+              <th className="px-6 py-3 text-left text-xs font-medium text-gray-500 uppercase tracking-wider">
+                Endereço
+              </th>
+              <th className="px-6 py-3 text-left text-xs font-medium text-gray-500 uppercase tracking-wider">
+                Cadastro
+              </th>
+              <th className="px-6 py-3 text-right text-xs font-medium text-gray-500 uppercase tracking-wider">
+                Ações
+              </th>
+            </tr>
+          }
+          renderRow={(cliente, style) => (
+            <tr
+              key={cliente.cliente_id}
+              className="hover:bg-gray-50"
+              style={style}
+            >
+              <td className="px-6 py-4 whitespace-nowrap">
+                <div className="text-sm font-medium text-gray-900">
+                  {cliente.nome}
+                </div>
+              </td>
+              <td className="px-6 py-4 whitespace-nowrap">
+                <div className="text-sm text-gray-900">{cliente.telefone}</div>
+                <div className="text-sm text-gray-500">{cliente.email}</div>
+              </td>
+              <td className="px-6 py-4 whitespace-nowrap">
+                <div className="text-sm text-gray-500">
+                  {cliente.endereco || "-"}
+                </div>
+              </td>
+              <td className="px-6 py-4 whitespace-nowrap text-sm text-gray-500">
+                {formatDate(cliente.data_cadastro)}
+              </td>
+              <td className="px-6 py-4 whitespace-nowrap text-right text-sm font-medium">
+                <button
+                  onClick={() => handleOpenAnimaisModal(cliente)}
+                  className="text-green-600 hover:text-green-900 mr-3"
+                  title="Ver Animais"
+                >
+                  <PawPrint className="h-5 w-5" />
+                </button>
+                <button
+                  onClick={() => handleOpenForm(cliente)}
+                  className="text-blue-600 hover:text-blue-900 mr-3"
+                >
+                  <Edit className="h-5 w-5" />
+                </button>
+                <button
+                  onClick={() => handleDelete(cliente.cliente_id)}
+                  className="text-red-600 hover:text-red-900"
+                >
+                  <Trash2 className="h-5 w-5" />
+                </button>
+              </td>
+            </tr>
+          )}
+        />
       </div>
     </div>
   );
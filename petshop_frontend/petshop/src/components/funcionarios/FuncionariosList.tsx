@@ -1,10 +1,16 @@
-import { useState, useEffect } from "react";
+import { useState } from "react";
 import { PlusCircle, Search, Edit, Trash2, X } from "lucide-react";
 import funcionarioService, {
   Funcionario,
   FuncionarioCreate,
   FuncionarioUpdate,
 } from "../../services/funcionarioService";
+import { useDebouncedValue } from "../../hooks/use-debounced-value";
+import { usePaginatedList } from "../../hooks/use-paginated-list";
+import VirtualTable from "../layout/VirtualTable";
+
+// Altura fixa das linhas (duas linhas de texto em "Contato"), usada pela virtualização.
+const ROW_HEIGHT = 73;
 
 // Tipos
 interface FuncionarioFormData {
@@ -17,8 +23,7 @@ interface FuncionarioFormData {
 }
 
 const FuncionariosList = () => {
-  const [funcionarios, setFuncionarios] = useState<Funcionario[]>([]);
-  const [loading, setLoading] = useState(true);
+  const [saving, setSaving] = useState(false);
   const [error, setError] = useState<string | null>(null);
   const [searchTerm, setSearchTerm] = useState("");
   const [showForm, setShowForm] = useState(false);
@@ -33,36 +38,14 @@ const FuncionariosList = () => {
     ativo: true,
   });
 
-  // Carregar dados da API
-  useEffect(() => {
-    const fetchFuncionarios = async () => {
-      try {
-        setLoading(true);
-        const data = await funcionarioService.getAll();
-        setFuncionarios(data);
-        setError(null);
-      } catch (err: any) {
-        console.error("Erro ao buscar funcionários:", err);
-        setError(
-          err.response?.data?.detail ||
-            "Não foi possível carregar os funcionários. Tente novamente."
-        );
-      } finally {
-        setLoading(false);
-      }
-    };
-    fetchFuncionarios();
-  }, []);
-
-  // Filtrar funcionários
-  const filteredFuncionarios = funcionarios.filter(
-    (funcionario) =>
-      funcionario.nome.toLowerCase().includes(searchTerm.toLowerCase()) ||
-      funcionario.cargo.toLowerCase().includes(searchTerm.toLowerCase()) ||
-      (funcionario.email &&
-        funcionario.email.toLowerCase().includes(searchTerm.toLowerCase())) ||
-      (funcionario.telefone && funcionario.telefone.includes(searchTerm))
-  );
+  // Busca e paginação no servidor; a busca só é enviada após uma pausa na digitação
+  const busca = useDebouncedValue(searchTerm.trim());
+  const funcionarios = usePaginatedList<Funcionario>({
+    fetchPage: (params) => funcionarioService.getPage({ ...params, busca }),
+    getKey: (funcionario) => funcionario.funcionario_id,
+    filtros: { busca },
+    errorMessage: "Não foi possível carregar os funcionários. Tente novamente.",
+  });
 
   const handleInputChange = (
     e: React.ChangeEvent<HTMLInputElement | HTMLSelectElement>
@@ -127,7 +110,7 @@ const FuncionariosList = () => {
     }
 
     try {
-      setLoading(true);
+      setSaving(true);
       if (editingFuncionario) {
         // Atualizar funcionário existente
         const funcionarioData: FuncionarioUpdate = {
@@ -142,13 +125,7 @@ const FuncionariosList = () => {
           editingFuncionario.funcionario_id,
           funcionarioData
         );
-        setFuncionarios(
-          funcionarios.map((f) =>
-            f.funcionario_id === updatedFuncionario.funcionario_id
-              ? updatedFuncionario
-              : f
-          )
-        );
+        funcionarios.replaceItem(updatedFuncionario);
       } else {
         // Adicionar novo funcionário
         const funcionarioData: FuncionarioCreate = {
@@ -159,11 +136,12 @@ const FuncionariosList = () => {
           data_contratacao: formData.data_contratacao,
           ativo: formData.ativo,
         };
-        const newFuncionario = await funcionarioService.create(funcionarioData);
-        setFuncionarios([...funcionarios, newFuncionario]);
+        await funcionarioService.create(funcionarioData);
+        // O novo funcionário entra na posição do nome: recarrega a partir da primeira página
+        funcionarios.reload();
       }
 
-      setLoading(false);
+      setSaving(false);
       setShowForm(false);
       resetForm();
       setError(null);
@@ -173,16 +151,16 @@ const FuncionariosList = () => {
         err.response?.data?.detail ||
           "Erro ao salvar funcionário. Tente novamente."
       );
-      setLoading(false);
+      setSaving(false);
     }
   };
 
   const handleDelete = async (id: number) => {
     if (window.confirm("Tem certeza que deseja excluir este funcionário?")) {
       try {
-        setLoading(true);
+        setSaving(true);
         await funcionarioService.delete(id);
-        setFuncionarios(funcionarios.filter((f) => f.funcionario_id !== id));
+        funcionarios.removeItem(id);
         setError(null);
       } catch (err: any) {
         console.error("Erro ao excluir funcionário:", err);
@@ -191,7 +169,7 @@ const FuncionariosList = () => {
             "Erro ao excluir funcionário. Tente novamente."
         );
       } finally {
-        setLoading(false);
+        setSaving(false);
       }
     }
   };
@@ -202,8 +180,9 @@ const FuncionariosList = () => {
     return date.toLocaleDateString("pt-BR");
   };
 
-  if (error && !loading) {
-    return <div className="text-red-500 p-4">{error}</div>;
+  const pageError = error || funcionarios.error;
+  if (pageError && !saving && !funcionarios.loading) {
+    return <div className="text-red-500 p-4">{pageError}</div>;
   }
 
   return (
@@ -231,6 +210,11 @@ const FuncionariosList = () => {
           />
           <Search className="absolute left-3 top-3 h-5 w-5 text-gray-400" />
         </div>
+        {funcionarios.total !== null && (
+          <p className="mt-2 text-sm text-gray-500">
+            {funcionarios.total} funcionário(s) encontrado(s)
+          </p>
+        )}
       </div>
 
       {}
@@ -351,9 +335,9 @@ const FuncionariosList = () => {
                 <button
                   type="submit"
                   className="px-4 py-2 bg-blue-600 text-white rounded-md hover:bg-blue-700"
-                  disabled={loading}
+                  disabled={saving}
                 >
-                  {loading ? "Salvando..." : "Salvar"}
+                  {saving ? "Salvando..." : "Salvar"}
                 </button>
               </div>
             </form>
@@ -361,108 +345,93 @@ const FuncionariosList = () => {
         </div>
       )}
 
-      {/* Tabela de funcionários */}
+      {/* Tabela de funcionários (virtualizada; próximas páginas carregadas na rolagem) */}
       <div className="bg-white shadow-md rounded-lg overflow-hidden">
-        <div className="overflow-x-auto">
-          <table className="min-w-full divide-y divide-gray-200">
-            <thead className="bg-gray-50">
-              <tr>
-                <th className="px-6 py-3 text-left text-xs font-medium text-gray-500 uppercase tracking-wider">
-                  Nome
-                </th>
-                <th className="px-6 py-3 text-left text-xs font-medium text-gray-500 uppercase tracking-wider">
-                  Cargo
-                </th>
-                <th className="px-6 py-3 text-left text-xs font-medium text-gray-500 uppercase tracking-wider">
-                  Contato
-                </th>
-                <th className="px-6 py-3 text-left text-xs font-medium text-gray-500 uppercase tracking-wider">
-                  Contratação
-                </th>
-                <th className="px-6 py-3 text-left text-xs font-medium text-gray-500 uppercase tracking-wider">
-                  Status
-                </th>
-                <th className="px-6 py-3 text-right text-xs font-medium text-gray-500 uppercase tracking-wider">
-                  Ações
-                </th>
-              </tr>
-            </thead>
-            <tbody className="bg-white divide-y divide-gray-200">
-              {loading ? (
-                <tr>
-                  <td colSpan={6} className="px-6 py-4 text-center">
-                    <div className="flex justify-center">
-                      <div className="animate-spin rounded-full h-6 w-6 border-b-2 border-blue-600"></div>
-                    </div>
-                  </td>
-                </tr>
-              ) : filteredFuncionarios.length === 0 ? (
-                <tr>
-                  <td
-                    colSpan={6}
-                    className="px-6 py-4 text-center text-gray-500"
-                  >
-                    Nenhum funcionário encontrado
-                  </td>
-                </tr>
-              ) : (
-                filteredFuncionarios.map((funcionario) => (
-                  <tr
-                    key={funcionario.funcionario_id}
-                    className="hover:bg-gray-50"
-                  >
-                    <td className="px-6 py-4 whitespace-nowrap">
-                      <div className="text-sm font-medium text-gray-900">
-                        {funcionario.nome}
-                      </div>
-                    </td>
-                    <td className="px-6 py-4 whitespace-nowrap">
-                      <div className="text-sm text-gray-900">
-                        {funcionario.cargo}
-                      </div>
-                    </td>
-                    <td className="px-6 py-4 whitespace-nowrap">
-                      <div className="text-sm text-gray-900">
-                        {funcionario.telefone || "-"}
-                      </div>
-                      <div className="text-sm text-gray-500">
-                        {funcionario.email || "-"}
-                      </div>
-                    </td>
-                    <td className="px-6 py-4 whitespace-nowrap text-sm text-gray-500">
-                      {formatDate(funcionario.data_contratacao)}
-                    </td>
-                    <td className="px-6 py-4 whitespace-nowrap">
-                      <span
-                        className={`px-2 inline-flex text-xs leading-5 font-semibold rounded-full ${
-                          funcionario.ativo
-                            ? "bg-green-100 text-green-800"
-                            : "bg-red-100 text-red-800"
-                        }`}
-                      >
-                        {funcionario.ativo ? "Ativo" : "Inativo"}
-                      </span>
-                    </td>
-                    <td className="px-6 py-4 whitespace-nowrap text-right text-sm font-medium">
-                      <button
-                        onClick={() => handleOpenForm(funcionario)}
-                        className="text-blue-600 hover:text-blue-900 mr-3"
-                      >
-                        <Edit className="h-5 w-5" />
-                      </button>
-                      <button
-                        onClick={() => handleDelete(funcionario.funcionario_id)}
-                        className="text-red-600 hover:text-red-900"
-                      >
-                        <Trash2 className="h-5 w-5" />
-                      </button>
-                    </td>
-                  </tr>
-                ))
-              )}
-            </tbody>
-          </table>
-        </div>
+        <VirtualTable
+          items={funcionarios.items}
+          rowHeight={ROW_HEIGHT}
+          colSpan={6}
+          loading={funcionarios.loading}
+          loadingMore={funcionarios.loadingMore}
+          hasMore={funcionarios.hasMore}
+          onEndReached={funcionarios.loadMore}
+          resetKey={busca}
+          emptyMessage="Nenhum funcionário encontrado"
+          header={
+            <tr>
+              <th className="px-6 py-3 text-left text-xs font-medium text-gray-500 uppercase tracking-wider">
+                Nome
+              </th>
+              <th className="px-6 py-3 text-left text-xs font-medium text-gray-500 uppercase tracking-wider">
+                Cargo
+              </th>
+              <th className="px-6 py-3 text-left text-xs font-medium text-gray-500 uppercase tracking-wider">
+                Contato
+              </th>
+              <th className="px-6 py-3 text-left text-xs font-medium text-gray-500 uppercase tracking-wider">
+                Contratação
+              </th>
+              <th className="px-6 py-3 text-left text-xs font-medium text-gray-500 uppercase tracking-wider">
+                Status
+              </th>
+              <th className="px-6 py-3 text-right text-xs font-medium text-gray-500 uppercase tracking-wider">
+                Ações
+              </th>
+            </tr>
+          }
+          renderRow={(funcionario, style) => (
+            <tr
+              key={funcionario.funcionario_id}
+              className="hover:bg-gray-50"
+              style={style}
+            >
+              <td className="px-6 py-4 whitespace-nowrap">
+                <div className="text-sm font-medium text-gray-900">
+                  {funcionario.nome}
+                </div>
+              </td>
+              <td className="px-6 py-4 whitespace-nowrap">
+                <div className="text-sm text-gray-900">{funcionario.cargo}</div>
+              </td>
+              <td className="px-6 py-4 whitespace-nowrap">
+                <div className="text-sm text-gray-900">
+                  {funcionario.telefone || "-"}
+                </div>
+                <div className="text-sm text-gray-500">
+                  {funcionario.email || "-"}
+                </div>
+              </td>
+              <td className="px-6 py-4 whitespace-nowrap text-sm text-gray-500">
+                {formatDate(funcionario.data_contratacao)}
+              </td>
+              <td className="px-6 py-4 whitespace-nowrap">
+                <span
+                  className={`px-2 inline-flex text-xs leading-5 font-semibold rounded-full ${
+                    funcionario.ativo
+                      ? "bg-green-100 text-green-800"
+                      : "bg-red-100 text-red-800"
+                  }`}
+                >
+                  {funcionario.ativo ? "Ativo" : "Inativo"}
+                </span>
+              </td>
+              <td className="px-6 py-4 whitespace-nowrap text-right text-sm font-medium">
+                <button
+                  onClick={() => handleOpenForm(funcionario)}
+                  className="text-blue-600 hover:text-blue-900 mr-3"
+                >
+                  <Edit className="h-5 w-5" />
+                </button>
+                <button
+                  onClick={() => handleDelete(funcionario.funcionario_id)}
+                  className="text-red-600 hover:text-red-900"
+                >
+                  <Trash2 className="h-5 w-5" />
+                </button>
+              </td>
+            </tr>
+          )}
+        />
       </div>
     </div>
   );
@@ -0,0 +1,204 @@
+import { useEffect, useRef, useState } from "react";
+import type { KeyboardEvent } from "react";
+import axios from "axios";
+import { Pagina, PaginaParams } from "../../services/api";
+import { useDebouncedValue } from "../../hooks/use-debounced-value";
+
+// Opções mostradas por busca: o suficiente para escolher; para achar outra, refine o texto.
+const LIMITE_OPCOES = 20;
+
+// Select com busca no servidor (getPage com "busca"), para listas que não cabem num
+// <select> (clientes, animais...): ao abrir mostra a primeira página em ordem de nome e,
+// a cada pausa na digitação, a página da busca. A requisição anterior é cancelada.
+interface BuscaSelectProps<T> {
+  id: string;
+  fetchPage: (params: PaginaParams) => Promise<Pagina<T>>;
+  getKey: (item: T) => number;
+  getLabel: (item: T) => string;
+  // Texto da opção escolhida ("" se nenhuma), mostrado com o campo fechado.
+  selectedLabel: string;
+  onSelect: (item: T | null) => void;
+  placeholder: string;
+  // Oferece "nenhum" como primeira opção (campos opcionais).
+  allowEmpty?: boolean;
+  // Opções que não devem aparecer (ex.: serviços já adicionados).
+  exclude?: (item: T) => boolean;
+  disabled?: boolean;
+}
+
+function BuscaSelect<T>({
+  id,
+  fetchPage,
+  getKey,
+  getLabel,
+  selectedLabel,
+  onSelect,
+  placeholder,
+  allowEmpty = false,
+  exclude,
+  disabled = false,
+}: BuscaSelectProps<T>) {
+  const inputRef = useRef<HTMLInputElement>(null);
+  const [open, setOpen] = useState(false);
+  const [text, setText] = useState("");
+  const [items, setItems] = useState<T[]>([]);
+  const [loading, setLoading] = useState(false);
+  const [error, setError] = useState<string | null>(null);
+  const [highlighted, setHighlighted] = useState(0);
+
+  const busca = useDebouncedValue(text.trim());
+
+  useEffect(() => {
+    if (!open) return;
+    const controller = new AbortController();
+    setLoading(true);
+    setError(null);
+    fetchPage({ skip: 0, limit: LIMITE_OPCOES, busca, signal: controller.signal })
+      .then((pagina) => {
+        if (controller.signal.aborted) return;
+        setItems(pagina.itens);
+        setHighlighted(0);
+        setLoading(false);
+      })
+      .catch((err) => {
+        if (axios.isCancel(err) || controller.signal.aborted) return;
+        console.error(`Erro ao buscar opções de ${id}:`, err);
+        setError("Não foi possível carregar as opções.");
+        setLoading(false);
+      });
+    return () => controller.abort();
+    // fetchPage costuma ser uma função nova a cada render; a busca só depende do texto.
+    // eslint-disable-next-line react-hooks/exhaustive-deps
+  }, [open, busca]);
+
+  const visibleItems = exclude ? items.filter((item) => !exclude(item)) : items;
+  // Com allowEmpty, o índice 0 é a opção "nenhum".
+  const offset = allowEmpty ? 1 : 0;
+  const total = visibleItems.length + offset;
+
+  const openList = () => {
+    if (disabled) return;
+    setText("");
+    setOpen(true);
+  };
+
+  const choose = (item: T | null) => {
+    onSelect(item);
+    setOpen(false);
+    inputRef.current?.blur();
+  };
+
+  const chooseIndex = (index: number) => {
+    if (allowEmpty && index === 0) {
+      choose(null);
+    } else if (visibleItems[index - offset] !== undefined) {
+      choose(visibleItems[index - offset]);
+    }
+  };
+
+  const handleKeyDown = (e: KeyboardEvent<HTMLInputElement>) => {
+    if (!open) {
+      if (e.key === "ArrowDown" || e.key === "Enter") {
+        e.preventDefault();
+        openList();
+      }
+      return;
+    }
+    if (e.key === "ArrowDown") {
+      e.preventDefault();
+      setHighlighted((atual) => Math.min(atual + 1, total - 1));
+    } else if (e.key === "ArrowUp") {
+      e.preventDefault();
+      setHighlighted((atual) => Math.max(atual - 1, 0));
+    } else if (e.key === "Enter") {
+      // Enter escolhe a opção destacada em vez de enviar o formulário.
+      e.preventDefault();
+      if (!loading) chooseIndex(highlighted);
+    } else if (e.key === "Escape") {
+      e.preventDefault();
+      setOpen(false);
+    }
+  };
+
+  const optionClass = (index: number) =>
+    `px-3 py-2 cursor-pointer text-sm ${
+      index === highlighted ? "bg-blue-100" : "hover:bg-gray-100"
+    }`;
+
+  return (
+    <div className="relative">
+      <input
+        ref={inputRef}
+        id={id}
+        type="text"
+        autoComplete="off"
+        role="combobox"
+        aria-expanded={open}
+        aria-controls={`${id}-opcoes`}
+        value={open ? text : selectedLabel}
+        placeholder={open ? "Digite para buscar..." : placeholder}
+        onFocus={openList}
+        onClick={() => !open && openList()}
+        onBlur={() => setOpen(false)}
+        onChange={(e) => setText(e.target.value)}
+        onKeyDown={handleKeyDown}
+        disabled={disabled}
+        className="w-full p-2 border border-gray-300 rounded-md focus:outline-none focus:ring-2 focus:ring-blue-500 disabled:bg-gray-100"
+      />
+      {open && (
+        <ul
+          id={`${id}-opcoes`}
+          role="listbox"
+          className="absolute z-10 mt-1 w-full max-h-60 overflow-y-auto bg-white border border-gray-300 rounded-md shadow-lg"
+        >
+          {allowEmpty && (
+            // onMouseDown (e não onClick): escolhe antes do blur fechar a lista.
+            <li
+              role="option"
+              aria-selected={highlighted === 0}
+              className={`${optionClass(0)} text-gray-500`}
+              onMouseDown={(e) => {
+                e.preventDefault();
+                choose(null);
+              }}
+            >
+              {placeholder}
+            </li>
+          )}
+          {loading ? (
+            <li className="px-3 py-2 text-sm text-gray-500">Buscando...</li>
+          ) : error ? (
+            <li className="px-3 py-2 text-sm text-red-500">{error}</li>
+          ) : visibleItems.length === 0 ? (
+            <li className="px-3 py-2 text-sm text-gray-500">
+              Nenhum resultado
+            </li>
+          ) : (
+            visibleItems.map((item, index) => (
+              <li
+                key={getKey(item)}
+                role="option"
+                aria-selected={highlighted === index + offset}
+                className={optionClass(index + offset)}
+                onMouseEnter={() => setHighlighted(index + offset)}
+                onMouseDown={(e) => {
+                  e.preventDefault();
+                  choose(item);
+                }}
+              >
+                {getLabel(item)}
+              </li>
+            ))
+          )}
+          {!loading && items.length === LIMITE_OPCOES && (
+            <li className="px-3 py-2 text-xs text-gray-400">
+              Mostrando os primeiros {LIMITE_OPCOES}; digite para refinar.
+            </li>
+          )}
+        </ul>
+      )}
+    </div>
+  );
+}
+
+export default BuscaSelect;
@@ -0,0 +1,143 @@
+import { useEffect, useLayoutEffect, useRef, useState } from "react";
+import type { CSSProperties, ReactNode } from "react";
+
+// Tabela com rolagem própria que só monta no DOM as linhas visíveis (mais uma margem):
+// as demais viram dois espaçadores com a altura correspondente. Todas as linhas têm a
+// mesma altura (rowHeight, aplicada pelo style passado a renderRow), o que permite achar
+// as linhas visíveis só pela posição da rolagem. Perto do fim chama onEndReached.
+interface VirtualTableProps<T> {
+  items: T[];
+  header: ReactNode;
+  renderRow: (item: T, style: CSSProperties) => ReactNode;
+  rowHeight: number;
+  colSpan: number;
+  loading: boolean;
+  loadingMore: boolean;
+  hasMore: boolean;
+  onEndReached: () => void;
+  emptyMessage: string;
+  // Quando muda (ex.: nova busca), a rolagem volta ao topo.
+  resetKey?: unknown;
+  maxHeight?: string;
+  overscan?: number;
+}
+
+const Spinner = ({ colSpan }: { colSpan: number }) => (
+  <tr>
+    <td colSpan={colSpan} className="px-6 py-4 text-center">
+      <div className="flex justify-center">
+        <div className="animate-spin rounded-full h-6 w-6 border-b-2 border-blue-600"></div>
+      </div>
+    </td>
+  </tr>
+);
+
+function VirtualTable<T>({
+  items,
+  header,
+  renderRow,
+  rowHeight,
+  colSpan,
+  loading,
+  loadingMore,
+  hasMore,
+  onEndReached,
+  emptyMessage,
+  resetKey,
+  maxHeight = "70vh",
+  overscan = 10,
+}: VirtualTableProps<T>) {
+  const containerRef = useRef<HTMLDivElement>(null);
+  const frameRef = useRef<number | null>(null);
+  const [scrollTop, setScrollTop] = useState(0);
+  const [viewportHeight, setViewportHeight] = useState(600);
+
+  useLayoutEffect(() => {
+    const container = containerRef.current;
+    if (!container) return;
+    setViewportHeight(container.clientHeight);
+    const observer = new ResizeObserver(() =>
+      setViewportHeight(container.clientHeight)
+    );
+    observer.observe(container);
+    return () => observer.disconnect();
+  }, []);
+
+  useEffect(() => {
+    if (containerRef.current) containerRef.current.scrollTop = 0;
+    setScrollTop(0);
+  }, [resetKey]);
+
+  useEffect(
+    () => () => {
+      if (frameRef.current !== null) cancelAnimationFrame(frameRef.current);
+    },
+    []
+  );
+
+  // No máximo uma atualização por quadro, por mais eventos de rolagem que cheguem.
+  const handleScroll = () => {
+    if (frameRef.current !== null) return;
+    frameRef.current = requestAnimationFrame(() => {
+      frameRef.current = null;
+      if (containerRef.current) setScrollTop(containerRef.current.scrollTop);
+    });
+  };
+
+  const start = Math.min(
+    items.length,
+    Math.max(0, Math.floor(scrollTop / rowHeight) - overscan)
+  );
+  const end = Math.min(
+    items.length,
+    Math.ceil((scrollTop + viewportHeight) / rowHeight) + overscan
+  );
+
+  useEffect(() => {
+    if (hasMore && !loading && !loadingMore && end >= items.length - overscan) {
+      onEndReached();
+    }
+  }, [end, items.length, hasMore, loading, loadingMore, overscan, onEndReached]);
+
+  const rowStyle: CSSProperties = { height: rowHeight };
+
+  return (
+    <div
+      ref={containerRef}
+      onScroll={handleScroll}
+      className="overflow-auto"
+      style={{ maxHeight }}
+    >
+      <table className="min-w-full divide-y divide-gray-200">
+        <thead className="bg-gray-50 sticky top-0 z-10">{header}</thead>
+        <tbody className="bg-white divide-y divide-gray-200">
+          {loading && items.length === 0 ? (
+            <Spinner colSpan={colSpan} />
+          ) : items.length === 0 ? (
+            <tr>
+              <td colSpan={colSpan} className="px-6 py-4 text-center text-gray-500">
+                {emptyMessage}
+              </td>
+            </tr>
+          ) : (
+            <>
+              {start > 0 && (
+                <tr aria-hidden="true" style={{ height: start * rowHeight }} />
+              )}
+              {items.slice(start, end).map((item) => renderRow(item, rowStyle))}
+              {end < items.length && (
+                <tr
+                  aria-hidden="true"
+                  style={{ height: (items.length - end) * rowHeight }}
+                />
+              )}
+              {loadingMore && <Spinner colSpan={colSpan} />}
+            </>
+          )}
+        </tbody>
+      </table>
+    </div>
+  );
+}
+
+export default VirtualTable;
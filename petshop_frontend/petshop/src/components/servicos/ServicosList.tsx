@@ -1,10 +1,16 @@
-import { useState, useEffect } from "react";
+import { useState } from "react";
 import { PlusCircle, Search, Edit, Trash2, X } from "lucide-react";
 import servicoService, {
   Servico,
   ServicoCreate,
   ServicoUpdate,
 } from "../../services/servicoService";
+import { useDebouncedValue } from "../../hooks/use-debounced-value";
+import { usePaginatedList } from "../../hooks/use-paginated-list";
+import VirtualTable from "../layout/VirtualTable";
+
+// Altura fixa das linhas (uma linha de texto e os ícones de ação), usada pela virtualização.
+const ROW_HEIGHT = 57;
 
 // Tipos
 interface ServicoFormData {
@@ -15,8 +21,7 @@ interface ServicoFormData {
 }
 
 const ServicosList = () => {
-  const [servicos, setServicos] = useState<Servico[]>([]);
-  const [loading, setLoading] = useState(true);
+  const [saving, setSaving] = useState(false);
   const [error, setError] = useState<string | null>(null);
   const [searchTerm, setSearchTerm] = useState("");
   const [showForm, setShowForm] = useState(false);
@@ -28,36 +33,14 @@ const ServicosList = () => {
     duracao_estimada_minutos: "",
   });
 
-  // Carregar dados da API
-  useEffect(() => {
-    const fetchServicos = async () => {
-      try {
-        setLoading(true);
-        const data = await servicoService.getAll();
-        setServicos(data);
-        setError(null);
-      } catch (err: any) {
-        console.error("Erro ao buscar serviços:", err);
-        setError(
-          err.response?.data?.detail ||
-            "Não foi possível carregar os serviços. Tente novamente."
-        );
-      } finally {
-        setLoading(false);
-      }
-    };
-    fetchServicos();
-  }, []);
-
-  // Filtrar serviços com base no termo de pesquisa
-  const filteredServicos = servicos.filter(
-    (servico) =>
-      servico.nome.toLowerCase().includes(searchTerm.toLowerCase()) ||
-      (servico.descricao &&
-        servico.descricao.toLowerCase().includes(searchTerm.toLowerCase())) ||
-      servico.preco.toString().includes(searchTerm) ||
-      servico.duracao_estimada_minutos.toString().includes(searchTerm)
-  );
+  // Busca (nome e descrição) e paginação no servidor, após uma pausa na digitação
+  const busca = useDebouncedValue(searchTerm.trim());
+  const servicos = usePaginatedList<Servico>({
+    fetchPage: (params) => servicoService.getPage({ ...params, busca }),
+    getKey: (servico) => servico.servico_id,
+    filtros: { busca },
+    errorMessage: "Não foi possível carregar os serviços. Tente novamente.",
+  });
 
   // Manipuladores de eventos para o formulário
   const handleInputChange = (
@@ -128,7 +111,7 @@ const ServicosList = () => {
     }
 
     try {
-      setLoading(true);
+      setSaving(true);
       if (editingServico) {
         // Atualizar serviço existente
         const servicoData: ServicoUpdate = {
@@ -141,11 +124,7 @@ const ServicosList = () => {
           editingServico.servico_id,
           servicoData
         );
-        setServicos(
-          servicos.map((s) =>
-            s.servico_id === updatedServico.servico_id ? updatedServico : s
-          )
-        );
+        servicos.replaceItem(updatedServico);
       } else {
         // Adicionar novo serviço
         const servicoData: ServicoCreate = {
@@ -154,11 +133,12 @@ const ServicosList = () => {
           preco: preco,
           duracao_estimada_minutos: duracao,
         };
-        const newServico = await servicoService.create(servicoData);
-        setServicos([...servicos, newServico]);
+        await servicoService.create(servicoData);
+        // O novo serviço entra na posição do nome: recarrega a partir da primeira página
+        servicos.reload();
       }
 
-      setLoading(false);
+      setSaving(false);
       setShowForm(false);
       resetForm();
       setError(null);
@@ -167,16 +147,16 @@ const ServicosList = () => {
       setError(
         err.response?.data?.detail || "Erro ao salvar serviço. Tente novamente."
       );
-      setLoading(false);
+      setSaving(false);
     }
   };
 
   const handleDelete = async (id: number) => {
     if (window.confirm("Tem certeza que deseja excluir este serviço?")) {
       try {
-        setLoading(true);
+        setSaving(true);
         await servicoService.delete(id);
-        setServicos(servicos.filter((s) => s.servico_id !== id));
+        servicos.removeItem(id);
         setError(null);
       } catch (err: any) {
         console.error("Erro ao excluir serviço:", err);
@@ -185,7 +165,7 @@ const ServicosList = () => {
             "Erro ao excluir serviço. Tente novamente."
         );
       } finally {
-        setLoading(false);
+        setSaving(false);
       }
     }
   };
@@ -210,8 +190,9 @@ const ServicosList = () => {
       : `${hours}h`;
   };
 
-  if (error && !loading) {
-    return <div className="text-red-500 p-4">{error}</div>;
+  const pageError = error || servicos.error;
+  if (pageError && !saving && !servicos.loading) {
+    return <div className="text-red-500 p-4">{pageError}</div>;
   }
 
   return (
@@ -239,6 +220,11 @@ const ServicosList = () => {
           />
           <Search className="absolute left-3 top-3 h-5 w-5 text-gray-400" />
         </div>
+        {servicos.total !== null && (
+          <p className="mt-2 text-sm text-gray-500">
+            {servicos.total} serviço(s) encontrado(s)
+          </p>
+        )}
       </div>
 
       {/* Modal de formulário */}
@@ -335,9 +321,9 @@ const ServicosList = () => {
                 <button
                   type="submit"
                   className="px-4 py-2 bg-blue-600 text-white rounded-md hover:bg-blue-700"
-                  disabled={loading}
+                  disabled={saving}
                 >
-                  {loading ? "Salvando..." : "Salvar"}
+                  {saving ? "Salvando..." : "Salvar"}
                 </button>
               </div>
             </form>
@@ -345,88 +331,74 @@ const ServicosList = () => {
         </div>
       )}
 
-      {/* Tabela de serviços */}
+      {/* Tabela de serviços (virtualizada; próximas páginas carregadas na rolagem) */}
       <div className="bg-white shadow-md rounded-lg overflow-hidden">
-        <div className="overflow-x-auto">
-          <table className="min-w-full divide-y divide-gray-200">
-            <thead className="bg-gray-50">
-              <tr>
-                <th className="px-6 py-3 text-left text-xs font-medium text-gray-500 uppercase tracking-wider">
-                  Nome
-                </th>
-                <th className="px-6 py-3 text-left text-xs font-medium text-gray-500 uppercase tracking-wider">
-                  Descrição
-                </th>
-                <th className="px-6 py-3 text-left text-xs font-medium text-gray-500 uppercase tracking-wider">
-                  Preço
-                </th>
-                <th className="px-6 py-3 text-left text-xs font-medium text-gray-500 uppercase tracking-wider">
-                  Duração
-                </th>
-                <th className="px-6 py-3 text-right text-xs font-medium text-gray-500 uppercase tracking-wider">
-                  Ações
-                </th>
-              </tr>
-            </thead>
-            <tbody className="bg-white divide-y divide-gray-200">
-              {loading ? (
-                <tr>
-                  <td colSpan={5} className="px-6 py-4 text-center">
-                    <div className="flex justify-center">
-                      <div className="animate-spin rounded-full h-6 w-6 border-b-2 border-blue-600"></div>
-                    </div>
-                  </td>
-                </tr>
-              ) : filteredServicos.length === 0 ? (
-                <tr>
-                  <td
-                    colSpan={5}
-                    className="px-6 py-4 text-center text-gray-500"
-                  >
-                    Nenhum serviço encontrado
-                  </td>
-                </tr>
-              ) : (
-                filteredServicos.map((servico) => (
-                  <tr key={servico.servico_id} className="hover:bg-gray-50">
-                    <td className="px-6 py-4 whitespace-nowrap">
-                      <div className="text-sm font-medium text-gray-900">
-                        {servico.nome}
-                      </div>
-                    </td>
-                    <td className="px-6 py-4">
-                      <div className="text-sm text-gray-500 truncate max-w-xs">
-                        {servico.descricao || "-"}
-                      </div>
-                    </td>
-                    <td className="px-6 py-4 whitespace-nowrap">
-                      <div className="text-sm text-gray-900 font-medium">
-                        {formatPrice(servico.preco)}
-                      </div>
-                    </td>
-                    <td className="px-6 py-4 whitespace-nowrap text-sm text-gray-500">
-                      {formatDuration(servico.duracao_estimada_minutos)}
-                    </td>
-                    <td className="px-6 py-4 whitespace-nowrap text-right text-sm font-medium">
-                      <button
-                        onClick={() => handleOpenForm(servico)}
-                        className="text-blue-600 hover:text-blue-900 mr-3"
-                      >
-                        <Edit className="h-5 w-5" />
-                      </button>
-                      <button
-                        onClick={() => handleDelete(servico.servico_id)}
-                        className="text-red-600 hover:text-red-900"
-                      >
-                        <Trash2 className="h-5 w-5" />
-                      </button>
-                    </td>
-                  </tr>
-                ))
-              )}
-            </tbody>
-          </table>
-        </div>
+        <VirtualTable
+          items={servicos.items}
+          rowHeight={ROW_HEIGHT}
+          colSpan={5}
+          loading={servicos.loading}
+          loadingMore={servicos.loadingMore}
+          hasMore={servicos.hasMore}
+          onEndReached={servicos.loadMore}
+          resetKey={busca}
+          emptyMessage="Nenhum serviço encontrado"
+          header={
+            <tr>
+              <th className="px-6 py-3 text-left text-xs font-medium text-gray-500 uppercase tracking-wider">
+                Nome
+              </th>
+              <th className="px-6 py-3 text-left text-xs font-medium text-gray-500 uppercase tracking-wider">
+                Descrição
+              </th>
+              <th className="px-6 py-3 text-left text-xs font-medium text-gray-500 uppercase tracking-wider">
+                Preço
+              </th>
+              <th className="px-6 py-3 text-left text-xs font-medium text-gray-500 uppercase tracking-wider">
+                Duração
+              </th>
+              <th className="px-6 py-3 text-right text-xs font-medium text-gray-500 uppercase tracking-wider">
+                Ações
+              </th>
+            </tr>
+          }
+          renderRow={(servico, style) => (
+            <tr key={servico.servico_id} className="hover:bg-gray-50" style={style}>
+              <td className="px-6 py-4 whitespace-nowrap">
+                <div className="text-sm font-medium text-gray-900">
+                  {servico.nome}
+                </div>
+              </td>
+              <td className="px-6 py-4">
+                <div className="text-sm text-gray-500 truncate max-w-xs">
+                  {servico.descricao || "-"}
+                </div>
+              </td>
+              <td className="px-6 py-4 whitespace-nowrap">
+                <div className="text-sm text-gray-900 font-medium">
+                  {formatPrice(servico.preco)}
+                </div>
+              </td>
+              <td className="px-6 py-4 whitespace-nowrap text-sm text-gray-500">
+                {formatDuration(servico.duracao_estimada_minutos)}
+              </td>
+              <td className="px-6 py-4 whitespace-nowrap text-right text-sm font-medium">
+                <button
+                  onClick={() => handleOpenForm(servico)}
+                  className="text-blue-600 hover:text-blue-900 mr-3"
+                >
+                  <Edit className="h-5 w-5" />
+                </button>
+                <button
+                  onClick={() => handleDelete(servico.servico_id)}
+                  className="text-red-600 hover:text-red-900"
+                >
+                  <Trash2 className="h-5 w-5" />
+                </button>
+              </td>
+            </tr>
+          )}
+        />
       </div>
     </div>
   );
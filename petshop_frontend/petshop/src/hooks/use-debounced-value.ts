@@ -0,0 +1,13 @@
+import * as React from "react"
+
+// Valor que só acompanha o original depois de `delay` ms sem mudanças (ex.: texto da busca).
+export function useDebouncedValue<T>(value: T, delay: number = 300): T {
+  const [debounced, setDebounced] = React.useState(value)
+
+  React.useEffect(() => {
+    const timer = window.setTimeout(() => setDebounced(value), delay)
+    return () => window.clearTimeout(timer)
+  }, [value, delay])
+
+  return debounced
+}
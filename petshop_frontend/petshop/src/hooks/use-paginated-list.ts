@@ -0,0 +1,210 @@
+import * as React from "react"
+import axios from "axios"
+
+import { Pagina, PaginaParams } from "../services/api"
+
+const PAGE_SIZE = 50
+
+// Lista paginada no servidor (skip/limit), carregada sob demanda pela rolagem.
+// Trocar `filtros` (ex.: a busca já com debounce) cancela as requisições em andamento e
+// recomeça da primeira página, que também traz o total. Assim que uma página chega, a
+// seguinte já é buscada em segundo plano, para que loadMore() normalmente só a anexe.
+export interface PaginatedList<T> {
+  items: T[]
+  total: string | null
+  loading: boolean
+  loadingMore: boolean
+  error: string | null
+  hasMore: boolean
+  loadMore: () => void
+  reload: () => void
+  replaceItem: (item: T) => void
+  removeItem: (key: number) => void
+}
+
+interface PaginatedListOptions<T> {
+  fetchPage: (params: PaginaParams) => Promise<Pagina<T>>
+  getKey: (item: T) => number
+  filtros: unknown
+  errorMessage: string
+  pageSize?: number
+}
+
+// Sequência de páginas de um conjunto de filtros.
+interface Sequencia<T> {
+  controller: AbortController
+  skip: number
+  ocupada: boolean
+  proxima: { skip: number; promise: Promise<Pagina<T>> } | null
+}
+
+const mensagemErro = (err: any, padrao: string): string =>
+  err.response?.data?.detail || padrao
+
+export function usePaginatedList<T>({
+  fetchPage,
+  getKey,
+  filtros,
+  errorMessage,
+  pageSize = PAGE_SIZE,
+}: PaginatedListOptions<T>): PaginatedList<T> {
+  const [items, setItems] = React.useState<T[]>([])
+  const [total, setTotal] = React.useState<string | null>(null)
+  const [loading, setLoading] = React.useState(true)
+  const [loadingMore, setLoadingMore] = React.useState(false)
+  const [error, setError] = React.useState<string | null>(null)
+  const [hasMore, setHasMore] = React.useState(false)
+  const [recarregar, setRecarregar] = React.useState(0)
+
+  // As funções recebidas mudam a cada render; as requisições usam sempre a mais recente.
+  const fetchRef = React.useRef(fetchPage)
+  fetchRef.current = fetchPage
+  const getKeyRef = React.useRef(getKey)
+  getKeyRef.current = getKey
+  const sequenciaRef = React.useRef<Sequencia<T> | null>(null)
+  const hasMoreRef = React.useRef(false)
+
+  const filtrosKey = JSON.stringify(filtros)
+
+  const buscar = React.useCallback(
+    (sequencia: Sequencia<T>, skip: number, comTotal = false) =>
+      fetchRef.current({
+        skip,
+        limit: pageSize,
+        comTotal,
+        signal: sequencia.controller.signal,
+      }),
+    [pageSize]
+  )
+
+  const preCarregar = React.useCallback(
+    (sequencia: Sequencia<T>) => {
+      const promise = buscar(sequencia, sequencia.skip)
+      // O erro é tratado quando a página for usada (ou ignorado, se for descartada).
+      promise.catch(() => undefined)
+      sequencia.proxima = { skip: sequencia.skip, promise }
+    },
+    [buscar]
+  )
+
+  const receberPagina = React.useCallback(
+    (sequencia: Sequencia<T>, pagina: Pagina<T>) => {
+      sequencia.skip += pagina.itens.length
+      const maisPaginas = pagina.itens.length === pageSize
+      hasMoreRef.current = maisPaginas
+      setHasMore(maisPaginas)
+      if (maisPaginas) preCarregar(sequencia)
+    },
+    [pageSize, preCarregar]
+  )
+
+  React.useEffect(() => {
+    const sequencia: Sequencia<T> = {
+      controller: new AbortController(),
+      skip: 0,
+      ocupada: true,
+      proxima: null,
+    }
+    sequenciaRef.current = sequencia
+    hasMoreRef.current = false
+    setLoading(true)
+    setLoadingMore(false)
+
+    buscar(sequencia, 0, true)
+      .then((pagina) => {
+        if (sequencia.controller.signal.aborted) return
+        setItems(pagina.itens)
+        setTotal(pagina.total)
+        setError(null)
+        receberPagina(sequencia, pagina)
+      })
+      .catch((err) => {
+        if (axios.isCancel(err)) return
+        console.error("Erro ao buscar página:", err)
+        setItems([])
+        setError(mensagemErro(err, errorMessage))
+      })
+      .finally(() => {
+        if (sequencia.controller.signal.aborted) return
+        sequencia.ocupada = false
+        setLoading(false)
+      })
+
+    return () => sequencia.controller.abort()
+    // eslint-disable-next-line react-hooks/exhaustive-deps
+  }, [filtrosKey, recarregar, buscar, receberPagina])
+
+  const loadMore = React.useCallback(() => {
+    const sequencia = sequenciaRef.current
+    if (!sequencia || sequencia.ocupada || !hasMoreRef.current) return
+    sequencia.ocupada = true
+    setLoadingMore(true)
+
+    const pendente =
+      sequencia.proxima?.skip === sequencia.skip
+        ? sequencia.proxima.promise
+        : buscar(sequencia, sequencia.skip)
+    sequencia.proxima = null
+
+    pendente
+      .then((pagina) => {
+        if (sequencia.controller.signal.aborted) return
+        // Registros inseridos por outros usuários deslocam o OFFSET: ignora repetidos.
+        setItems((atuais) => {
+          const chaves = new Set(atuais.map(getKeyRef.current))
+          return [
+            ...atuais,
+            ...pagina.itens.filter((item) => !chaves.has(getKeyRef.current(item))),
+          ]
+        })
+        receberPagina(sequencia, pagina)
+      })
+      .catch((err) => {
+        if (axios.isCancel(err)) return
+        console.error("Erro ao buscar próxima página:", err)
+        setError(mensagemErro(err, errorMessage))
+      })
+      .finally(() => {
+        if (sequencia.controller.signal.aborted) return
+        sequencia.ocupada = false
+        setLoadingMore(false)
+      })
+  }, [buscar, receberPagina, errorMessage])
+
+  const reload = React.useCallback(() => setRecarregar((n) => n + 1), [])
+
+  const replaceItem = React.useCallback((item: T) => {
+    const chave = getKeyRef.current(item)
+    setItems((atuais) =>
+      atuais.map((atual) => (getKeyRef.current(atual) === chave ? item : atual))
+    )
+  }, [])
+
+  const removeItem = React.useCallback(
+    (key: number) => {
+      setItems((atuais) => atuais.filter((item) => getKeyRef.current(item) !== key))
+      setTotal((atual) => (atual && /^\d+$/.test(atual) ? String(Number(atual) - 1) : atual))
+      // A exclusão desloca o OFFSET das páginas seguintes em um registro.
+      const sequencia = sequenciaRef.current
+      if (sequencia) {
+        sequencia.skip = Math.max(0, sequencia.skip - 1)
+        sequencia.proxima = null
+        if (!sequencia.ocupada && hasMoreRef.current) preCarregar(sequencia)
+      }
+    },
+    [preCarregar]
+  )
+
+  return {
+    items,
+    total,
+    loading,
+    loadingMore,
+    error,
+    hasMore,
+    loadMore,
+    reload,
+    replaceItem,
+    removeItem,
+  }
+}
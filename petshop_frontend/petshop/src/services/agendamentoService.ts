@@ -1,4 +1,4 @@
-import api from "./api";
+import api, { getPagina, Pagina, PaginaParams } from "./api";
 
 export interface AgendamentoServico {
   servico_id: number;
@@ -78,6 +78,13 @@ const agendamentoService = {
     return response.data;
   },
 
+  // Página de agendamentos (mais recentes primeiro); a busca encontra pelo animal, dono ou funcionário.
+  getPage: (
+    params: PaginaParams,
+    filtros: Omit<AgendamentoFiltros, "skip" | "limit"> = {}
+  ): Promise<Pagina<Agendamento>> =>
+    getPagina<Agendamento>("/agendamentos/", params, { ...filtros }),
+
   getById: async (id: number): Promise<Agendamento> => {
     const response = await api.get(`/agendamentos/${id}`);
     return response.data;
@@ -1,6 +1,6 @@
 // /home/ubuntu/petshop_frontend/petshop/src/services/animalService.ts
 
-import api from './api';
+import api, { getPagina, Pagina, PaginaParams } from './api';
 
 export interface Animal {
   animal_id: number;
@@ -10,8 +10,13 @@ export interface Animal {
   raca?: string;
   data_nascimento?: string;
   observacoes?: string;
+  cliente_nome?: string | null; // Só vem na listagem paginada (getPage)
 }
 
+// Colunas da listagem, incluindo o nome do dono (calculado pelo backend).
+const CAMPOS_LISTAGEM =
+  'animal_id,cliente_id,nome,especie,raca,data_nascimento,observacoes,cliente_nome';
+
 export interface AnimalCreate {
   cliente_id: number;
   nome: string;
@@ -36,6 +41,10 @@ const animalService = {
     return response.data;
   },
 
+  // Buscar uma página de animais (ordenados por nome); a busca também encontra pelo dono
+  getPage: (params: PaginaParams): Promise<Pagina<Animal>> =>
+    getPagina<Animal>('/animais/', params, { fields: CAMPOS_LISTAGEM }),
+
   // Buscar animais por cliente
   getByCliente: async (clienteId: number): Promise<Animal[]> => {
     const response = await api.get(`/animais/?cliente_id=${clienteId}`);
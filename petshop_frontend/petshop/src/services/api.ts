@@ -14,6 +14,10 @@ const api = axios.create({
 api.interceptors.response.use(
   (response) => response,
   (error) => {
+    // Requisições canceladas (ex.: busca substituída por outra) não são erros.
+    if (axios.isCancel(error)) {
+      return Promise.reject(error);
+    }
     console.error('Erro na requisição API:', error);
     
     // Personalizar mensagens de erro com base no status
@@ -41,4 +45,37 @@ api.interceptors.response.use(
   }
 );
 
+// Página de uma listagem (GET com skip/limit). O total vem do cabeçalho X-Total-Count,
+// só quando pedido (com_total), e pode ser "1000+" quando o backend limita a contagem.
+export interface Pagina<T> {
+  itens: T[];
+  total: string | null;
+}
+
+export interface PaginaParams {
+  skip: number;
+  limit: number;
+  busca?: string;
+  comTotal?: boolean;
+  signal?: AbortSignal;
+}
+
+export const getPagina = async <T>(
+  url: string,
+  { skip, limit, busca, comTotal, signal }: PaginaParams,
+  filtros: Record<string, string | number | boolean | undefined> = {}
+): Promise<Pagina<T>> => {
+  const params: Record<string, string | number | boolean> = { skip, limit };
+  if (busca) params.busca = busca;
+  if (comTotal) params.com_total = true;
+  for (const [chave, valor] of Object.entries(filtros)) {
+    if (valor !== undefined && valor !== "") params[chave] = valor;
+  }
+  const response = await api.get(url, { params, signal });
+  return {
+    itens: response.data,
+    total: response.headers["x-total-count"] ?? null,
+  };
+};
+
 export default api;
@@ -1,6 +1,8 @@
 // /home/ubuntu/petshop_frontend/petshop/src/services/clienteService.ts
 
-import api from './api';
+import api, { getPagina, Pagina, PaginaParams } from './api';
+import { Animal } from './animalService';
+import { Agendamento } from './agendamentoService';
 
 export interface Cliente {
   cliente_id: number;
@@ -11,6 +13,13 @@ export interface Cliente {
   data_cadastro: string;
 }
 
+// Ficha montada pelo backend em uma consulta (GET /clientes/{id}/completo).
+export interface ClienteCompleto extends Cliente {
+  animais?: Animal[];
+  proximos_agendamentos?: Agendamento[];
+  agendamentos_recentes?: Agendamento[];
+}
+
 export interface ClienteCreate {
   nome: string;
   telefone: string;
@@ -32,12 +41,24 @@ const clienteService = {
     return response.data;
   },
 
+  // Buscar uma página de clientes (ordenados por nome), com busca no servidor
+  getPage: (params: PaginaParams): Promise<Pagina<Cliente>> =>
+    getPagina<Cliente>('/clientes/', params),
+
   // Buscar cliente por ID
   getById: async (id: number): Promise<Cliente> => {
     const response = await api.get(`/clientes/${id}`);
     return response.data;
   },
 
+  // Buscar cliente com animais e agendamentos (include: animais, agendamentos, servicos)
+  getCompleto: async (id: number, include?: string[]): Promise<ClienteCompleto> => {
+    const response = await api.get(`/clientes/${id}/completo`, {
+      params: include ? { include: include.join(',') } : undefined,
+    });
+    return response.data;
+  },
+
   // Criar novo cliente
   create: async (cliente: ClienteCreate): Promise<Cliente> => {
     const response = await api.post('/clientes/', cliente);
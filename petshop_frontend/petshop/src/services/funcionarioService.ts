@@ -1,6 +1,6 @@
 // /home/ubuntu/petshop_frontend/petshop/src/services/funcionarioService.ts
 
-import api from './api';
+import api, { getPagina, Pagina, PaginaParams } from './api';
 
 export interface Funcionario {
   funcionario_id: number;
@@ -37,6 +37,10 @@ const funcionarioService = {
     return response.data;
   },
 
+  // Buscar uma página de funcionários (ordenados por nome), com busca no servidor
+  getPage: (params: PaginaParams, apenasAtivos: boolean = false): Promise<Pagina<Funcionario>> =>
+    getPagina<Funcionario>('/funcionarios/', params, { apenas_ativos: apenasAtivos }),
+
   // Buscar funcionário por ID
   getById: async (id: number): Promise<Funcionario> => {
     const response = await api.get(`/funcionarios/${id}`);
@@ -1,6 +1,6 @@
 // /home/ubuntu/petshop_frontend/petshop/src/services/servicoService.ts
 
-import api from './api';
+import api, { getPagina, Pagina, PaginaParams } from './api';
 
 export interface Servico {
   servico_id: number;
@@ -31,6 +31,10 @@ const servicoService = {
     return response.data;
   },
 
+  // Buscar uma página de serviços (ordenados por nome), com busca no servidor
+  getPage: (params: PaginaParams): Promise<Pagina<Servico>> =>
+    getPagina<Servico>('/servicos/', params),
+
   // Buscar serviço por ID
   getById: async (id: number): Promise<Servico> => {
     const response = await api.get(`/servicos/${id}`);